@@ -0,0 +1,385 @@
+# almacen_escenarios.py
+# Almacén local (SQLite embebido) de los escenarios calculados en las páginas de producción y balance de aguas.
+#
+# Los resultados se guardan una sola vez por huella (la misma que usan las cachés de sesión): parámetros en
+# JSON, resultados escalares en la tabla `metricas` (una fila por valor) y tablas completas en Parquet.
+# Un escenario es una etiqueta (sitio, fecha, nombre) que apunta a un resultado, así que el mismo cálculo
+# repetido en otro sitio o día no se vuelve a calcular ni a almacenar. Las comparaciones entre escenarios
+# se hacen sobre `metricas` en SQL, sin cargar las tablas; de las tablas solo se leen las columnas pedidas.
+# El almacén conserva como máximo MAX_ESCENARIOS escenarios: al superarlo se borran los más antiguos.
+
+import datetime
+import gzip
+import io
+import json
+import math
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from motor_produccion import totales_anuales, totales_diarios
+
+RUTA_DEFECTO = os.environ.get("BIOGAS_ALMACEN_ESCENARIOS", os.path.join(os.path.expanduser("~"), ".biogas", "escenarios.sqlite"))
+TIPOS_ESCENARIO = {"produccion": "Producción de Biogás", "balance": "Balance de Aguas"}
+VERSION_ESQUEMA = 1
+# Versión de los motores de cálculo: forma parte de la huella con la que se guardan y recuperan los resultados,
+# así que al subirla (cambios en motor_produccion o motor_balance) no se reutilizan resultados antiguos
+VERSION_CALCULO = 2
+MAX_ESCENARIOS = int(os.environ.get("BIOGAS_MAX_ESCENARIOS", "5000"))
+# Errores al abrir o usar el archivo del almacén: las páginas siguen calculando sin él
+ERRORES_ALMACEN = (OSError, sqlite3.Error)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    huella TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    parametros TEXT NOT NULL,
+    creado TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS metricas (
+    huella TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    valor REAL,
+    PRIMARY KEY (huella, clave)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tablas (
+    huella TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    formato TEXT NOT NULL,
+    filas INTEGER NOT NULL,
+    datos BLOB NOT NULL,
+    PRIMARY KEY (huella, nombre)
+);
+CREATE TABLE IF NOT EXISTS escenarios (
+    id INTEGER PRIMARY KEY,
+    huella TEXT NOT NULL REFERENCES resultados (huella),
+    tipo TEXT NOT NULL,
+    sitio TEXT NOT NULL DEFAULT '',
+    fecha TEXT NOT NULL,
+    nombre TEXT NOT NULL DEFAULT '',
+    creado TEXT NOT NULL,
+    UNIQUE (huella, sitio, fecha)
+);
+CREATE INDEX IF NOT EXISTS idx_escenarios_sitio_fecha ON escenarios (sitio, fecha);
+CREATE INDEX IF NOT EXISTS idx_escenarios_fecha ON escenarios (fecha);
+CREATE INDEX IF NOT EXISTS idx_escenarios_tipo_fecha ON escenarios (tipo, fecha);
+"""
+
+
+# --- SERIALIZACIÓN DE TABLAS ---
+def _tabla_a_blob(df):
+    """(formato, bytes): Parquet si pyarrow está instalado (permite leer solo algunas columnas); si no, CSV comprimido."""
+    buffer = io.BytesIO()
+    try:
+        df.to_parquet(buffer, index=False)
+        return "parquet", buffer.getvalue()
+    except ImportError:
+        return "csv.gz", gzip.compress(df.to_csv(index=False).encode("utf-8"), compresslevel=6)
+
+
+def _blob_a_tabla(formato, datos, columnas=None):
+    if formato == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Instale 'pyarrow' para leer escenarios guardados en Parquet: pip install pyarrow") from e
+        archivo = pq.ParquetFile(io.BytesIO(datos))
+        if columnas is not None:
+            columnas = [c for c in columnas if c in archivo.schema_arrow.names]
+        return archivo.read(columns=columnas).to_pandas()
+    return pd.read_csv(io.BytesIO(gzip.decompress(datos)), usecols=lambda c: columnas is None or c in columnas)
+
+
+def _valor_metrica(valor):
+    if valor is None:
+        return None
+    valor = float(valor)
+    return valor if math.isfinite(valor) else None
+
+
+def _hoy():
+    return datetime.date.today().isoformat()
+
+
+def _ahora():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+# --- ALMACÉN ---
+class AlmacenEscenarios:
+    """Escenarios calculados en un archivo SQLite. Seguro entre hilos (una conexión protegida por un bloqueo).
+
+    Con `max_escenarios` (None: sin límite) cada escenario nuevo que lo supere borra los más antiguos.
+    """
+
+    def __init__(self, ruta=RUTA_DEFECTO, max_escenarios=MAX_ESCENARIOS):
+        self.ruta = ruta
+        self.max_escenarios = max_escenarios
+        if ruta != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._bloqueo = threading.RLock()
+        with self._bloqueo:
+            self._conexion.execute("PRAGMA journal_mode=WAL")  # Lecturas concurrentes mientras otra sesión escribe
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.execute("PRAGMA foreign_keys=ON")
+            self._conexion.executescript(ESQUEMA)
+            self._conexion.execute(f"PRAGMA user_version={VERSION_ESQUEMA}")
+
+    def cerrar(self):
+        with self._bloqueo:
+            self._conexion.close()
+
+    def _consulta(self, sql, argumentos=()):
+        with self._bloqueo:
+            return self._conexion.execute(sql, argumentos).fetchall()
+
+    def _tabla_sql(self, sql, argumentos=()):
+        with self._bloqueo:
+            cursor = self._conexion.execute(sql, argumentos)
+            columnas = [d[0] for d in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columnas)
+
+    # --- ESCRITURA ---
+    def guardar(self, tipo, huella, metricas, tablas=None, parametros=None, sitio="", fecha=None, nombre=""):
+        """Guarda un escenario y devuelve su id.
+
+        Si el resultado con esa huella ya existe no se vuelve a escribir (solo se añade la etiqueta de
+        sitio/fecha); si el escenario (huella, sitio, fecha) ya existe se devuelve el id existente.
+        """
+        if tipo not in TIPOS_ESCENARIO:
+            raise ValueError(f"Tipo de escenario desconocido: {tipo}. Use: {', '.join(TIPOS_ESCENARIO)}")
+        fecha = str(fecha or _hoy())
+        with self._bloqueo:
+            conexion = self._conexion
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                nuevo = conexion.execute(
+                    "INSERT OR IGNORE INTO resultados (huella, tipo, parametros, creado) VALUES (?, ?, ?, ?)",
+                    (huella, tipo, json.dumps(parametros or {}, ensure_ascii=False, sort_keys=True, default=str), _ahora()),
+                ).rowcount
+                if nuevo:
+                    conexion.executemany(
+                        "INSERT INTO metricas (huella, clave, valor) VALUES (?, ?, ?)",
+                        [(huella, clave, _valor_metrica(valor)) for clave, valor in metricas.items()],
+                    )
+                    for nombre_tabla, df in (tablas or {}).items():
+                        formato, datos = _tabla_a_blob(df)
+                        conexion.execute(
+                            "INSERT INTO tablas (huella, nombre, formato, filas, datos) VALUES (?, ?, ?, ?, ?)",
+                            (huella, nombre_tabla, formato, len(df), datos),
+                        )
+                escenario_nuevo = conexion.execute(
+                    "INSERT OR IGNORE INTO escenarios (huella, tipo, sitio, fecha, nombre, creado) VALUES (?, ?, ?, ?, ?, ?)",
+                    (huella, tipo, sitio or "", fecha, nombre or "", _ahora()),
+                ).rowcount
+                identificador = conexion.execute(
+                    "SELECT id FROM escenarios WHERE huella = ? AND sitio = ? AND fecha = ?", (huella, sitio or "", fecha)
+                ).fetchone()[0]
+                conexion.execute("COMMIT")
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                raise
+        if escenario_nuevo and self.max_escenarios:
+            self.podar(self.max_escenarios)
+        return identificador
+
+    @staticmethod
+    def _borrar_huerfanos(conexion, huellas):
+        # Resultados que ya no usa ningún escenario (dentro de la transacción abierta)
+        for (huella,) in huellas:
+            if conexion.execute("SELECT 1 FROM escenarios WHERE huella = ? LIMIT 1", (huella,)).fetchone() is None:
+                for tabla in ("metricas", "tablas", "resultados"):
+                    conexion.execute(f"DELETE FROM {tabla} WHERE huella = ?", (huella,))
+
+    def borrar(self, identificador):
+        """Borra un escenario; el resultado se elimina también si ningún otro escenario lo usa."""
+        identificador = int(identificador)
+        with self._bloqueo:
+            conexion = self._conexion
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                huellas = conexion.execute("SELECT huella FROM escenarios WHERE id = ?", (identificador,)).fetchall()
+                conexion.execute("DELETE FROM escenarios WHERE id = ?", (identificador,))
+                self._borrar_huerfanos(conexion, huellas)
+                conexion.execute("COMMIT")
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                raise
+
+    def podar(self, max_escenarios):
+        """Conserva solo los `max_escenarios` escenarios guardados más recientemente. Devuelve cuántos se borran.
+
+        Las páginas liberadas en el archivo se reutilizan en las escrituras siguientes.
+        """
+        antiguos = "SELECT id FROM escenarios ORDER BY id DESC LIMIT -1 OFFSET ?"
+        with self._bloqueo:
+            conexion = self._conexion
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                huellas = conexion.execute(f"SELECT DISTINCT huella FROM escenarios WHERE id IN ({antiguos})", (int(max_escenarios),)).fetchall()
+                borrados = conexion.execute(f"DELETE FROM escenarios WHERE id IN ({antiguos})", (int(max_escenarios),)).rowcount
+                self._borrar_huerfanos(conexion, huellas)
+                conexion.execute("COMMIT")
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                raise
+        return borrados
+
+    def numero_escenarios(self):
+        return self._consulta("SELECT COUNT(*) FROM escenarios")[0][0]
+
+    # --- LECTURA ---
+    def existe(self, huella):
+        return bool(self._consulta("SELECT 1 FROM resultados WHERE huella = ?", (huella,)))
+
+    def huella_escenario(self, identificador):
+        fila = self._consulta("SELECT huella FROM escenarios WHERE id = ?", (int(identificador),))  # Admite enteros de NumPy
+        if not fila:
+            raise KeyError(f"No existe el escenario {identificador}.")
+        return fila[0][0]
+
+    def metricas(self, huella):
+        """{clave: valor} de un resultado (None para valores no finitos)."""
+        return dict(self._consulta("SELECT clave, valor FROM metricas WHERE huella = ?", (huella,)))
+
+    def parametros(self, huella):
+        fila = self._consulta("SELECT parametros FROM resultados WHERE huella = ?", (huella,))
+        return json.loads(fila[0][0]) if fila else None
+
+    def cargar_tabla(self, huella, nombre, columnas=None):
+        """Tabla guardada con el resultado (None si no existe); con `columnas` solo se leen esas columnas."""
+        fila = self._consulta("SELECT formato, datos FROM tablas WHERE huella = ? AND nombre = ?", (huella, nombre))
+        if not fila:
+            return None
+        return _blob_a_tabla(fila[0][0], fila[0][1], columnas)
+
+    def sitios(self):
+        return [fila[0] for fila in self._consulta("SELECT DISTINCT sitio FROM escenarios ORDER BY sitio")]
+
+    def listar(self, sitio=None, desde=None, hasta=None, tipo=None, metricas=(), limite=None):
+        """Escenarios (más recientes primero) con filtros opcionales por sitio, rango de fechas y tipo.
+
+        `metricas` añade esas claves como columnas en la misma consulta, sin cargar ninguna tabla.
+        """
+        condiciones, argumentos = [], []
+        for condicion, valor in (("e.sitio = ?", sitio), ("e.fecha >= ?", desde), ("e.fecha <= ?", hasta), ("e.tipo = ?", tipo)):
+            if valor is not None:
+                condiciones.append(condicion)
+                argumentos.append(str(valor))
+        # Una búsqueda por clave primaria (huella, clave) por métrica: no se recorren las demás métricas
+        columnas_metricas = "".join(
+            f", (SELECT valor FROM metricas m WHERE m.huella = e.huella AND m.clave = ?) AS \"{clave}\"" for clave in metricas
+        )
+        sql = (
+            f"SELECT e.id, e.tipo, e.sitio, e.fecha, e.nombre, e.creado, e.huella{columnas_metricas} FROM escenarios e"
+            + (" WHERE " + " AND ".join(condiciones) if condiciones else "")
+            + " ORDER BY e.fecha DESC, e.id DESC"
+            + (" LIMIT ?" if limite else "")
+        )
+        return self._tabla_sql(sql, list(metricas) + argumentos + ([int(limite)] if limite else []))
+
+    # --- COMPARACIÓN ---
+    def diferencias(self, id_a, id_b):
+        """Métricas de dos escenarios lado a lado con la diferencia absoluta y relativa (b - a)."""
+        huella_a, huella_b = self.huella_escenario(id_a), self.huella_escenario(id_b)
+        df = self._tabla_sql(
+            "SELECT a.clave, a.valor AS a, b.valor AS b FROM metricas a LEFT JOIN metricas b ON b.huella = ? AND b.clave = a.clave "
+            "WHERE a.huella = ? "
+            "UNION ALL SELECT b.clave, NULL, b.valor FROM metricas b WHERE b.huella = ? "
+            "AND NOT EXISTS (SELECT 1 FROM metricas a WHERE a.huella = ? AND a.clave = b.clave) ORDER BY 1",
+            (huella_b, huella_a, huella_b, huella_a),
+        )
+        df[["a", "b"]] = df[["a", "b"]].astype(float)
+        df["diferencia"] = df["b"] - df["a"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df["diferencia_relativa"] = np.where(df["a"].abs() > 0, df["diferencia"] / df["a"].abs(), np.nan)
+        return df
+
+    def diferencias_parametros(self, id_a, id_b):
+        """Parámetros que cambian entre dos escenarios."""
+        a = self.parametros(self.huella_escenario(id_a)) or {}
+        b = self.parametros(self.huella_escenario(id_b)) or {}
+        filas = [(clave, a.get(clave), b.get(clave)) for clave in sorted(set(a) | set(b)) if a.get(clave) != b.get(clave)]
+        return pd.DataFrame(filas, columns=["parametro", "a", "b"])
+
+    def diferencias_tabla(self, id_a, id_b, nombre, clave, columnas):
+        """Compara `columnas` de una tabla guardada fila a fila, emparejando por la columna `clave`.
+
+        Solo se leen `clave` y `columnas` de cada tabla. Devuelve, por cada columna, los valores de a y b y
+        su diferencia; las filas que solo existen en un escenario quedan con NaN en el otro.
+        """
+        partes = []
+        for identificador, sufijo in ((id_a, "a"), (id_b, "b")):
+            df = self.cargar_tabla(self.huella_escenario(identificador), nombre, [clave] + list(columnas))
+            if df is None:
+                raise KeyError(f"El escenario {identificador} no tiene la tabla '{nombre}'.")
+            partes.append(df.groupby(clave, observed=True, sort=False)[list(columnas)].sum().add_suffix(f" ({sufijo})"))
+        df = partes[0].join(partes[1], how="outer")
+        for col in columnas:
+            df[f"{col} (b - a)"] = df[f"{col} (b)"].fillna(0.0) - df[f"{col} (a)"].fillna(0.0)
+        return df.reset_index()
+
+
+# --- ESCENARIOS DE LAS PÁGINAS ---
+def huella_almacen(huella):
+    """Huella con la que se guarda un resultado: la de la caché de sesión más la versión de los motores."""
+    return f"{huella}-v{VERSION_CALCULO}"
+
+
+def metricas_produccion(df_resultados):
+    """Totales anuales y diarios de la tabla de producción (lo que se compara entre escenarios)."""
+    metricas = dict(totales_anuales(df_resultados), **totales_diarios(df_resultados))
+    metricas["biometano_final_m3_ano"] = float(df_resultados["Biometano final (m3/año)"].sum())
+    metricas["insumos"] = len(df_resultados)
+    return metricas
+
+
+def guardar_produccion(almacen, huella, df_resultados, sitio="", fecha=None, nombre=""):
+    return almacen.guardar("produccion", huella_almacen(huella), metricas_produccion(df_resultados), {"produccion": df_resultados}, {}, sitio, fecha, nombre)
+
+
+def cargar_produccion(almacen, huella):
+    """Tabla de producción de un resultado ya guardado (None si no existe): evita recalcular escenarios idénticos."""
+    df = almacen.cargar_tabla(huella_almacen(huella), "produccion")
+    if df is not None and "Residuo ganadero" in df.columns:
+        df["Residuo ganadero"] = df["Residuo ganadero"].astype("category")
+    return df
+
+
+def guardar_balance(almacen, huella, parametros, resultado, sitio="", fecha=None, nombre=""):
+    """El resultado del balance es un dict de escalares: se guarda entero como métricas."""
+    return almacen.guardar("balance", huella_almacen(huella), {k: v for k, v in resultado.items() if np.ndim(v) == 0}, None, parametros, sitio, fecha, nombre)
+
+
+_almacen = None
+_bloqueo_almacen = threading.Lock()
+
+
+def almacen_compartido():
+    """Almacén compartido por todas las sesiones del proceso (ruta: variable BIOGAS_ALMACEN_ESCENARIOS)."""
+    global _almacen
+    with _bloqueo_almacen:
+        if _almacen is None:
+            _almacen = AlmacenEscenarios()
+        return _almacen
+
+
+def controles_escenario(st_modulo, key):
+    """Controles de la barra lateral: guardar o no (desactivado por defecto), sitio y fecha del escenario.
+
+    El sitio se comparte entre páginas. Sin guardar, la página no abre el almacén.
+    """
+    with st_modulo.sidebar.expander("Escenarios guardados", expanded=False):
+        guardar = st_modulo.checkbox(
+            "Guardar cada cálculo como escenario", value=False, key=f"{key}_guardar_escenario",
+            help=f"Se conservan los {MAX_ESCENARIOS:,} escenarios más recientes (variable BIOGAS_MAX_ESCENARIOS).",
+        )
+        sitio = st_modulo.text_input("Sitio / planta", value=st_modulo.session_state.get("escenario_sitio", ""), key=f"{key}_sitio_escenario")
+        fecha = st_modulo.date_input("Fecha del escenario", value=datetime.date.today(), key=f"{key}_fecha_escenario")
+        st_modulo.session_state["escenario_sitio"] = sitio
+        st_modulo.caption("Consulte y compare los escenarios en la página 'Escenarios'.")
+    return guardar, sitio.strip(), fecha.isoformat()
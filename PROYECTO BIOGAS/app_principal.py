@@ -7,6 +7,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Importa el motor y prepara gráficos/PDF en segundo plano (una vez por proceso) mientras se lee esta página
+from precarga import precargar
+precargar()
+
 st.sidebar.success("Seleccione una sección arriba.")
 
 st.markdown(
@@ -21,5 +25,12 @@ st.markdown(
     ### Funcionalidades:
     - **Producción de Biogás**: Calcule el biogás y biometano potencial a partir de diversos insumos.
     - **Balance de Aguas**: Analice las entradas y salidas de agua en su proceso.
+    - **Series Temporales**: Procese registros diarios u horarios de alimentación y obtenga producción y balance de aguas por día, semana o mes.
+    - **Escenarios**: Los cálculos de Producción y Balance de Aguas se guardan con su sitio, fecha y parámetros solo si activa 'Guardar cada cálculo como escenario' en la barra lateral; busque escenarios anteriores y compare dos de ellos.
+    - **Monitor en Vivo**: Siga las lecturas de caudalímetros, biogás y temperatura (archivo, socket o simulador) y vea el balance de aguas sobre ventanas móviles.
+    - **Cartera de Plantas**: Evalúe una flota de plantas en paralelo, con resultados por sitio, totales de la flota e informes Excel/PDF.
+
+    Los mismos cálculos están disponibles sin interfaz para otros sistemas (SCADA, planificación):
+    `python linea_comandos.py calcular insumos.csv` o la API HTTP local `python linea_comandos.py servir`.
     """
 )
\ No newline at end of file
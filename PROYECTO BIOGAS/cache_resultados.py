@@ -0,0 +1,128 @@
+# cache_resultados.py
+# Caché LRU acotada para resultados calculados (DataFrames, figuras, bytes de exportación),
+# indexada por una huella estable de la tabla de insumos y los parámetros de proceso.
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MAX_ENTRADAS_DEFECTO = 32
+
+# Contadores agregados de todas las cachés del proceso (todas las sesiones de Streamlit)
+_estadisticas_globales = {"aciertos": 0, "fallos": 0, "desalojos": 0}
+_bloqueo_global = threading.Lock()
+
+
+def _actualizar_global(campo):
+    with _bloqueo_global:
+        _estadisticas_globales[campo] += 1
+
+
+def estadisticas_globales():
+    with _bloqueo_global:
+        return dict(_estadisticas_globales)
+
+
+def _alimentar(h, obj):
+    if isinstance(obj, pd.DataFrame):
+        h.update(b"df")
+        h.update(json.dumps([str(c) for c in obj.columns]).encode())
+        h.update(json.dumps([str(t) for t in obj.dtypes]).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(b"serie")
+        h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(b"nd" + str(obj.dtype).encode() + str(obj.shape).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"dict")
+        for k in sorted(obj, key=str):
+            _alimentar(h, str(k))
+            _alimentar(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"seq%d" % len(obj))
+        for item in obj:
+            _alimentar(h, item)
+    elif isinstance(obj, (float, np.floating)):
+        h.update(b"f" + float(obj).hex().encode())
+    else:
+        h.update(type(obj).__name__.encode() + b":" + repr(obj).encode())
+
+
+def huella(*objetos):
+    """Hash estable (hex) de tablas, arrays, dicts de parámetros y escalares."""
+    h = hashlib.blake2b(digest_size=16)
+    for obj in objetos:
+        _alimentar(h, obj)
+    return h.hexdigest()
+
+
+class CacheLRU:
+    """Caché LRU con tamaño máximo y contadores de aciertos/fallos. Segura entre hilos."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS_DEFECTO):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._bloqueo = threading.RLock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __contains__(self, clave):
+        return clave in self._datos
+
+    def obtener(self, clave, defecto=None):
+        with self._bloqueo:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                _actualizar_global("aciertos")
+                return self._datos[clave]
+            self.fallos += 1
+            _actualizar_global("fallos")
+            return defecto
+
+    def guardar(self, clave, valor):
+        with self._bloqueo:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+                _actualizar_global("desalojos")
+        return valor
+
+    def obtener_o_calcular(self, clave, funcion):
+        """Devuelve el valor en caché o lo calcula con `funcion()` y lo guarda."""
+        faltante = object()
+        valor = self.obtener(clave, faltante)
+        if valor is faltante:
+            valor = self.guardar(clave, funcion())
+        return valor
+
+    def limpiar(self):
+        with self._bloqueo:
+            self._datos.clear()
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._datos), "max_entradas": self.max_entradas,
+            "aciertos": self.aciertos, "fallos": self.fallos, "desalojos": self.desalojos,
+            "tasa_aciertos": (self.aciertos / consultas) if consultas else 0.0,
+        }
+
+
+def cache_de_sesion(estado, nombre, max_entradas=MAX_ENTRADAS_DEFECTO):
+    """Obtiene (o crea) la caché `nombre` dentro de un mapeo de estado, p. ej. st.session_state."""
+    if nombre not in estado:
+        estado[nombre] = CacheLRU(max_entradas)
+    return estado[nombre]
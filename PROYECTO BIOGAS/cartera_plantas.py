@@ -0,0 +1,341 @@
+# cartera_plantas.py
+# Modo cartera: evaluación de una flota de plantas (una tabla de insumos y unos parámetros de proceso por
+# sitio) repartida entre procesos, con resúmenes por sitio y de toda la flota.
+#
+# Cada proceso devuelve solo arrays: una fila de resumen (totales y balance de aguas) y las columnas de la
+# tabla de producción del sitio. El proceso principal las añade a un almacén en columnas común a la flota
+# (arrays de NumPy y textos codificados), sin un DataFrame por sitio; las tablas se reconstruyen, de una en
+# una, al consultarlas o exportarlas.
+
+import json
+import math
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from importacion_insumos import leer_insumos, iterar_bloques_archivo, mapear_columnas
+from motor_produccion import COLUMNAS_ENTRADA, COLUMNAS_CALCULADAS
+from servicio_calculo import PARAMETROS_DEFECTO, evaluar_trabajo, trabajos_desde_json
+from visualizacion import COLUMNAS_GRAFICO_PRODUCCION, categorias_insumos
+
+COLUMNA_SITIO = "Sitio"
+# Salidas por sitio que se muestran y exportan; todas son flujos que se suman en el total de la flota
+COLUMNAS_RESUMEN_CARTERA = {
+    "total_volumen_insumos_humedos_t_dia": "Alimentación (t/día)",
+    "total_ts_en_insumos_t_dia": "TS alimentado (t/día)",
+    "total_biogas_bruto_m3_dia": "Biogás bruto (m³/día)",
+    "biometano_final_m3_ano": "Biometano final (m³/año)",
+    "E4_agua_dilucion_calculada": "Agua de dilución calculada (m³/día)",
+    "total_agua_entrante_m3_dia": "Total agua entrante (m³/día)",
+    "agua_efluente_liquido_neto_m3_dia": "Efluente líquido neto (m³/día)",
+    "agua_en_torta_solida_m3_dia": "Agua en torta sólida (m³/día)",
+}
+COLUMNAS_CATEGORIAS_CARTERA = ["Volumen (t/año)"] + COLUMNAS_GRAFICO_PRODUCCION
+COLUMNAS_TABLA_SITIO = COLUMNAS_ENTRADA + ["Categoría"] + COLUMNAS_CALCULADAS
+COLUMNAS_TEXTO_SITIO = ["Nombre", "Residuo ganadero", "Categoría"]
+COLUMNAS_NUMERICAS_SITIO = [c for c in COLUMNAS_TABLA_SITIO if c not in COLUMNAS_TEXTO_SITIO]
+
+
+# --- LECTURA DE LA CARTERA ---
+def leer_parametros_sitios(fuente, nombre_archivo=None):
+    """{sitio: {parámetro: valor}} de una tabla con la columna 'Sitio' y columnas de PARAMETROS_DEFECTO.
+
+    Las celdas vacías no se incluyen (el sitio usa el valor común o el de por defecto).
+    """
+    df = pd.concat(list(iterar_bloques_archivo(fuente, nombre_archivo, mapeador=lambda columnas: {c: c for c in columnas})), ignore_index=True)
+    columna_sitio = next((c for c in df.columns if mapear_columnas([c]).get(c) == COLUMNA_SITIO), None)
+    if columna_sitio is None:
+        raise ValueError("La tabla de parámetros por sitio necesita la columna 'Sitio'.")
+    columnas = {c: c.strip() for c in df.columns if c != columna_sitio}
+    desconocidas = [c for c in columnas.values() if c not in PARAMETROS_DEFECTO]
+    if desconocidas:
+        raise ValueError(f"Parámetros desconocidos en la tabla de sitios: {', '.join(desconocidas)}. Use: {', '.join(PARAMETROS_DEFECTO)}")
+    parametros = {}
+    for fila in df.rename(columns=columnas).to_dict("records"):
+        sitio = str(fila.pop(columna_sitio)).strip()
+        if sitio in parametros:
+            raise ValueError(f"El sitio '{sitio}' aparece dos veces en la tabla de parámetros.")
+        parametros[sitio] = {clave: valor for clave, valor in fila.items() if not (valor is None or (isinstance(valor, float) and math.isnan(valor)) or valor == "")}
+    return parametros
+
+
+def _trabajos_json(fuente, nombre):
+    if hasattr(fuente, "read"):
+        if hasattr(fuente, "seek"):
+            fuente.seek(0)
+        contenido = fuente.read()
+        datos = json.loads(contenido.decode("utf-8-sig") if isinstance(contenido, bytes) else contenido)
+    else:
+        with open(fuente, encoding="utf-8-sig") as f:
+            datos = json.load(f)
+    if isinstance(datos, dict) and "sitios" in datos:
+        datos = {"trabajos": [dict(s, id=s.get("id", s.get("sitio"))) if isinstance(s, dict) else s for s in datos["sitios"]]}
+    trabajos = trabajos_desde_json(datos)
+    # Sin 'id' el sitio se numera dentro del archivo
+    return [(df, parametros, identificador if isinstance(identificador, str) else f"{nombre} {identificador + 1}")
+            for df, parametros, identificador in trabajos]
+
+
+def trabajos_cartera(fuentes, parametros_sitios=None, parametros_comunes=None):
+    """Lista de trabajos (df_insumos, parametros, sitio) de una flota, como los de servicio_calculo.evaluar_lote.
+
+    Cada fuente (ruta o archivo subido) puede ser una tabla de insumos con la columna 'Sitio' (varias plantas en
+    un archivo), una tabla sin ella (una planta con el nombre del archivo) o un JSON {"sitios": [{"sitio",
+    "insumos", "parametros"}, ...]}. Los parámetros se aplican en este orden: `parametros_comunes`, los del JSON
+    y los de `parametros_sitios` ({sitio: {parámetro: valor}}, ver leer_parametros_sitios).
+    """
+    parametros_sitios = parametros_sitios or {}
+    trabajos = []
+    for fuente in fuentes:
+        nombre = os.path.basename(str(getattr(fuente, "name", None) or fuente))
+        raiz, extension = os.path.splitext(nombre)
+        if extension.lower() == ".json":
+            trabajos.extend(_trabajos_json(fuente, raiz))
+            continue
+        df = leer_insumos(fuente, nombre)
+        if COLUMNA_SITIO not in df.columns:
+            trabajos.append((df, None, raiz))
+            continue
+        if (df[COLUMNA_SITIO] == "").any():
+            raise ValueError(f"'{nombre}': hay insumos sin sitio en la columna 'Sitio'.")
+        for sitio, grupo in df.groupby(COLUMNA_SITIO, sort=False):
+            trabajos.append((grupo.drop(columns=COLUMNA_SITIO).reset_index(drop=True), None, str(sitio)))
+    repetidos = [sitio for sitio, n in Counter(sitio for _, _, sitio in trabajos).items() if n > 1]
+    if repetidos:
+        raise ValueError(f"Sitios repetidos en la cartera: {', '.join(map(str, repetidos[:10]))}.")
+    return [(df, {**(parametros_comunes or {}), **(parametros or {}), **parametros_sitios.get(sitio, {})}, sitio)
+            for df, parametros, sitio in trabajos]
+
+
+def cartera_sintetica(df_insumos, n_sitios, semilla=0):
+    """Trabajos de `n_sitios` plantas de ejemplo: los insumos de `df_insumos` con volúmenes y parámetros variados."""
+    rng = np.random.default_rng(semilla)
+    columnas = [c for c in COLUMNAS_ENTRADA + ["Categoría"] if c in df_insumos.columns]
+    base = df_insumos[columnas].reset_index(drop=True)
+    trabajos = []
+    for i in range(n_sitios):
+        # Cada planta usa parte de los insumos, con volúmenes entre ~1/3 y ~3 veces los de la tabla
+        usados = rng.random(len(base)) < 0.7
+        usados[rng.integers(len(base))] = True
+        df = base[usados].copy()
+        df["Volumen (t/año)"] = df["Volumen (t/año)"].to_numpy(dtype=float) * rng.lognormal(0.0, 0.5, len(df))
+        parametros = {
+            "recirculacion_fraccion": round(float(rng.uniform(0.1, 0.5)), 2),
+            "target_TS_digestor_percent": round(float(rng.uniform(8.0, 12.0)), 1),
+            "agua_limpieza_m3_dia": round(float(rng.uniform(2.0, 10.0)), 1),
+        }
+        trabajos.append((df.reset_index(drop=True), parametros, f"Planta {i + 1:03d}"))
+    return trabajos
+
+
+# --- EVALUACIÓN ---
+def _evaluar_sitio(trabajo):
+    """Evalúa un sitio y devuelve solo su resultado compacto. Se ejecuta también en otros procesos.
+
+    Cualquier fallo del sitio (no solo de validación) se devuelve como error del sitio para que un sitio mal
+    definido no detenga la evaluación de la flota; las dependencias opcionales que faltan sí se propagan.
+    """
+    df_insumos, parametros, sitio = trabajo
+    try:
+        return _resultado_sitio(evaluar_trabajo(df_insumos, parametros, sitio), sitio)
+    except ImportError:
+        raise
+    except ValueError as e:
+        return {"sitio": sitio, "error": str(e)}
+    except Exception as e:
+        return {"sitio": sitio, "error": f"{type(e).__name__}: {e}"}
+
+
+def _resultado_sitio(r, sitio):
+    df = r["produccion"]
+    fila = {"Insumos": len(df), **r["totales"], "biometano_final_m3_ano": float(df["Biometano final (m3/año)"].sum()),
+            "g_agua_por_Nm3_biogas": r["parametros"]["g_agua_por_Nm3_biogas"]}
+    fila.update({col: float(df[col].sum()) for col in COLUMNAS_GRAFICO_PRODUCCION})
+    fila.update({clave: valor for clave, valor in r["balance"].items() if not isinstance(valor, bool)})
+    fila.update({f"parametro:{clave}": valor for clave, valor in r["parametros"].items() if isinstance(valor, (int, float)) and not isinstance(valor, bool)})
+    columnas = {col: df[col].to_numpy(dtype=float) for col in COLUMNAS_NUMERICAS_SITIO if col in df.columns}
+    columnas.update({col: df[col].astype(str).tolist() for col in ("Nombre", "Residuo ganadero")})
+    columnas["Categoría"] = categorias_insumos(df).tolist()
+    return {"sitio": sitio, "fila": fila, "columnas": columnas}
+
+
+class _ColumnaCreciente:
+    """Array de NumPy al que se añaden valores al final; la capacidad se duplica al llenarse (coste amortizado O(1))."""
+
+    __slots__ = ("datos", "n")
+
+    def __init__(self, dtype, relleno=None, n=0):
+        self.datos = np.empty(max(1024, 2 * n), dtype=dtype)
+        self.n = n
+        if n:
+            self.datos[:n] = relleno  # Columna que aparece tarde: las filas anteriores quedan con el relleno
+
+    def extender(self, valores):
+        fin = self.n + len(valores)
+        if fin > len(self.datos):
+            nuevos = np.empty(max(fin, 2 * len(self.datos)), dtype=self.datos.dtype)
+            nuevos[:self.n] = self.datos[:self.n]
+            self.datos = nuevos
+        self.datos[self.n:fin] = valores
+        self.n = fin
+
+    def valores(self, inicio=0, fin=None):
+        return self.datos[inicio:self.n if fin is None else fin]
+
+    @property
+    def nbytes(self):
+        return self.n * self.datos.itemsize
+
+
+class ResultadosCartera:
+    """Resultados de una flota guardados en columnas.
+
+    El resumen (una fila por sitio) y las tablas de producción de todos los sitios, una tras otra, se guardan en
+    arrays float64 que crecen por bloques; los textos (nombre, residuo ganadero, categoría) se guardan como
+    códigos int32 de un diccionario común a la flota, porque los mismos insumos se repiten de un sitio a otro.
+    No se conserva ningún DataFrame por sitio: las tablas se reconstruyen al consultarlas.
+    """
+
+    def __init__(self):
+        self._sitios = []
+        self._errores = []
+        self._resumen = {}  # clave -> _ColumnaCreciente (float64), una fila por sitio
+        self._numericas = {col: _ColumnaCreciente(np.float64) for col in COLUMNAS_NUMERICAS_SITIO}
+        self._codigos = {col: _ColumnaCreciente(np.int32) for col in COLUMNAS_TEXTO_SITIO}
+        self._textos = []
+        self._indice_textos = {}
+        self._rangos = {}  # sitio -> (fila inicial, fila final) en las columnas de producción
+        self._n_filas = 0
+        self._df_resumen = None
+
+    def __len__(self):
+        return len(self._sitios) + len(self._errores)
+
+    def _codificar(self, textos):
+        indice = self._indice_textos
+        codigos = np.empty(len(textos), dtype=np.int32)
+        for i, texto in enumerate(textos):
+            codigo = indice.get(texto)
+            if codigo is None:
+                codigo = indice[texto] = len(self._textos)
+                self._textos.append(texto)
+            codigos[i] = codigo
+        return codigos
+
+    def anadir(self, resultado):
+        self._df_resumen = None
+        sitio = resultado["sitio"]
+        if "error" in resultado:
+            self._errores.append({COLUMNA_SITIO: sitio, "Error": resultado["error"]})
+            return
+        for clave, valor in resultado["fila"].items():
+            if clave not in self._resumen:
+                self._resumen[clave] = _ColumnaCreciente(np.float64, np.nan, len(self._sitios))
+            self._resumen[clave].extender([math.nan if valor is None else valor])
+        for clave, columna in self._resumen.items():
+            if clave not in resultado["fila"]:
+                columna.extender([math.nan])
+        self._sitios.append(sitio)
+
+        columnas = resultado["columnas"]
+        n = len(columnas["Nombre"])
+        for col, columna in self._numericas.items():
+            columna.extender(columnas[col] if col in columnas else np.full(n, np.nan))
+        for col, columna in self._codigos.items():
+            columna.extender(self._codificar(columnas[col]))
+        self._rangos[sitio] = (self._n_filas, self._n_filas + n)
+        self._n_filas += n
+
+    @property
+    def sitios(self):
+        return list(self._sitios)
+
+    @property
+    def bytes_tablas(self):
+        """Memoria de las columnas de producción y del diccionario de textos."""
+        columnas = sum(c.nbytes for c in self._numericas.values()) + sum(c.nbytes for c in self._codigos.values())
+        return columnas + sum(len(t.encode("utf-8")) for t in self._textos)
+
+    def resumen(self):
+        """Una fila por sitio evaluado con todos sus totales, balance de aguas y parámetros ('parametro:...')."""
+        if self._df_resumen is None:
+            datos = {COLUMNA_SITIO: self._sitios}
+            datos.update({clave: columna.valores().copy() for clave, columna in self._resumen.items()})
+            if not self._resumen:
+                datos.update({clave: [] for clave in ["Insumos"] + list(COLUMNAS_RESUMEN_CARTERA)})
+            self._df_resumen = pd.DataFrame(datos).astype({"Insumos": int})
+        return self._df_resumen
+
+    def tabla_sitios(self):
+        """Resumen por sitio con las columnas de COLUMNAS_RESUMEN_CARTERA y sus etiquetas."""
+        df = self.resumen()
+        return df[[COLUMNA_SITIO, "Insumos"] + list(COLUMNAS_RESUMEN_CARTERA)].rename(columns=COLUMNAS_RESUMEN_CARTERA)
+
+    def errores(self):
+        return pd.DataFrame(self._errores, columns=[COLUMNA_SITIO, "Error"])
+
+    def totales_flota(self):
+        """Suma de los flujos de COLUMNAS_RESUMEN_CARTERA en toda la flota, más recuentos de sitios."""
+        df = self.resumen()
+        totales = {"Sitios evaluados": len(df), "Sitios con error": len(self._errores)}
+        totales["Sitios sin estado estacionario"] = int(df["E4_agua_dilucion_calculada"].isna().sum()) if len(df) else 0
+        for clave, etiqueta in COLUMNAS_RESUMEN_CARTERA.items():
+            totales[etiqueta] = float(df[clave].sum()) if len(df) else 0.0
+        return totales
+
+    def produccion_por_categoria(self):
+        """Producción sumada por categoría de insumo en toda la flota, de mayor a menor biometano final."""
+        codigos = self._codigos["Categoría"].valores()
+        presentes = np.unique(codigos)
+        datos = {"Categoría": [self._textos[c] for c in presentes.tolist()]}
+        for col in COLUMNAS_CATEGORIAS_CARTERA:
+            valores = np.nan_to_num(self._numericas[col].valores())
+            datos[col] = np.bincount(codigos, weights=valores, minlength=len(self._textos))[presentes]
+        return pd.DataFrame(datos).sort_values("Biometano final (m3/año)", ascending=False, ignore_index=True)
+
+    def produccion(self, sitio, columnas=None):
+        """Tabla de producción por insumo de un sitio (solo las `columnas` pedidas, si se indican)."""
+        inicio, fin = self._rangos[sitio]
+        datos = {}
+        for col in COLUMNAS_TABLA_SITIO:
+            if columnas is not None and col not in columnas:
+                continue
+            if col in self._codigos:
+                datos[col] = [self._textos[c] for c in self._codigos[col].valores(inicio, fin).tolist()]
+            else:
+                datos[col] = self._numericas[col].valores(inicio, fin).copy()
+        return pd.DataFrame(datos)
+
+    def iterar_produccion(self, columnas=None):
+        """(sitio, tabla de producción) de cada sitio, reconstruyendo una tabla cada vez."""
+        for sitio in self._sitios:
+            yield sitio, self.produccion(sitio, columnas)
+
+
+def evaluar_cartera(trabajos, procesos=1, al_progresar=None, tamano_tanda=None):
+    """Evalúa los sitios de `trabajos` (ver trabajos_cartera) y devuelve un ResultadosCartera.
+
+    Con `procesos` > 1 los sitios se reparten en tandas entre procesos; los resultados se incorporan en
+    orden a medida que llegan y `al_progresar(hechos, total)` se llama tras cada uno.
+    """
+    trabajos = list(trabajos)
+    resultados = ResultadosCartera()
+    if procesos and procesos > 1 and len(trabajos) > 1:
+        procesos = min(procesos, len(trabajos))
+        tamano_tanda = tamano_tanda or max(1, len(trabajos) // (procesos * 4))
+        # 'spawn': seguro también desde los hilos de Streamlit
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for hechos, resultado in enumerate(pool.map(_evaluar_sitio, trabajos, chunksize=tamano_tanda), 1):
+                resultados.anadir(resultado)
+                if al_progresar is not None:
+                    al_progresar(hechos, len(trabajos))
+    else:
+        for hechos, trabajo in enumerate(trabajos, 1):
+            resultados.anadir(_evaluar_sitio(trabajo))
+            if al_progresar is not None:
+                al_progresar(hechos, len(trabajos))
+    return resultados
@@ -0,0 +1,405 @@
+# exportacion.py
+# Generación de exportaciones (Excel / PDF) bajo demanda, en un pool de hilos y con resultados en caché.
+# Los informes grandes se escriben en un archivo temporal en lugar de mantenerse en un BytesIO.
+# Los libros Excel se escriben en flujo con libro_excel.LibroExcel (memoria constante, mismos formatos).
+
+import atexit
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+
+import pandas as pd
+
+from instrumentacion import tramo, propagar_a_hilo
+from libro_excel import LibroExcel
+
+# A partir de este número de filas la exportación se escribe en disco
+UMBRAL_FILAS_ARCHIVO_TEMPORAL = 20_000
+MIME_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MIME_PDF = "application/pdf"
+INTERVALO_SONDEO_S = 1.0  # Cada cuánto se comprueba si una exportación en segundo plano ha terminado
+
+
+# --- ESCRITORES ---
+# Todos aceptan un `destino` (ruta o archivo binario). Sin destino devuelven los bytes.
+def _escribir(escritor, destino, nombre="Exportación"):
+    with tramo(nombre, "exportacion"):
+        if destino is None:
+            buffer = BytesIO()
+            escritor(buffer)
+            return buffer.getvalue()
+        escritor(destino)
+        return destino
+
+
+# Hojas de entradas, intermedios y resultados de cada modelo; las columnas ausentes de la tabla se omiten
+HOJAS_PRODUCCION = {
+    "Entradas": [
+        "Nombre", "Volumen (t/año)", "Residuo ganadero", "Humedad (%)", "TS (%)", "SV (%sms)",
+        "Potencial (m3CH4/tSV)", "%CH4", "Upgrading (%)",
+    ],
+    "Intermedios": ["Nombre", "TS (t/año)", "SV (t/año)", "Agua en Insumo (t/año)"],
+    "Resultados": ["Nombre", "Biogás Bruto (m3/año)", "Biometano útil (m3/año)", "Biometano final (m3/año)"],
+}
+COLUMNAS_ALIMENTACION_SERIE = ["Volumen (t/día)", "TS (t/día)", "SV (t/día)", "Agua en Insumo (t/día)"]
+
+
+def _hojas_produccion(libro, df_produccion):
+    for hoja, columnas in HOJAS_PRODUCCION.items():
+        presentes = [c for c in columnas if c in df_produccion.columns]
+        if len(presentes) > (1 if "Nombre" in presentes else 0):
+            libro.hoja(f"Producción - {hoja}", df_produccion[presentes])
+    calculadas = [c for c in HOJAS_PRODUCCION["Intermedios"] + HOJAS_PRODUCCION["Resultados"] if c != "Nombre" and c in df_produccion.columns]
+    if calculadas:
+        libro.hoja_pares("Producción - Totales", {c: float(df_produccion[c].sum()) for c in calculadas}, ("Magnitud", "Total"))
+
+
+def _hojas_balance(libro, df_entradas, df_salidas, df_resumen, parametros=None):
+    if parametros:
+        libro.hoja_pares("Balance - Entradas", parametros)
+    libro.hoja("Balance - Flujos entrada", df_entradas)
+    libro.hoja("Balance - Flujos salida", df_salidas)
+    libro.hoja("Balance - Resultados", df_resumen)
+
+
+def exportar_excel_produccion(df_export, destino=None):
+    """Hojas de entradas, intermedios, resultados y totales de la tabla de producción."""
+    def escritor(salida):
+        with LibroExcel(salida) as libro:
+            _hojas_produccion(libro, df_export)
+    return _escribir(escritor, destino, "Excel producción")
+
+
+def exportar_excel_balance(df_entradas, df_salidas, df_resumen, destino=None, parametros=None):
+    """Parámetros de entrada (si se dan), flujos de entrada y salida y resumen del balance."""
+    def escritor(salida):
+        with LibroExcel(salida) as libro:
+            _hojas_balance(libro, df_entradas, df_salidas, df_resumen, parametros)
+    return _escribir(escritor, destino, "Excel balance")
+
+
+def exportar_excel_informe(df_produccion, df_entradas, df_salidas, df_resumen, destino=None, parametros=None):
+    """Producción y balance de aguas en un solo libro (entradas, intermedios y resultados de cada modelo)."""
+    def escritor(salida):
+        with LibroExcel(salida) as libro:
+            _hojas_produccion(libro, df_produccion)
+            _hojas_balance(libro, df_entradas, df_salidas, df_resumen, parametros)
+    return _escribir(escritor, destino, "Excel informe")
+
+
+def exportar_excel_serie(serie, destino=None):
+    """Serie temporal (series_temporales.SerieTemporalPlanta): parámetros, alimentación diaria,
+    producción diaria y según TRH, y balance de aguas diario."""
+    def escritor(salida):
+        with LibroExcel(salida) as libro:
+            libro.hoja_pares("Serie - Entradas", dict(
+                serie.parametros_balance, trh_dias=serie.trh_dias, metodo_suavizado=serie.metodo_suavizado,
+                g_agua_por_Nm3_biogas=serie.g_agua_por_Nm3_biogas,
+            ))
+            alimentacion = [c for c in COLUMNAS_ALIMENTACION_SERIE if c in serie.diario.columns]
+            libro.hoja("Serie - Alimentación", serie.diario[alimentacion], indice=True)
+            produccion = pd.concat([serie.diario.drop(columns=alimentacion), serie.suavizado], axis=1)
+            libro.hoja("Serie - Producción", produccion, indice=True)
+            libro.hoja("Serie - Balance", serie.balance, indice=True)
+    return _escribir(escritor, destino, "Excel serie")
+
+
+def preparar_df_pdf_produccion(df_resultados, columnas_para_pdf):
+    with tramo("PDF: preparar tabla", "exportacion"):
+        return _preparar_df_pdf(df_resultados, columnas_para_pdf)
+
+
+def _preparar_df_pdf(df_resultados, columnas_para_pdf):
+    df_pdf_export_safe = df_resultados[columnas_para_pdf].copy()
+    for col in df_pdf_export_safe.select_dtypes(include=float).columns: df_pdf_export_safe[col] = df_pdf_export_safe[col].fillna(0.0)
+    for col in df_pdf_export_safe.select_dtypes(exclude="number").columns: df_pdf_export_safe[col] = df_pdf_export_safe[col].fillna("")
+    return df_pdf_export_safe
+
+
+ANCHOS_PDF_PRODUCCION = {
+    "Nombre": 55, "Volumen (t/año)": 25, "TS (t/año)": 25, "SV (t/año)": 25,
+    "Biogás Bruto (m3/año)": 30, "Biometano útil (m3/año)": 30, "Biometano final (m3/año)": 30,
+}
+
+
+def exportar_pdf_produccion(df_export, columnas_para_pdf, destino=None):
+    # fpdf se importa al generar el primer PDF, no en cada rerun de la página
+    with tramo("PDF: importar fpdf", "exportacion"):
+        from fpdf import FPDF # fpdf2
+        from fpdf.enums import XPos, YPos
+        from tabla_pdf import TablaPDF, anchos_columnas
+
+    with tramo("PDF: maquetar tabla", "exportacion"):
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Arial", size=12)
+        pdf.cell(0, 10, text="Resultados de Producción de Biometano", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+        pdf.ln(5)
+        anchos = anchos_columnas(pdf, columnas_para_pdf, ANCHOS_PDF_PRODUCCION)
+        TablaPDF(pdf, columnas_para_pdf, anchos).dibujar(df_export)
+    with tramo("PDF: escribir", "exportacion"):
+        return _salida_pdf(pdf, destino)
+
+
+def _salida_pdf(pdf, destino):
+    if destino is not None:
+        pdf.output(destino)
+        return destino
+    pdf_output_result = pdf.output()
+    if isinstance(pdf_output_result, str): return pdf_output_result.encode('latin-1')
+    if isinstance(pdf_output_result, (bytes, bytearray)): return bytes(pdf_output_result)
+    raise TypeError(f"FPDF output devolvió un tipo inesperado: {type(pdf_output_result)}")
+
+
+# --- INFORMES DE CARTERA ---
+# `resultados` es un cartera_plantas.ResultadosCartera; las tablas de cada sitio se leen de una en una.
+COLUMNAS_PDF_SITIO = ["Nombre", "Volumen (t/año)", "TS (t/año)", "SV (t/año)", "Biogás Bruto (m3/año)", "Biometano útil (m3/año)", "Biometano final (m3/año)"]
+
+
+def _tabla_totales_flota(resultados):
+    totales = resultados.totales_flota()
+    return pd.DataFrame({"Magnitud": list(totales), "Valor": list(totales.values())})
+
+
+def exportar_excel_cartera(resultados, destino=None, hoja_por_sitio=True):
+    """Libro con las hojas Flota, Sitios, Categorias, Errores (si los hay) y una hoja de producción por sitio."""
+    def escritor(salida):
+        with LibroExcel(salida) as libro:
+            libro.hoja_pares("Flota", resultados.totales_flota(), ("Magnitud", "Valor"))
+            libro.hoja("Sitios", resultados.resumen())
+            libro.hoja("Categorias", resultados.produccion_por_categoria())
+            errores = resultados.errores()
+            if len(errores):
+                libro.hoja("Errores", errores)
+            if hoja_por_sitio:
+                # Una tabla de sitio en memoria cada vez; el libro no retiene las filas ya escritas
+                for sitio, df in resultados.iterar_produccion():
+                    libro.hoja(sitio, df)
+    return _escribir(escritor, destino, "Excel cartera")
+
+
+def exportar_pdf_cartera(resultados, destino=None, detalle_por_sitio=True):
+    """Informe con secciones: totales de la flota, resumen por sitio, producción por categoría y detalle de cada sitio."""
+    from fpdf import FPDF # fpdf2
+    from fpdf.enums import XPos, YPos
+    from tabla_pdf import TablaPDF, anchos_columnas
+
+    pdf = FPDF(orientation="L")
+    pdf.add_page()
+
+    def titulo_seccion(texto, tamano=12):
+        if pdf.get_y() > pdf.h - pdf.b_margin - 30:
+            pdf.add_page()
+        pdf.ln(4)
+        pdf.set_font("Arial", 'B', tamano)
+        pdf.cell(0, 8, text=texto, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.ln(1)
+
+    def tabla(df, anchos_config=None):
+        columnas = list(df.columns)
+        TablaPDF(pdf, columnas, anchos_columnas(pdf, columnas, anchos_config or {})).dibujar(df)
+
+    pdf.set_font("Arial", size=14)
+    pdf.cell(0, 10, text="Informe de la Cartera de Plantas", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    titulo_seccion("1. Totales de la flota")
+    df_totales = _tabla_totales_flota(resultados)
+    df_totales["Valor"] = [f"{v:,.2f}" if isinstance(v, float) else str(v) for v in df_totales["Valor"]]
+    tabla(df_totales, {"Magnitud": 90, "Valor": 50})
+    titulo_seccion("2. Resumen por sitio")
+    tabla(resultados.tabla_sitios(), {"Sitio": 45, "Insumos": 15})
+    titulo_seccion("3. Producción por categoría de insumo")
+    tabla(resultados.produccion_por_categoria(), {"Categoría": 60})
+    errores = resultados.errores()
+    if len(errores):
+        titulo_seccion("Sitios con error")
+        tabla(errores, {"Sitio": 60})
+    if detalle_por_sitio:
+        with tramo("PDF cartera: detalle por sitio", "exportacion"):
+            titulo_seccion("4. Detalle por sitio")
+            for i, (sitio, df) in enumerate(resultados.iterar_produccion(COLUMNAS_PDF_SITIO), 1):
+                titulo_seccion(f"4.{i} {sitio}", tamano=10)
+                tabla(_preparar_df_pdf(df, [c for c in COLUMNAS_PDF_SITIO if c in df.columns]), ANCHOS_PDF_PRODUCCION)
+    with tramo("PDF cartera: escribir", "exportacion"):
+        return _salida_pdf(pdf, destino)
+
+
+# --- GESTOR DE EXPORTACIONES EN SEGUNDO PLANO ---
+class GestorExportaciones:
+    """Pool de hilos que genera exportaciones bajo demanda y conserva las últimas terminadas.
+
+    Cada exportación se identifica por una clave (tipo de documento + huella de los datos), de modo
+    que la misma exportación solicitada desde varias sesiones o reruns se genera una sola vez.
+    El resultado es `bytes` o, para informes grandes, la ruta de un archivo temporal. Un archivo
+    temporal desalojado no se borra mientras alguna sesión lo tenga abierto (ver `abrir`).
+    """
+
+    def __init__(self, max_hilos=2, max_entradas=32):
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="exportacion")
+        self._futuros = OrderedDict()
+        self._bloqueo = threading.Lock()
+        self._lectores = {}  # ruta temporal -> número de lecturas en curso
+        self._por_borrar = set()  # rutas desalojadas que se borran al cerrar la última lectura
+        self.max_entradas = max_entradas
+
+    def solicitar(self, clave, funcion, en_archivo=False, sufijo=""):
+        """Encola `funcion(destino)` si la clave no existe todavía; devuelve el Future."""
+        with self._bloqueo:
+            futuro = self._futuros.get(clave)
+            if futuro is not None and not (futuro.done() and futuro.exception() is not None):
+                self._futuros.move_to_end(clave)
+                return futuro
+            if en_archivo:
+                futuro = self._pool.submit(self._generar_en_archivo, funcion, sufijo)
+            else:
+                futuro = self._pool.submit(funcion, None)
+            self._futuros[clave] = futuro
+            self._recortar()
+            return futuro
+
+    @staticmethod
+    def _generar_en_archivo(funcion, sufijo):
+        descriptor, ruta = tempfile.mkstemp(prefix="biogas_export_", suffix=sufijo)
+        os.close(descriptor)
+        try:
+            funcion(ruta)
+        except BaseException:
+            os.remove(ruta)
+            raise
+        return ruta
+
+    def _recortar(self):
+        # Solo se desalojan exportaciones terminadas; las rutas temporales se borran del disco
+        terminadas = [c for c, f in self._futuros.items() if f.done()]
+        while len(self._futuros) > self.max_entradas and terminadas:
+            self._liberar(self._futuros.pop(terminadas.pop(0)))
+
+    def _liberar(self, futuro):
+        # Con el bloqueo adquirido: borra el archivo temporal ahora o, si se está leyendo, al cerrarlo
+        ruta = _ruta_temporal(futuro)
+        if ruta is None:
+            return
+        if ruta in self._lectores:
+            self._por_borrar.add(ruta)
+        elif os.path.exists(ruta):
+            os.remove(ruta)
+
+    def futuro(self, clave):
+        """Future de la exportación (None si no se ha solicitado o ya se desalojó)."""
+        with self._bloqueo:
+            return self._futuros.get(clave)
+
+    def estado(self, clave):
+        """None (no solicitada), 'en_curso', 'lista' o 'error'."""
+        return estado_futuro(self.futuro(clave))
+
+    @contextmanager
+    def abrir(self, futuro):
+        """Resultado de una exportación terminada: `bytes` o el archivo temporal abierto en binario.
+
+        Mientras el bloque esté abierto el archivo no se borra aunque se desaloje. FileNotFoundError
+        si el archivo ya se borró (exportación desalojada antes de abrirla).
+        """
+        ruta = _ruta_temporal(futuro)
+        if ruta is None:
+            yield futuro.result()
+            return
+        with self._bloqueo:
+            if ruta in self._por_borrar or not os.path.exists(ruta):
+                raise FileNotFoundError(ruta)
+            self._lectores[ruta] = self._lectores.get(ruta, 0) + 1
+        try:
+            with open(ruta, "rb") as archivo:
+                yield archivo
+        finally:
+            with self._bloqueo:
+                self._lectores[ruta] -= 1
+                if not self._lectores[ruta]:
+                    del self._lectores[ruta]
+                    if ruta in self._por_borrar:
+                        self._por_borrar.discard(ruta)
+                        os.remove(ruta)
+
+    def limpiar(self):
+        with self._bloqueo:
+            for futuro in self._futuros.values():
+                self._liberar(futuro)
+            self._futuros.clear()
+
+
+def estado_futuro(futuro):
+    """None (sin Future), 'en_curso', 'lista' o 'error'."""
+    if futuro is None:
+        return None
+    if not futuro.done():
+        return "en_curso"
+    return "error" if futuro.exception() is not None else "lista"
+
+
+def _ruta_temporal(futuro):
+    if futuro.done() and futuro.exception() is None:
+        valor = futuro.result()
+        if isinstance(valor, str):
+            return valor
+    return None
+
+
+_gestor = None
+_bloqueo_gestor = threading.Lock()
+
+
+def gestor_exportaciones():
+    """Gestor compartido por todas las sesiones del proceso."""
+    global _gestor
+    with _bloqueo_gestor:
+        if _gestor is None:
+            _gestor = GestorExportaciones()
+            atexit.register(_gestor.limpiar)
+        return _gestor
+
+
+def _aviso_en_curso(st_modulo, futuro, nombre_archivo):
+    # Fragmento que se vuelve a ejecutar solo cada INTERVALO_SONDEO_S: la página no se bloquea mientras se
+    # genera el documento y, al terminar, un rerun completo muestra la descarga
+    @st_modulo.fragment(run_every=INTERVALO_SONDEO_S)
+    def aviso():
+        if futuro.done():
+            st_modulo.rerun()
+        st_modulo.info(f"⏳ Generando '{nombre_archivo}'... La descarga aparecerá aquí al terminar.")
+    aviso()
+
+
+def boton_exportacion_diferida(st_modulo, etiqueta_preparar, etiqueta_descarga, clave, funcion, nombre_archivo, mime,
+                               key, en_archivo=False):
+    """Botón 'preparar' + botón de descarga: el documento solo se genera cuando el usuario lo pide.
+
+    La generación no bloquea la página: mientras está en curso se muestra un aviso que se actualiza solo.
+    Una vez generado, la descarga se ofrece directamente en los siguientes reruns.
+    """
+    gestor = gestor_exportaciones()
+    # La sesión conserva el Future que pidió: sigue disponible aunque el gestor lo desaloje
+    solicitud = st_modulo.session_state.get(f"{key}_exportacion")
+    futuro = solicitud[1] if solicitud is not None and solicitud[0] == clave else gestor.futuro(clave)
+    estado = estado_futuro(futuro)
+    if estado in (None, "error"):
+        if estado == "error":
+            st_modulo.error(f"Error al generar '{nombre_archivo}': {futuro.exception()}. Puede volver a intentarlo.")
+        if not st_modulo.button(etiqueta_preparar, key=f"{key}_preparar"):
+            return
+        # Los tramos que anote la exportación en el pool van al registro de instrumentación de esta página
+        futuro = gestor.solicitar(clave, propagar_a_hilo(funcion), en_archivo=en_archivo, sufijo=os.path.splitext(nombre_archivo)[1])
+        st_modulo.session_state[f"{key}_exportacion"] = (clave, futuro)
+    if not futuro.done():
+        _aviso_en_curso(st_modulo, futuro, nombre_archivo)
+        return
+    try:
+        with gestor.abrir(futuro) as datos:
+            st_modulo.download_button(etiqueta_descarga, datos, nombre_archivo, mime, key=key)
+    except FileNotFoundError:
+        # El archivo temporal se desalojó antes de servirlo: se vuelve a ofrecer la preparación
+        st_modulo.session_state.pop(f"{key}_exportacion", None)
+        st_modulo.warning(f"'{nombre_archivo}' ya no está disponible. Vuelva a prepararlo.")
+        st_modulo.button(etiqueta_preparar, key=f"{key}_preparar")
@@ -0,0 +1,135 @@
+# graficos.py
+# Construcción de las figuras de las páginas de producción y balance de aguas.
+# plotly se importa al construir la primera figura: las páginas importan este módulo en cada rerun de
+# Streamlit y la mayoría de reruns no dibujan nada.
+
+from visualizacion import COLUMNAS_GRAFICO_PRODUCCION, PUNTOS_MAXIMOS_SERIE, reducir_serie
+
+
+def _go():
+    import plotly.graph_objects as go
+    return go
+
+
+def figura_produccion_agregada(df_agregado, titulo_grupo="Insumo"):
+    """Barras agrupadas (plotly) de biogás bruto, biometano útil y final por grupo de visualizacion.agregar_produccion()."""
+    go = _go()
+    fig = go.Figure()
+    for col, nombre in zip(COLUMNAS_GRAFICO_PRODUCCION, ["Biogás Bruto", "Biometano útil", "Biometano final"]):
+        fig.add_trace(go.Bar(
+            name=nombre, x=df_agregado["Grupo"], y=df_agregado[col], customdata=df_agregado["Insumos"],
+            hovertemplate="%{x}<br>%{y:,.0f} m³/año<br>%{customdata} insumos<extra>" + nombre + "</extra>"
+        ))
+    fig.update_layout(
+        title_text=f"Producción por {titulo_grupo.lower()}", yaxis_title="Producción (m3/año)", barmode='group',
+        xaxis_tickangle=-45, legend_title_text='Producto', height=550
+    )
+    return fig
+
+
+def figura_balance_barras(resultado):
+    """Comparación entradas vs. salidas netas de agua (plotly)."""
+    go = _go()
+    total_agua_entrante_m3_dia = float(resultado["total_agua_entrante_m3_dia"])
+    total_agua_saliente_m3_dia = float(resultado["total_agua_saliente_m3_dia"])
+    fig_bar = go.Figure()
+    fig_bar.add_trace(go.Bar(name='Entradas', x=['Total Flujos'], y=[total_agua_entrante_m3_dia], text=[f"{total_agua_entrante_m3_dia:.2f}"], textposition='auto', marker_color='royalblue'))
+    fig_bar.add_trace(go.Bar(name='Salidas (Netas)', x=['Total Flujos'], y=[total_agua_saliente_m3_dia], text=[f"{total_agua_saliente_m3_dia:.2f}"], textposition='auto', marker_color='orangered'))
+    fig_bar.update_layout(title_text='Comparación Entradas vs. Salidas Netas de Agua', yaxis_title='Flujo de Agua (m³/día)', barmode='group', legend_title_text='Flujo')
+    return fig_bar
+
+
+def figura_sankey(resultado):
+    """Diagrama Sankey simplificado del agua; None si no hay flujos significativos."""
+    go = _go()
+    labels_sankey_simple = [
+        "Insumos", "Dilución Directa", "Limpieza", "Dilución Calculada", # 0-3 (Fuentes)
+        "Proceso Digestor", # 4 (Central)
+        "Evaporación", "Condensado", "Torta Sólida", "Efluente Neto", # 5-8 (Salidas Netas)
+        "Recirculación" # 9 (Loop, tratado como salida y luego vuelve a entrar o reduce necesidad de dilución)
+    ]
+    # El efluente líquido neto es una salida del proceso, después de la recirculación
+    s_nodes_final = [0,1,2,3,  4,4,4,4, 9]
+    t_nodes_final = [4,4,4,4,  5,6,7,8, 4]
+    v_values_final = [float(resultado[k]) for k in [
+        "E1_agua_en_insumos", "E2_agua_dilucion_directa", "E3_agua_limpieza", "E4_agua_dilucion_calculada",
+        "S1_evaporacion_m3_dia", "S2_condensado_biogas_m3_dia", "agua_en_torta_solida_m3_dia", "agua_efluente_liquido_neto_m3_dia",
+        "S4_agua_recirculada_m3_dia",  # Recirculación vuelve al proceso
+    ]]
+
+    # Filtrar flujos con valor cero
+    valid_indices = [i for i, v in enumerate(v_values_final) if v > 0.001]
+    if not valid_indices:
+        return None
+    fig_sankey = go.Figure(data=[go.Sankey(
+        arrangement = "snap", # Alinea los nodos
+        node=dict(
+            pad=20, thickness=20, line=dict(color="black", width=0.5),
+            label=labels_sankey_simple,
+            color=["skyblue","skyblue","skyblue","skyblue", "green", "lightcoral","lightcoral","lightcoral","lightcoral", "mediumpurple"]
+        ),
+        link=dict(
+            source=[s_nodes_final[i] for i in valid_indices],
+            target=[t_nodes_final[i] for i in valid_indices],
+            value=[v_values_final[i] for i in valid_indices],
+        )
+    )])
+    fig_sankey.update_layout(title_text="Diagrama de Flujo de Agua Simplificado (Sankey)", font_size=11, height=500)
+    return fig_sankey
+
+
+def figura_tornado(df_tornado, titulo_salida):
+    """Diagrama de tornado a partir de sensibilidad_balance.tornado()."""
+    go = _go()
+    valor_base = df_tornado.attrs.get("valor_base", 0.0)
+    df = df_tornado.iloc[::-1]  # Mayor amplitud arriba
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        name='Parámetro en valor bajo', y=df["Parámetro"], x=df["Salida con valor bajo"] - valor_base, base=valor_base,
+        orientation='h', marker_color='royalblue',
+        customdata=df[["Valor bajo", "Salida con valor bajo"]], hovertemplate="%{y} = %{customdata[0]:.3g} → %{customdata[1]:.2f}<extra></extra>"
+    ))
+    fig.add_trace(go.Bar(
+        name='Parámetro en valor alto', y=df["Parámetro"], x=df["Salida con valor alto"] - valor_base, base=valor_base,
+        orientation='h', marker_color='orangered',
+        customdata=df[["Valor alto", "Salida con valor alto"]], hovertemplate="%{y} = %{customdata[0]:.3g} → %{customdata[1]:.2f}<extra></extra>"
+    ))
+    fig.add_vline(x=valor_base, line_dash="dash", line_color="black")
+    fig.update_layout(title_text=f"Sensibilidad: {titulo_salida}", xaxis_title=titulo_salida, barmode='overlay', legend_title_text='Extremo')
+    return fig
+
+
+def figura_mapa_calor(matriz, valores_x, valores_y, titulo_x, titulo_y, titulo_salida):
+    """Mapa de calor de una salida del balance sobre una rejilla de dos parámetros."""
+    go = _go()
+    fig = go.Figure(data=go.Heatmap(z=matriz, x=valores_x, y=valores_y, colorscale="Viridis", colorbar=dict(title=titulo_salida)))
+    fig.update_layout(title_text=f"{titulo_salida}", xaxis_title=titulo_x, yaxis_title=titulo_y, height=500)
+    return fig
+
+
+def figura_histograma(df_histograma, percentiles, titulo_salida):
+    """Distribución de una salida de Monte Carlo (ResumenMonteCarlo.histograma de incertidumbre) con líneas en los percentiles {etiqueta: valor}."""
+    go = _go()
+    centros = (df_histograma["desde"] + df_histograma["hasta"]) / 2
+    fig = go.Figure(go.Bar(
+        x=centros, y=df_histograma["frecuencia"] * 100, width=df_histograma["hasta"] - df_histograma["desde"],
+        marker_color="seagreen", hovertemplate="%{x:.4g}: %{y:.2f}%<extra></extra>"
+    ))
+    for etiqueta, valor in percentiles.items():
+        fig.add_vline(x=valor, line_dash="dash", line_color="black", annotation_text=etiqueta, annotation_position="top")
+    fig.update_layout(title_text=f"Incertidumbre: {titulo_salida}", xaxis_title=titulo_salida, yaxis_title="Frecuencia (%)", bargap=0)
+    return fig
+
+
+def figura_series(df_serie, columnas, titulo, titulo_eje_y, puntos_maximos=PUNTOS_MAXIMOS_SERIE, metodo="lttb"):
+    """Líneas temporales (plotly, WebGL) de varias columnas de una serie indexada por fecha.
+
+    Cada columna se submuestrea a `puntos_maximos` puntos antes de construir la figura.
+    """
+    go = _go()
+    fig = go.Figure()
+    for col in columnas:
+        x, y = reducir_serie(df_serie.index.to_numpy(), df_serie[col].to_numpy(), puntos_maximos, metodo)
+        fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', name=col))
+    fig.update_layout(title_text=titulo, xaxis_title='Fecha', yaxis_title=titulo_eje_y, hovermode='x unified', legend_title_text='Serie')
+    return fig
@@ -0,0 +1,254 @@
+# importacion_insumos.py
+# Importación masiva de tablas de insumos (CSV, Excel .xlsx, Parquet) por bloques y con validación de columnas.
+
+import io
+import os
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from motor_produccion import COLUMNAS_ENTRADA
+
+TAMANO_BLOQUE_DEFECTO = 50_000
+EXTENSIONES_SOPORTADAS = (".csv", ".txt", ".xlsx", ".xlsm", ".parquet", ".pq")
+
+# --- ALIAS DE COLUMNAS ---
+# Se aceptan los nombres de la tabla de resultados y las claves de default_insumos_data_pg1.
+ALIAS_COLUMNAS = {
+    "Nombre": ["nombre", "insumo", "sustrato"],
+    "Volumen (t/año)": ["volumen (t/año)", "volumen (t/ano)", "volumen", "volumen_t_ano", "t/año"],
+    "Residuo ganadero": ["residuo ganadero", "residuo_ganadero", "ganadero"],
+    "Humedad (%)": ["humedad (%)", "humedad"],
+    "TS (%)": ["ts (%)", "ts"],
+    "SV (%sms)": ["sv (%sms)", "sv (%)", "sv"],
+    "Potencial (m3CH4/tSV)": ["potencial (m3ch4/tsv)", "potencial"],
+    "%CH4": ["%ch4", "porcentaje_ch4", "ch4 (%)", "ch4"],
+    "Upgrading (%)": ["upgrading (%)", "rendimiento_upgrading", "rendimiento upgrading (%)", "upgrading"],
+    "Categoría": ["categoria", "categoría", "tipo de insumo", "familia", "grupo"],  # Opcional, para agrupar gráficos
+    # Opcionales: oferta de cada insumo para el optimizador de mezcla
+    "Disponible (t/año)": ["disponible (t/año)", "disponible (t/ano)", "disponible", "oferta (t/año)", "oferta"],
+    "Mínimo (t/año)": ["minimo (t/año)", "minimo (t/ano)", "minimo", "volumen minimo"],
+    # Opcional: planta a la que pertenece cada insumo (tablas de una cartera de plantas)
+    "Sitio": ["sitio", "planta", "instalacion", "site"],
+}
+COLUMNAS_OFERTA = ["Disponible (t/año)", "Mínimo (t/año)"]
+COLUMNAS_OBLIGATORIAS = ["Volumen (t/año)", "TS (%)", "SV (%sms)", "Potencial (m3CH4/tSV)", "%CH4"]
+COLUMNAS_PORCENTAJE = ["Humedad (%)", "TS (%)", "SV (%sms)", "%CH4", "Upgrading (%)"]
+UPGRADING_DEFECTO = 95.0  # Mismo valor por defecto que el formulario
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", str(texto).strip().lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+_INDICE_ALIAS = {_normalizar(alias): col for col, alias_list in ALIAS_COLUMNAS.items() for alias in alias_list + [col]}
+
+
+def mapear_columnas(columnas):
+    """Devuelve {columna original: columna canónica} para las columnas reconocidas."""
+    mapeo = {}
+    for col in columnas:
+        canonica = _INDICE_ALIAS.get(_normalizar(col))
+        if canonica is not None and canonica not in mapeo.values():
+            mapeo[col] = canonica
+    return mapeo
+
+
+def _validar_columnas(mapeo):
+    faltantes = [col for col in COLUMNAS_OBLIGATORIAS if col not in mapeo.values()]
+    if faltantes:
+        raise ValueError(
+            f"La tabla de insumos no contiene las columnas obligatorias: {', '.join(faltantes)}. "
+            f"Columnas aceptadas: {', '.join(COLUMNAS_ENTRADA)}"
+        )
+
+
+def normalizar_bloque(df_bloque, mapeo, fila_inicial=0):
+    """Convierte un bloque leído del archivo a la tabla de entrada del motor de producción."""
+    df = df_bloque[list(mapeo)].rename(columns=mapeo)
+    valores = {}
+    for col in COLUMNAS_ENTRADA[1:] + COLUMNAS_OFERTA:
+        if col in df.columns and col != "Residuo ganadero":
+            serie = df[col]
+            if not pd.api.types.is_numeric_dtype(serie):
+                serie = serie.astype(str).str.replace(",", ".", regex=False)
+            valores[col] = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    invalidas = np.zeros(len(df), dtype=bool)
+    for col in COLUMNAS_OBLIGATORIAS:
+        invalidas |= np.isnan(valores[col])
+    invalidas |= valores["Volumen (t/año)"] < 0
+    for col in COLUMNAS_OFERTA:
+        if col in valores:
+            invalidas |= valores[col] < 0
+    for col in COLUMNAS_PORCENTAJE:
+        if col in valores:
+            v = valores[col]
+            invalidas |= (v < 0) | (v > 100)
+    if invalidas.any():
+        filas = (np.flatnonzero(invalidas)[:10] + fila_inicial + 2).tolist()  # +2: cabecera y base 1
+        raise ValueError(
+            f"{int(invalidas.sum())} filas con valores no numéricos, negativos o porcentajes fuera de 0-100 "
+            f"(primeras filas del archivo: {', '.join(map(str, filas))})."
+        )
+
+    # Las columnas se reúnen en un dict y el DataFrame se construye una sola vez (insertarlas una a una
+    # cuesta más que el propio cálculo en tablas pequeñas, p. ej. las peticiones de la API)
+    indice = pd.RangeIndex(fila_inicial, fila_inicial + len(df))
+    salida = {}
+    if "Nombre" in df.columns:
+        salida["Nombre"] = df["Nombre"].fillna("").astype(str).to_numpy()
+    else:
+        salida["Nombre"] = [f"Insumo {i + 1}" for i in indice]
+    salida["Volumen (t/año)"] = valores["Volumen (t/año)"]
+    if "Residuo ganadero" in df.columns:
+        es_ganadero = df["Residuo ganadero"].map(_normalizar).isin(["si", "s", "yes", "y", "true", "1", "1.0"])
+        salida["Residuo ganadero"] = np.where(es_ganadero.to_numpy(), "Sí", "No")
+    else:
+        salida["Residuo ganadero"] = np.full(len(df), "No")
+    if "Humedad (%)" in valores:
+        humedad = valores["Humedad (%)"]
+        salida["Humedad (%)"] = np.where(np.isnan(humedad), 100.0 - valores["TS (%)"], humedad)
+    else:
+        salida["Humedad (%)"] = 100.0 - valores["TS (%)"]
+    for col in ["TS (%)", "SV (%sms)", "Potencial (m3CH4/tSV)", "%CH4"]:
+        salida[col] = valores[col]
+    if "Categoría" in df.columns:
+        salida["Categoría"] = df["Categoría"].fillna("Sin categoría").astype(str).to_numpy()
+    if "Sitio" in df.columns:
+        salida["Sitio"] = df["Sitio"].fillna("").astype(str).str.strip().to_numpy()
+    upgrading = valores.get("Upgrading (%)")
+    salida["Upgrading (%)"] = np.full(len(df), UPGRADING_DEFECTO) if upgrading is None else np.where(np.isnan(upgrading), UPGRADING_DEFECTO, upgrading)
+    for col in COLUMNAS_OFERTA:
+        if col in valores:
+            salida[col] = valores[col]
+    return pd.DataFrame(salida, index=indice)
+
+
+# --- LECTORES POR FORMATO (GENERADORES DE BLOQUES CRUDOS) ---
+def _opciones_csv(muestra):
+    primera_linea = muestra.splitlines()[0] if muestra else ""
+    if primera_linea.count(";") > primera_linea.count(","):
+        return {"sep": ";", "decimal": ","}  # CSV exportado con configuración regional española
+    return {"sep": ","}
+
+
+def _bloques_csv(fuente, tamano_bloque, mapeador=None):
+    if not hasattr(fuente, "read"):
+        with open(fuente, encoding="utf-8-sig") as f:
+            opciones = _opciones_csv(f.read(4096))
+        with pd.read_csv(fuente, chunksize=tamano_bloque, encoding="utf-8-sig", **opciones) as lector:
+            yield from lector
+        return
+    # Archivo subido: se decodifica en flujo, sin copiar el contenido entero en memoria
+    binario = not isinstance(fuente, io.TextIOBase)
+    texto = io.TextIOWrapper(fuente, encoding="utf-8-sig", newline="") if binario else fuente
+    inicio = texto.tell()
+    opciones = _opciones_csv(texto.read(4096))
+    texto.seek(inicio)
+    try:
+        with pd.read_csv(texto, chunksize=tamano_bloque, **opciones) as lector:
+            yield from lector
+    finally:
+        if binario:
+            texto.detach()  # Devuelve el archivo subido sin cerrarlo
+
+
+def _bloques_excel(fuente, tamano_bloque, mapeador=None):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("Instale 'openpyxl' para importar Excel: pip install openpyxl") from e
+    libro = load_workbook(fuente, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        cabecera = [str(c) if c is not None else f"columna_{i}" for i, c in enumerate(next(filas, ()))]
+        bloque = []
+        for fila in filas:
+            if fila is None or all(v is None for v in fila):
+                continue
+            bloque.append(fila)
+            if len(bloque) >= tamano_bloque:
+                yield pd.DataFrame(bloque, columns=cabecera)
+                bloque = []
+        if bloque or not cabecera:
+            yield pd.DataFrame(bloque, columns=cabecera)
+    finally:
+        libro.close()
+
+
+def _bloques_parquet(fuente, tamano_bloque, mapeador=None):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Instale 'pyarrow' para importar Parquet: pip install pyarrow") from e
+    archivo = pq.ParquetFile(fuente)
+    mapeo = (mapeador or mapear_columnas)(archivo.schema_arrow.names)  # Solo se leen las columnas reconocidas
+    for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=list(mapeo) or None):
+        yield lote.to_pandas()
+
+
+def _formato(nombre_archivo):
+    extension = os.path.splitext(str(nombre_archivo))[1].lower()
+    if extension not in EXTENSIONES_SOPORTADAS:
+        raise ValueError(f"Formato '{extension}' no soportado. Use CSV, XLSX o Parquet.")
+    if extension in (".csv", ".txt"):
+        return _bloques_csv
+    if extension in (".xlsx", ".xlsm"):
+        return _bloques_excel
+    return _bloques_parquet
+
+
+def iterar_bloques_archivo(fuente, nombre_archivo=None, tamano_bloque=TAMANO_BLOQUE_DEFECTO, mapeador=None):
+    """Genera bloques crudos (sin validar) de un archivo CSV, XLSX o Parquet.
+
+    `fuente` puede ser una ruta o un objeto tipo archivo (p. ej. el UploadedFile de st.file_uploader);
+    en este último caso el formato se deduce de `nombre_archivo` o del atributo `name`.
+    `mapeador` (por defecto mapear_columnas) decide qué columnas se leen de un Parquet.
+    """
+    nombre_archivo = nombre_archivo or getattr(fuente, "name", None) or str(fuente)
+    lector = _formato(nombre_archivo)
+    if hasattr(fuente, "seek"):
+        fuente.seek(0)  # El UploadedFile se conserva entre reruns de Streamlit
+    yield from lector(fuente, tamano_bloque, mapeador)
+
+
+def iterar_bloques_insumos(fuente, nombre_archivo=None, tamano_bloque=TAMANO_BLOQUE_DEFECTO):
+    """Genera bloques validados de la tabla de insumos (columnas de COLUMNAS_ENTRADA)."""
+    mapeo = None
+    fila_inicial = 0
+    for bloque in iterar_bloques_archivo(fuente, nombre_archivo, tamano_bloque):
+        if mapeo is None:
+            mapeo = mapear_columnas(bloque.columns)
+            _validar_columnas(mapeo)
+        yield normalizar_bloque(bloque, mapeo, fila_inicial)
+        fila_inicial += len(bloque)
+
+
+def leer_insumos(fuente, nombre_archivo=None, tamano_bloque=TAMANO_BLOQUE_DEFECTO):
+    """Lee un archivo completo de insumos y devuelve un único DataFrame validado."""
+    bloques = list(iterar_bloques_insumos(fuente, nombre_archivo, tamano_bloque))
+    if not bloques:
+        raise ValueError("El archivo no contiene filas de insumos.")
+    df = pd.concat(bloques, ignore_index=True) if len(bloques) > 1 else bloques[0].reset_index(drop=True)
+    df["Residuo ganadero"] = df["Residuo ganadero"].astype("category")
+    if "Categoría" in df.columns:
+        df["Categoría"] = df["Categoría"].astype("category")
+    return df
+
+
+def normalizar_insumos(df_insumos):
+    """Valida una tabla de insumos ya cargada en memoria (p. ej. el JSON de la API) con las mismas reglas que un archivo."""
+    mapeo = mapear_columnas(df_insumos.columns)
+    _validar_columnas(mapeo)
+    if df_insumos.empty:
+        raise ValueError("La tabla de insumos no contiene filas.")
+    return normalizar_bloque(df_insumos.reset_index(drop=True), mapeo)
+
+
+def plantilla_csv(filas_ejemplo):
+    """CSV de ejemplo con las columnas esperadas a partir de dicts tipo default_insumos_data_pg1."""
+    df = pd.DataFrame(filas_ejemplo).rename(columns=mapear_columnas(pd.DataFrame(filas_ejemplo).columns))
+    return df[[col for col in COLUMNAS_ENTRADA if col in df.columns]].to_csv(index=False).encode("utf-8")
@@ -0,0 +1,312 @@
+# incertidumbre.py
+# Propagación de la incertidumbre de las propiedades de los insumos (Monte Carlo) a través de la cadena de
+# producción y del balance de aguas. Las muestras se generan y evalúan por bloques (arrays de NumPy de
+# muestras x insumos), cada bloque con su propio generador derivado de una SeedSequence: el resultado es
+# reproducible con la misma semilla tanto en serie como repartido entre procesos. Cada bloque se reduce al
+# llegar a histogramas de clases fijas (percentiles, media y desviación en flujo) y se descarta, así que la
+# memoria no crece con el número de muestras.
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from motor_balance import resolver_recirculacion, agua_condensado_biogas
+from motor_produccion import calcular_cadena, COLUMNAS_NUMERICAS_ENTRADA, DIAS_POR_ANO
+
+# Propiedades con incertidumbre de laboratorio y sus límites físicos
+LIMITES_PROPIEDADES = {
+    "Humedad (%)": (0.0, 100.0),
+    "TS (%)": (0.0, 100.0),
+    "SV (%sms)": (0.0, 100.0),
+    "Potencial (m3CH4/tSV)": (0.0, np.inf),
+    "%CH4": (0.0, 100.0),
+    "Upgrading (%)": (0.0, 100.0),
+}
+DISTRIBUCIONES = {
+    "normal": "Normal (±variación = intervalo del 95%)",
+    "triangular": "Triangular (moda en el valor nominal)",
+    "uniforme": "Uniforme en ±variación",
+}
+SALIDAS_MONTE_CARLO = {
+    "biometano_final_m3_ano": "Biometano final (m³/año)",
+    "biogas_bruto_m3_dia": "Biogás bruto (m³/día)",
+    "E4_agua_dilucion_calculada": "Agua de dilución calculada (m³/día)",
+    "total_agua_entrante_m3_dia": "Total agua entrante (m³/día)",
+    "agua_efluente_liquido_neto_m3_dia": "Efluente líquido neto (m³/día)",
+}
+VARIACION_DEFECTO = 0.20
+ELEMENTOS_POR_BLOQUE = 1_000_000  # muestras x insumos evaluados a la vez (~8 MB por array de trabajo)
+MUESTRAS_CRUDAS_MAXIMAS = 200_000  # simular() devuelve cada muestra; para más, resumir()
+CLASES_DISTRIBUCION = 4096  # Clases finas de cada salida: el error de un percentil es de una clase
+Z_95 = 1.959963984540054
+
+
+def _propiedades_nominales(df_insumos):
+    faltantes = [col for col in COLUMNAS_NUMERICAS_ENTRADA if col not in df_insumos.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en la tabla de insumos: {', '.join(faltantes)}")
+    return {col: pd.to_numeric(df_insumos[col], errors="coerce").fillna(0.0).to_numpy(dtype=float) for col in COLUMNAS_NUMERICAS_ENTRADA}
+
+
+def _variaciones(variacion_relativa):
+    """{propiedad: variación relativa} a partir de un valor común o de un dict parcial."""
+    if isinstance(variacion_relativa, dict):
+        desconocidas = [p for p in variacion_relativa if p not in LIMITES_PROPIEDADES]
+        if desconocidas:
+            raise ValueError(f"Propiedades sin incertidumbre: {', '.join(desconocidas)}. Use: {', '.join(LIMITES_PROPIEDADES)}")
+        return {p: float(variacion_relativa.get(p, VARIACION_DEFECTO)) for p in LIMITES_PROPIEDADES}
+    return {p: float(variacion_relativa) for p in LIMITES_PROPIEDADES}
+
+
+def _muestrear(rng, nominal, variacion, distribucion, n_muestras, limites):
+    """Array (n_muestras x insumos) de valores alrededor de `nominal` con dispersión relativa `variacion`."""
+    forma = (n_muestras, len(nominal))
+    if variacion <= 0:
+        return np.broadcast_to(nominal, forma).copy()
+    if distribucion == "normal":
+        factor = rng.standard_normal(forma)
+        factor *= variacion / Z_95
+    elif distribucion == "triangular":
+        factor = rng.triangular(-variacion, 0.0, variacion, forma)
+    else:
+        factor = rng.uniform(-variacion, variacion, forma)
+    factor += 1.0
+    factor *= nominal
+    return np.clip(factor, *limites, out=factor)
+
+
+def _simular_bloque(nominales, configuracion, semilla, n_muestras):
+    """Evalúa un bloque de muestras y devuelve {salida: array float32}. Se ejecuta también en otros procesos."""
+    rng = np.random.default_rng(semilla)
+    variaciones = configuracion["variaciones"]
+    muestras = {}
+    for col, limites in LIMITES_PROPIEDADES.items():
+        if col == "Humedad (%)":
+            continue
+        muestras[col] = _muestrear(rng, nominales[col], variaciones[col], configuracion["distribucion"], n_muestras, limites)
+    # La humedad sigue al TS muestreado en los insumos donde suman 100 (como en la importación); en el resto se muestrea aparte
+    acoplada = configuracion["humedad_acoplada"]
+    humedad = _muestrear(rng, nominales["Humedad (%)"], variaciones["Humedad (%)"], configuracion["distribucion"], n_muestras, LIMITES_PROPIEDADES["Humedad (%)"])
+    muestras["Humedad (%)"] = np.where(acoplada, 100.0 - muestras["TS (%)"], humedad)
+
+    cadena = calcular_cadena(nominales["Volumen (t/año)"], *(muestras[col] for col in COLUMNAS_NUMERICAS_ENTRADA[1:]))
+    ts_total_t_dia = cadena["TS (t/año)"].sum(axis=1) / DIAS_POR_ANO
+    biogas_m3_dia = cadena["Biogás Bruto (m3/año)"].sum(axis=1) / DIAS_POR_ANO
+    balance = configuracion["funcion_balance"](
+        ts_total_t_dia=ts_total_t_dia,
+        agua_en_insumos_t_dia=configuracion["volumen_total_t_dia"] - ts_total_t_dia,
+        agua_en_biogas_condensado_m3_dia=agua_condensado_biogas(biogas_m3_dia, configuracion["g_agua_por_Nm3_biogas"]),
+        **configuracion["parametros_proceso"],
+    )
+    salidas = {
+        "biometano_final_m3_ano": cadena["Biometano final (m3/año)"].sum(axis=1),
+        "biogas_bruto_m3_dia": biogas_m3_dia,
+    }
+    for salida in SALIDAS_MONTE_CARLO:
+        if salida not in salidas:
+            salidas[salida] = np.broadcast_to(balance[salida], (n_muestras,))
+    return {salida: np.asarray(valores, dtype=np.float32) for salida, valores in salidas.items()}
+
+
+def _simular_bloque_empaquetado(argumentos):
+    return _simular_bloque(*argumentos)
+
+
+def iterar_bloques(df_insumos, parametros_proceso, g_agua_por_Nm3_biogas, n_muestras, variacion_relativa=VARIACION_DEFECTO,
+                   distribucion="normal", semilla=0, procesos=1, funcion_balance=resolver_recirculacion, elementos_por_bloque=ELEMENTOS_POR_BLOQUE):
+    """Genera, en orden, los bloques de salidas ({salida: array float32}) de la simulación.
+
+    `parametros_proceso` son los argumentos de calcular_balance que no dependen de los insumos (agua de limpieza,
+    dilución directa, TS objetivo, recirculación, evaporación, humedad y captura de la torta). Con `procesos` > 1
+    los bloques se evalúan en un pool de procesos; las muestras son las mismas que en serie.
+    """
+    if distribucion not in DISTRIBUCIONES:
+        raise ValueError(f"Distribución desconocida: {distribucion}. Use: {', '.join(DISTRIBUCIONES)}")
+    if n_muestras <= 0:
+        return
+    nominales = _propiedades_nominales(df_insumos)
+    configuracion = {
+        "variaciones": _variaciones(variacion_relativa),
+        "distribucion": distribucion,
+        "humedad_acoplada": np.abs(nominales["Humedad (%)"] + nominales["TS (%)"] - 100.0) < 0.5,
+        "volumen_total_t_dia": nominales["Volumen (t/año)"].sum() / DIAS_POR_ANO,
+        "g_agua_por_Nm3_biogas": g_agua_por_Nm3_biogas,
+        "parametros_proceso": dict(parametros_proceso),
+        "funcion_balance": funcion_balance,
+    }
+    filas_por_bloque = max(1, elementos_por_bloque // max(1, len(df_insumos)))
+    tamanos = [min(filas_por_bloque, n_muestras - inicio) for inicio in range(0, n_muestras, filas_por_bloque)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    tareas = [(nominales, configuracion, s, n) for s, n in zip(semillas, tamanos)]
+    if procesos and procesos > 1 and len(tareas) > 1:
+        # 'spawn': seguro también desde los hilos de Streamlit
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tareas)), mp_context=multiprocessing.get_context("spawn")) as pool:
+            yield from pool.map(_simular_bloque_empaquetado, tareas)
+    else:
+        for tarea in tareas:
+            yield _simular_bloque(*tarea)
+
+
+class _DistribucionAcumulada:
+    """Histograma de clases fijas de un flujo de valores, con media y desviación típica combinadas por bloques.
+
+    El rango lo fija el primer bloque; si llegan valores fuera de él, cada par de clases contiguas se funde en
+    una y el rango se duplica hacia ese lado. Los valores no finitos (sin estado estacionario) se cuentan aparte.
+    """
+
+    def __init__(self, n_clases=CLASES_DISTRIBUCION):
+        self.conteos = np.zeros(n_clases, dtype=np.int64)
+        self.inicio = self.ancho = None
+        self.n = self.no_finitos = 0
+        self.media = self._m2 = 0.0
+        self.minimo, self.maximo = np.inf, -np.inf
+
+    def anadir(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        finitos = valores[np.isfinite(valores)]
+        self.no_finitos += len(valores) - len(finitos)
+        if not len(finitos):
+            return
+        minimo, maximo = float(finitos.min()), float(finitos.max())
+        # Media y suma de cuadrados de las desviaciones combinadas con las del bloque (Chan et al.)
+        n_bloque, media_bloque = len(finitos), float(finitos.mean())
+        delta, n_total = media_bloque - self.media, self.n + n_bloque
+        self._m2 += float(((finitos - media_bloque) ** 2).sum()) + delta ** 2 * self.n * n_bloque / n_total
+        self.media += delta * n_bloque / n_total
+        self.n = n_total
+        self.minimo, self.maximo = min(self.minimo, minimo), max(self.maximo, maximo)
+        if self.inicio is None:
+            self.inicio = minimo
+            self.ancho = max(maximo - minimo, abs(maximo) * 1e-9, 1e-12) / (len(self.conteos) - 1)
+        self._cubrir(minimo, maximo)
+        clases = ((finitos - self.inicio) / self.ancho).astype(np.int64)
+        np.clip(clases, 0, len(self.conteos) - 1, out=clases)
+        self.conteos += np.bincount(clases, minlength=len(self.conteos))
+
+    def _cubrir(self, minimo, maximo):
+        n = len(self.conteos)
+        while minimo < self.inicio or maximo >= self.inicio + n * self.ancho:
+            fundidos = self.conteos.reshape(-1, 2).sum(axis=1)
+            self.conteos[:] = 0
+            if minimo < self.inicio:
+                self.conteos[n // 2:] = fundidos
+                self.inicio -= n * self.ancho
+            else:
+                self.conteos[:n // 2] = fundidos
+            self.ancho *= 2.0
+
+    def percentiles(self, percentiles):
+        """Percentiles interpolados dentro de su clase."""
+        if not self.n:
+            return np.full(len(percentiles), np.nan)
+        acumulado = np.cumsum(self.conteos)
+        objetivo = np.asarray(percentiles, dtype=float) / 100.0 * self.n
+        clase = np.minimum(np.searchsorted(acumulado, objetivo), len(self.conteos) - 1)
+        previo = np.where(clase > 0, acumulado[clase - 1], 0)
+        fraccion = (objetivo - previo) / np.maximum(self.conteos[clase], 1)
+        return np.clip(self.inicio + (clase + fraccion) * self.ancho, self.minimo, self.maximo)
+
+    def desviacion(self):
+        return np.sqrt(self._m2 / self.n) if self.n else np.nan
+
+    def histograma(self, n_clases):
+        """DataFrame desde/hasta/frecuencia de unas `n_clases` clases, fundiendo las clases finas ocupadas."""
+        ocupadas = np.flatnonzero(self.conteos)
+        if not len(ocupadas):
+            return pd.DataFrame({"desde": [], "hasta": [], "frecuencia": []})
+        conteos = self.conteos[ocupadas[0]:ocupadas[-1] + 1]
+        por_clase = -(-len(conteos) // n_clases)
+        conteos = np.pad(conteos, (0, -len(conteos) % por_clase)).reshape(-1, por_clase).sum(axis=1)
+        desde = self.inicio + (ocupadas[0] + np.arange(len(conteos)) * por_clase) * self.ancho
+        return pd.DataFrame({"desde": desde, "hasta": desde + por_clase * self.ancho, "frecuencia": conteos / self.n})
+
+
+class ResumenMonteCarlo:
+    """Percentiles, media, desviación e histogramas de las salidas, acumulados bloque a bloque (ver resumir).
+
+    `salidas` es una lista de columnas o un dict {columna: etiqueta} con los nombres de las filas de la tabla.
+    """
+
+    def __init__(self, salidas=SALIDAS_MONTE_CARLO):
+        self.etiquetas = dict(salidas) if isinstance(salidas, dict) else {salida: salida for salida in salidas}
+        self.distribuciones = {salida: _DistribucionAcumulada() for salida in salidas}
+
+    def anadir(self, bloque):
+        for salida, distribucion in self.distribuciones.items():
+            distribucion.anadir(bloque[salida])
+
+    def fraccion_no_finita(self, salida):
+        """Fracción de muestras sin valor (NaN) de `salida`, p. ej. sin estado estacionario."""
+        distribucion = self.distribuciones[salida]
+        total = distribucion.n + distribucion.no_finitos
+        return distribucion.no_finitos / total if total else 0.0
+
+    def tabla(self, percentiles=(10, 50, 90), valores_nominales=None):
+        """Misma tabla que resumen_percentiles."""
+        return _tabla_resumen({
+            salida: (d.percentiles(percentiles), d.media if d.n else np.nan, d.desviacion())
+            for salida, d in self.distribuciones.items()
+        }, percentiles, valores_nominales, self.etiquetas)
+
+    def histograma(self, salida, n_clases=60):
+        """Histograma de `salida` para el gráfico (n_clases barras en lugar de todas las muestras)."""
+        return self.distribuciones[salida].histograma(n_clases)
+
+
+def resumir(df_insumos, parametros_proceso, g_agua_por_Nm3_biogas, n_muestras=1_000_000, **opciones):
+    """ResumenMonteCarlo de la simulación. Acepta las mismas opciones que iterar_bloques.
+
+    Cada bloque se reduce al llegar y se descarta: la memoria no depende de `n_muestras`.
+    """
+    resumen = ResumenMonteCarlo()
+    for bloque in iterar_bloques(df_insumos, parametros_proceso, g_agua_por_Nm3_biogas, n_muestras, **opciones):
+        resumen.anadir(bloque)
+    return resumen
+
+
+def simular(df_insumos, parametros_proceso, g_agua_por_Nm3_biogas, n_muestras=100_000, **opciones):
+    """Todas las muestras de salida en un DataFrame (una columna float32 por salida de SALIDAS_MONTE_CARLO).
+
+    Solo para simulaciones pequeñas (hasta MUESTRAS_CRUDAS_MAXIMAS); acepta las mismas opciones que iterar_bloques.
+    """
+    if n_muestras > MUESTRAS_CRUDAS_MAXIMAS:
+        raise ValueError(f"simular() devuelve cada muestra y admite hasta {MUESTRAS_CRUDAS_MAXIMAS:,}; use resumir() para {n_muestras:,}.")
+    salidas = {salida: np.empty(n_muestras, dtype=np.float32) for salida in SALIDAS_MONTE_CARLO}
+    inicio = 0
+    for bloque in iterar_bloques(df_insumos, parametros_proceso, g_agua_por_Nm3_biogas, n_muestras, **opciones):
+        fin = inicio + len(next(iter(bloque.values())))
+        for salida, valores in bloque.items():
+            salidas[salida][inicio:fin] = valores
+        inicio = fin
+    return pd.DataFrame(salidas)
+
+
+def _tabla_resumen(estadisticos, percentiles, valores_nominales, etiquetas=SALIDAS_MONTE_CARLO):
+    """Tabla a partir de {salida: (valores de los percentiles, media, desviación típica)}."""
+    filas = {}
+    for salida, (valores, media, desviacion) in estadisticos.items():
+        fila = dict(zip((f"P{p}" for p in percentiles), valores))
+        fila["Media"] = media
+        fila["Desv. típica"] = desviacion
+        if valores_nominales is not None:
+            fila["Nominal"] = valores_nominales.get(salida, np.nan)
+        filas[etiquetas.get(salida, salida)] = fila
+    return pd.DataFrame.from_dict(filas, orient="index")
+
+
+def resumen_percentiles(df_muestras, percentiles=(10, 50, 90), valores_nominales=None):
+    """Tabla por salida con los percentiles (P10, P50, P90 por defecto), media y desviación típica de las muestras de simular.
+
+    Las operaciones sin estado estacionario (NaN) se excluyen; `valores_nominales` añade la columna 'Nominal'.
+    """
+    estadisticos = {}
+    for salida in df_muestras.columns:
+        valores = df_muestras[salida].to_numpy(dtype=np.float64)
+        valores = valores[np.isfinite(valores)]
+        if len(valores):
+            estadisticos[salida] = (np.percentile(valores, percentiles), valores.mean(), valores.std())
+        else:
+            estadisticos[salida] = ([np.nan] * len(percentiles), np.nan, np.nan)
+    return _tabla_resumen(estadisticos, percentiles, valores_nominales)
@@ -0,0 +1,267 @@
+# instrumentacion.py
+# Tramos de tiempo en los puntos calientes de las páginas (cálculo, estilos, gráficos, exportación),
+# captura opcional con cProfile / tracemalloc y exportación de la traza en formato Chrome Trace
+# (se abre en chrome://tracing o https://ui.perfetto.dev).
+# Desactivada, cada tramo devuelve un contexto nulo compartido: no se toma la hora ni se reserva nada.
+
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import nullcontext
+
+import pandas as pd
+
+MAX_TRAMOS_DEFECTO = 5000
+LINEAS_PERFIL_DEFECTO = 25
+CATEGORIAS = {
+    "pagina": "Ejecución de la página", "calculo": "Cálculo", "estilo": "Estilos y tablas",
+    "grafico": "Gráficos", "exportacion": "Exportación",
+}
+COLUMNAS_RESUMEN_TRAMOS = ["Tramo", "Categoría", "Llamadas", "Total (ms)", "Media (ms)", "Máx (ms)", "Última (ms)"]
+
+_NULO = nullcontext()
+# Registro activo en cada hilo: el hilo del script de la página o el hilo de exportación que trabaja para ella
+class _Local(threading.local):
+    registro = None  # Valor por defecto en cada hilo: sin getattr con excepción en el camino desactivado
+
+
+_local = _Local()
+
+
+class _Tramo:
+    __slots__ = ("registro", "nombre", "categoria", "inicio")
+
+    def __init__(self, registro, nombre, categoria):
+        self.registro = registro
+        self.nombre = nombre
+        self.categoria = categoria
+
+    def __enter__(self):
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.registro.anotar(self.nombre, self.categoria, self.inicio, time.perf_counter_ns() - self.inicio, error=tipo is not None)
+        return False
+
+
+class RegistroTramos:
+    """Tramos de tiempo de una página (los `max_tramos` más recientes) y última captura de perfil. Seguro entre hilos."""
+
+    def __init__(self, max_tramos=MAX_TRAMOS_DEFECTO):
+        self.activo = False
+        self.ejecucion = 0
+        self.perfil = None        # pstats.Stats de la última ejecución perfilada
+        self.memoria = None       # DataFrame con las líneas que más memoria reservaron
+        self.pico_memoria = None  # bytes
+        self.aviso = None
+        self._tramos = deque(maxlen=max_tramos)
+        self._bloqueo = threading.Lock()
+        self._origen_ns = time.perf_counter_ns()
+        self._inicio_ejecucion = None
+        self._perfilador = None
+        self._tracemalloc_propio = False
+
+    def tramo(self, nombre, categoria="calculo"):
+        """Contexto que mide `nombre`; contexto nulo si el registro está desactivado."""
+        if not self.activo:
+            return _NULO
+        return _Tramo(self, nombre, categoria)
+
+    def anotar(self, nombre, categoria, inicio_ns, duracion_ns, error=False):
+        hilo = threading.current_thread()
+        with self._bloqueo:
+            self._tramos.append((nombre, categoria, inicio_ns, duracion_ns, hilo.ident, hilo.name, self.ejecucion, error))
+
+    def tramos(self):
+        with self._bloqueo:
+            return list(self._tramos)
+
+    def limpiar(self):
+        with self._bloqueo:
+            self._tramos.clear()
+        self.perfil = self.memoria = self.pico_memoria = self.aviso = None
+
+    # --- EJECUCIÓN DE LA PÁGINA ---
+    def iniciar_ejecucion(self, cprofile=False, memoria=False):
+        """Marca el inicio de un rerun en el hilo actual y arranca las capturas pedidas."""
+        self._detener_capturas()  # Por si la ejecución anterior se cortó (st.stop, excepción) sin finalizar
+        self.ejecucion += 1
+        self.aviso = None
+        _local.registro = self
+        self._inicio_ejecucion = time.perf_counter_ns()
+        if cprofile:
+            perfilador = cProfile.Profile()
+            try:
+                perfilador.enable()
+                self._perfilador = perfilador
+            except ValueError as e:  # Python 3.12+: solo un perfilador activo por proceso
+                self.aviso = f"No se pudo iniciar cProfile (¿otra sesión perfilando?): {e}"
+        if memoria:
+            if tracemalloc.is_tracing():
+                self.aviso = "tracemalloc ya está activo en otra sesión; se omite la captura de memoria."
+            else:
+                tracemalloc.start()
+                self._tracemalloc_propio = True
+
+    def finalizar_ejecucion(self, lineas=LINEAS_PERFIL_DEFECTO):
+        """Cierra el tramo de la página completa y guarda el perfil y la memoria de este rerun."""
+        if self._inicio_ejecucion is not None and self.activo:
+            self.anotar("Página completa", "pagina", self._inicio_ejecucion, time.perf_counter_ns() - self._inicio_ejecucion)
+        self._inicio_ejecucion = None
+        if self._perfilador is not None:
+            self._perfilador.disable()
+            self.perfil = pstats.Stats(self._perfilador)
+            self._perfilador = None
+        if self._tracemalloc_propio:
+            estadisticas = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)]
+            ).statistics("lineno")[:lineas]
+            self.pico_memoria = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._tracemalloc_propio = False
+            self.memoria = pd.DataFrame(
+                [(f"{os.path.basename(e.traceback[0].filename)}:{e.traceback[0].lineno}", e.size / 1024, e.count) for e in estadisticas],
+                columns=["Línea", "KiB", "Bloques"]
+            )
+        if _local.registro is self:
+            _local.registro = None
+
+    def _detener_capturas(self):
+        if self._perfilador is not None:
+            self._perfilador.disable()
+            self._perfilador = None
+        if self._tracemalloc_propio:
+            tracemalloc.stop()
+            self._tracemalloc_propio = False
+
+    # --- RESULTADOS ---
+    def resumen(self):
+        """Tabla por tramo: llamadas, total, media, máximo y duración en la última ejecución (ms)."""
+        tramos = self.tramos()
+        if not tramos:
+            return pd.DataFrame(columns=COLUMNAS_RESUMEN_TRAMOS)
+        df = pd.DataFrame(tramos, columns=["Tramo", "cat", "inicio", "ns", "hilo", "nombre_hilo", "ejecucion", "error"])
+        df["ms"] = df["ns"] / 1e6
+        ultima = df[df["ejecucion"] == df["ejecucion"].max()].groupby("Tramo")["ms"].sum()
+        resumen = df.groupby("Tramo", sort=False).agg(
+            cat=("cat", "first"), Llamadas=("ms", "size"), total=("ms", "sum"), media=("ms", "mean"), maximo=("ms", "max")
+        )
+        resumen["Última (ms)"] = ultima.reindex(resumen.index)
+        resumen = resumen.rename(columns={"total": "Total (ms)", "media": "Media (ms)", "maximo": "Máx (ms)"})
+        resumen["Categoría"] = resumen["cat"].map(CATEGORIAS).fillna(resumen["cat"])
+        return resumen.reset_index()[COLUMNAS_RESUMEN_TRAMOS].sort_values("Total (ms)", ascending=False, ignore_index=True)
+
+    def texto_perfil(self, lineas=LINEAS_PERFIL_DEFECTO, orden="cumulative"):
+        if self.perfil is None:
+            return None
+        salida = io.StringIO()
+        self.perfil.stream = salida
+        self.perfil.sort_stats(orden).print_stats(lineas)
+        return salida.getvalue()
+
+    def perfil_binario(self):
+        """Perfil en el formato de `pstats.Stats.dump_stats` (snakeviz, pstats, gprof2dot)."""
+        return None if self.perfil is None else marshal.dumps(self.perfil.stats)
+
+    def traza_chrome(self, proceso="biogas"):
+        """Tramos como JSON de Chrome Trace (eventos completos 'X', tiempos en µs)."""
+        tramos = self.tramos()
+        eventos = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": proceso}}]
+        hilos = {}
+        for nombre, categoria, inicio, duracion, hilo, nombre_hilo, ejecucion, error in tramos:
+            hilos[hilo] = nombre_hilo
+            eventos.append({
+                "name": nombre, "cat": categoria, "ph": "X", "pid": os.getpid(), "tid": hilo,
+                "ts": (inicio - self._origen_ns) / 1000, "dur": duracion / 1000,
+                "args": {"ejecucion": ejecucion, "error": error},
+            })
+        eventos.extend({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": h, "args": {"name": n}} for h, n in hilos.items())
+        return json.dumps({"traceEvents": eventos, "displayTimeUnit": "ms"}, ensure_ascii=False).encode("utf-8")
+
+
+def registro_de_sesion(estado, nombre, max_tramos=MAX_TRAMOS_DEFECTO):
+    """Obtiene (o crea) el registro `nombre` dentro de un mapeo de estado, p. ej. st.session_state."""
+    if nombre not in estado:
+        estado[nombre] = RegistroTramos(max_tramos)
+    return estado[nombre]
+
+
+# --- TRAMOS EN MÓDULOS COMPARTIDOS ---
+# Las funciones del motor y de exportación no reciben el registro: usan el activo en su hilo, si lo hay.
+def tramo(nombre, categoria="calculo"):
+    """Como RegistroTramos.tramo, con el registro activo en el hilo actual."""
+    registro = _local.registro
+    if registro is None or not registro.activo:
+        return _NULO
+    return _Tramo(registro, nombre, categoria)
+
+
+def propagar_a_hilo(funcion):
+    """Envuelve `funcion` para que, ejecutada en otro hilo (pool de exportación), anote en el registro activo aquí."""
+    registro = _local.registro
+    if registro is None or not registro.activo:
+        return funcion
+
+    def envuelta(*args, **kwargs):
+        anterior = _local.registro
+        _local.registro = registro
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            _local.registro = anterior
+    return envuelta
+
+
+# --- PANEL DE LA BARRA LATERAL ---
+def iniciar_instrumentacion(st_modulo, prefijo):
+    """Controles de instrumentación en la barra lateral. Devuelve (registro, panel) con el rerun ya iniciado.
+
+    La página llama a `mostrar_instrumentacion(panel, registro, prefijo)` al final para rellenar el panel.
+    """
+    registro = registro_de_sesion(st_modulo.session_state, f"{prefijo}_instrumentacion")
+    panel = st_modulo.sidebar.expander("⏱️ Instrumentación y perfilado")
+    registro.activo = panel.toggle(
+        "Tramos de tiempo", key=f"{prefijo}_instr_tramos",
+        help="Mide cálculo, estilos, gráficos y exportación en cada rerun. Desactivado no añade coste apreciable."
+    )
+    cprofile = panel.toggle("Perfil de CPU (cProfile)", key=f"{prefijo}_instr_cprofile", help="Ralentiza el rerun perfilado.")
+    memoria = panel.toggle("Memoria (tracemalloc)", key=f"{prefijo}_instr_memoria", help="Ralentiza mucho el rerun capturado.")
+    registro.iniciar_ejecucion(cprofile=cprofile, memoria=memoria)
+    return registro, panel
+
+
+def mostrar_instrumentacion(panel, registro, prefijo):
+    """Cierra el rerun y muestra tramos, perfil y memoria en el panel, con la traza descargable."""
+    registro.finalizar_ejecucion()
+    if registro.aviso:
+        panel.warning(registro.aviso)
+    resumen = registro.resumen()
+    if resumen.empty and registro.perfil is None and registro.memoria is None:
+        panel.caption("Active los tramos o un perfilador y vuelva a ejecutar la página.")
+        return
+    if not resumen.empty:
+        panel.caption(f"Ejecución {registro.ejecucion} · {len(registro.tramos())} tramos registrados")
+        panel.dataframe(resumen.round(2), hide_index=True, use_container_width=True)
+        panel.download_button(
+            "⬇️ Traza (Chrome / Perfetto)", registro.traza_chrome(prefijo), f"traza_{prefijo}.json", "application/json",
+            key=f"{prefijo}_instr_dl_traza"
+        )
+    if registro.perfil is not None:
+        panel.markdown("**cProfile** (último rerun perfilado, por tiempo acumulado)")
+        panel.code(registro.texto_perfil(), language=None)
+        panel.download_button(
+            "⬇️ Perfil (.prof)", registro.perfil_binario(), f"perfil_{prefijo}.prof", "application/octet-stream",
+            key=f"{prefijo}_instr_dl_perfil"
+        )
+    if registro.memoria is not None:
+        panel.markdown(f"**tracemalloc** · pico {registro.pico_memoria / 1024 ** 2:.1f} MiB")
+        panel.dataframe(registro.memoria, hide_index=True, use_container_width=True)
+    panel.button("Limpiar registro", key=f"{prefijo}_instr_limpiar", on_click=registro.limpiar)
@@ -0,0 +1,183 @@
+# libro_excel.py
+# Escritura de libros Excel en flujo (hojas write-only de openpyxl): cada fila se serializa al añadirla,
+# así que la memoria no crece con el número de filas. Todas las exportaciones usan los mismos formatos
+# numéricos, cabecera en negrita, panel inmovilizado y nombres de hoja válidos.
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Límite de filas de una hoja de Excel; las tablas más largas continúan en "Hoja (2)", "Hoja (3)", ...
+MAX_FILAS_HOJA = 1_048_576
+TAMANO_BLOQUE_DEFECTO = 20_000
+FORMATOS_NUMERO = {
+    "entero": "#,##0",
+    "decimal": "#,##0.00",
+    "porcentaje": "0.00",  # Las columnas en % guardan 0-100, no fracciones
+    "fecha": "yyyy-mm-dd",
+    "fecha_hora": "yyyy-mm-dd hh:mm",
+}
+
+
+def formato_columna(nombre, serie):
+    """Clave de FORMATOS_NUMERO para una columna, o None si se escribe sin formato (texto, booleanos)."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        horas = serie.dropna()
+        return "fecha" if horas.empty or (horas == horas.dt.normalize()).all() else "fecha_hora"
+    if pd.api.types.is_bool_dtype(serie) or not pd.api.types.is_numeric_dtype(serie):
+        return None
+    if pd.api.types.is_integer_dtype(serie):
+        return "entero"
+    return "porcentaje" if "%" in str(nombre) else "decimal"
+
+
+def _nombre_hoja(nombre, usados):
+    """Nombre de hoja de Excel válido (31 caracteres, sin []:*?/\\) y distinto de los ya `usados`."""
+    base = re.sub(r"[\[\]:*?/\\]", "_", str(nombre)).strip("'")[:31] or "Hoja"
+    candidato, n = base, 2
+    while candidato.lower() in usados:
+        sufijo = f" ({n})"
+        candidato, n = base[:31 - len(sufijo)] + sufijo, n + 1
+    usados.add(candidato.lower())
+    return candidato
+
+
+def _columnas_python(df):
+    """Listas de valores Python por columna, con None en lugar de NaN/NaT (celda vacía)."""
+    columnas = []
+    for _, serie in df.items():
+        valores = serie.tolist()
+        nulos = serie.isna().to_numpy()
+        if nulos.any():
+            for i in np.flatnonzero(nulos):
+                valores[i] = None
+        columnas.append(valores)
+    return columnas
+
+
+class LibroExcel:
+    """Libro write-only de openpyxl. Uso:
+
+        with LibroExcel(destino) as libro:
+            libro.hoja("Resultados", df)
+            libro.hoja_bloques("Detalle", iterador_de_dataframes)
+
+    `destino` es una ruta o un archivo binario; el libro se guarda al salir del bloque.
+    """
+
+    def __init__(self, destino):
+        try:
+            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+            from openpyxl.utils import get_column_letter
+        except ImportError as e:
+            raise ImportError("Instale 'openpyxl' para exportar a Excel: pip install openpyxl") from e
+        self.destino = destino
+        self._libro = Workbook(write_only=True)
+        self._celda = WriteOnlyCell
+        self._letra_columna = get_column_letter
+        self._negrita = Font(bold=True)
+        self._usados = set()
+        self.filas_escritas = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.guardar()
+        return False
+
+    def guardar(self):
+        if not self._libro.worksheets:  # Un libro sin hojas no es válido
+            self._libro.create_sheet("Vacío")
+        self._libro.save(self.destino)
+
+    def _nueva_hoja(self, nombre, columnas, anchos):
+        hoja = self._libro.create_sheet(_nombre_hoja(nombre, self._usados))
+        # En modo write-only, anchos y panel inmovilizado se fijan antes de la primera fila
+        for i, ancho in enumerate(anchos, 1):
+            hoja.column_dimensions[self._letra_columna(i)].width = ancho
+        hoja.freeze_panes = "A2"
+        cabecera = []
+        for columna in columnas:
+            celda = self._celda(hoja, value=str(columna))
+            celda.font = self._negrita
+            cabecera.append(celda)
+        hoja.append(cabecera)
+        return hoja
+
+    def _plantillas(self, hoja, formatos):
+        plantillas = []
+        for formato in formatos:
+            if formato is None:
+                plantillas.append(None)
+            else:
+                celda = self._celda(hoja)
+                celda.number_format = FORMATOS_NUMERO[formato]
+                plantillas.append(celda)
+        return plantillas
+
+    def hoja(self, nombre, df, indice=False, tamano_bloque=TAMANO_BLOQUE_DEFECTO):
+        """Escribe un DataFrame en una hoja (por bloques de filas, sin copiar la tabla entera)."""
+        if indice:
+            df = df.reset_index()
+        return self.hoja_bloques(nombre, (df.iloc[i:i + tamano_bloque] for i in range(0, max(len(df), 1), tamano_bloque)))
+
+    def hoja_bloques(self, nombre, bloques):
+        """Escribe bloques de DataFrames con las mismas columnas, uno tras otro, en la hoja `nombre`.
+
+        Las columnas y formatos se toman del primer bloque. Devuelve el número de filas escritas.
+        """
+        hoja = plantillas = columnas = formatos = anchos = None
+        filas_hoja = filas = 0
+        for bloque in bloques:
+            if hoja is None:
+                columnas = list(bloque.columns)
+                formatos = [formato_columna(c, bloque[c]) for c in bloque.columns]
+                anchos = [min(max(len(str(c)) + 2, 12), 45) for c in columnas]
+                hoja = self._nueva_hoja(nombre, columnas, anchos)
+                plantillas = self._plantillas(hoja, formatos)
+                filas_hoja = 1
+            for fila in zip(*_columnas_python(bloque)):
+                if filas_hoja >= MAX_FILAS_HOJA:
+                    hoja = self._nueva_hoja(nombre, columnas, anchos)
+                    plantillas = self._plantillas(hoja, formatos)
+                    filas_hoja = 1
+                hoja.append([_con_valor(p, v) for p, v in zip(plantillas, fila)])
+                filas_hoja += 1
+                filas += 1
+        if hoja is None:  # Ningún bloque: hoja vacía con el nombre pedido
+            self._libro.create_sheet(_nombre_hoja(nombre, self._usados))
+        self.filas_escritas += filas
+        return filas
+
+    def hoja_pares(self, nombre, pares, columnas=("Parámetro", "Valor")):
+        """Hoja de dos columnas a partir de un dict o de pares (clave, valor), p. ej. parámetros de entrada."""
+        pares = list(pares.items()) if isinstance(pares, dict) else list(pares)
+        hoja = self._nueva_hoja(nombre, list(columnas), [45, 18])
+        decimal, entero = self._plantillas(hoja, ["decimal", "entero"])
+        for clave, valor in pares:
+            if valor is None:
+                celda = None
+            elif isinstance(valor, (bool, np.bool_)):
+                celda = bool(valor)
+            elif isinstance(valor, (int, np.integer)):
+                celda = _con_valor(entero, int(valor))
+            elif isinstance(valor, (float, np.floating)):
+                celda = None if np.isnan(valor) else _con_valor(decimal, float(valor))
+            else:
+                celda = str(valor)
+            hoja.append([str(clave), celda])
+        self.filas_escritas += len(pares)
+        return len(pares)
+
+
+def _con_valor(plantilla, valor):
+    # La hoja write-only serializa la fila en `append`, así que la misma celda con formato se reutiliza en cada fila
+    if plantilla is None or valor is None:
+        return valor
+    plantilla.value = valor
+    return plantilla
@@ -0,0 +1,235 @@
+# linea_comandos.py
+# Punto de entrada sin interfaz gráfica: los mismos cálculos que las páginas de producción y balance de aguas.
+#
+#   python linea_comandos.py calcular insumos.csv [otra_planta.xlsx trabajos.json ...]
+#                            [-p recirculacion_fraccion=0.4 ...] [--parametros parametros.json]
+#                            [--formato json|csv|parquet] [--detalle] [-o salida] [--procesos N]
+#   python linea_comandos.py incertidumbre insumos.csv [-n 1000000] [--variacion 0.2] [--distribucion normal]
+#                            [--semilla 0] [--procesos N] [-p ...] [--parametros ...] [-o resumen.csv]
+#   python linea_comandos.py optimizar oferta.csv [--dilucion-max 200] [--efluente-max 300] [--ganadero-min 0.3]
+#                            [--volumen-max 250] [--sin-ts-objetivo] [--metodo auto|lineal|voraz] [-p ...] [-o mezcla.csv]
+#   python linea_comandos.py cartera flota.csv [planta_b.xlsx sitios.json ...] [--sitios parametros_sitios.csv]
+#                            [-p ...] [--parametros ...] [--procesos N] [-o informe.xlsx|informe.pdf|resumen.csv|resumen.parquet]
+#   python linea_comandos.py simular-sensores (--archivo lecturas.csv | --puerto 9100) [--aceleracion 60] [--periodo 60]
+#                            [--alimentacion 240] [--biogas 24000] [--duracion segundos]
+#   python linea_comandos.py servir [--host 127.0.0.1] [--puerto 8765] [--procesos N]
+#   python linea_comandos.py parametros
+#
+# Cada archivo de insumos es un trabajo (id = nombre del archivo); un .json aporta su propia lista de
+# trabajos {"trabajos": [{"id", "insumos", "parametros"}, ...]}, igual que el cuerpo de la API.
+
+import argparse
+import json
+import os
+import sys
+
+from cartera_plantas import evaluar_cartera, leer_parametros_sitios, trabajos_cartera
+from exportacion import exportar_excel_cartera, exportar_pdf_cartera
+from importacion_insumos import leer_insumos, normalizar_insumos
+from incertidumbre import DISTRIBUCIONES, simular, resumir
+from monitor_sensores import ServidorSimulacion, SimuladorSensores, escribir_simulacion, valores_medios_simulacion
+from optimizador_mezcla import METODOS_OPTIMIZACION, optimizar_mezcla
+
+from servicio_calculo import (
+    PARAMETROS_DEFECTO, FORMATOS_SALIDA, configuracion_balance, evaluar_lote, parametros_desde_pares, parametros_proceso,
+    procesos_disponibles, serializar_resultados, trabajos_desde_archivos,
+)
+
+
+def _parametros_linea(args):
+    parametros = {}
+    if args.parametros:
+        with open(args.parametros, encoding="utf-8") as f:
+            parametros.update(json.load(f))
+    parametros.update(parametros_desde_pares(args.p))
+    return parametros
+
+
+def _calcular(args):
+    trabajos = trabajos_desde_archivos(args.archivos, _parametros_linea(args))
+    resultados = evaluar_lote(trabajos, procesos=args.procesos)
+    datos = serializar_resultados(resultados, args.formato, args.detalle)
+    if args.salida:
+        with open(args.salida, "wb") as f:
+            f.write(datos)
+    else:
+        sys.stdout.buffer.write(datos)
+        sys.stdout.buffer.flush()
+    errores = [r for r in resultados if "error" in r]
+    for r in errores:
+        print(f"Trabajo {r['id']}: {r['error']}", file=sys.stderr)
+    return 1 if errores else 0
+
+
+def _incertidumbre(args):
+    funcion_balance, g_agua, argumentos = configuracion_balance(parametros_proceso(_parametros_linea(args)))
+    df_insumos = normalizar_insumos(leer_insumos(args.archivo))
+    opciones = dict(distribucion=args.distribucion, variacion_relativa=args.variacion, semilla=args.semilla, funcion_balance=funcion_balance)
+    nominal = simular(df_insumos, argumentos, g_agua, 1, **dict(opciones, variacion_relativa=0.0)).iloc[0].to_dict()
+    resumen = resumir(df_insumos, argumentos, g_agua, args.n, procesos=args.procesos, **opciones).tabla(valores_nominales=nominal)
+    if args.salida:
+        resumen.to_csv(args.salida, index_label="Salida")
+    else:
+        print(resumen.to_string(float_format=lambda v: f"{v:,.2f}"))
+    return 0
+
+
+def _optimizar(args):
+    funcion_balance, g_agua, argumentos = configuracion_balance(parametros_proceso(_parametros_linea(args)))
+    resultado = optimizar_mezcla(
+        leer_insumos(args.archivo), argumentos, g_agua, funcion_balance, metodo=args.metodo,
+        dilucion_max_m3_dia=args.dilucion_max, efluente_max_m3_dia=args.efluente_max, fraccion_ganadera_min=args.ganadero_min,
+        volumen_max_t_dia=args.volumen_max, exigir_ts_objetivo=not args.sin_ts_objetivo,
+    )
+    if resultado["estado"]:
+        print(f"Sin solución ({resultado['metodo']}): {resultado['estado']}", file=sys.stderr)
+        return 1
+    print(f"Biometano final: {resultado['biometano_final_m3_ano']:,.0f} m³/año ({resultado['metodo']})", file=sys.stderr)
+    print(resultado["restricciones"].to_string(index=False), file=sys.stderr)
+    if args.salida:
+        resultado["produccion"].to_csv(args.salida, index=False)
+    else:
+        sys.stdout.write(resultado["produccion"].to_csv(index=False))
+    return 0
+
+
+def _cartera(args):
+    parametros_sitios = leer_parametros_sitios(args.sitios) if args.sitios else None
+    trabajos = trabajos_cartera(args.archivos, parametros_sitios, _parametros_linea(args))
+    resultados = evaluar_cartera(trabajos, procesos=args.procesos)
+    for clave, valor in resultados.totales_flota().items():
+        print(f"{clave}: {valor:,.2f}" if isinstance(valor, float) else f"{clave}: {valor}", file=sys.stderr)
+    extension = os.path.splitext(args.salida or "")[1].lower()
+    if extension == ".xlsx":
+        exportar_excel_cartera(resultados, args.salida)
+    elif extension == ".pdf":
+        exportar_pdf_cartera(resultados, args.salida)
+    elif extension == ".parquet":
+        try:
+            resultados.resumen().to_parquet(args.salida, index=False)
+        except ImportError as e:
+            raise ImportError("Instale 'pyarrow' para exportar a Parquet: pip install pyarrow") from e
+    elif args.salida:
+        resultados.resumen().to_csv(args.salida, index=False)
+    else:
+        sys.stdout.write(resultados.resumen().to_csv(index=False))
+    errores = resultados.errores()
+    for sitio, error in zip(errores["Sitio"], errores["Error"]):
+        print(f"Sitio {sitio}: {error}", file=sys.stderr)
+    return 1 if len(errores) else 0
+
+
+def _simular_sensores(args):
+    totales = {"total_volumen_insumos_humedos_t_dia": args.alimentacion, "total_biogas_bruto_m3_dia": args.biogas}
+    opciones = dict(valores_medios=valores_medios_simulacion(totales, args.temperatura), periodo_s=args.periodo,
+                    aceleracion=args.aceleracion, semilla=args.semilla)
+    try:
+        if args.archivo:
+            print(f"Escribiendo lecturas simuladas en {args.archivo} (Ctrl+C para salir)", file=sys.stderr, flush=True)
+            escribir_simulacion(args.archivo, SimuladorSensores(**opciones), args.duracion)
+        else:
+            with ServidorSimulacion(args.host, args.puerto, **opciones) as servidor:
+                print(f"Lecturas simuladas en tcp://{args.host}:{servidor.puerto} (Ctrl+C para salir)", file=sys.stderr, flush=True)
+                servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _servir(args):
+    from servidor_api import servir
+    def al_iniciar(servidor):
+        print(f"API escuchando en http://{servidor.host}:{servidor.puerto} con {servidor.procesos} procesos de cálculo (Ctrl+C para salir)",
+              file=sys.stderr, flush=True)
+    servir(args.host, args.puerto, args.procesos, al_iniciar=al_iniciar)
+    return 0
+
+
+def _parametros(args):
+    print(json.dumps(PARAMETROS_DEFECTO, ensure_ascii=False, indent=2))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Producción de biogás y balance de aguas por lotes (sin interfaz).")
+    subparsers = parser.add_subparsers(dest="orden", required=True)
+
+    calcular = subparsers.add_parser("calcular", help="Calcula uno o varios archivos de insumos")
+    calcular.add_argument("archivos", nargs="+", help="Archivos de insumos (CSV, XLSX, Parquet) o JSON con trabajos")
+    calcular.add_argument("-p", action="append", metavar="CLAVE=VALOR", help="Parámetro de proceso (repetible)")
+    calcular.add_argument("--parametros", help="JSON con parámetros de proceso comunes a todos los trabajos")
+    calcular.add_argument("--formato", choices=list(FORMATOS_SALIDA), default="json")
+    calcular.add_argument("--detalle", action="store_true", help="Incluir la producción por insumo")
+    calcular.add_argument("-o", "--salida", help="Archivo de salida (por defecto, la salida estándar)")
+    calcular.add_argument("--procesos", type=int, default=1, help="Procesos para repartir los trabajos (0 = todos los núcleos)")
+    calcular.set_defaults(funcion=_calcular)
+
+    incertidumbre = subparsers.add_parser("incertidumbre", help="P10/P50/P90 por Monte Carlo de las propiedades de los insumos")
+    incertidumbre.add_argument("archivo", help="Archivo de insumos (CSV, XLSX, Parquet)")
+    incertidumbre.add_argument("-n", type=int, default=1_000_000, help="Número de muestras")
+    incertidumbre.add_argument("--variacion", type=float, default=0.2, help="Variación relativa de las propiedades (0.2 = ±20%%)")
+    incertidumbre.add_argument("--distribucion", choices=list(DISTRIBUCIONES), default="normal")
+    incertidumbre.add_argument("--semilla", type=int, default=0)
+    incertidumbre.add_argument("-p", action="append", metavar="CLAVE=VALOR", help="Parámetro de proceso (repetible)")
+    incertidumbre.add_argument("--parametros", help="JSON con parámetros de proceso")
+    incertidumbre.add_argument("-o", "--salida", help="CSV con el resumen (por defecto, tabla en la salida estándar)")
+    incertidumbre.add_argument("--procesos", type=int, default=1, help="Procesos para repartir los bloques de muestras (0 = todos los núcleos)")
+    incertidumbre.set_defaults(funcion=_incertidumbre)
+
+    optimizar = subparsers.add_parser("optimizar", help="Mezcla de insumos que maximiza el biometano con restricciones de agua y TS")
+    optimizar.add_argument("archivo", help="Insumos con la oferta en 'Disponible (t/año)' (o 'Volumen (t/año)') y opcionalmente 'Mínimo (t/año)'")
+    optimizar.add_argument("--dilucion-max", type=float, help="Agua de dilución máxima (m³/día)")
+    optimizar.add_argument("--efluente-max", type=float, help="Efluente líquido neto máximo (m³/día)")
+    optimizar.add_argument("--ganadero-min", type=float, help="Fracción mínima de residuo ganadero (0-1)")
+    optimizar.add_argument("--volumen-max", type=float, help="Capacidad de la planta (t/día de insumos)")
+    optimizar.add_argument("--sin-ts-objetivo", action="store_true", help="Admitir mezclas más diluidas que el TS objetivo")
+    optimizar.add_argument("--metodo", choices=list(METODOS_OPTIMIZACION), default="auto")
+    optimizar.add_argument("-p", action="append", metavar="CLAVE=VALOR", help="Parámetro de proceso (repetible)")
+    optimizar.add_argument("--parametros", help="JSON con parámetros de proceso")
+    optimizar.add_argument("-o", "--salida", help="CSV con la producción de la mezcla óptima (por defecto, la salida estándar)")
+    optimizar.set_defaults(funcion=_optimizar)
+
+    cartera = subparsers.add_parser("cartera", help="Evalúa una flota de plantas y genera el informe de la cartera")
+    cartera.add_argument("archivos", nargs="+", help="Insumos con columna 'Sitio', un archivo por planta o JSON {\"sitios\": [...]}")
+    cartera.add_argument("--sitios", help="Tabla de parámetros por sitio (columna 'Sitio' y una columna por parámetro)")
+    cartera.add_argument("-p", action="append", metavar="CLAVE=VALOR", help="Parámetro de proceso común (repetible)")
+    cartera.add_argument("--parametros", help="JSON con parámetros de proceso comunes")
+    cartera.add_argument("--procesos", type=int, default=1, help="Procesos para repartir los sitios (0 = todos los núcleos)")
+    cartera.add_argument("-o", "--salida", help="Informe .xlsx o .pdf, o resumen por sitio .csv o .parquet (por defecto, CSV en la salida estándar)")
+    cartera.set_defaults(funcion=_cartera)
+
+    simulador = subparsers.add_parser("simular-sensores", help="Genera lecturas de planta simuladas en un archivo o un socket TCP")
+    destino = simulador.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--archivo", help="Archivo al que se añaden las lecturas")
+    destino.add_argument("--puerto", type=int, help="Puerto TCP en el que se sirven las lecturas (0 = puerto libre cualquiera)")
+    simulador.add_argument("--host", default="127.0.0.1")
+    simulador.add_argument("--periodo", type=float, default=60.0, help="Segundos simulados entre lecturas")
+    simulador.add_argument("--aceleracion", type=float, default=60.0, help="Segundos simulados por segundo real")
+    simulador.add_argument("--alimentacion", type=float, help="Alimentación media (t/día)")
+    simulador.add_argument("--biogas", type=float, help="Biogás medio (Nm³/día)")
+    simulador.add_argument("--temperatura", type=float, default=35.0, help="Temperatura media del biogás (°C)")
+    simulador.add_argument("--duracion", type=float, help="Segundos reales de simulación en archivo (por defecto, sin fin)")
+    simulador.add_argument("--semilla", type=int, default=0)
+    simulador.set_defaults(funcion=_simular_sensores)
+
+    servir = subparsers.add_parser("servir", help="Arranca la API HTTP local")
+    servir.add_argument("--host", default="127.0.0.1")
+    servir.add_argument("--puerto", type=int, default=8765, help="0 = puerto libre cualquiera")
+    servir.add_argument("--procesos", type=int, default=None, help="Procesos de cálculo (por defecto, uno por núcleo)")
+    servir.set_defaults(funcion=_servir)
+
+    parametros = subparsers.add_parser("parametros", help="Muestra los parámetros de proceso y sus valores por defecto")
+    parametros.set_defaults(funcion=_parametros)
+
+    args = parser.parse_args(argv)
+    if getattr(args, "procesos", None) == 0 and args.orden in ("calcular", "incertidumbre", "cartera"):
+        args.procesos = procesos_disponibles()
+    try:
+        return args.funcion(args)
+    except (ValueError, ImportError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
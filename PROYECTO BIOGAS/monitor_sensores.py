@@ -0,0 +1,518 @@
+# monitor_sensores.py
+# Modo en vivo: lecturas de caudalímetros, medidor de biogás y temperatura que llegan por un archivo que
+# otro proceso va ampliando (como `tail -f`) o por un socket TCP, con un simulador local para pruebas.
+# Cada lectura actualiza en O(1) las sumas acumuladas de unas ventanas móviles por sensor (1 h, 24 h...);
+# el balance de aguas de una ventana se evalúa con sus medias, sin reconstruir ningún DataFrame.
+#
+# Formato de las lecturas, una por línea (se admiten las dos formas):
+#   2026-10-17T08:00:00,biogas_Nm3_h,2105.3                      (CSV: fecha, sensor, valor; también con ';')
+#   {"t": "2026-10-17T08:00:00", "biogas_Nm3_h": 2105.3, ...}     (JSON: uno o varios sensores por línea)
+# La fecha es ISO 8601 (sin zona = UTC) o segundos desde 1970.
+
+import json
+import math
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from motor_balance import resolver_recirculacion, agua_condensado_biogas
+from psicrometria import contenido_agua_biogas, PRESION_NORMAL_HPA
+
+# --- SENSORES Y VENTANAS ---
+SENSORES = {
+    "alimentacion_t_h": "Caudal de alimentación (t/h)",
+    "biogas_Nm3_h": "Biogás (Nm³/h)",
+    "temperatura_biogas_C": "Temperatura del biogás (°C)",
+    "agua_limpieza_m3_h": "Agua de limpieza (m³/h)",
+    "agua_dilucion_directa_m3_h": "Agua de dilución directa (m³/h)",
+}
+# Sensores imprescindibles para el balance; el resto, si no informan, toma el valor de los parámetros
+SENSORES_OBLIGATORIOS = ("alimentacion_t_h", "biogas_Nm3_h")
+VENTANAS_DEFECTO = {"1 h": 3600.0, "24 h": 86400.0}
+CUBETAS_POR_VENTANA = 240  # Resolución de la expiración: la ventana abarca entre su duración y 1/240 más
+HISTORIAL_MAXIMO = 2880  # Instantáneas del balance que se conservan para el gráfico
+MAX_BYTES_LECTURA = 4 * 1024 * 1024  # Lectura máxima de un archivo por llamada
+MAX_LINEAS_PENDIENTES = 200_000  # Líneas recibidas por socket a la espera de consumirse
+INACTIVIDAD_MAXIMA_S = 120.0  # Sin llamadas a leer() durante este tiempo, el hilo del socket se detiene
+ANTIGUEDAD_AVISO_S = 300.0  # Antigüedad de la última lectura a partir de la cual se avisa de datos desfasados
+SALIDAS_EN_VIVO = {
+    "total_volumen_insumos_humedos_t_dia": "Alimentación (t/día)",
+    "total_biogas_bruto_m3_dia": "Biogás (Nm³/día)",
+    "E4_agua_dilucion_calculada": "Agua de dilución calculada (m³/día)",
+    "total_agua_entrante_m3_dia": "Total agua entrante (m³/día)",
+    "agua_efluente_liquido_neto_m3_dia": "Efluente líquido neto (m³/día)",
+}
+CAMPOS_FECHA_JSON = ("t", "fecha", "timestamp")
+
+
+# --- LECTURAS ---
+def segundos_desde_fecha(valor):
+    """Segundos desde 1970 (UTC) de una fecha ISO 8601 o de un número."""
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).strip()
+    try:
+        return float(texto)
+    except ValueError:
+        pass
+    try:
+        fecha = datetime.fromisoformat(texto.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Fecha no reconocida: {texto!r}") from None
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return fecha.timestamp()
+
+
+def fecha_desde_segundos(segundos):
+    return pd.Timestamp(segundos, unit="s")
+
+
+def parsear_linea(linea):
+    """Lista de (segundos, sensor, valor) de una línea CSV o JSON. Las líneas vacías devuelven []."""
+    linea = linea.strip()
+    if not linea:
+        return []
+    if linea.startswith("{"):
+        try:
+            datos = json.loads(linea)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON no válido: {e}") from None
+        campo_fecha = next((c for c in CAMPOS_FECHA_JSON if c in datos), None)
+        if campo_fecha is None:
+            raise ValueError("Falta la fecha ('t') en la lectura JSON.")
+        t = segundos_desde_fecha(datos[campo_fecha])
+        if "sensor" in datos:
+            return [(t, str(datos["sensor"]), float(datos["valor"]))]
+        return [(t, sensor, float(valor)) for sensor, valor in datos.items() if sensor != campo_fecha]
+    partes = linea.split(";" if ";" in linea else ",")
+    if len(partes) != 3:
+        raise ValueError(f"Se esperaban 3 campos (fecha, sensor, valor): {linea[:80]!r}")
+    return [(segundos_desde_fecha(partes[0]), partes[1].strip(), float(partes[2].replace(",", ".")))]
+
+
+def formatear_lectura(segundos, sensor, valor):
+    """Línea CSV de una lectura (formato que escribe el simulador)."""
+    fecha = datetime.fromtimestamp(segundos, timezone.utc).replace(tzinfo=None)
+    return f"{fecha.isoformat(timespec='seconds')},{sensor},{valor:.4f}"
+
+
+# --- VENTANA MÓVIL ---
+class VentanaMovil:
+    """Media de las lecturas de los últimos `duracion_s` segundos con suma y recuento acumulados.
+
+    Las lecturas se agrupan en cubetas de duracion_s / CUBETAS_POR_VENTANA segundos: añadir y expirar cuestan
+    O(1) amortizado y la memoria queda acotada sea cual sea la frecuencia del sensor. Se asume un orden
+    aproximadamente cronológico; una lectura atrasada cuenta en la cubeta más reciente.
+    """
+
+    __slots__ = ("duracion_s", "resolucion_s", "_cubetas", "_suma", "_n", "_retiradas")
+
+    def __init__(self, duracion_s, cubetas=CUBETAS_POR_VENTANA):
+        if duracion_s <= 0:
+            raise ValueError("La duración de la ventana debe ser positiva.")
+        self.duracion_s = float(duracion_s)
+        self.resolucion_s = self.duracion_s / cubetas
+        self._cubetas = deque()  # [inicio de la cubeta (s), suma, recuento]
+        self._suma = 0.0
+        self._n = 0
+        self._retiradas = 0
+
+    def __len__(self):
+        return self._n
+
+    def anadir(self, t, valor):
+        cubetas = self._cubetas
+        if cubetas and t < cubetas[-1][0] + self.resolucion_s:
+            ultima = cubetas[-1]
+            ultima[1] += valor
+            ultima[2] += 1
+        else:
+            cubetas.append([t - t % self.resolucion_s, valor, 1])
+        self._suma += valor
+        self._n += 1
+        self.expirar(t)
+
+    def expirar(self, t_actual):
+        """Retira las cubetas que han quedado enteras fuera de la ventana que termina en `t_actual`."""
+        cubetas = self._cubetas
+        limite = t_actual - self.duracion_s - self.resolucion_s
+        while cubetas and cubetas[0][0] <= limite:
+            _, suma, n = cubetas.popleft()
+            self._suma -= suma
+            self._n -= n
+            self._retiradas += 1
+        # Las restas acumulan error de redondeo: se rehace la suma cada tantas retiradas como cubetas hay
+        if self._retiradas > len(cubetas):
+            self._suma = math.fsum(c[1] for c in cubetas)
+            self._retiradas = 0
+
+    def media(self):
+        return self._suma / self._n if self._n else math.nan
+
+
+# --- BALANCE EN VIVO ---
+class MonitorBalance:
+    """Balance de aguas sobre ventanas móviles de las lecturas de planta.
+
+    `parametros_proceso` son los argumentos de calcular_balance que no dependen de la alimentación (como
+    ARGUMENTOS_PROCESO_BALANCE de servicio_calculo); el agua de limpieza y la dilución directa se sustituyen por
+    las medias de sus caudalímetros cuando estos informan. El TS de la alimentación no se mide en línea y se
+    toma de `ts_alimentacion_percent` (por ejemplo, el de la mezcla calculada en 'Producción de Biogás').
+    """
+
+    def __init__(self, parametros_proceso, ts_alimentacion_percent, ventanas=None, temperatura_biogas_C=35.0,
+                 presion_biogas_hPa=PRESION_NORMAL_HPA, base_agua_biogas="Nm3_seco", funcion_balance=resolver_recirculacion,
+                 max_historial=HISTORIAL_MAXIMO):
+        self.parametros_proceso = dict(parametros_proceso)
+        self.ts_alimentacion_percent = float(ts_alimentacion_percent)
+        self.ventanas = dict(ventanas or VENTANAS_DEFECTO)
+        self.temperatura_biogas_C = float(temperatura_biogas_C)
+        self.presion_biogas_hPa = float(presion_biogas_hPa)
+        self.base_agua_biogas = base_agua_biogas
+        self.funcion_balance = funcion_balance
+        self._ventanas = {nombre: {sensor: VentanaMovil(duracion) for sensor in SENSORES} for nombre, duracion in self.ventanas.items()}
+        self.ultimas = {}  # sensor -> (segundos, valor)
+        self.t_ultimo = None
+        self.t_recepcion = None  # Reloj del sistema al recibir la última lectura válida
+        self.lecturas = 0
+        self.descartadas = 0
+        self.historial = deque(maxlen=max_historial)
+        self._t_historial = None
+
+    def anadir(self, t, sensor, valor):
+        """Incorpora una lectura a todas las ventanas. Devuelve False si se descarta (sensor desconocido o valor no finito)."""
+        if sensor not in SENSORES or not math.isfinite(valor):
+            self.descartadas += 1
+            return False
+        for ventanas in self._ventanas.values():
+            ventanas[sensor].anadir(t, valor)
+        self.ultimas[sensor] = (t, valor)
+        if self.t_ultimo is None or t > self.t_ultimo:
+            self.t_ultimo = t
+        self.t_recepcion = time.time()
+        self.lecturas += 1
+        return True
+
+    def antiguedad(self, ahora=None):
+        """Segundos entre la fecha de la última lectura y `ahora` (reloj del sistema); None sin lecturas.
+
+        Las ventanas expiran con la fecha de las lecturas, no con el reloj: si la fuente se detiene o reproduce
+        datos antiguos, las medias son las de la ventana que termina en la última lectura.
+        """
+        return None if self.t_ultimo is None else (time.time() if ahora is None else ahora) - self.t_ultimo
+
+    def segundos_sin_lecturas(self, ahora=None):
+        """Segundos de reloj desde que llegó la última lectura válida; None sin lecturas."""
+        return None if self.t_recepcion is None else (time.time() if ahora is None else ahora) - self.t_recepcion
+
+    def consumir(self, lineas):
+        """Incorpora las lecturas de unas líneas de texto; las que no se entienden se cuentan como descartadas."""
+        anadidas = 0
+        for linea in lineas:
+            try:
+                lecturas = parsear_linea(linea)
+            except (ValueError, TypeError, KeyError):
+                self.descartadas += 1
+                continue
+            for t, sensor, valor in lecturas:
+                anadidas += self.anadir(t, sensor, valor)
+        return anadidas
+
+    def medias(self, ventana):
+        """{sensor: media en la ventana} (NaN si el sensor no ha informado en ella)."""
+        ventanas = self._ventanas[ventana]
+        if self.t_ultimo is not None:
+            # Los sensores que dejan de informar se vacían con el tiempo de las lecturas más recientes
+            for v in ventanas.values():
+                v.expirar(self.t_ultimo)
+        return {sensor: v.media() for sensor, v in ventanas.items()}
+
+    def entradas_balance(self, ventana):
+        """Totales diarios de la ventana con las mismas claves que totales_diarios, o None si faltan sensores obligatorios."""
+        medias = self.medias(ventana)
+        if any(not math.isfinite(medias[s]) for s in SENSORES_OBLIGATORIOS):
+            return None
+        volumen_t_dia = medias["alimentacion_t_h"] * 24.0
+        temperatura = medias["temperatura_biogas_C"] if math.isfinite(medias["temperatura_biogas_C"]) else self.temperatura_biogas_C
+        entradas = {
+            "total_volumen_insumos_humedos_t_dia": volumen_t_dia,
+            "total_ts_en_insumos_t_dia": volumen_t_dia * self.ts_alimentacion_percent / 100.0,
+            "total_biogas_bruto_m3_dia": medias["biogas_Nm3_h"] * 24.0,
+            "temperatura_biogas_C": temperatura,
+            "g_agua_por_Nm3_biogas": float(contenido_agua_biogas(temperatura, self.presion_biogas_hPa, self.base_agua_biogas)),
+        }
+        for sensor, parametro in (("agua_limpieza_m3_h", "agua_limpieza_m3_dia"), ("agua_dilucion_directa_m3_h", "agua_dilucion_directa_m3_dia")):
+            entradas[parametro] = medias[sensor] * 24.0 if math.isfinite(medias[sensor]) else self.parametros_proceso[parametro]
+        return entradas
+
+    def balance(self, ventana):
+        """(entradas, balance de aguas) de la ventana; (None, None) si aún no hay datos suficientes."""
+        entradas = self.entradas_balance(ventana)
+        if entradas is None:
+            return None, None
+        argumentos = dict(self.parametros_proceso, agua_limpieza_m3_dia=entradas["agua_limpieza_m3_dia"],
+                          agua_dilucion_directa_m3_dia=entradas["agua_dilucion_directa_m3_dia"])
+        ts_total = entradas["total_ts_en_insumos_t_dia"]
+        resultado = self.funcion_balance(
+            ts_total_t_dia=ts_total,
+            agua_en_insumos_t_dia=entradas["total_volumen_insumos_humedos_t_dia"] - ts_total,
+            agua_en_biogas_condensado_m3_dia=float(agua_condensado_biogas(entradas["total_biogas_bruto_m3_dia"], entradas["g_agua_por_Nm3_biogas"])),
+            **argumentos,
+        )
+        return entradas, {clave: float(valor) for clave, valor in resultado.items() if np.ndim(valor) == 0}
+
+    def registrar(self):
+        """Guarda una instantánea de SALIDAS_EN_VIVO por ventana si han llegado lecturas nuevas. Devuelve True si la guarda."""
+        if self.t_ultimo is None or self.t_ultimo == self._t_historial:
+            return False
+        fila = {"fecha": self.t_ultimo}
+        for ventana in self.ventanas:
+            entradas, resultado = self.balance(ventana)
+            valores = dict(entradas or {}, **(resultado or {}))
+            for salida, etiqueta in SALIDAS_EN_VIVO.items():
+                fila[f"{etiqueta} [{ventana}]"] = valores.get(salida, math.nan)
+        self.historial.append(fila)
+        self._t_historial = self.t_ultimo
+        return True
+
+    def historial_df(self):
+        """Instantáneas registradas como DataFrame indexado por fecha (a lo sumo max_historial filas)."""
+        if not self.historial:
+            return pd.DataFrame()
+        df = pd.DataFrame.from_records(list(self.historial))
+        df.index = pd.to_datetime(df.pop("fecha"), unit="s")
+        return df
+
+
+# --- FUENTES DE LECTURAS ---
+class FuenteArchivo:
+    """Sigue un archivo de lecturas que otro proceso va ampliando. Cada leer() devuelve las líneas completas nuevas.
+
+    Si el archivo se trunca o se sustituye (rotación), se vuelve a leer desde el principio.
+    """
+
+    def __init__(self, ruta, desde_inicio=True):
+        self.ruta = ruta
+        self._posicion = 0
+        self._resto = b""
+        self._identidad = None
+        if not desde_inicio and os.path.exists(ruta):
+            estado = os.stat(ruta)
+            self._posicion, self._identidad = estado.st_size, (estado.st_dev, estado.st_ino)
+        self.error = None
+
+    @property
+    def descripcion(self):
+        return f"archivo {self.ruta}"
+
+    def leer(self):
+        try:
+            estado = os.stat(self.ruta)
+        except FileNotFoundError:
+            self.error = f"No existe el archivo {self.ruta} (se sigue esperando)."
+            return []
+        self.error = None
+        identidad = (estado.st_dev, estado.st_ino)
+        if identidad != self._identidad or estado.st_size < self._posicion:
+            self._posicion, self._resto, self._identidad = 0, b"", identidad
+        if estado.st_size == self._posicion:
+            return []
+        with open(self.ruta, "rb") as f:
+            f.seek(self._posicion)
+            datos = f.read(MAX_BYTES_LECTURA)
+        self._posicion += len(datos)
+        lineas = (self._resto + datos).split(b"\n")
+        self._resto = lineas.pop()  # Línea a medio escribir: se completa en la siguiente lectura
+        return [linea.decode("utf-8", errors="replace") for linea in lineas]
+
+    def cerrar(self):
+        pass
+
+
+class FuenteSocket:
+    """Cliente TCP de un flujo de lecturas por líneas (pasarela SCADA o `linea_comandos.py simular-sensores --puerto`).
+
+    Un hilo en segundo plano recibe y se reconecta si se corta la conexión; leer() entrega lo recibido desde
+    la llamada anterior. Si el consumidor se retrasa se conservan las MAX_LINEAS_PENDIENTES más recientes.
+    Si nadie llama a leer() durante `max_inactividad_s` (p. ej. se cerró la pestaña sin desconectar) el hilo
+    cierra la conexión y termina; la siguiente llamada a leer() lo vuelve a arrancar.
+    """
+
+    def __init__(self, host, puerto, espera_reconexion_s=2.0, max_inactividad_s=INACTIVIDAD_MAXIMA_S):
+        self.host = host
+        self.puerto = int(puerto)
+        self.espera_reconexion_s = espera_reconexion_s
+        self.max_inactividad_s = max_inactividad_s
+        self.error = None
+        self.conectado = False
+        self.detenida_por_inactividad = False
+        self._pendientes = deque(maxlen=MAX_LINEAS_PENDIENTES)
+        self._parar = threading.Event()
+        self._socket = None
+        self._ultima_lectura = time.monotonic()
+        self._arrancar()
+
+    def _arrancar(self):
+        self.detenida_por_inactividad = False
+        self._hilo = threading.Thread(target=self._recibir, name=f"sensores-{self.host}:{self.puerto}", daemon=True)
+        self._hilo.start()
+
+    def _inactiva(self):
+        return self.max_inactividad_s is not None and time.monotonic() - self._ultima_lectura > self.max_inactividad_s
+
+    @property
+    def descripcion(self):
+        return f"socket {self.host}:{self.puerto}"
+
+    def _recibir(self):
+        while not self._parar.is_set():
+            if self._inactiva():
+                self.conectado, self.detenida_por_inactividad = False, True
+                self.error = f"Recepción detenida: nadie ha leído la fuente en {self.max_inactividad_s:g} s."
+                return
+            try:
+                with socket.create_connection((self.host, self.puerto), timeout=5.0) as s:
+                    s.settimeout(1.0)
+                    self._socket, self.conectado, self.error = s, True, None
+                    resto = b""
+                    while not self._parar.is_set() and not self._inactiva():
+                        try:
+                            datos = s.recv(65536)
+                        except socket.timeout:
+                            continue
+                        if not datos:
+                            break
+                        lineas = (resto + datos).split(b"\n")
+                        resto = lineas.pop()
+                        self._pendientes.extend(linea.decode("utf-8", errors="replace") for linea in lineas)
+                    else:
+                        continue  # Parada o inactividad: se comprueba al inicio del bucle
+                self.error = "La fuente cerró la conexión; reintentando."
+            except OSError as e:
+                self.error = f"Sin conexión con {self.host}:{self.puerto} ({e}); reintentando."
+            self.conectado = False
+            self._parar.wait(self.espera_reconexion_s)
+
+    def leer(self):
+        self._ultima_lectura = time.monotonic()
+        if self.detenida_por_inactividad and not self._parar.is_set():
+            self._arrancar()
+        pendientes = self._pendientes
+        return [pendientes.popleft() for _ in range(len(pendientes))]
+
+    def cerrar(self):
+        self._parar.set()
+        self.conectado = False
+        s = self._socket
+        if s is not None:
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+# --- SIMULADOR LOCAL ---
+def valores_medios_simulacion(totales=None, temperatura_biogas_C=35.0, agua_limpieza_m3_dia=5.0):
+    """Medias horarias de los sensores simulados, a partir de los totales diarios de 'Producción de Biogás' si los hay."""
+    totales = totales or {}
+    return {
+        "alimentacion_t_h": (totales.get("total_volumen_insumos_humedos_t_dia") or 240.0) / 24.0,
+        "biogas_Nm3_h": (totales.get("total_biogas_bruto_m3_dia") or 24_000.0) / 24.0,
+        "temperatura_biogas_C": temperatura_biogas_C,
+        "agua_limpieza_m3_h": agua_limpieza_m3_dia / 24.0,
+    }
+
+
+class SimuladorSensores:
+    """Fuente local de lecturas verosímiles (ciclo diario más ruido) que avanza con el reloj, para pruebas.
+
+    Cada paso son `periodo_s` segundos simulados con una lectura por sensor; con `aceleracion` = 60 un minuto de
+    planta transcurre en un segundo real. Con la misma semilla la secuencia de lecturas es siempre la misma.
+    """
+
+    def __init__(self, valores_medios=None, periodo_s=60.0, aceleracion=60.0, semilla=0, inicio=None, max_pasos_lectura=10_000):
+        self.valores_medios = dict(valores_medios or valores_medios_simulacion())
+        self.periodo_s = float(periodo_s)
+        self.aceleracion = float(aceleracion)
+        self.max_pasos_lectura = max_pasos_lectura
+        self.t_inicio = segundos_desde_fecha(inicio) if inicio is not None else float(int(time.time()))
+        self.error = None
+        self._rng = np.random.default_rng(semilla)
+        self._pasos = 0
+        self._reloj_inicio = time.monotonic()
+
+    @property
+    def descripcion(self):
+        return f"simulador local (x{self.aceleracion:g})"
+
+    def lineas(self, n_pasos):
+        """Las líneas de los `n_pasos` pasos siguientes, sin esperar al reloj."""
+        sensores = list(self.valores_medios)
+        medias = np.array([self.valores_medios[s] for s in sensores])
+        t = self.t_inicio + (self._pasos + np.arange(n_pasos)) * self.periodo_s
+        self._pasos += n_pasos
+        ciclo = np.sin(2 * np.pi * (t % 86400.0) / 86400.0)[:, None]
+        ruido = self._rng.standard_normal((n_pasos, len(sensores)))
+        # Caudales: ±8% de ciclo diario y 3% de ruido; temperatura: ±3 °C y 0,3 °C de ruido
+        es_temperatura = np.array([s == "temperatura_biogas_C" for s in sensores])
+        valores = np.where(es_temperatura, medias + 3.0 * ciclo + 0.3 * ruido, medias * (1.0 + 0.08 * ciclo + 0.03 * ruido))
+        valores = np.where(es_temperatura, valores, np.maximum(valores, 0.0))
+        return [formatear_lectura(ti, sensor, v) for ti, fila in zip(t.tolist(), valores.tolist()) for sensor, v in zip(sensores, fila)]
+
+    def leer(self):
+        debidos = int((time.monotonic() - self._reloj_inicio) * self.aceleracion / self.periodo_s) + 1 - self._pasos
+        return self.lineas(min(debidos, self.max_pasos_lectura)) if debidos > 0 else []
+
+    def cerrar(self):
+        pass
+
+
+def escribir_simulacion(ruta, simulador, duracion_s=None, intervalo_s=0.5):
+    """Añade al archivo `ruta` las lecturas del simulador a su ritmo (hasta `duracion_s` reales, o sin fin)."""
+    fin = time.monotonic() + duracion_s if duracion_s else None
+    with open(ruta, "a", encoding="utf-8") as f:
+        while fin is None or time.monotonic() < fin:
+            lineas = simulador.leer()
+            if lineas:
+                f.write("\n".join(lineas) + "\n")
+                f.flush()
+            time.sleep(intervalo_s)
+
+
+class _ManejadorSimulacion(socketserver.StreamRequestHandler):
+    def handle(self):
+        # Cada cliente recibe su propio flujo simulado, que empieza al conectarse
+        opciones = self.server.opciones_simulador
+        simulador = SimuladorSensores(**opciones)
+        try:
+            while True:
+                lineas = simulador.leer()
+                if lineas:
+                    self.wfile.write(("\n".join(lineas) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                time.sleep(0.5)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class ServidorSimulacion(socketserver.ThreadingTCPServer):
+    """Servidor TCP que envía lecturas simuladas, línea a línea, a cada cliente que se conecta."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", puerto=9100, **opciones_simulador):
+        super().__init__((host, puerto), _ManejadorSimulacion)
+        self.opciones_simulador = opciones_simulador
+
+    @property
+    def puerto(self):
+        return self.server_address[1]
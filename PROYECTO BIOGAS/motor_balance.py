@@ -0,0 +1,285 @@
+# motor_balance.py
+# Motor de cálculo (sin Streamlit) del balance de aguas de la planta de biogás.
+# Todas las entradas pueden ser escalares o arrays de NumPy compatibles por broadcasting.
+
+import numpy as np
+import pandas as pd
+
+CONCEPTOS_ENTRADA = ["Agua en Insumos", "Agua Dilución Directa", "Agua de Limpieza", "Agua Dilución Necesaria Calculada"]
+CONCEPTOS_SALIDA = ["Evaporación", "Condensado Biogás", "Agua en Torta Sólida", "Agua Efluente Líquido Neto"]
+CONCEPTOS_RESUMEN = ["Total Agua Entrante", "Total Agua Saliente (Neta)", "Balance (Entradas - Salidas)", "Agua Recirculada"]
+# Tramos del balance: con dilución (se alcanza el TS objetivo) o sin ella (la mezcla ya está más diluida).
+# En cada tramo todas las salidas son lineales en TS, agua de los insumos y condensado del biogás.
+RAMAS_DILUCION = ("con_dilucion", "sin_dilucion")
+
+
+def agua_y_solidos_insumos(volumen_total_insumos_t_dia, ts_promedio_insumos_percent):
+    """Devuelve (ts_total_t_dia, agua_en_insumos_t_dia) a partir del volumen y el TS promedio."""
+    ts_total_t_dia = np.multiply(volumen_total_insumos_t_dia, np.divide(ts_promedio_insumos_percent, 100.0))
+    return ts_total_t_dia, np.subtract(volumen_total_insumos_t_dia, ts_total_t_dia)
+
+
+def agua_condensado_biogas(volumen_biogas_Nm3_dia, g_agua_por_Nm3_biogas):
+    """Agua condensada del biogás en m³/día."""
+    return np.multiply(volumen_biogas_Nm3_dia, g_agua_por_Nm3_biogas) / 1000000.0
+
+
+def _recortar_dilucion(dilucion_sin_recortar, rama=None):
+    """Dilución aplicada: nunca negativa, salvo que `rama` fuerce uno de los dos tramos lineales."""
+    if rama is None:
+        return np.maximum(dilucion_sin_recortar, 0.0)
+    if rama == "con_dilucion":
+        return dilucion_sin_recortar
+    if rama == "sin_dilucion":
+        return np.zeros(np.shape(dilucion_sin_recortar))
+    raise ValueError(f"Tramo del balance desconocido: {rama}. Use: {', '.join(RAMAS_DILUCION)}")
+
+
+def _escalares(resultado):
+    # Los arrays 0-d (entradas escalares) se devuelven como escalares de NumPy
+    return {k: (v[()] if isinstance(v, np.ndarray) and v.ndim == 0 else v) for k, v in resultado.items()}
+
+
+def calcular_balance(ts_total_t_dia, agua_en_insumos_t_dia, agua_limpieza_m3_dia, agua_dilucion_directa_m3_dia,
+                     target_TS_digestor_percent, recirculacion_fraccion, evaporacion_perdida_fraccion,
+                     humedad_torta_solida_percent, eficiencia_captura_ts_en_torta, agua_en_biogas_condensado_m3_dia, rama=None):
+    """Balance de aguas de un solo paso (la recirculación se trata como flujo interno).
+
+    `eficiencia_captura_ts_en_torta` es una fracción (0-1). Devuelve un dict de escalares o arrays
+    con las entradas E1-E4, las salidas S1-S4 y los totales del balance. `rama` (ver RAMAS_DILUCION)
+    fuerza un tramo aunque no sea el que corresponde: solo para linealizar el balance.
+    """
+    target_TS_digestor_fraccion = np.divide(target_TS_digestor_percent, 100.0)
+    if np.any(target_TS_digestor_fraccion <= 0):
+        raise ValueError("TS Objetivo en digestor no puede ser 0%.")
+
+    # ENTRADAS DE AGUA
+    masa_total_en_digestor_objetivo_t_dia = ts_total_t_dia / target_TS_digestor_fraccion
+    agua_total_requerida_en_digestor_m3_dia = masa_total_en_digestor_objetivo_t_dia - ts_total_t_dia
+    agua_ya_presente_m3_dia = agua_en_insumos_t_dia + agua_limpieza_m3_dia + agua_dilucion_directa_m3_dia
+    agua_dilucion_sin_recortar_m3_dia = agua_total_requerida_en_digestor_m3_dia - agua_ya_presente_m3_dia
+    masa_mezcla = agua_ya_presente_m3_dia + ts_total_t_dia
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ts_mezcla_antes_dilucion_percent = np.where(masa_mezcla > 0, ts_total_t_dia / np.where(masa_mezcla > 0, masa_mezcla, 1.0) * 100, 0.0)
+    agua_dilucion_calculada_m3_dia = _recortar_dilucion(agua_dilucion_sin_recortar_m3_dia, rama)
+
+    E1_agua_en_insumos = agua_en_insumos_t_dia
+    E2_agua_dilucion_directa = agua_dilucion_directa_m3_dia
+    E3_agua_limpieza = agua_limpieza_m3_dia
+    E4_agua_dilucion_calculada = agua_dilucion_calculada_m3_dia
+    total_agua_entrante_m3_dia = E1_agua_en_insumos + E2_agua_dilucion_directa + E3_agua_limpieza + E4_agua_dilucion_calculada
+    total_slurry_en_digestor_m3_dia = ts_total_t_dia + total_agua_entrante_m3_dia
+
+    # SALIDAS DE AGUA
+    S1_evaporacion_m3_dia = total_slurry_en_digestor_m3_dia * evaporacion_perdida_fraccion
+    S2_condensado_biogas_m3_dia = agua_en_biogas_condensado_m3_dia
+    slurry_post_perdidas_m3_dia = total_slurry_en_digestor_m3_dia - S1_evaporacion_m3_dia - S2_condensado_biogas_m3_dia
+
+    ts_torta_solida_fraccion = (100.0 - np.asarray(humedad_torta_solida_percent)) / 100.0
+    ts_en_torta_t_dia = ts_total_t_dia * eficiencia_captura_ts_en_torta
+    with np.errstate(divide="ignore", invalid="ignore"):
+        S3_masa_torta_solida_t_dia = np.where(ts_torta_solida_fraccion > 0, ts_en_torta_t_dia / np.where(ts_torta_solida_fraccion > 0, ts_torta_solida_fraccion, 1.0), 0.0)
+    agua_en_torta_solida_m3_dia = S3_masa_torta_solida_t_dia - ts_en_torta_t_dia
+
+    masa_efluente_liquido_total_t_dia = slurry_post_perdidas_m3_dia - S3_masa_torta_solida_t_dia
+    ts_en_efluente_liquido_total_t_dia = ts_total_t_dia - ts_en_torta_t_dia
+    agua_en_efluente_liquido_total_m3_dia = masa_efluente_liquido_total_t_dia - ts_en_efluente_liquido_total_t_dia
+
+    S4_agua_recirculada_m3_dia = masa_efluente_liquido_total_t_dia * recirculacion_fraccion
+    agua_efluente_liquido_neto_m3_dia = agua_en_efluente_liquido_total_m3_dia * (1.0 - recirculacion_fraccion)
+
+    total_agua_saliente_m3_dia = S1_evaporacion_m3_dia + S2_condensado_biogas_m3_dia + agua_en_torta_solida_m3_dia + agua_efluente_liquido_neto_m3_dia
+    balance_hidrico_m3_dia = total_agua_entrante_m3_dia - total_agua_saliente_m3_dia
+
+    return _escalares({
+        "E1_agua_en_insumos": E1_agua_en_insumos,
+        "E2_agua_dilucion_directa": E2_agua_dilucion_directa,
+        "E3_agua_limpieza": E3_agua_limpieza,
+        "E4_agua_dilucion_calculada": E4_agua_dilucion_calculada,
+        "dilucion_recortada": agua_dilucion_sin_recortar_m3_dia < 0,
+        "ts_mezcla_antes_dilucion_percent": ts_mezcla_antes_dilucion_percent,
+        "total_agua_entrante_m3_dia": total_agua_entrante_m3_dia,
+        "S1_evaporacion_m3_dia": S1_evaporacion_m3_dia,
+        "S2_condensado_biogas_m3_dia": S2_condensado_biogas_m3_dia,
+        "agua_en_torta_solida_m3_dia": agua_en_torta_solida_m3_dia,
+        "agua_efluente_liquido_neto_m3_dia": agua_efluente_liquido_neto_m3_dia,
+        "agua_en_efluente_liquido_total_m3_dia": agua_en_efluente_liquido_total_m3_dia,
+        "S4_agua_recirculada_m3_dia": S4_agua_recirculada_m3_dia,
+        "total_agua_saliente_m3_dia": total_agua_saliente_m3_dia,
+        "balance_hidrico_m3_dia": balance_hidrico_m3_dia,
+    })
+
+
+# --- RECIRCULACIÓN EN ESTADO ESTACIONARIO ---
+# Con recirculación, una fracción r del efluente líquido (agua + TS no capturados en la torta) vuelve al
+# digestor: aporta agua, reduce la dilución necesaria y eleva el TS de la alimentación. Balance de sólidos:
+#   TS_alim = TS_frescos + r·(1 - captura)·TS_alim  ->  TS_alim = TS_frescos / (1 - r·(1 - captura))
+# Balance de masa en el digestor (con dilución D >= 0 para alcanzar el TS objetivo):
+#   M_alim = TS_alim / TS_obj ;  M_efl = M_alim·(1 - evap) - condensado - torta ;  D = M_alim - TS_frescos - W0 - r·M_efl
+# Si D resultaría negativa no se diluye (D = 0) y M_alim se despeja de M_alim = TS_frescos + W0 + r·M_efl.
+def _flujos_estado_estacionario(ts_total_t_dia, agua_fresca, dilucion, recirculado_ts, recirculado_agua,
+                                 target_TS_digestor_fraccion, evaporacion_perdida_fraccion, eficiencia_captura_ts_en_torta,
+                                 ts_torta_solida_fraccion, agua_en_biogas_condensado_m3_dia, recirculacion_fraccion, rama=None):
+    """Un paso del lazo: dados los flujos recirculados, calcula la dilución y los nuevos flujos recirculados."""
+    ts_alimentacion = ts_total_t_dia + recirculado_ts
+    agua_presente = agua_fresca + recirculado_agua
+    if dilucion is None:
+        dilucion = _recortar_dilucion(ts_alimentacion / target_TS_digestor_fraccion - ts_alimentacion - agua_presente, rama)
+    masa_alimentacion = ts_alimentacion + agua_presente + dilucion
+    ts_en_torta = ts_alimentacion * eficiencia_captura_ts_en_torta
+    with np.errstate(divide="ignore", invalid="ignore"):
+        masa_torta = np.where(ts_torta_solida_fraccion > 0, ts_en_torta / np.where(ts_torta_solida_fraccion > 0, ts_torta_solida_fraccion, 1.0), 0.0)
+    masa_efluente = masa_alimentacion * (1.0 - evaporacion_perdida_fraccion) - agua_en_biogas_condensado_m3_dia - masa_torta
+    ts_efluente = ts_alimentacion - ts_en_torta
+    return {
+        "dilucion": dilucion, "ts_alimentacion": ts_alimentacion, "masa_alimentacion": masa_alimentacion,
+        "ts_en_torta": ts_en_torta, "masa_torta": masa_torta, "masa_efluente": masa_efluente, "ts_efluente": ts_efluente,
+        "recirculado_ts": recirculacion_fraccion * ts_efluente,
+        "recirculado_agua": recirculacion_fraccion * (masa_efluente - ts_efluente),
+    }
+
+
+def resolver_recirculacion(ts_total_t_dia, agua_en_insumos_t_dia, agua_limpieza_m3_dia, agua_dilucion_directa_m3_dia,
+                           target_TS_digestor_percent, recirculacion_fraccion, evaporacion_perdida_fraccion,
+                           humedad_torta_solida_percent, eficiencia_captura_ts_en_torta, agua_en_biogas_condensado_m3_dia,
+                           metodo="cerrado", tolerancia=1e-9, max_iteraciones=1000, rama=None):
+    """Balance de aguas con el lazo de recirculación de agua y sólidos resuelto en estado estacionario.
+
+    Mismos argumentos y claves de salida que calcular_balance, más diagnósticos de convergencia.
+    `metodo="cerrado"` resuelve el sistema lineal de forma explícita; `metodo="punto_fijo"` itera el
+    lazo partiendo de la aproximación de un solo paso (recirculación nula). En ambos casos
+    `residuo_lazo` es el cambio de los flujos recirculados al aplicar un paso más del lazo.
+    `rama` fuerza un tramo del balance, como en calcular_balance.
+    """
+    target_TS_digestor_fraccion = np.divide(target_TS_digestor_percent, 100.0)
+    if np.any(target_TS_digestor_fraccion <= 0):
+        raise ValueError("TS Objetivo en digestor no puede ser 0%.")
+    if metodo not in ("cerrado", "punto_fijo"):
+        raise ValueError(f"Método de resolución desconocido: {metodo}")
+    if rama is not None and rama not in RAMAS_DILUCION:
+        raise ValueError(f"Tramo del balance desconocido: {rama}. Use: {', '.join(RAMAS_DILUCION)}")
+    r = np.asarray(recirculacion_fraccion, dtype=float)
+    captura = np.asarray(eficiencia_captura_ts_en_torta, dtype=float)
+    evap = np.asarray(evaporacion_perdida_fraccion, dtype=float)
+    ts_torta_solida_fraccion = (100.0 - np.asarray(humedad_torta_solida_percent, dtype=float)) / 100.0
+    agua_fresca = agua_en_insumos_t_dia + agua_limpieza_m3_dia + agua_dilucion_directa_m3_dia
+    comunes = dict(
+        target_TS_digestor_fraccion=target_TS_digestor_fraccion, evaporacion_perdida_fraccion=evap,
+        eficiencia_captura_ts_en_torta=captura, ts_torta_solida_fraccion=ts_torta_solida_fraccion,
+        agua_en_biogas_condensado_m3_dia=agua_en_biogas_condensado_m3_dia, recirculacion_fraccion=r, rama=rama,
+    )
+    # Tramo de equilibrio: en el tramo con dilución la masa de alimentación la fija el TS objetivo, así que
+    # se conoce en forma cerrada sin depender del balance de masa del lazo
+    factor_ts = 1.0 - r * (1.0 - captura)
+    factor_masa = 1.0 - r * (1.0 - evap)
+    acumula_solidos = factor_ts <= 0
+    factor_ts = np.where(factor_ts > 0, factor_ts, np.nan)
+    ts_alimentacion = ts_total_t_dia / factor_ts
+    with np.errstate(divide="ignore", invalid="ignore"):
+        torta_por_ts = np.where(ts_torta_solida_fraccion > 0, captura / np.where(ts_torta_solida_fraccion > 0, ts_torta_solida_fraccion, 1.0), 0.0)
+    masa_torta = ts_alimentacion * torta_por_ts
+    masa_objetivo = ts_alimentacion / target_TS_digestor_fraccion
+    efluente_objetivo = masa_objetivo * (1.0 - evap) - agua_en_biogas_condensado_m3_dia - masa_torta
+    dilucion = masa_objetivo - ts_total_t_dia - agua_fresca - r * efluente_objetivo
+    con_dilucion = dilucion >= 0 if rama is None else np.full(np.shape(dilucion), rama == "con_dilucion")
+    # Sin dilución y sin pérdidas en el lazo (recirculación total sin evaporación) el agua se acumula;
+    # sin captura de sólidos y con recirculación total se acumulan los TS
+    acumula_agua = ~acumula_solidos & (factor_masa <= 0) & ~con_dilucion
+    sin_solucion = acumula_solidos | acumula_agua
+    factor_masa = np.where(factor_masa > 0, factor_masa, np.nan)
+
+    if metodo == "cerrado":
+        # Rama sin dilución: la mezcla ya está por debajo del TS objetivo
+        with np.errstate(invalid="ignore"):
+            masa_sin_dilucion = (ts_total_t_dia + agua_fresca - r * (agua_en_biogas_condensado_m3_dia + masa_torta)) / factor_masa
+        masa_alimentacion = np.where(con_dilucion, masa_objetivo, masa_sin_dilucion)
+        masa_efluente = masa_alimentacion * (1.0 - evap) - agua_en_biogas_condensado_m3_dia - masa_torta
+        ts_efluente = ts_alimentacion * (1.0 - captura)
+        recirculado_ts = r * ts_efluente
+        recirculado_agua = r * (masa_efluente - ts_efluente)
+        iteraciones = np.zeros(np.shape(masa_alimentacion), dtype=np.int64)
+    else:
+        forma = np.broadcast(ts_total_t_dia, agua_fresca, target_TS_digestor_fraccion, r, captura, evap,
+                             ts_torta_solida_fraccion, agua_en_biogas_condensado_m3_dia).shape
+        recirculado_ts = np.zeros(forma)
+        recirculado_agua = np.zeros(forma)
+        iteraciones = np.zeros(forma, dtype=np.int64)
+        activos = ~np.broadcast_to(sin_solucion, forma)
+        for _ in range(max_iteraciones):
+            if not activos.any():
+                break
+            paso = _flujos_estado_estacionario(ts_total_t_dia, agua_fresca, None, recirculado_ts, recirculado_agua, **comunes)
+            cambio = np.maximum(np.abs(paso["recirculado_ts"] - recirculado_ts), np.abs(paso["recirculado_agua"] - recirculado_agua))
+            recirculado_ts = np.where(activos, paso["recirculado_ts"], recirculado_ts)
+            recirculado_agua = np.where(activos, paso["recirculado_agua"], recirculado_agua)
+            iteraciones += activos
+            activos &= ~(cambio <= tolerancia * np.maximum(1.0, np.abs(recirculado_agua)))
+
+    paso = _flujos_estado_estacionario(ts_total_t_dia, agua_fresca, None, recirculado_ts, recirculado_agua, **comunes)
+    residuo_lazo = np.maximum(np.abs(paso["recirculado_ts"] - recirculado_ts), np.abs(paso["recirculado_agua"] - recirculado_agua))
+    residuo_lazo = np.where(sin_solucion, np.nan, residuo_lazo)
+    convergido = ~sin_solucion & (residuo_lazo <= tolerancia * np.maximum(1.0, np.abs(recirculado_agua)) * 10)
+
+    # Flujos finales con los recirculados de equilibrio
+    f = paso
+    masa_mezcla_fresca = agua_fresca + ts_total_t_dia
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ts_mezcla_antes_dilucion_percent = np.where(masa_mezcla_fresca > 0, ts_total_t_dia / np.where(masa_mezcla_fresca > 0, masa_mezcla_fresca, 1.0) * 100, 0.0)
+        ts_digestor_percent = f["ts_alimentacion"] / f["masa_alimentacion"] * 100
+    agua_en_torta_solida_m3_dia = f["masa_torta"] - f["ts_en_torta"]
+    agua_en_efluente_liquido_total_m3_dia = f["masa_efluente"] - f["ts_efluente"]
+    agua_efluente_liquido_neto_m3_dia = agua_en_efluente_liquido_total_m3_dia * (1.0 - r)
+    S1_evaporacion_m3_dia = f["masa_alimentacion"] * evap
+    total_agua_entrante_m3_dia = agua_fresca + f["dilucion"]
+    total_agua_saliente_m3_dia = S1_evaporacion_m3_dia + agua_en_biogas_condensado_m3_dia + agua_en_torta_solida_m3_dia + agua_efluente_liquido_neto_m3_dia
+
+    return _escalares({
+        "E1_agua_en_insumos": agua_en_insumos_t_dia,
+        "E2_agua_dilucion_directa": agua_dilucion_directa_m3_dia,
+        "E3_agua_limpieza": agua_limpieza_m3_dia,
+        "E4_agua_dilucion_calculada": f["dilucion"],
+        "dilucion_recortada": f["dilucion"] <= 0,
+        "ts_mezcla_antes_dilucion_percent": ts_mezcla_antes_dilucion_percent,
+        "total_agua_entrante_m3_dia": total_agua_entrante_m3_dia,
+        "S1_evaporacion_m3_dia": S1_evaporacion_m3_dia,
+        "S2_condensado_biogas_m3_dia": agua_en_biogas_condensado_m3_dia,
+        "agua_en_torta_solida_m3_dia": agua_en_torta_solida_m3_dia,
+        "agua_efluente_liquido_neto_m3_dia": agua_efluente_liquido_neto_m3_dia,
+        "agua_en_efluente_liquido_total_m3_dia": agua_en_efluente_liquido_total_m3_dia,
+        "S4_agua_recirculada_m3_dia": r * f["masa_efluente"],
+        "total_agua_saliente_m3_dia": total_agua_saliente_m3_dia,
+        "balance_hidrico_m3_dia": total_agua_entrante_m3_dia - total_agua_saliente_m3_dia,
+        # Diagnósticos del lazo de recirculación
+        "agua_recirculada_m3_dia": recirculado_agua,
+        "ts_recirculado_t_dia": recirculado_ts,
+        "ts_alimentacion_digestor_t_dia": f["ts_alimentacion"],
+        "ts_digestor_percent": ts_digestor_percent,
+        "iteraciones": iteraciones,
+        "residuo_lazo": residuo_lazo,
+        "convergido": convergido,
+        "acumula_solidos": np.broadcast_to(acumula_solidos, np.shape(convergido)),
+        "acumula_agua": np.broadcast_to(acumula_agua, np.shape(convergido)),
+    })
+
+
+def balance_desajustado(resultado, tolerancia=0.02):
+    """True si |balance| supera la tolerancia relativa sobre el agua entrante (criterio de la página)."""
+    entrante = resultado["total_agua_entrante_m3_dia"]
+    return (np.abs(resultado["balance_hidrico_m3_dia"]) > tolerancia * entrante) & (entrante > 0.01)
+
+
+def tablas_balance(resultado):
+    """DataFrames de entradas, salidas y resumen para un balance escalar."""
+    df_entradas = pd.DataFrame({
+        "Concepto Entrada": CONCEPTOS_ENTRADA,
+        "Flujo (m³/día)": [float(resultado[k]) for k in ["E1_agua_en_insumos", "E2_agua_dilucion_directa", "E3_agua_limpieza", "E4_agua_dilucion_calculada"]],
+    })
+    df_salidas = pd.DataFrame({
+        "Concepto Salida": CONCEPTOS_SALIDA,
+        "Flujo (m³/día)": [float(resultado[k]) for k in ["S1_evaporacion_m3_dia", "S2_condensado_biogas_m3_dia", "agua_en_torta_solida_m3_dia", "agua_efluente_liquido_neto_m3_dia"]],
+    })
+    df_resumen = pd.DataFrame({
+        "Concepto": CONCEPTOS_RESUMEN,
+        "Flujo (m³/día)": [float(resultado[k]) for k in ["total_agua_entrante_m3_dia", "total_agua_saliente_m3_dia", "balance_hidrico_m3_dia", "S4_agua_recirculada_m3_dia"]],
+    })
+    return df_entradas, df_salidas, df_resumen
@@ -0,0 +1,128 @@
+# motor_produccion.py
+# Motor de cálculo (sin Streamlit) de la cadena TS -> SV -> biogás bruto -> biometano útil -> biometano final.
+
+import numpy as np
+import pandas as pd
+
+# --- DEFINICIÓN DE COLUMNAS ---
+COLUMNAS_ENTRADA = [
+    "Nombre", "Volumen (t/año)", "Residuo ganadero", "Humedad (%)", "TS (%)", "SV (%sms)",
+    "Potencial (m3CH4/tSV)", "%CH4", "Upgrading (%)"
+]
+COLUMNAS_NUMERICAS_ENTRADA = [
+    "Volumen (t/año)", "Humedad (%)", "TS (%)", "SV (%sms)",
+    "Potencial (m3CH4/tSV)", "%CH4", "Upgrading (%)"
+]
+COLUMNAS_CALCULADAS = [
+    "TS (t/año)", "SV (t/año)", "Biogás Bruto (m3/año)", "Biometano útil (m3/año)",
+    "Biometano final (m3/año)", "Agua en Insumo (t/año)"
+]
+DIAS_POR_ANO = 365.0
+
+
+def calcular_cadena(volumen, humedad, ts, sv, potencial, porcentaje_ch4, upgrading):
+    """Calcula la cadena de producción sobre arrays (o escalares) compatibles por broadcasting.
+
+    Devuelve un dict {columna calculada: ndarray}. Cada resultado se obtiene con una única
+    asignación y el resto de operaciones se hacen in situ.
+    """
+    volumen = np.asarray(volumen, dtype=float)
+    ts_t = np.multiply(volumen, ts, dtype=float)
+    ts_t /= 100
+    sv_t = np.multiply(ts_t, sv, dtype=float)
+    sv_t /= 100
+    biogas = np.multiply(sv_t, potencial, dtype=float)
+    biometano_util = np.divide(porcentaje_ch4, 100, dtype=float)
+    biometano_util *= biogas
+    biometano_final = np.divide(upgrading, 100, dtype=float)
+    biometano_final *= biometano_util
+    agua = np.divide(humedad, 100, dtype=float)
+    agua *= volumen
+    return {
+        "TS (t/año)": ts_t,
+        "SV (t/año)": sv_t,
+        "Biogás Bruto (m3/año)": biogas,
+        "Biometano útil (m3/año)": biometano_util,
+        "Biometano final (m3/año)": biometano_final,
+        "Agua en Insumo (t/año)": agua,
+    }
+
+
+def _columna_float(df, col):
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def calcular_produccion(df_insumos):
+    """Añade las columnas calculadas a una tabla de insumos (una fila por insumo).
+
+    La tabla debe contener las columnas de COLUMNAS_NUMERICAS_ENTRADA. Se devuelve una copia;
+    los resultados no numéricos (NaN) se dejan en 0, igual que en la página de producción.
+    """
+    faltantes = [col for col in COLUMNAS_NUMERICAS_ENTRADA if col not in df_insumos.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en la tabla de insumos: {', '.join(faltantes)}")
+    resultados = calcular_cadena(*(_columna_float(df_insumos, col) for col in COLUMNAS_NUMERICAS_ENTRADA))
+    for valores in resultados.values():
+        valores[np.isnan(valores)] = 0.0
+    # Una sola concatenación en lugar de insertar columna a columna (se recalculan las ya existentes)
+    previas = df_insumos.drop(columns=[col for col in resultados if col in df_insumos.columns])
+    return pd.concat([previas, pd.DataFrame(resultados, index=df_insumos.index)], axis=1)
+
+
+def totales_anuales(df_resultados):
+    """Totales anuales que alimentan el balance de aguas."""
+    return {
+        "volumen_insumos_t_ano": float(df_resultados["Volumen (t/año)"].sum()),
+        "ts_en_insumos_t_ano": float(df_resultados["TS (t/año)"].sum()),
+        "biogas_bruto_m3_ano": float(df_resultados["Biogás Bruto (m3/año)"].sum()),
+    }
+
+
+def totales_diarios(df_resultados):
+    """Totales por día con las mismas claves que se guardan en st.session_state."""
+    totales = totales_anuales(df_resultados)
+    return {
+        "total_volumen_insumos_humedos_t_dia": totales["volumen_insumos_t_ano"] / DIAS_POR_ANO,
+        "total_ts_en_insumos_t_dia": totales["ts_en_insumos_t_ano"] / DIAS_POR_ANO,
+        "total_biogas_bruto_m3_dia": totales["biogas_bruto_m3_ano"] / DIAS_POR_ANO,
+    }
+
+
+# --- EVALUACIÓN MASIVA DE CONFIGURACIONES DE PLANTA ---
+COLUMNAS_TOTALES_CONFIGURACION = ["Volumen (t/año)"] + COLUMNAS_CALCULADAS
+
+
+def coeficientes_por_tonelada(df_insumos):
+    """Matriz (n_insumos x 7) con el aporte de cada insumo por tonelada húmeda alimentada.
+
+    Todas las salidas de la cadena son lineales en el volumen, así que una configuración de
+    planta (un vector de toneladas por insumo) se evalúa con un producto matricial.
+    """
+    props = [_columna_float(df_insumos, col) for col in COLUMNAS_NUMERICAS_ENTRADA[1:]]
+    unitario = calcular_cadena(np.ones(len(df_insumos)), *props)
+    coef = np.empty((len(df_insumos), len(COLUMNAS_TOTALES_CONFIGURACION)))
+    coef[:, 0] = 1.0
+    for j, col in enumerate(COLUMNAS_CALCULADAS, start=1):
+        coef[:, j] = unitario[col]
+    np.nan_to_num(coef, copy=False, nan=0.0)
+    return coef
+
+
+def evaluar_configuraciones(df_insumos, volumenes, tamano_bloque=100_000):
+    """Evalúa muchas configuraciones de planta a la vez.
+
+    `volumenes` es un array (n_configuraciones x n_insumos) con las toneladas/año de cada insumo
+    (en el orden de las filas de `df_insumos`). Devuelve un DataFrame con una fila por
+    configuración y los totales anuales de la cadena de producción.
+    """
+    volumenes = np.atleast_2d(np.asarray(volumenes, dtype=float))
+    if volumenes.shape[1] != len(df_insumos):
+        raise ValueError(
+            f"Se esperaban {len(df_insumos)} columnas de volumen (una por insumo); se recibieron {volumenes.shape[1]}."
+        )
+    coef = coeficientes_por_tonelada(df_insumos)
+    totales = np.empty((volumenes.shape[0], coef.shape[1]))
+    for inicio in range(0, volumenes.shape[0], tamano_bloque):
+        fin = inicio + tamano_bloque
+        np.matmul(volumenes[inicio:fin], coef, out=totales[inicio:fin])
+    return pd.DataFrame(totales, columns=COLUMNAS_TOTALES_CONFIGURACION)
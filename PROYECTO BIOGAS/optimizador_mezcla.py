@@ -0,0 +1,256 @@
+# optimizador_mezcla.py
+# Optimización de la mezcla de insumos: toneladas de cada insumo disponible que maximizan el biometano final
+# respetando el TS objetivo del digestor, el agua de dilución y el efluente máximos, la fracción mínima de
+# residuo ganadero y la capacidad de la planta.
+#
+# La cadena de producción es lineal en el volumen (motor_produccion.coeficientes_por_tonelada) y el balance de
+# aguas es lineal por tramos (con o sin dilución) en los totales diarios de TS, agua y condensado
+# (motor_balance.RAMAS_DILUCION). Cada restricción es por tanto una fila de A·x <= b y el problema es un
+# programa lineal: se resuelve con scipy.optimize.linprog (HiGHS) si scipy está instalado y, si no, con una
+# heurística voraz vectorizada.
+
+import numpy as np
+import pandas as pd
+
+from motor_balance import resolver_recirculacion
+from motor_produccion import (
+    calcular_produccion, coeficientes_por_tonelada, totales_diarios, COLUMNAS_TOTALES_CONFIGURACION, DIAS_POR_ANO,
+)
+
+COLUMNA_DISPONIBLE = "Disponible (t/año)"
+COLUMNA_MINIMO = "Mínimo (t/año)"
+COLUMNA_OPTIMA = "Volumen óptimo (t/año)"
+METODOS_OPTIMIZACION = {
+    "auto": "Programación lineal si scipy está instalado; si no, heurística voraz",
+    "lineal": "Programación lineal (scipy.optimize.linprog, HiGHS)",
+    "voraz": "Heurística voraz (sin dependencias)",
+}
+# Restricción -> (etiqueta, salida con la que se comprueba en la mezcla óptima)
+RESTRICCIONES_MEZCLA = {
+    "dilucion_max": ("Agua de dilución máxima (m³/día)", "E4_agua_dilucion_calculada"),
+    "ts_objetivo": ("TS objetivo alcanzable (dilución ≥ 0 m³/día)", "E4_agua_dilucion_calculada"),
+    "efluente_max": ("Efluente líquido neto máximo (m³/día)", "agua_efluente_liquido_neto_m3_dia"),
+    "fraccion_ganadera_min": ("Fracción mínima de residuo ganadero", "fraccion_ganadera"),
+    "volumen_max": ("Volumen máximo de insumos (t/día)", "total_volumen_insumos_humedos_t_dia"),
+}
+SALIDAS_LINEALIZADAS = ["E4_agua_dilucion_calculada", "agua_efluente_liquido_neto_m3_dia"]
+TOLERANCIA = 1e-7
+PASOS_VORAZ = 20  # Incrementos por insumo en la heurística voraz
+
+
+def formas_lineales_balance(parametros_proceso, funcion_balance=resolver_recirculacion, salidas=SALIDAS_LINEALIZADAS):
+    """{rama: {salida: (constante, d/dTS, d/dagua, d/dcondensado)}} del balance de aguas en cada tramo.
+
+    Se obtienen evaluando el balance (vectorizado) en el origen y en los tres vectores unitarios de
+    (TS t/día, agua en insumos t/día, condensado m³/día) con el tramo forzado; en cada tramo son exactas.
+    El tramo sin dilución es None si no tiene estado estacionario (recirculación total sin evaporación).
+    """
+    puntos = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    formas = {}
+    for rama in ("con_dilucion", "sin_dilucion"):
+        resultado = funcion_balance(
+            ts_total_t_dia=puntos[:, 0], agua_en_insumos_t_dia=puntos[:, 1], agua_en_biogas_condensado_m3_dia=puntos[:, 2],
+            rama=rama, **parametros_proceso
+        )
+        formas[rama] = {}
+        for salida in salidas:
+            valores = np.broadcast_to(np.asarray(resultado[salida], dtype=float), (len(puntos),))
+            if np.all(np.isfinite(valores)):
+                formas[rama][salida] = (valores[0], *(valores[1:] - valores[0]))
+            elif rama == "con_dilucion":
+                raise ValueError("El balance de aguas no tiene estado estacionario con estos parámetros de proceso (recirculación total sin captura de sólidos: los TS se acumulan).")
+            else:
+                formas[rama] = None  # El agua se acumula si la mezcla no necesita dilución
+                break
+    return formas
+
+
+def _fraccion_ganadera(df_insumos):
+    if "Residuo ganadero" not in df_insumos.columns:
+        return np.zeros(len(df_insumos))
+    return df_insumos["Residuo ganadero"].astype(str).str.strip().str.lower().isin(["sí", "si", "s", "yes", "true", "1"]).to_numpy(dtype=float)
+
+
+def restricciones_mezcla(df_insumos, parametros_proceso, g_agua_por_Nm3_biogas, funcion_balance=resolver_recirculacion,
+                         dilucion_max_m3_dia=None, efluente_max_m3_dia=None, fraccion_ganadera_min=None,
+                         volumen_max_t_dia=None, exigir_ts_objetivo=True):
+    """(A, b, nombres): restricciones lineales A·x <= b sobre las toneladas/año de cada insumo.
+
+    Las restricciones con límite None se omiten. Con `exigir_ts_objetivo` la mezcla debe poder llevarse al
+    TS objetivo del digestor diluyendo (no puede llegar ya más diluida que el objetivo).
+    """
+    coef = coeficientes_por_tonelada(df_insumos)
+    columnas = {col: j for j, col in enumerate(COLUMNAS_TOTALES_CONFIGURACION)}
+    # Aporte diario de cada tonelada anual a los totales que entran al balance de aguas
+    ts_por_t = coef[:, columnas["TS (t/año)"]] / DIAS_POR_ANO
+    agua_por_t = 1.0 / DIAS_POR_ANO - ts_por_t
+    condensado_por_t = coef[:, columnas["Biogás Bruto (m3/año)"]] / DIAS_POR_ANO * g_agua_por_Nm3_biogas / 1000000.0
+    formas = formas_lineales_balance(parametros_proceso, funcion_balance)
+
+    def fila(rama, salida):
+        constante, d_ts, d_agua, d_condensado = formas[rama][salida]
+        return d_ts * ts_por_t + d_agua * agua_por_t + d_condensado * condensado_por_t, constante
+
+    filas, limites, nombres = [], [], []
+    if dilucion_max_m3_dia is not None:
+        # La dilución aplicada es max(dilución del tramo con dilución, 0): basta acotar el tramo
+        a, c = fila("con_dilucion", "E4_agua_dilucion_calculada")
+        filas.append(a), limites.append(dilucion_max_m3_dia - c), nombres.append("dilucion_max")
+    if exigir_ts_objetivo or formas["sin_dilucion"] is None:
+        # Sin estado estacionario en el tramo sin dilución, la mezcla tiene que quedar en el tramo con dilución
+        a, c = fila("con_dilucion", "E4_agua_dilucion_calculada")
+        filas.append(-a), limites.append(c), nombres.append("ts_objetivo")
+    if efluente_max_m3_dia is not None:
+        # El efluente real es el mayor de los dos tramos: se acotan ambos
+        for rama in ("con_dilucion", "sin_dilucion"):
+            if formas[rama] is None:
+                continue
+            a, c = fila(rama, "agua_efluente_liquido_neto_m3_dia")
+            filas.append(a), limites.append(efluente_max_m3_dia - c), nombres.append("efluente_max")
+    if fraccion_ganadera_min is not None:
+        filas.append(fraccion_ganadera_min - _fraccion_ganadera(df_insumos)), limites.append(0.0), nombres.append("fraccion_ganadera_min")
+    if volumen_max_t_dia is not None:
+        filas.append(np.full(len(df_insumos), 1.0 / DIAS_POR_ANO)), limites.append(volumen_max_t_dia), nombres.append("volumen_max")
+    A = np.vstack(filas) if filas else np.zeros((0, len(df_insumos)))
+    return A, np.asarray(limites, dtype=float), nombres
+
+
+def _resolver_lineal(valor, A, b, minimo, maximo):
+    try:
+        from scipy.optimize import linprog
+    except ImportError as e:
+        raise ImportError("Instale 'scipy' para optimizar la mezcla por programación lineal: pip install scipy") from e
+    solucion = linprog(
+        -valor, A_ub=A if len(b) else None, b_ub=b if len(b) else None,
+        bounds=np.column_stack([minimo, maximo]), method="highs"
+    )
+    if solucion.status == 2:
+        return None, "No existe ninguna mezcla que cumpla todas las restricciones."
+    if solucion.status != 0:
+        return None, f"La programación lineal no terminó: {solucion.message}"
+    return np.clip(solucion.x, minimo, maximo), None
+
+
+def _resolver_voraz(valor, A, b, minimo, maximo, pasos=PASOS_VORAZ):
+    """Heurística voraz en dos fases, evaluando todos los insumos a la vez en cada paso.
+
+    1. Factibilidad: partiendo de los mínimos, mientras alguna restricción esté incumplida (p. ej. el TS objetivo)
+       se añade el incremento que más reduce el incumplimiento total normalizado; si ninguno lo reduce, se
+       reducen los incrementos a la mitad.
+    2. Mejora: se añaden incrementos del insumo con más biometano por unidad del recurso más escaso, sin
+       incumplir ninguna restricción.
+    """
+    x = minimo.astype(float).copy()
+    holgura = b - A @ x
+    amplitud = maximo - minimo
+    escala = np.abs(A) @ amplitud + np.abs(b) + TOLERANCIA
+    incremento = amplitud / pasos
+    for _ in range(4 * pasos * len(x) + 1):
+        incumplimiento = np.maximum(-holgura, 0.0) / escala
+        if incumplimiento.sum() <= TOLERANCIA:
+            break
+        paso = np.minimum(incremento, maximo - x)
+        nuevo = (np.maximum(-(holgura[:, None] - A * paso), 0.0) / escala[:, None]).sum(axis=0)
+        i = int(np.argmin(nuevo))
+        if nuevo[i] < incumplimiento.sum() - TOLERANCIA and paso[i] > 0:
+            x[i] += paso[i]
+            holgura -= A[:, i] * paso[i]
+        elif incremento.max() > amplitud.max() * 1e-6:
+            incremento /= 2
+        else:
+            break
+    if np.any(holgura < -1e-6 * np.maximum(1.0, np.abs(b))):
+        return None, "La heurística voraz no encontró una mezcla que cumpla todas las restricciones."
+
+    incremento = np.maximum(amplitud / pasos, TOLERANCIA)
+    positivos = A > 0
+    for _ in range(2 * pasos * len(x) + 1):
+        holgura_util = np.maximum(holgura, 0.0)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            limite = np.where(positivos, holgura_util / np.where(positivos, A, 1.0), np.inf).min(axis=0, initial=np.inf)
+            uso = np.where(positivos, A / np.maximum(holgura_util, TOLERANCIA), 0.0).max(axis=0, initial=0.0)
+        paso = np.minimum(np.minimum(incremento, maximo - x), limite)
+        puntuacion = np.where((paso > TOLERANCIA) & (valor > 0), valor / np.maximum(uso, TOLERANCIA), -np.inf)
+        i = int(np.argmax(puntuacion))
+        if not np.isfinite(puntuacion[i]):
+            break
+        x[i] += paso[i]
+        holgura -= A[:, i] * paso[i]
+    return x, None
+
+
+def _volumenes_oferta(df_oferta):
+    """(mínimo, máximo) en t/año: 'Disponible (t/año)' o, donde falte, el volumen actual como oferta máxima."""
+    if COLUMNA_DISPONIBLE not in df_oferta.columns and "Volumen (t/año)" not in df_oferta.columns:
+        raise ValueError(f"La tabla de oferta necesita la columna '{COLUMNA_DISPONIBLE}' o 'Volumen (t/año)'.")
+    maximo = pd.Series(np.nan, index=df_oferta.index)
+    for columna in (COLUMNA_DISPONIBLE, "Volumen (t/año)"):
+        if columna in df_oferta.columns:
+            maximo = maximo.fillna(pd.to_numeric(df_oferta[columna], errors="coerce"))
+    maximo = maximo.fillna(0.0).clip(lower=0.0).to_numpy(dtype=float)
+    minimo = np.zeros(len(df_oferta))
+    if COLUMNA_MINIMO in df_oferta.columns:
+        minimo = pd.to_numeric(df_oferta[COLUMNA_MINIMO], errors="coerce").fillna(0.0).clip(lower=0.0).to_numpy(dtype=float)
+    if np.any(minimo > maximo):
+        nombres = df_oferta.get("Nombre", pd.Series(range(len(df_oferta)))).astype(str)[minimo > maximo]
+        raise ValueError(f"El mínimo supera la cantidad disponible en: {', '.join(nombres.head(5))}")
+    return minimo, maximo
+
+
+def optimizar_mezcla(df_oferta, parametros_proceso, g_agua_por_Nm3_biogas, funcion_balance=resolver_recirculacion,
+                     metodo="auto", **limites):
+    """Mezcla que maximiza el biometano final (m³/año) con los insumos de `df_oferta`.
+
+    `df_oferta` es una tabla de insumos (columnas de motor_produccion) con la cantidad disponible de cada uno
+    en 'Disponible (t/año)' (o 'Volumen (t/año)') y opcionalmente 'Mínimo (t/año)'. `parametros_proceso` son
+    los argumentos de calcular_balance que no dependen de los insumos; `limites` los de restricciones_mezcla.
+
+    Devuelve un dict con 'estado' (None si hay solución, o el motivo), 'metodo', 'produccion' (tabla con las
+    toneladas óptimas en 'Volumen (t/año)' y 'Volumen óptimo (t/año)'), 'totales', 'balance' y 'restricciones'.
+    """
+    if metodo not in METODOS_OPTIMIZACION:
+        raise ValueError(f"Método de optimización desconocido: {metodo}. Use: {', '.join(METODOS_OPTIMIZACION)}")
+    if metodo == "auto":
+        try:
+            import scipy.optimize  # noqa: F401
+            metodo = "lineal"
+        except ImportError:
+            metodo = "voraz"
+    minimo, maximo = _volumenes_oferta(df_oferta)
+    A, b, nombres = restricciones_mezcla(df_oferta, parametros_proceso, g_agua_por_Nm3_biogas, funcion_balance, **limites)
+    valor = coeficientes_por_tonelada(df_oferta)[:, COLUMNAS_TOTALES_CONFIGURACION.index("Biometano final (m3/año)")]
+    volumenes, estado = (_resolver_lineal if metodo == "lineal" else _resolver_voraz)(valor, A, b, minimo, maximo)
+    resultado = {"estado": estado, "metodo": metodo}
+    if volumenes is None:
+        return resultado
+
+    df_produccion = df_oferta.drop(columns=[COLUMNA_DISPONIBLE, COLUMNA_MINIMO], errors="ignore").assign(**{"Volumen (t/año)": volumenes})
+    df_produccion = calcular_produccion(df_produccion)
+    df_produccion.insert(df_produccion.columns.get_loc("Volumen (t/año)") + 1, COLUMNA_OPTIMA, volumenes)
+    totales = totales_diarios(df_produccion)
+    ts_total = totales["total_ts_en_insumos_t_dia"]
+    balance = funcion_balance(
+        ts_total_t_dia=ts_total, agua_en_insumos_t_dia=totales["total_volumen_insumos_humedos_t_dia"] - ts_total,
+        agua_en_biogas_condensado_m3_dia=totales["total_biogas_bruto_m3_dia"] * g_agua_por_Nm3_biogas / 1000000.0,
+        **parametros_proceso
+    )
+    # Comprobación con los motores (no con las formas lineales): valor de cada restricción en la mezcla
+    holgura = b - A @ volumenes
+    activas = {n for n, h, l in zip(nombres, holgura, b) if abs(h) <= 1e-6 * max(1.0, abs(l))}
+    valores = dict(balance, **totales)
+    volumen_total = volumenes.sum()
+    valores["fraccion_ganadera"] = float(_fraccion_ganadera(df_oferta) @ volumenes / volumen_total) if volumen_total > 0 else 0.0
+    limites_usuario = {
+        "dilucion_max": limites.get("dilucion_max_m3_dia"), "efluente_max": limites.get("efluente_max_m3_dia"),
+        "fraccion_ganadera_min": limites.get("fraccion_ganadera_min"), "volumen_max": limites.get("volumen_max_t_dia"),
+        "ts_objetivo": 0.0 if "ts_objetivo" in nombres else None,
+    }
+    resultado.update(
+        produccion=df_produccion, totales=totales, balance=balance,
+        biometano_final_m3_ano=float(df_produccion["Biometano final (m3/año)"].sum()),
+        restricciones=pd.DataFrame([
+            {"Restricción": etiqueta, "Límite": limites_usuario[n], "Valor en la mezcla": float(valores[salida]), "Activa": n in activas}
+            for n, (etiqueta, salida) in RESTRICCIONES_MEZCLA.items() if limites_usuario[n] is not None
+        ], columns=["Restricción", "Límite", "Valor en la mezcla", "Activa"]),
+    )
+    return resultado
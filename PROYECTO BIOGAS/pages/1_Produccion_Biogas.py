@@ -2,11 +2,17 @@
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from io import BytesIO
-from fpdf import FPDF # Asumiendo que sigues con fpdf2
-from fpdf.enums import XPos, YPos # Para fpdf2
-import traceback # Para imprimir tracebacks detallados
+from motor_produccion import calcular_produccion, totales_diarios, COLUMNAS_CALCULADAS
+from importacion_insumos import leer_insumos, plantilla_csv
+from graficos import figura_produccion_agregada
+from visualizacion import agregar_produccion, AGRUPACIONES, COLUMNAS_GRAFICO_PRODUCCION
+from cache_resultados import cache_de_sesion, huella, estadisticas_globales
+from almacen_escenarios import almacen_compartido, controles_escenario, guardar_produccion, cargar_produccion, ERRORES_ALMACEN
+from exportacion import (
+    exportar_excel_produccion, exportar_pdf_produccion, preparar_df_pdf_produccion, boton_exportacion_diferida,
+    UMBRAL_FILAS_ARCHIVO_TEMPORAL, MIME_EXCEL, MIME_PDF
+)
+from instrumentacion import iniciar_instrumentacion, mostrar_instrumentacion
 
 # --- CONFIGURACIÓN DE PÁGINA (OPCIONAL AQUÍ SI ESTÁ EN APP_PRINCIPAL.PY) ---
 # st.set_page_config(page_title="Producción de Biometano", layout="wide") # Puede estar en app_principal.py
@@ -37,123 +43,136 @@ columnas_pdf_export_list_pg1 = [
     "Biogás Bruto (m3/año)", "Biometano útil (m3/año)", "Biometano final (m3/año)"
 ]
 
+# Límites de filas para las salidas que no escalan con tablas importadas grandes
+max_grupos_grafico_pg1 = 50
+max_filas_pdf_pg1 = 50_000
+
+# --- INSTRUMENTACIÓN (TRAMOS DE TIEMPO Y PERFILES OPCIONALES, EN LA BARRA LATERAL) ---
+instr_pg1, panel_instr_pg1 = iniciar_instrumentacion(st, "pg1")
+
 # --- TÍTULO DE LA PÁGINA ---
 st.title("🐖 Cálculo de Producción de Biogás y Biometano (Formulario)")
 st.markdown("---")
 
-# --- FORMULARIO DE ENTRADA DE DATOS ---
-st.header("Formulario de Insumos")
-with st.form("input_form_pg1"): 
-    num_insumos = st.number_input(
-        "Número de insumos", min_value=1, max_value=10,
-        value=default_num_insumos_pg1, step=1, key="pg1_num_insumos"
+origen_datos_pg1 = st.radio(
+    "Origen de los datos de insumos", ["Formulario", "Archivo (CSV / Excel / Parquet)"],
+    horizontal=True, key="pg1_origen_datos"
+)
+submitted_pg1 = False
+df_insumos_pg1 = None
+
+# --- IMPORTACIÓN MASIVA DESDE ARCHIVO ---
+if origen_datos_pg1 != "Formulario":
+    st.header("Importar Insumos desde Archivo")
+    st.download_button(
+        "📋 Descargar plantilla CSV", plantilla_csv(default_insumos_data_pg1), "plantilla_insumos.csv", "text/csv",
+        key="pg1_dl_plantilla"
+    )
+    archivo_insumos_pg1 = st.file_uploader(
+        "Tabla de insumos (una fila por insumo o lote)", type=["csv", "xlsx", "parquet"], key="pg1_archivo_insumos",
+        help="Columnas obligatorias: Volumen (t/año), TS (%), SV (%sms), Potencial (m3CH4/tSV), %CH4. "
+             "Opcionales: Nombre, Residuo ganadero, Humedad (%), Upgrading (%)."
     )
-    datos_pg1 = []
-    for i in range(num_insumos):
-        st.subheader(f"Insumo {i+1}")
-        current_default = {}
-        if i < len(default_insumos_data_pg1):
-            current_default = default_insumos_data_pg1[i]
+    if archivo_insumos_pg1 is not None and st.button("Calcular Producción", key="pg1_calc_archivo", type="primary"):
+        try:
+            with st.spinner("Leyendo archivo de insumos..."):
+                df_insumos_pg1 = leer_insumos(archivo_insumos_pg1)
+            st.info(f"{len(df_insumos_pg1):,} insumos importados desde '{archivo_insumos_pg1.name}'.")
+            submitted_pg1 = True
+        except ImportError as e: st.warning(str(e))
+        except Exception as e: st.error(f"Error al importar el archivo de insumos: {e}")
+
+# --- FORMULARIO DE ENTRADA DE DATOS ---
+if origen_datos_pg1 == "Formulario":
+    st.header("Formulario de Insumos")
+    with st.form("input_form_pg1"): 
+        num_insumos = st.number_input(
+            "Número de insumos", min_value=1, max_value=10,
+            value=default_num_insumos_pg1, step=1, key="pg1_num_insumos"
+        )
+        datos_pg1 = []
+        for i in range(num_insumos):
+            st.subheader(f"Insumo {i+1}")
+            current_default = {}
+            if i < len(default_insumos_data_pg1):
+                current_default = default_insumos_data_pg1[i]
         
-        residuo_options = ["Sí", "No"]
-        default_residuo_index = 0
-        if "residuo_ganadero" in current_default:
-            try:
-                default_residuo_index = residuo_options.index(current_default.get("residuo_ganadero", "Sí"))
-            except ValueError: default_residuo_index = 0
-
-        nombre = st.text_input(f"Nombre del insumo {i+1}", value=current_default.get("nombre", f"Insumo {i+1}"), key=f"pg1_nombre_{i}")
-        volumen = st.number_input(f"Volumen (t/año) {i+1}", min_value=0.0, value=current_default.get("volumen", 0.0), key=f"pg1_volumen_{i}")
-        residuo_ganadero = st.selectbox(f"Residuo ganadero {i+1}", residuo_options, index=default_residuo_index, key=f"pg1_residuo_{i}")
-        humedad = st.number_input(f"Humedad (%) {i+1}", 0.0, 100.0, value=current_default.get("humedad", 0.0), key=f"pg1_humedad_{i}")
-        ts = st.number_input(f"Sólidos Totales (% de materia húmeda) {i+1}", 0.0, 100.0, value=current_default.get("ts", 0.0), key=f"pg1_ts_{i}")
-        sv = st.number_input(f"Sólidos Volátiles (% de SMS) {i+1}", 0.0, 100.0, value=current_default.get("sv", 0.0), key=f"pg1_sv_{i}")
-        potencial = st.number_input(f"Potencial de metano (m3CH4/tSV) {i+1}", 0.0, value=current_default.get("potencial", 0.0), key=f"pg1_potencial_{i}")
-        porcentaje_ch4 = st.number_input(f"%CH4 {i+1}", 0.0, 100.0, value=current_default.get("porcentaje_ch4", 0.0), key=f"pg1_ch4_{i}")
-        rendimiento_upgrading = st.number_input(f"Rendimiento upgrading (%) {i+1}", 0.0, 100.0, value=current_default.get("rendimiento_upgrading", 95.0), key=f"pg1_upgrading_{i}")
+            residuo_options = ["Sí", "No"]
+            default_residuo_index = 0
+            if "residuo_ganadero" in current_default:
+                try:
+                    default_residuo_index = residuo_options.index(current_default.get("residuo_ganadero", "Sí"))
+                except ValueError: default_residuo_index = 0
+
+            nombre = st.text_input(f"Nombre del insumo {i+1}", value=current_default.get("nombre", f"Insumo {i+1}"), key=f"pg1_nombre_{i}")
+            volumen = st.number_input(f"Volumen (t/año) {i+1}", min_value=0.0, value=current_default.get("volumen", 0.0), key=f"pg1_volumen_{i}")
+            residuo_ganadero = st.selectbox(f"Residuo ganadero {i+1}", residuo_options, index=default_residuo_index, key=f"pg1_residuo_{i}")
+            humedad = st.number_input(f"Humedad (%) {i+1}", 0.0, 100.0, value=current_default.get("humedad", 0.0), key=f"pg1_humedad_{i}")
+            ts = st.number_input(f"Sólidos Totales (% de materia húmeda) {i+1}", 0.0, 100.0, value=current_default.get("ts", 0.0), key=f"pg1_ts_{i}")
+            sv = st.number_input(f"Sólidos Volátiles (% de SMS) {i+1}", 0.0, 100.0, value=current_default.get("sv", 0.0), key=f"pg1_sv_{i}")
+            potencial = st.number_input(f"Potencial de metano (m3CH4/tSV) {i+1}", 0.0, value=current_default.get("potencial", 0.0), key=f"pg1_potencial_{i}")
+            porcentaje_ch4 = st.number_input(f"%CH4 {i+1}", 0.0, 100.0, value=current_default.get("porcentaje_ch4", 0.0), key=f"pg1_ch4_{i}")
+            rendimiento_upgrading = st.number_input(f"Rendimiento upgrading (%) {i+1}", 0.0, 100.0, value=current_default.get("rendimiento_upgrading", 95.0), key=f"pg1_upgrading_{i}")
         
-        datos_pg1.append({
-            "Nombre": nombre, "Volumen (t/año)": volumen, "Residuo ganadero": residuo_ganadero,
-            "Humedad (%)": humedad, "TS (%)": ts, "SV (%sms)": sv,
-            "Potencial (m3CH4/tSV)": potencial, "%CH4": porcentaje_ch4, "Upgrading (%)": rendimiento_upgrading
-        })
-    submitted_pg1 = st.form_submit_button("Calcular Producción")
-
-# --- FUNCIÓN PARA EXPORTAR PDF (ADAPTADA PARA FPDF2) ---
-def exportar_pdf_pg1(df_export, columnas_para_pdf):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(0, 10, txt="Resultados de Producción de Biometano", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
-    pdf.ln(5)
-    col_widths_config = {
-        "Nombre": 55, "Volumen (t/año)": 25, "TS (t/año)": 25, "SV (t/año)": 25,
-        "Biogás Bruto (m3/año)": 30, "Biometano útil (m3/año)": 30, "Biometano final (m3/año)": 30,
-    }
-    page_width = pdf.w - 2 * pdf.l_margin
-    defined_widths_sum = sum(col_widths_config.get(col, 0) for col in columnas_para_pdf if col in col_widths_config)
-    num_undefined_cols = len([col for col in columnas_para_pdf if col not in col_widths_config])
-    remaining_width = page_width - defined_widths_sum
-    default_width_for_undefined = (remaining_width / num_undefined_cols) if num_undefined_cols > 0 else 20
-    dynamic_col_widths = {col_name: col_widths_config.get(col_name, default_width_for_undefined) for col_name in columnas_para_pdf}
-    current_total_width = sum(dynamic_col_widths.values())
-    if current_total_width > page_width:
-        scale_factor = page_width / current_total_width
-        for col_name in dynamic_col_widths: dynamic_col_widths[col_name] *= scale_factor
-    elif current_total_width < page_width * 0.95 and current_total_width > 0:
-        try:
-            scale_factor = (page_width * 0.95) / current_total_width
-            for col_name in dynamic_col_widths: dynamic_col_widths[col_name] *= scale_factor
-        except ZeroDivisionError: pass
-    pdf.set_font("Arial", 'B', 7)
-    header_y = pdf.get_y()
-    for col_name in columnas_para_pdf:
-        pdf.multi_cell(dynamic_col_widths.get(col_name, 20), 8, col_name, border=1, align='C', new_x=XPos.RIGHT, new_y=YPos.TOP, max_line_height=pdf.font_size * 1.2)
-    pdf.set_y(header_y + 8)
-    pdf.set_font("Arial", '', 7)
-    for i in range(len(df_export)):
-        row_y_start = pdf.get_y()
-        max_h = pdf.font_size * 1.2
-        for col_name in columnas_para_pdf:
-            valor_txt = f"{df_export.iloc[i][col_name]:.2f}" if isinstance(df_export.iloc[i][col_name], float) else str(df_export.iloc[i][col_name])
-            cell_height = pdf.multi_cell(dynamic_col_widths.get(col_name, 20), pdf.font_size * 1.2, valor_txt, border=0, align='L', new_x=XPos.RIGHT, new_y=YPos.TOP, max_line_height=pdf.font_size * 1.2, dry_run=True, output="HEIGHT")
-            max_h = max(max_h, cell_height)
-        pdf.set_y(row_y_start)
-        for col_name in columnas_para_pdf:
-            valor_txt = f"{df_export.iloc[i][col_name]:.2f}" if isinstance(df_export.iloc[i][col_name], float) else str(df_export.iloc[i][col_name])
-            pdf.multi_cell(dynamic_col_widths.get(col_name, 20), max_h, valor_txt, border=1, align='L', new_x=XPos.RIGHT, new_y=YPos.TOP, max_line_height=pdf.font_size * 1.2)
-        pdf.set_y(row_y_start + max_h)
-    try:
-        pdf_output_result = pdf.output(dest='S')
-        if isinstance(pdf_output_result, str): return pdf_output_result.encode('latin-1')
-        elif isinstance(pdf_output_result, bytes): return pdf_output_result
-        elif isinstance(pdf_output_result, bytearray): return bytes(pdf_output_result)
-        else:
-            st.error(f"FPDF output (dest='S') devolvió un tipo inesperado: {type(pdf_output_result)}")
-            return b""
-    except Exception as e:
-        st.error(f"Error al generar PDF bytes: {e}\n{traceback.format_exc()}")
-        return b""
+            datos_pg1.append({
+                "Nombre": nombre, "Volumen (t/año)": volumen, "Residuo ganadero": residuo_ganadero,
+                "Humedad (%)": humedad, "TS (%)": ts, "SV (%sms)": sv,
+                "Potencial (m3CH4/tSV)": potencial, "%CH4": porcentaje_ch4, "Upgrading (%)": rendimiento_upgrading
+            })
+        submitted_pg1 = st.form_submit_button("Calcular Producción")
+    if submitted_pg1:
+        df_insumos_pg1 = pd.DataFrame(datos_pg1)
+
+# --- CACHÉ DE RESULTADOS DE LA SESIÓN ---
+# Las claves combinan el tipo de resultado con la huella de la tabla de insumos; al volver a
+# ejecutar el script con las mismas entradas (p. ej. al pulsar una descarga) no se recalcula nada.
+cache_pg1 = cache_de_sesion(st.session_state, "pg1_cache_resultados")
+with st.sidebar.expander("Caché de resultados (Producción)"):
+    stats_cache_pg1 = cache_pg1.estadisticas()
+    st.caption(
+        f"Entradas: {stats_cache_pg1['entradas']}/{stats_cache_pg1['max_entradas']} · "
+        f"Aciertos: {stats_cache_pg1['aciertos']} · Fallos: {stats_cache_pg1['fallos']} · "
+        f"Desalojos: {stats_cache_pg1['desalojos']}"
+    )
+    stats_globales_pg1 = estadisticas_globales()
+    st.caption(f"Todas las sesiones: {stats_globales_pg1['aciertos']} aciertos / {stats_globales_pg1['fallos']} fallos")
+
+guardar_escenario_pg1, sitio_pg1, fecha_escenario_pg1 = controles_escenario(st, "pg1")
 
-# --- LÓGICA DE PROCESAMIENTO Y VISUALIZACIÓN DE RESULTADOS ---
 if submitted_pg1:
-    df_pg1 = pd.DataFrame(datos_pg1)
-    df_pg1["TS (t/año)"] = df_pg1["Volumen (t/año)"].astype(float) * df_pg1["TS (%)"].astype(float) / 100
-    df_pg1["SV (t/año)"] = df_pg1["TS (t/año)"].astype(float) * df_pg1["SV (%sms)"].astype(float) / 100
-    df_pg1["Biogás Bruto (m3/año)"] = df_pg1["SV (t/año)"].astype(float) * df_pg1["Potencial (m3CH4/tSV)"].astype(float)
-    df_pg1["Biometano útil (m3/año)"] = df_pg1["Biogás Bruto (m3/año)"].astype(float) * (df_pg1["%CH4"].astype(float) / 100)
-    df_pg1["Biometano final (m3/año)"] = df_pg1["Biometano útil (m3/año)"].astype(float) * (df_pg1["Upgrading (%)"].astype(float) / 100)
-    
-    df_pg1["Agua en Insumo (t/año)"] = df_pg1["Volumen (t/año)"].astype(float) * (df_pg1["Humedad (%)"].astype(float) / 100)
-    
-    total_volumen_insumos_humedos_t_ano_calc = df_pg1["Volumen (t/año)"].sum()
-    total_ts_en_insumos_t_ano_calc = df_pg1["TS (t/año)"].sum()
-    total_biogas_bruto_m3_ano_calc = df_pg1["Biogás Bruto (m3/año)"].sum() 
-
-    columns_to_format_display_pg1 = ["TS (t/año)", "SV (t/año)", "Biogás Bruto (m3/año)", "Biometano útil (m3/año)", "Biometano final (m3/año)", "Agua en Insumo (t/año)"]
-    for col in columns_to_format_display_pg1:
-        if col in df_pg1.columns:
-            df_pg1[col] = pd.to_numeric(df_pg1[col], errors='coerce').fillna(0)
+    clave_pg1 = huella(df_insumos_pg1)
+    def calcular_produccion_pg1():
+        if guardar_escenario_pg1:
+            # Una tabla de insumos idéntica ya guardada (misma huella y versión de cálculo) se recupera del almacén
+            try:
+                df_guardado_pg1 = cargar_produccion(almacen_compartido(), clave_pg1)
+            except ERRORES_ALMACEN as e:
+                st.warning(f"No se pudo abrir el almacén de escenarios ({e}); se calcula sin él.")
+            else:
+                if df_guardado_pg1 is not None:
+                    return df_guardado_pg1
+        return calcular_produccion(df_insumos_pg1)
+    with instr_pg1.tramo("Producción (cálculo)", "calculo"):
+        cache_pg1.obtener_o_calcular(("produccion", clave_pg1), calcular_produccion_pg1)
+    st.session_state['pg1_clave_resultados'] = clave_pg1
+
+# --- LÓGICA DE PROCESAMIENTO Y VISUALIZACIÓN DE RESULTADOS ---
+clave_pg1 = st.session_state.get('pg1_clave_resultados')
+df_pg1 = cache_pg1.obtener(("produccion", clave_pg1)) if clave_pg1 else None
+if df_pg1 is not None:
+    with instr_pg1.tramo("Totales diarios", "calculo"):
+        totales_dia_pg1 = totales_diarios(df_pg1)
+    if guardar_escenario_pg1:
+        # Se guarda una vez por (insumos, sitio, fecha); los reruns posteriores aciertan en la caché de sesión
+        try:
+            cache_pg1.obtener_o_calcular(
+                ("escenario", clave_pg1, sitio_pg1, fecha_escenario_pg1),
+                lambda: guardar_produccion(almacen_compartido(), clave_pg1, df_pg1, sitio_pg1, fecha_escenario_pg1)
+            )
+        except ERRORES_ALMACEN as e:
+            st.warning(f"No se pudo guardar el escenario ({e}).")
+
+    columns_to_format_display_pg1 = COLUMNAS_CALCULADAS
     st.success("✅ Cálculos completados")
     st.subheader("Resultados de Producción")
     display_columns_streamlit_pg1 = [
@@ -163,44 +182,51 @@ if submitted_pg1:
         "Biometano útil (m3/año)", "Biometano final (m3/año)"
     ]
     display_columns_existing_streamlit_pg1 = [col for col in display_columns_streamlit_pg1 if col in df_pg1.columns]
-    format_dict_streamlit_pg1 = {col: "{:.2f}" for col in columns_to_format_display_pg1 if col in df_pg1.columns}
+    # El formato se aplica en el navegador (column_config) para no construir un Styler celda a celda en tablas importadas grandes
+    format_config_streamlit_pg1 = {col: st.column_config.NumberColumn(col, format="%.2f") for col in columns_to_format_display_pg1 if col in df_pg1.columns}
     if display_columns_existing_streamlit_pg1:
-        st.dataframe(df_pg1[display_columns_existing_streamlit_pg1].style.format(format_dict_streamlit_pg1), key="pg1_df_results")
+        with instr_pg1.tramo("Tabla de resultados", "estilo"):
+            st.dataframe(df_pg1[display_columns_existing_streamlit_pg1], column_config=format_config_streamlit_pg1, key="pg1_df_results")
     
     st.subheader("Visualización de Producción por Insumo")
-    plot_cols_pg1 = ["Biogás Bruto (m3/año)", "Biometano útil (m3/año)", "Biometano final (m3/año)"]
-    df_plot_pg1 = df_pg1.dropna(subset=plot_cols_pg1 + ["Nombre"])
-    if not df_plot_pg1.empty:
-        fig, ax = plt.subplots(figsize=(12, 7))
-        n_insumos_plot = len(df_plot_pg1["Nombre"])
-        bar_width = 0.25
-        index_bars = range(n_insumos_plot)
-        ax.bar([i - bar_width for i in index_bars], df_plot_pg1["Biogás Bruto (m3/año)"], bar_width, label='Biogás Bruto')
-        ax.bar(index_bars, df_plot_pg1["Biometano útil (m3/año)"], bar_width, label='Biometano útil')
-        ax.bar([i + bar_width for i in index_bars], df_plot_pg1["Biometano final (m3/año)"], bar_width, label='Biometano final')
-        ax.set_ylabel("Producción (m3/año)"); ax.set_title("Producción por tipo de insumo")
-        ax.set_xticks(index_bars); ax.set_xticklabels(df_plot_pg1["Nombre"], rotation=45, ha="right")
-        ax.legend(); plt.tight_layout(); st.pyplot(fig) # CORRECCIÓN AQUÍ: SE QUITÓ key="pg1_plot"
+    # La tabla se agrega en el servidor: el gráfico tiene como mucho max_grupos_grafico_pg1 + 1 grupos por serie
+    vcol1_pg1, vcol2_pg1 = st.columns(2)
+    agrupacion_pg1 = vcol1_pg1.radio("Agrupar por", list(AGRUPACIONES), format_func=AGRUPACIONES.get, horizontal=True, key="pg1_agrupacion")
+    top_n_pg1 = vcol2_pg1.slider("Grupos mostrados (el resto se suma en 'Otros')", 5, max_grupos_grafico_pg1, 20, 1, key="pg1_top_n")
+    with instr_pg1.tramo("Gráfico: agregación y construcción", "grafico"):
+        df_plot_pg1 = df_pg1.dropna(subset=COLUMNAS_GRAFICO_PRODUCCION + ["Nombre"])
+        fig_plot_pg1 = None if df_plot_pg1.empty else cache_pg1.obtener_o_calcular(
+            ("grafico", clave_pg1, agrupacion_pg1, top_n_pg1),
+            lambda: figura_produccion_agregada(agregar_produccion(df_plot_pg1, agrupacion_pg1, top_n_pg1), AGRUPACIONES[agrupacion_pg1])
+        )
+    if fig_plot_pg1 is not None:
+        with instr_pg1.tramo("Gráfico: envío", "grafico"):
+            st.plotly_chart(fig_plot_pg1, use_container_width=True)
     
     st.subheader("Exportar resultados")
-    output_excel_pg1 = BytesIO()
+    # Los documentos se generan solo al pedirlos, en segundo plano, y quedan en caché por huella de datos
+    en_archivo_pg1 = len(df_pg1) > UMBRAL_FILAS_ARCHIVO_TEMPORAL
     if display_columns_existing_streamlit_pg1:
-        df_excel_pg1 = df_pg1[display_columns_existing_streamlit_pg1].copy()
-        with pd.ExcelWriter(output_excel_pg1, engine='xlsxwriter') as writer:
-            df_excel_pg1.to_excel(writer, index=False, sheet_name='ResultadosProduccion')
-        st.download_button("📥 Descargar Excel", output_excel_pg1.getvalue(), "resultados_produccion.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="pg1_dl_excel")
+        # Hojas de entradas, intermedios, resultados y totales, escritas en flujo
+        boton_exportacion_diferida(
+            st, "⚙️ Preparar Excel", "📥 Descargar Excel", ("excel_produccion", clave_pg1),
+            lambda destino: exportar_excel_produccion(df_pg1, destino),
+            "resultados_produccion.xlsx", MIME_EXCEL, key="pg1_dl_excel", en_archivo=en_archivo_pg1
+        )
     
     valid_columns_for_pdf_pg1 = [col for col in columnas_pdf_export_list_pg1 if col in df_pg1.columns]
-    if valid_columns_for_pdf_pg1:
-        df_pdf_export_safe_pg1 = df_pg1[valid_columns_for_pdf_pg1].copy()
-        for col in df_pdf_export_safe_pg1.select_dtypes(include=float).columns: df_pdf_export_safe_pg1[col] = df_pdf_export_safe_pg1[col].fillna(0.0)
-        for col in df_pdf_export_safe_pg1.select_dtypes(include=object).columns: df_pdf_export_safe_pg1[col] = df_pdf_export_safe_pg1[col].fillna("")
-        pdf_data_pg1 = exportar_pdf_pg1(df_pdf_export_safe_pg1, valid_columns_for_pdf_pg1)
-        if pdf_data_pg1: st.download_button("📄 Descargar PDF", pdf_data_pg1, "resultados_produccion.pdf", "application/pdf", key="pg1_dl_pdf")
+    if valid_columns_for_pdf_pg1 and len(df_pg1) > max_filas_pdf_pg1:
+        st.info(f"El PDF está limitado a {max_filas_pdf_pg1} insumos; use la exportación a Excel para tablas mayores.")
+    elif valid_columns_for_pdf_pg1:
+        boton_exportacion_diferida(
+            st, "⚙️ Preparar PDF", "📄 Descargar PDF", ("pdf_produccion", clave_pg1),
+            lambda destino: exportar_pdf_produccion(preparar_df_pdf_produccion(df_pg1, valid_columns_for_pdf_pg1), valid_columns_for_pdf_pg1, destino),
+            "resultados_produccion.pdf", MIME_PDF, key="pg1_dl_pdf", en_archivo=en_archivo_pg1
+        )
 
     st.session_state['datos_produccion_biogas_completados'] = True
-    st.session_state['total_volumen_insumos_humedos_t_dia'] = total_volumen_insumos_humedos_t_ano_calc / 365.0
-    st.session_state['total_ts_en_insumos_t_dia'] = total_ts_en_insumos_t_ano_calc / 365.0
-    st.session_state['total_biogas_bruto_m3_dia'] = total_biogas_bruto_m3_ano_calc / 365.0 
+    st.session_state.update(totales_dia_pg1)
     
-    st.success("Datos base para Balance de Aguas guardados en sesión.")
\ No newline at end of file
+    st.success("Datos base para Balance de Aguas guardados en sesión.")
+
+mostrar_instrumentacion(panel_instr_pg1, instr_pg1, "pg1")
@@ -1,8 +1,24 @@
 # pages/2_Balance_de_Aguas.py
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go 
-from io import BytesIO 
+import numpy as np
+from motor_balance import calcular_balance, resolver_recirculacion, balance_desajustado, tablas_balance
+from graficos import figura_balance_barras, figura_sankey, figura_tornado, figura_mapa_calor, figura_histograma
+from sensibilidad_balance import (
+    RANGOS_PARAMETROS, ETIQUETAS_PARAMETROS, SALIDAS_BARRIDO,
+    evaluar_barrido, bloques_hipercubo_latino, tornado, mapa_calor
+)
+from psicrometria import contenido_agua_biogas, BASES_CONTENIDO_AGUA, PRESION_NORMAL_HPA
+from cache_resultados import cache_de_sesion, huella, estadisticas_globales
+from almacen_escenarios import almacen_compartido, controles_escenario, guardar_balance, ERRORES_ALMACEN
+from exportacion import exportar_excel_balance, exportar_excel_informe, boton_exportacion_diferida, MIME_EXCEL, UMBRAL_FILAS_ARCHIVO_TEMPORAL
+from incertidumbre import DISTRIBUCIONES, SALIDAS_MONTE_CARLO, ResumenMonteCarlo, simular, resumir
+from optimizador_mezcla import COLUMNA_DISPONIBLE, COLUMNA_MINIMO, COLUMNA_OPTIMA, METODOS_OPTIMIZACION, optimizar_mezcla
+from motor_produccion import COLUMNAS_ENTRADA
+from servicio_calculo import procesos_disponibles
+from instrumentacion import iniciar_instrumentacion, mostrar_instrumentacion
+
+# Tramos de tiempo y perfiles opcionales de este rerun (panel en la barra lateral; sin coste si está desactivado)
+instr_wb, panel_instr_wb = iniciar_instrumentacion(st, "wb")
 
 # --- TÍTULO DE LA PÁGINA ---
 st.title("💧 Balance de Aguas Detallado para Planta de Biogás")
@@ -63,6 +79,11 @@ with col_params1:
 with col_params2:
     st.subheader("Pérdidas y Separación")
     recirculacion_fraccion = st.slider("Fracción de recirculación del efluente líquido", 0.0, 1.0, 0.3, 0.01, key="wb_recirc_frac")
+    recirculacion_estacionaria = st.checkbox(
+        "Resolver la recirculación en estado estacionario", value=True, key="wb_recirc_estacionaria",
+        help="El efluente recirculado (agua y sólidos no capturados) vuelve al digestor y reduce la dilución necesaria. "
+             "Desactívelo para usar la aproximación de un solo paso, que no descuenta el agua recirculada."
+    )
     evaporacion_perdida_fraccion = st.slider("Fracción de pérdida por evaporación (del total en digestor)", 0.0, 0.1, 0.01, 0.001, format="%.3f", key="wb_evap_frac")
     humedad_torta_solida_percent = st.slider("Humedad de la torta sólida separada (%)", 50.0, 95.0, 75.0, 0.5, key="wb_hum_torta")
     eficiencia_captura_ts_en_torta = st.slider("Eficiencia de captura de TS en torta sólida (%)", 0.0, 100.0, 85.0, 1.0, key="wb_ts_capture_eff") / 100.0
@@ -86,88 +107,91 @@ volumen_biogas_Nm3_dia = st.number_input(
     value=biogas_bruto_m3_dia_ss if biogas_bruto_m3_dia_ss > 0 else 500.0,
     step=10.0, key="wb_vol_biogas"
 )
-temp_biogas_C = st.number_input("Temperatura del biogás en saturación (°C)", 0.0, 60.0, 35.0, 0.5, key="wb_temp_biogas")
-
-g_agua_por_Nm3_biogas = 0.0
-if temp_biogas_C <= 5: g_agua_por_Nm3_biogas = 6.8
-elif temp_biogas_C <= 10: g_agua_por_Nm3_biogas = 9.4
-elif temp_biogas_C <= 15: g_agua_por_Nm3_biogas = 12.8
-elif temp_biogas_C <= 20: g_agua_por_Nm3_biogas = 17.3
-elif temp_biogas_C <= 25: g_agua_por_Nm3_biogas = 23.0
-elif temp_biogas_C <= 30: g_agua_por_Nm3_biogas = 30.4
-elif temp_biogas_C <= 35: g_agua_por_Nm3_biogas = 39.6
-elif temp_biogas_C <= 40: g_agua_por_Nm3_biogas = 51.1
-elif temp_biogas_C <= 45: g_agua_por_Nm3_biogas = 65.6
-elif temp_biogas_C <= 50: g_agua_por_Nm3_biogas = 83.0
-else: g_agua_por_Nm3_biogas = 100.0 # Aproximación para T > 50C
-
-g_agua_por_Nm3_biogas_adj = st.number_input(
-    f"Contenido de agua en biogás a {temp_biogas_C}°C (g H₂O / Nm³)", 0.0, 200.0,
-    value=g_agua_por_Nm3_biogas, step=0.1, key="wb_g_h2o_biogas",
-    help="Valores típicos de saturación. Ajuste si tiene datos más precisos."
+tcol_biogas, pcol_biogas, bcol_biogas = st.columns(3)
+temp_biogas_C = tcol_biogas.number_input("Temperatura del biogás en saturación (°C)", 0.0, 60.0, 35.0, 0.5, key="wb_temp_biogas")
+base_agua_biogas = bcol_biogas.radio(
+    "Base del contenido de agua", list(BASES_CONTENIDO_AGUA), format_func=BASES_CONTENIDO_AGUA.get, key="wb_base_agua_biogas",
+    help="Por Nm³ de biogás seco (coherente con el volumen en Nm³) o por m³ de gas saturado, como la tabla de valores típicos anterior."
 )
+presion_biogas_hPa = pcol_biogas.number_input(
+    "Presión absoluta del biogás (hPa)", 500.0, 20000.0, PRESION_NORMAL_HPA, 5.0, key="wb_presion_biogas",
+    disabled=base_agua_biogas != "Nm3_seco"
+)
+
+# Saturación continua en temperatura y presión (Magnus), sin escalones entre rangos de temperatura
+g_agua_por_Nm3_biogas = round(float(contenido_agua_biogas(temp_biogas_C, presion_biogas_hPa, base_agua_biogas)), 1)
+
+# El valor manual se pide aparte: un number_input con clave conservaría su valor al cambiar la temperatura
+if st.checkbox("Ajustar manualmente el contenido de agua (datos medidos)", key="wb_g_h2o_manual"):
+    g_agua_por_Nm3_biogas_adj = st.number_input(
+        f"Contenido de agua en biogás a {temp_biogas_C}°C (g H₂O / Nm³)", 0.0, 200.0,
+        value=g_agua_por_Nm3_biogas, step=0.1, key="wb_g_h2o_biogas"
+    )
+else:
+    g_agua_por_Nm3_biogas_adj = g_agua_por_Nm3_biogas
+    unidad_agua_biogas = "Nm³ seco" if base_agua_biogas == "Nm3_seco" else "m³ saturado"
+    st.markdown(f"**Contenido de agua en biogás saturado a {temp_biogas_C}°C:** `{g_agua_por_Nm3_biogas:.1f} g H₂O / {unidad_agua_biogas}`")
 agua_en_biogas_condensado_m3_dia = (volumen_biogas_Nm3_dia * g_agua_por_Nm3_biogas_adj) / 1000000.0
 st.markdown(f"**Agua estimada como condensado del biogás:** `{agua_en_biogas_condensado_m3_dia:.3f} m³/día`")
 st.markdown("---")
 
 # --- SECCIÓN 4: CÁLCULO Y RESULTADOS DEL BALANCE ---
 st.header("🧮 Resultados del Balance de Aguas")
-if st.button("Calcular Balance de Aguas", key="wb_calc_balance_button", type="primary"):
-    # ENTRADAS DE AGUA
-    target_TS_digestor_fraccion = target_TS_digestor_percent / 100.0
-    if target_TS_digestor_fraccion <= 0:
-        st.error("TS Objetivo en digestor no puede ser 0%."); st.stop()
 
-    masa_total_en_digestor_objetivo_t_dia = ts_total_t_dia / target_TS_digestor_fraccion
-    agua_total_requerida_en_digestor_m3_dia = masa_total_en_digestor_objetivo_t_dia - ts_total_t_dia
-    agua_ya_presente_m3_dia = agua_en_insumos_t_dia + agua_limpieza_m3_dia + agua_dilucion_directa_m3_dia
-    agua_dilucion_calculada_m3_dia = agua_total_requerida_en_digestor_m3_dia - agua_ya_presente_m3_dia
-    
-    current_ts_before_calc_dilution_percent = 0
-    if (agua_ya_presente_m3_dia + ts_total_t_dia) > 0: # Evitar división por cero
-        current_ts_before_calc_dilution_percent = (ts_total_t_dia / (agua_ya_presente_m3_dia + ts_total_t_dia)) * 100
+# Caché de la sesión: balance, figuras y exportaciones indexados por la huella de los parámetros actuales
+cache_wb = cache_de_sesion(st.session_state, "wb_cache_resultados")
+parametros_balance_wb = {
+    "ts_total_t_dia": ts_total_t_dia, "agua_en_insumos_t_dia": agua_en_insumos_t_dia,
+    "agua_limpieza_m3_dia": agua_limpieza_m3_dia, "agua_dilucion_directa_m3_dia": agua_dilucion_directa_m3_dia,
+    "target_TS_digestor_percent": target_TS_digestor_percent, "recirculacion_fraccion": recirculacion_fraccion,
+    "evaporacion_perdida_fraccion": evaporacion_perdida_fraccion, "humedad_torta_solida_percent": humedad_torta_solida_percent,
+    "eficiencia_captura_ts_en_torta": eficiencia_captura_ts_en_torta, "agua_en_biogas_condensado_m3_dia": agua_en_biogas_condensado_m3_dia,
+}
+funcion_balance_wb = resolver_recirculacion if recirculacion_estacionaria else calcular_balance
+clave_wb = huella(parametros_balance_wb, recirculacion_estacionaria)
+with st.sidebar.expander("Caché de resultados (Balance)"):
+    stats_cache_wb = cache_wb.estadisticas()
+    st.caption(
+        f"Entradas: {stats_cache_wb['entradas']}/{stats_cache_wb['max_entradas']} · "
+        f"Aciertos: {stats_cache_wb['aciertos']} · Fallos: {stats_cache_wb['fallos']} · "
+        f"Desalojos: {stats_cache_wb['desalojos']}"
+    )
+    stats_globales_wb = estadisticas_globales()
+    st.caption(f"Todas las sesiones: {stats_globales_wb['aciertos']} aciertos / {stats_globales_wb['fallos']} fallos")
+
+guardar_escenario_wb, sitio_wb, fecha_escenario_wb = controles_escenario(st, "wb")
 
-    if agua_dilucion_calculada_m3_dia < 0:
-        agua_dilucion_calculada_m3_dia = 0
+calcular_wb = st.button("Calcular Balance de Aguas", key="wb_calc_balance_button", type="primary")
+# Los resultados se mantienen en pantalla mientras no cambien los parámetros (p. ej. tras pulsar una descarga)
+if calcular_wb or st.session_state.get("wb_clave_resultados") == clave_wb:
+    if target_TS_digestor_percent / 100.0 <= 0:
+        st.error("TS Objetivo en digestor no puede ser 0%."); st.stop()
+    with instr_wb.tramo("Balance (cálculo)", "calculo"):
+        resultado_wb = cache_wb.obtener_o_calcular(("balance", clave_wb), lambda: funcion_balance_wb(**parametros_balance_wb))
+    st.session_state["wb_clave_resultados"] = clave_wb
+    if guardar_escenario_wb:
+        # Se guarda una vez por (parámetros, sitio, fecha); los reruns posteriores aciertan en la caché de sesión
+        try:
+            cache_wb.obtener_o_calcular(
+                ("escenario", clave_wb, sitio_wb, fecha_escenario_wb),
+                lambda: guardar_balance(
+                    almacen_compartido(), clave_wb, dict(parametros_balance_wb, recirculacion_estacionaria=recirculacion_estacionaria),
+                    resultado_wb, sitio_wb, fecha_escenario_wb
+                )
+            )
+        except ERRORES_ALMACEN as e:
+            st.warning(f"No se pudo guardar el escenario ({e}).")
+
+    if resultado_wb["dilucion_recortada"]:
         st.warning(
-            f"El TS actual de la mezcla de insumos y agua de proceso ({current_ts_before_calc_dilution_percent:.1f}%) "
+            f"El TS actual de la mezcla de insumos y agua de proceso ({resultado_wb['ts_mezcla_antes_dilucion_percent']:.1f}%) "
             f"ya es igual o inferior al TS objetivo ({target_TS_digestor_percent:.1f}%). "
             "No se calcula agua de dilución adicional. Considere aumentar el TS objetivo o reducir el agua de proceso."
         )
 
-    E1_agua_en_insumos = agua_en_insumos_t_dia
-    E2_agua_dilucion_directa = agua_dilucion_directa_m3_dia
-    E3_agua_limpieza = agua_limpieza_m3_dia
-    E4_agua_dilucion_calculada = agua_dilucion_calculada_m3_dia
-    total_agua_entrante_m3_dia = E1_agua_en_insumos + E2_agua_dilucion_directa + E3_agua_limpieza + E4_agua_dilucion_calculada
-    total_slurry_en_digestor_m3_dia = ts_total_t_dia + total_agua_entrante_m3_dia
-
-    # SALIDAS DE AGUA
-    S1_evaporacion_m3_dia = total_slurry_en_digestor_m3_dia * evaporacion_perdida_fraccion
-    S2_condensado_biogas_m3_dia = agua_en_biogas_condensado_m3_dia
-    
-    slurry_post_perdidas_m3_dia = total_slurry_en_digestor_m3_dia - S1_evaporacion_m3_dia - S2_condensado_biogas_m3_dia
-    ts_en_slurry_post_perdidas_t_dia = ts_total_t_dia 
-
-    ts_torta_solida_fraccion = (100.0 - humedad_torta_solida_percent) / 100.0
-    ts_en_torta_t_dia = ts_en_slurry_post_perdidas_t_dia * eficiencia_captura_ts_en_torta
-    S3_masa_torta_solida_t_dia = ts_en_torta_t_dia / ts_torta_solida_fraccion if ts_torta_solida_fraccion > 0 else 0
-    agua_en_torta_solida_m3_dia = S3_masa_torta_solida_t_dia - ts_en_torta_t_dia
-    
-    masa_efluente_liquido_total_t_dia = slurry_post_perdidas_m3_dia - S3_masa_torta_solida_t_dia
-    ts_en_efluente_liquido_total_t_dia = ts_en_slurry_post_perdidas_t_dia - ts_en_torta_t_dia
-    agua_en_efluente_liquido_total_m3_dia = masa_efluente_liquido_total_t_dia - ts_en_efluente_liquido_total_t_dia
-
-    S4_agua_recirculada_m3_dia = masa_efluente_liquido_total_t_dia * recirculacion_fraccion 
-    # La recirculación devuelve agua y TS. Aquí simplificamos a caudal de líquido.
-    # Si recirculamos agua, esta agua vuelve a sumarse a las entradas o reduce la necesidad de dilución.
-    # Para este balance, consideramos la recirculación como un flujo interno y nos centramos en el efluente NETO.
-
-    agua_efluente_liquido_neto_m3_dia = agua_en_efluente_liquido_total_m3_dia * (1.0 - recirculacion_fraccion)
-    # ts_efluente_liquido_neto_t_dia = ts_en_efluente_liquido_total_t_dia * (1.0 - recirculacion_fraccion) # No es necesario para balance de agua
-
-    total_agua_saliente_m3_dia = S1_evaporacion_m3_dia + S2_condensado_biogas_m3_dia + agua_en_torta_solida_m3_dia + agua_efluente_liquido_neto_m3_dia
-    balance_hidrico_m3_dia = total_agua_entrante_m3_dia - total_agua_saliente_m3_dia
+    total_agua_entrante_m3_dia = resultado_wb["total_agua_entrante_m3_dia"]
+    total_agua_saliente_m3_dia = resultado_wb["total_agua_saliente_m3_dia"]
+    balance_hidrico_m3_dia = resultado_wb["balance_hidrico_m3_dia"]
 
     st.subheader("Resumen del Balance Hídrico (m³/día)")
     mcol1, mcol2, mcol3 = st.columns(3)
@@ -175,112 +199,273 @@ if st.button("Calcular Balance de Aguas", key="wb_calc_balance_button", type="pr
     mcol2.metric("Total Agua Saliente (Neta)", f"{total_agua_saliente_m3_dia:.2f}")
     mcol3.metric("Balance (Entradas - Salidas)", f"{balance_hidrico_m3_dia:.2f}", delta=f"{balance_hidrico_m3_dia:.2f}")
 
-    if abs(balance_hidrico_m3_dia) > (0.02 * total_agua_entrante_m3_dia) and total_agua_entrante_m3_dia > 0.01:
+    if balance_desajustado(resultado_wb):
         st.warning("El balance hídrico presenta un desajuste mayor al 2%. Revise parámetros.")
     else:
         st.success("El balance hídrico está razonablemente ajustado.")
 
-    data_entradas = {"Concepto Entrada": ["Agua en Insumos", "Agua Dilución Directa", "Agua de Limpieza", "Agua Dilución Necesaria Calculada"],
-                     "Flujo (m³/día)": [E1_agua_en_insumos, E2_agua_dilucion_directa, E3_agua_limpieza, E4_agua_dilucion_calculada]}
-    df_entradas = pd.DataFrame(data_entradas)
-    data_salidas = {"Concepto Salida": ["Evaporación", "Condensado Biogás", "Agua en Torta Sólida", "Agua Efluente Líquido Neto"],
-                    "Flujo (m³/día)": [S1_evaporacion_m3_dia, S2_condensado_biogas_m3_dia, agua_en_torta_solida_m3_dia, agua_efluente_liquido_neto_m3_dia]}
-    df_salidas = pd.DataFrame(data_salidas)
+    with instr_wb.tramo("Tablas del balance", "calculo"):
+        df_entradas, df_salidas, df_export_summary = cache_wb.obtener_o_calcular(("tablas", clave_wb), lambda: tablas_balance(resultado_wb))
     
     st.markdown("##### Detalles de Flujos")
     dcol1, dcol2 = st.columns(2)
-    with dcol1: st.dataframe(df_entradas.style.format({"Flujo (m³/día)": "{:.2f}"}), hide_index=True, use_container_width=True)
-    with dcol2: st.dataframe(df_salidas.style.format({"Flujo (m³/día)": "{:.2f}"}), hide_index=True, use_container_width=True)
-    st.write(f"**Agua Recirculada (Interna):** {S4_agua_recirculada_m3_dia:.2f} m³/día")
+    with instr_wb.tramo("Tablas con formato (Styler)", "estilo"):
+        with dcol1: st.dataframe(df_entradas.style.format({"Flujo (m³/día)": "{:.2f}"}), hide_index=True, use_container_width=True)
+        with dcol2: st.dataframe(df_salidas.style.format({"Flujo (m³/día)": "{:.2f}"}), hide_index=True, use_container_width=True)
+    st.write(f"**Agua Recirculada (Interna):** {resultado_wb['S4_agua_recirculada_m3_dia']:.2f} m³/día")
+    if recirculacion_estacionaria:
+        if resultado_wb["convergido"]:
+            st.caption(
+                f"Lazo de recirculación en estado estacionario: {resultado_wb['agua_recirculada_m3_dia']:.2f} m³/día de agua y "
+                f"{resultado_wb['ts_recirculado_t_dia']:.2f} t/día de TS vuelven al digestor; TS alcanzado en el digestor "
+                f"{resultado_wb['ts_digestor_percent']:.2f}% (residuo del lazo {resultado_wb['residuo_lazo']:.1e})."
+            )
+        elif resultado_wb["acumula_solidos"]:
+            st.error("El lazo de recirculación no tiene estado estacionario: con recirculación total y sin captura de sólidos en la torta los TS se acumulan en el digestor.")
+        elif resultado_wb["acumula_agua"]:
+            st.error(
+                "El lazo de recirculación no tiene estado estacionario: con recirculación total, sin evaporación y una mezcla ya más "
+                "diluida que el TS objetivo (sin agua de dilución que ajustar) el agua se acumula en el digestor."
+            )
+        elif resultado_wb["iteraciones"] > 0:  # Punto fijo: agotó las iteraciones
+            st.error(f"El lazo de recirculación no convergió en {resultado_wb['iteraciones']} iteraciones (residuo {resultado_wb['residuo_lazo']:.1e}).")
+        else:  # Forma cerrada (sin iteraciones): la solución explícita no cierra el lazo
+            st.error(
+                "El lazo de recirculación no tiene estado estacionario con estos parámetros: los sólidos o el agua se acumulan "
+                f"en el digestor (residuo del lazo {resultado_wb['residuo_lazo']:.1e})."
+            )
 
     st.subheader("Visualización del Balance de Aguas")
-    fig_bar = go.Figure()
-    fig_bar.add_trace(go.Bar(name='Entradas', x=['Total Flujos'], y=[total_agua_entrante_m3_dia], text=[f"{total_agua_entrante_m3_dia:.2f}"], textposition='auto', marker_color='royalblue'))
-    fig_bar.add_trace(go.Bar(name='Salidas (Netas)', x=['Total Flujos'], y=[total_agua_saliente_m3_dia], text=[f"{total_agua_saliente_m3_dia:.2f}"], textposition='auto', marker_color='orangered'))
-    fig_bar.update_layout(title_text='Comparación Entradas vs. Salidas Netas de Agua', yaxis_title='Flujo de Agua (m³/día)', barmode='group', legend_title_text='Flujo')
-    st.plotly_chart(fig_bar, use_container_width=True)
-
-    labels_sankey = [
-        "Agua en Insumos", "Agua Dil. Directa", "Agua Limpieza", "Agua Dil. Calculada", # 0-3
-        "Total Agua Entrante al Proceso", # 4
-        "Evaporación", "Condensado", "Agua Torta Sólida", "Agua Efluente Líquido Neto", # 5-8
-        "Agua Recirculada (Retorno)", #9 (aunque es un loop, aquí lo mostramos como 'salida' del efluente total y 'entrada' al proceso)
-        "Efluente Líquido Bruto (antes de recirc.)" #10
-    ]
-    source_nodes = [0,1,2,3,  4,4,4,   4,                         10,                            10]
-    target_nodes = [4,4,4,4,  5,6,10,  S4_agua_recirculada_m3_dia > 0.001 if 9 else 4,  9 if S4_agua_recirculada_m3_dia > 0.001 else 4,8] # Si recirc>0 va a 9, sino a 4 (proceso) o a 8 (salida neta)
-                                                                                                                                      # Si recirc > 0, efluente bruto (10) -> recirc (9) y efluente neto (8)
-                                                                                                                                      # Si recirc = 0, efluente bruto (10) -> efluente neto (8)
-    values = [
-        E1_agua_en_insumos, E2_agua_dilucion_directa, E3_agua_limpieza, E4_agua_dilucion_calculada, # A nodo 4
-        S1_evaporacion_m3_dia, S2_condensado_biogas_m3_dia, agua_en_efluente_liquido_total_m3_dia, # De nodo 4 a 10 (efluente bruto)
-        S4_agua_recirculada_m3_dia, # De nodo 4 (o 10) a 9 (recirculación)
-        S4_agua_recirculada_m3_dia, # De nodo 10 a 9
-        agua_efluente_liquido_neto_m3_dia # De nodo 10 a 8
-    ]
-    
-    # Simplificación de Sankey para claridad (menos nodos)
-    labels_sankey_simple = [
-        "Insumos", "Dilución Directa", "Limpieza", "Dilución Calculada", # 0-3 (Fuentes)
-        "Proceso Digestor", # 4 (Central)
-        "Evaporación", "Condensado", "Torta Sólida", "Efluente Neto", # 5-8 (Salidas Netas)
-        "Recirculación" # 9 (Loop, tratado como salida y luego vuelve a entrar o reduce necesidad de dilución)
-    ]
-    
-    s_nodes = [0,1,2,3, # Fuentes -> Proceso
-               4,4,4,4, # Proceso -> Salidas/Recirculación
-               9]       # Recirculación -> Proceso (conceptual)
-    t_nodes = [4,4,4,4, # -> Proceso
-               5,6,7,9, # -> Salidas/Recirculación
-               4]       # -> Proceso
-    v_values = [
-        E1_agua_en_insumos, E2_agua_dilucion_directa, E3_agua_limpieza, E4_agua_dilucion_calculada,
-        S1_evaporacion_m3_dia, S2_condensado_biogas_m3_dia, agua_en_torta_solida_m3_dia, S4_agua_recirculada_m3_dia, # Salida a recirculación
-        S4_agua_recirculada_m3_dia # Recirculación vuelve al proceso
-    ]
-    # Necesitamos una salida NETA para el Sankey simple, si la recirculación vuelve al proceso
-    # El efluente líquido NETO es una salida final.
-    s_nodes_final = [0,1,2,3,  4,4,4,4, 9] # El efluente líquido neto es una salida del proceso, después de la recirc.
-    t_nodes_final = [4,4,4,4,  5,6,7,8, 4] # Salida a Efluente Neto (8)
-    v_values_final = [
-        E1_agua_en_insumos, E2_agua_dilucion_directa, E3_agua_limpieza, E4_agua_dilucion_calculada,
-        S1_evaporacion_m3_dia, S2_condensado_biogas_m3_dia, agua_en_torta_solida_m3_dia, agua_efluente_liquido_neto_m3_dia, # Salida a Efluente Neto
-        S4_agua_recirculada_m3_dia # Recirculación vuelve al proceso
-    ]
-
-    # Filtrar flujos con valor cero
-    valid_indices = [i for i, v in enumerate(v_values_final) if v > 0.001]
-    filtered_s = [s_nodes_final[i] for i in valid_indices]
-    filtered_t = [t_nodes_final[i] for i in valid_indices]
-    filtered_v = [v_values_final[i] for i in valid_indices]
-
-    if filtered_v:
-        fig_sankey = go.Figure(data=[go.Sankey(
-            arrangement = "snap", # Alinea los nodos
-            node=dict(
-                pad=20, thickness=20, line=dict(color="black", width=0.5),
-                label=labels_sankey_simple,
-                color=["skyblue","skyblue","skyblue","skyblue", "green", "lightcoral","lightcoral","lightcoral","lightcoral", "mediumpurple"]
-            ),
-            link=dict(source=filtered_s, target=filtered_t, value=filtered_v)
-        )])
-        fig_sankey.update_layout(title_text="Diagrama de Flujo de Agua Simplificado (Sankey)", font_size=11, height=500)
-        st.plotly_chart(fig_sankey, use_container_width=True)
+    # Construcción (en caché) y envío (serialización de plotly) se miden por separado
+    with instr_wb.tramo("Figura de barras: construcción", "grafico"):
+        fig_bar = cache_wb.obtener_o_calcular(("figura_barras", clave_wb), lambda: figura_balance_barras(resultado_wb))
+    with instr_wb.tramo("Figura de barras: envío", "grafico"):
+        st.plotly_chart(fig_bar, use_container_width=True)
+
+    with instr_wb.tramo("Figura Sankey: construcción", "grafico"):
+        fig_sankey = cache_wb.obtener_o_calcular(("figura_sankey", clave_wb), lambda: figura_sankey(resultado_wb))
+    if fig_sankey is not None:
+        with instr_wb.tramo("Figura Sankey: envío", "grafico"):
+            st.plotly_chart(fig_sankey, use_container_width=True)
     
     st.subheader("📤 Exportar Resumen del Balance")
-    df_export_summary = pd.DataFrame({
-        "Concepto": ["Total Agua Entrante", "Total Agua Saliente (Neta)", "Balance (Entradas - Salidas)", "Agua Recirculada"],
-        "Flujo (m³/día)": [total_agua_entrante_m3_dia, total_agua_saliente_m3_dia, balance_hidrico_m3_dia, S4_agua_recirculada_m3_dia]
-    })
-    csv_export_summary = df_export_summary.to_csv(index=False).encode("utf-8")
+    with instr_wb.tramo("CSV resumen", "exportacion"):
+        csv_export_summary = cache_wb.obtener_o_calcular(("csv", clave_wb), lambda: df_export_summary.to_csv(index=False).encode("utf-8"))
     st.download_button("⬇️ CSV Resumen", csv_export_summary, "water_balance_summary.csv", "text/csv", key="wb_csv_summary_dl")
-    try:
-        output_excel = BytesIO()
-        with pd.ExcelWriter(output_excel, engine='openpyxl') as writer:
-            df_entradas.to_excel(writer, index=False, sheet_name='EntradasAgua')
-            df_salidas.to_excel(writer, index=False, sheet_name='SalidasAgua')
-            df_export_summary.to_excel(writer, index=False, sheet_name='ResumenBalance')
-        excel_data = output_excel.getvalue()
-        st.download_button("⬇️ Excel Detallado", excel_data, "water_balance_detailed.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="wb_excel_detail_dl")
-    except ImportError: st.warning("Instale 'openpyxl' para exportar a Excel: pip install openpyxl")
-    except Exception as e: st.error(f"Error exportando a Excel: {e}")
\ No newline at end of file
+    # El Excel detallado solo se genera al pedirlo (en segundo plano) y se conserva por huella de parámetros
+    parametros_excel_wb = dict(parametros_balance_wb, recirculacion_estacionaria=recirculacion_estacionaria)
+    boton_exportacion_diferida(
+        st, "⚙️ Preparar Excel Detallado", "⬇️ Excel Detallado", ("excel_balance", clave_wb),
+        lambda destino: exportar_excel_balance(df_entradas, df_salidas, df_export_summary, destino, parametros=parametros_excel_wb),
+        "water_balance_detailed.xlsx", MIME_EXCEL, key="wb_excel_detail_dl"
+    )
+    # Libro conjunto: producción de la página 1 (entradas, intermedios, resultados) y este balance
+    clave_informe_pg1_wb = st.session_state.get("pg1_clave_resultados")
+    df_informe_pg1_wb = cache_de_sesion(st.session_state, "pg1_cache_resultados").obtener(("produccion", clave_informe_pg1_wb)) if clave_informe_pg1_wb else None
+    if df_informe_pg1_wb is not None:
+        boton_exportacion_diferida(
+            st, "⚙️ Preparar Excel Producción + Balance", "⬇️ Excel Producción + Balance", ("excel_informe", clave_informe_pg1_wb, clave_wb),
+            lambda destino: exportar_excel_informe(df_informe_pg1_wb, df_entradas, df_salidas, df_export_summary, destino, parametros=parametros_excel_wb),
+            "informe_produccion_balance.xlsx", MIME_EXCEL, key="wb_excel_informe_dl",
+            en_archivo=len(df_informe_pg1_wb) > UMBRAL_FILAS_ARCHIVO_TEMPORAL
+        )
+
+# --- SECCIÓN 5: ANÁLISIS DE SENSIBILIDAD ---
+st.markdown("---")
+st.header("🔬 Análisis de Sensibilidad de los Parámetros de Operación")
+with st.expander("Barrido de parámetros: tornado, mapa de calor e hipercubo latino", expanded=False):
+    st.caption("Se parte del punto de operación actual (valores de las secciones anteriores) y se evalúan todos los puntos en una sola pasada vectorizada.")
+    salida_sens_wb = st.selectbox("Salida a analizar", list(SALIDAS_BARRIDO), format_func=SALIDAS_BARRIDO.get, key="wb_sens_salida")
+    col_sens1, col_sens2 = st.columns(2)
+    with col_sens1:
+        modo_tornado_wb = st.radio("Extremos del tornado", ["Rango completo de cada parámetro", "Variación relativa sobre el punto actual"], key="wb_sens_modo_tornado")
+        variacion_tornado_wb = st.slider("Variación relativa (± %)", 5, 50, 20, 5, key="wb_sens_variacion", disabled=modo_tornado_wb.startswith("Rango"))
+        n_puntos_lhs_wb = st.select_slider("Puntos del hipercubo latino", options=[10_000, 100_000, 1_000_000, 5_000_000], value=100_000, key="wb_sens_n_lhs")
+    with col_sens2:
+        parametros_sens_wb = list(RANGOS_PARAMETROS)
+        param_x_wb = st.selectbox("Parámetro eje X", parametros_sens_wb, index=0, format_func=ETIQUETAS_PARAMETROS.get, key="wb_sens_x")
+        param_y_wb = st.selectbox("Parámetro eje Y", parametros_sens_wb, index=1, format_func=ETIQUETAS_PARAMETROS.get, key="wb_sens_y")
+        resolucion_mapa_wb = st.slider("Resolución del mapa de calor (puntos por eje)", 10, 400, 100, 10, key="wb_sens_resolucion")
+
+    opciones_sens_wb = {
+        "salida": salida_sens_wb, "modo": modo_tornado_wb, "variacion": variacion_tornado_wb, "n_lhs": n_puntos_lhs_wb,
+        "x": param_x_wb, "y": param_y_wb, "resolucion": resolucion_mapa_wb,
+    }
+    clave_sens_wb = huella(parametros_balance_wb, recirculacion_estacionaria, opciones_sens_wb)
+    ejecutar_sens_wb = st.button("Ejecutar análisis de sensibilidad", key="wb_sens_button")
+    if param_x_wb == param_y_wb:
+        st.warning("Elija parámetros distintos para los ejes X e Y del mapa de calor.")
+    elif ejecutar_sens_wb or st.session_state.get("wb_clave_sensibilidad") == clave_sens_wb:
+        def calcular_sensibilidad_wb():
+            # En los barridos el parámetro barrido sustituye al valor del punto actual
+            df_tornado = tornado(
+                parametros_balance_wb, salida_sens_wb,
+                variacion_relativa=None if modo_tornado_wb.startswith("Rango") else variacion_tornado_wb / 100.0,
+                funcion_balance=funcion_balance_wb
+            )
+            valores_x = np.linspace(*RANGOS_PARAMETROS[param_x_wb], resolucion_mapa_wb)
+            valores_y = np.linspace(*RANGOS_PARAMETROS[param_y_wb], resolucion_mapa_wb)
+            matriz = mapa_calor(parametros_balance_wb, param_x_wb, valores_x, param_y_wb, valores_y, salida_sens_wb, funcion_balance=funcion_balance_wb)
+            # Cada bloque de puntos se reduce a histogramas y se descarta: la memoria no crece con los puntos
+            distribucion_lhs = ResumenMonteCarlo(SALIDAS_BARRIDO)
+            puntos_sin_dilucion = 0
+            for muestras_lhs in bloques_hipercubo_latino(RANGOS_PARAMETROS, n_puntos_lhs_wb, semilla=0):
+                df_lhs = evaluar_barrido(parametros_balance_wb, muestras_lhs, funcion_balance=funcion_balance_wb)
+                distribucion_lhs.anadir(df_lhs)
+                puntos_sin_dilucion += int((df_lhs["E4_agua_dilucion_calculada"] <= 0).sum())
+            resumen_lhs = distribucion_lhs.tabla(percentiles=(5, 25, 50, 75, 95))[["P5", "P25", "P50", "P75", "P95"]]
+            return {
+                "fig_tornado": figura_tornado(df_tornado, SALIDAS_BARRIDO[salida_sens_wb]),
+                "fig_mapa": figura_mapa_calor(matriz, valores_x, valores_y, ETIQUETAS_PARAMETROS[param_x_wb], ETIQUETAS_PARAMETROS[param_y_wb], SALIDAS_BARRIDO[salida_sens_wb]),
+                "tabla_tornado": df_tornado.drop(columns="parametro"),
+                "resumen_lhs": resumen_lhs,
+                "fraccion_sin_dilucion": puntos_sin_dilucion / n_puntos_lhs_wb,
+            }
+        with st.spinner("Evaluando barrido de parámetros..."), instr_wb.tramo("Sensibilidad (cálculo)", "calculo"):
+            sensibilidad_wb = cache_wb.obtener_o_calcular(("sensibilidad", clave_sens_wb), calcular_sensibilidad_wb)
+        st.session_state["wb_clave_sensibilidad"] = clave_sens_wb
+
+        st.plotly_chart(sensibilidad_wb["fig_tornado"], use_container_width=True)
+        st.dataframe(sensibilidad_wb["tabla_tornado"].style.format(precision=3), hide_index=True, use_container_width=True)
+        st.plotly_chart(sensibilidad_wb["fig_mapa"], use_container_width=True)
+        st.markdown(f"##### Distribución sobre {n_puntos_lhs_wb:,} puntos (hipercubo latino en todo el rango de operación)")
+        st.dataframe(sensibilidad_wb["resumen_lhs"].style.format("{:.2f}"), use_container_width=True)
+        st.caption(f"En el {sensibilidad_wb['fraccion_sin_dilucion'] * 100:.1f}% de los puntos no se requiere agua de dilución adicional.")
+
+# --- SECCIÓN 6: INCERTIDUMBRE DE LOS INSUMOS (MONTE CARLO) ---
+st.markdown("---")
+st.header("🎲 Incertidumbre de las Propiedades de los Insumos")
+with st.expander("Simulación de Monte Carlo: P10 / P50 / P90 de biometano y agua de dilución", expanded=False):
+    clave_pg1_wb = st.session_state.get("pg1_clave_resultados")
+    df_insumos_mc_wb = cache_de_sesion(st.session_state, "pg1_cache_resultados").obtener(("produccion", clave_pg1_wb)) if clave_pg1_wb else None
+    if df_insumos_mc_wb is None:
+        st.info("La simulación usa la tabla de insumos de 'Producción de Biogás'. Calcule primero en esa página.")
+    else:
+        st.caption(
+            "Humedad, TS, SV, potencial, %CH4 y upgrading de cada insumo se muestrean alrededor de su valor de laboratorio; "
+            "los volúmenes y los parámetros de proceso de esta página se mantienen fijos. Las muestras se evalúan por bloques."
+        )
+        col_mc1, col_mc2 = st.columns(2)
+        with col_mc1:
+            distribucion_mc_wb = st.selectbox("Distribución", list(DISTRIBUCIONES), format_func=DISTRIBUCIONES.get, key="wb_mc_distribucion")
+            variacion_mc_wb = st.slider("Variación relativa de las propiedades (± %)", 1, 50, 20, 1, key="wb_mc_variacion")
+        with col_mc2:
+            n_muestras_mc_wb = st.select_slider("Muestras", options=[10_000, 100_000, 1_000_000, 5_000_000], value=100_000, key="wb_mc_n_muestras")
+            semilla_mc_wb = st.number_input("Semilla", min_value=0, value=0, step=1, key="wb_mc_semilla")
+            procesos_mc_wb = st.number_input("Procesos", min_value=1, max_value=procesos_disponibles(), value=1, step=1, key="wb_mc_procesos")
+
+        parametros_proceso_mc_wb = {
+            k: v for k, v in parametros_balance_wb.items()
+            if k not in ("ts_total_t_dia", "agua_en_insumos_t_dia", "agua_en_biogas_condensado_m3_dia")
+        }
+        opciones_mc_wb = dict(distribucion=distribucion_mc_wb, variacion_relativa=variacion_mc_wb / 100.0, semilla=int(semilla_mc_wb), funcion_balance=funcion_balance_wb)
+        # Los procesos no cambian las muestras (semillas por bloque): no forman parte de la clave
+        clave_mc_wb = huella(clave_pg1_wb, parametros_proceso_mc_wb, g_agua_por_Nm3_biogas_adj, recirculacion_estacionaria,
+                             n_muestras_mc_wb, distribucion_mc_wb, variacion_mc_wb, int(semilla_mc_wb))
+        ejecutar_mc_wb = st.button("Ejecutar simulación", key="wb_mc_button")
+        if ejecutar_mc_wb or st.session_state.get("wb_clave_monte_carlo") == clave_mc_wb:
+            def calcular_monte_carlo_wb():
+                # Cada bloque de muestras se reduce a histogramas al llegar: la memoria no crece con el número de muestras
+                resumen_mc = resumir(df_insumos_mc_wb, parametros_proceso_mc_wb, g_agua_por_Nm3_biogas_adj, n_muestras_mc_wb,
+                                     procesos=int(procesos_mc_wb), **opciones_mc_wb)
+                nominal = simular(df_insumos_mc_wb, parametros_proceso_mc_wb, g_agua_por_Nm3_biogas_adj, 1,
+                                  **dict(opciones_mc_wb, variacion_relativa=0.0)).iloc[0].to_dict()
+                return {
+                    "resumen": resumen_mc.tabla(valores_nominales=nominal),
+                    "histogramas": {salida: resumen_mc.histograma(salida) for salida in ("biometano_final_m3_ano", "E4_agua_dilucion_calculada")},
+                    "sin_estado_estacionario": resumen_mc.fraccion_no_finita("E4_agua_dilucion_calculada"),
+                }
+            with st.spinner(f"Simulando {n_muestras_mc_wb:,} muestras..."), instr_wb.tramo("Monte Carlo (cálculo)", "calculo"):
+                monte_carlo_wb = cache_wb.obtener_o_calcular(("monte_carlo", clave_mc_wb), calcular_monte_carlo_wb)
+            st.session_state["wb_clave_monte_carlo"] = clave_mc_wb
+
+            st.dataframe(monte_carlo_wb["resumen"].style.format("{:,.2f}"), use_container_width=True)
+            for salida, df_hist in monte_carlo_wb["histogramas"].items():
+                fila = monte_carlo_wb["resumen"].loc[SALIDAS_MONTE_CARLO[salida]]
+                st.plotly_chart(
+                    figura_histograma(df_hist, {p: fila[p] for p in ("P10", "P50", "P90")}, SALIDAS_MONTE_CARLO[salida]),
+                    use_container_width=True
+                )
+            if monte_carlo_wb["sin_estado_estacionario"] > 0:
+                st.warning(f"El {monte_carlo_wb['sin_estado_estacionario'] * 100:.1f}% de las muestras no tiene estado estacionario del lazo de recirculación.")
+
+# --- SECCIÓN 7: OPTIMIZACIÓN DE LA MEZCLA DE INSUMOS ---
+st.markdown("---")
+st.header("🧪 Optimización de la Mezcla de Insumos")
+with st.expander("Toneladas de cada insumo que maximizan el biometano con las restricciones de agua y TS", expanded=False):
+    if df_insumos_mc_wb is None:
+        st.info("La optimización parte de la tabla de insumos de 'Producción de Biogás'. Calcule primero en esa página.")
+    else:
+        st.caption(
+            "Indique la cantidad disponible (y, si la hay, la mínima comprometida) de cada insumo. Los parámetros de proceso "
+            "son los de esta página; los límites vacíos no se aplican."
+        )
+        factor_oferta_wb = st.slider("Disponible inicial respecto al volumen actual (%)", 50, 500, 150, 10, key="wb_opt_factor")
+        # La oferta importada con la tabla de insumos (columnas opcionales) tiene prioridad sobre el porcentaje
+        volumen_actual_wb = df_insumos_mc_wb["Volumen (t/año)"]
+        df_oferta_base_wb = df_insumos_mc_wb[["Nombre", "Residuo ganadero", "Volumen (t/año)"]].assign(**{
+            COLUMNA_DISPONIBLE: df_insumos_mc_wb.get(COLUMNA_DISPONIBLE, volumen_actual_wb * np.nan).fillna(volumen_actual_wb * factor_oferta_wb / 100.0),
+            COLUMNA_MINIMO: df_insumos_mc_wb.get(COLUMNA_MINIMO, volumen_actual_wb * 0.0).fillna(0.0),
+        })
+        df_oferta_editada_wb = st.data_editor(
+            df_oferta_base_wb, hide_index=True, key=f"wb_opt_oferta_{clave_pg1_wb}_{factor_oferta_wb}",
+            disabled=["Nombre", "Residuo ganadero", "Volumen (t/año)"],
+            column_config={c: st.column_config.NumberColumn(c, min_value=0.0, format="%.1f") for c in ["Volumen (t/año)", COLUMNA_DISPONIBLE, COLUMNA_MINIMO]},
+        )
+        col_opt1, col_opt2, col_opt3 = st.columns(3)
+        dilucion_max_opt_wb = col_opt1.number_input("Agua de dilución máxima (m³/día)", min_value=0.0, value=None, step=10.0, key="wb_opt_dilucion_max")
+        efluente_max_opt_wb = col_opt2.number_input("Efluente líquido neto máximo (m³/día)", min_value=0.0, value=None, step=10.0, key="wb_opt_efluente_max")
+        ganadero_min_opt_wb = col_opt3.number_input("Residuo ganadero mínimo (% de la masa)", min_value=0.0, max_value=100.0, value=None, step=5.0, key="wb_opt_ganadero_min")
+        col_opt4, col_opt5, col_opt6 = st.columns(3)
+        volumen_max_opt_wb = col_opt4.number_input(
+            "Capacidad de la planta (t/día de insumos)", min_value=0.0, value=float(round(volumen_total_insumos_t_dia, 1)) or None, step=10.0, key="wb_opt_volumen_max"
+        )
+        metodo_opt_wb = col_opt5.selectbox("Método", list(METODOS_OPTIMIZACION), format_func=METODOS_OPTIMIZACION.get, key="wb_opt_metodo")
+        exigir_ts_opt_wb = col_opt6.checkbox("Alcanzar el TS objetivo del digestor", value=True, key="wb_opt_exigir_ts",
+                                             help="La mezcla no puede llegar más diluida que el TS objetivo (se diluye hasta él).")
+
+        # Insumos de la tabla de producción con la oferta editada (mismo orden de filas)
+        df_oferta_opt_wb = df_insumos_mc_wb[[c for c in COLUMNAS_ENTRADA if c in df_insumos_mc_wb.columns]].assign(**{
+            COLUMNA_DISPONIBLE: df_oferta_editada_wb[COLUMNA_DISPONIBLE].to_numpy(), COLUMNA_MINIMO: df_oferta_editada_wb[COLUMNA_MINIMO].to_numpy(),
+        })
+        limites_opt_wb = {
+            "dilucion_max_m3_dia": dilucion_max_opt_wb, "efluente_max_m3_dia": efluente_max_opt_wb,
+            "fraccion_ganadera_min": None if ganadero_min_opt_wb is None else ganadero_min_opt_wb / 100.0,
+            "volumen_max_t_dia": volumen_max_opt_wb, "exigir_ts_objetivo": exigir_ts_opt_wb,
+        }
+        clave_opt_wb = huella(df_oferta_opt_wb, parametros_proceso_mc_wb, g_agua_por_Nm3_biogas_adj, recirculacion_estacionaria, limites_opt_wb, metodo_opt_wb)
+        ejecutar_opt_wb = st.button("Optimizar mezcla", key="wb_opt_button")
+        if ejecutar_opt_wb or st.session_state.get("wb_clave_optimizacion") == clave_opt_wb:
+            with st.spinner("Optimizando la mezcla..."), instr_wb.tramo("Optimización (cálculo)", "calculo"):
+                optimo_wb = cache_wb.obtener_o_calcular(
+                    ("optimizacion", clave_opt_wb),
+                    lambda: optimizar_mezcla(df_oferta_opt_wb, parametros_proceso_mc_wb, g_agua_por_Nm3_biogas_adj, funcion_balance_wb,
+                                             metodo=metodo_opt_wb, **limites_opt_wb)
+                )
+            st.session_state["wb_clave_optimizacion"] = clave_opt_wb
+            if optimo_wb["estado"]:
+                st.error(optimo_wb["estado"])
+            else:
+                biometano_actual_wb = float(df_insumos_mc_wb["Biometano final (m3/año)"].sum())
+                mcol1, mcol2, mcol3 = st.columns(3)
+                mcol1.metric("Biometano final óptimo (m³/año)", f"{optimo_wb['biometano_final_m3_ano']:,.0f}",
+                             delta=f"{optimo_wb['biometano_final_m3_ano'] - biometano_actual_wb:,.0f} respecto a la mezcla actual")
+                mcol2.metric("Agua de dilución (m³/día)", f"{optimo_wb['balance']['E4_agua_dilucion_calculada']:.2f}")
+                mcol3.metric("Efluente líquido neto (m³/día)", f"{optimo_wb['balance']['agua_efluente_liquido_neto_m3_dia']:.2f}")
+                st.caption(f"Método: {METODOS_OPTIMIZACION[optimo_wb['metodo']]}.")
+                st.dataframe(optimo_wb["restricciones"], hide_index=True, use_container_width=True,
+                             column_config={c: st.column_config.NumberColumn(c, format="%.3f") for c in ["Límite", "Valor en la mezcla"]})
+                df_optima_wb = optimo_wb["produccion"]
+                st.dataframe(
+                    df_optima_wb[["Nombre", COLUMNA_OPTIMA, "Biometano final (m3/año)"]].assign(**{"Volumen actual (t/año)": df_insumos_mc_wb["Volumen (t/año)"].to_numpy()}),
+                    hide_index=True, use_container_width=True, key="wb_opt_tabla",
+                    column_config={c: st.column_config.NumberColumn(c, format="%.1f") for c in [COLUMNA_OPTIMA, "Biometano final (m3/año)", "Volumen actual (t/año)"]},
+                )
+                # Tabla de insumos con los volúmenes óptimos, para importarla en 'Producción de Biogás'
+                st.download_button(
+                    "⬇️ CSV de insumos con la mezcla óptima",
+                    cache_wb.obtener_o_calcular(("csv_optimizacion", clave_opt_wb), lambda: df_optima_wb[[c for c in COLUMNAS_ENTRADA if c in df_optima_wb.columns]].to_csv(index=False).encode("utf-8")),
+                    "insumos_mezcla_optima.csv", "text/csv", key="wb_opt_csv_dl"
+                )
+
+mostrar_instrumentacion(panel_instr_wb, instr_wb, "wb")
@@ -0,0 +1,178 @@
+# pages/3_Series_Temporales.py
+import streamlit as st
+import pandas as pd
+from motor_balance import calcular_balance, resolver_recirculacion
+from series_temporales import (
+    SerieTemporalPlanta, registro_sintetico, remuestrear,
+    COLUMNAS_SUAVIZADAS, COLUMNAS_BALANCE_SERIE, METODOS_SUAVIZADO, FRECUENCIAS, UN_DIA
+)
+from psicrometria import agua_saturacion_g_por_Nm3, PRESION_NORMAL_HPA
+from graficos import figura_series
+from cache_resultados import cache_de_sesion, huella
+from exportacion import exportar_excel_serie, boton_exportacion_diferida, MIME_EXCEL, UMBRAL_FILAS_ARCHIVO_TEMPORAL
+
+# --- TÍTULO DE LA PÁGINA ---
+st.title("📈 Series Temporales de Producción y Balance de Aguas")
+st.markdown(
+    "Procese registros diarios u horarios de alimentación de insumos para obtener la producción de biogás "
+    "y el balance de aguas día a día, suavizados según el tiempo de retención hidráulica (TRH) del digestor."
+)
+st.markdown("---")
+
+# Catálogo de propiedades de insumos: la última tabla calculada en 'Producción de Biogás'
+clave_pg1 = st.session_state.get('pg1_clave_resultados')
+df_catalogo_ts = cache_de_sesion(st.session_state, "pg1_cache_resultados").obtener(("produccion", clave_pg1)) if clave_pg1 else None
+
+# --- SECCIÓN 1: REGISTRO DE ALIMENTACIÓN ---
+st.header("🗓️ Registro de Alimentación")
+origen_ts = st.radio("Origen del registro", ["Archivo de registro", "Registro de ejemplo"], horizontal=True, key="ts_origen")
+if df_catalogo_ts is not None:
+    st.success(f"Catálogo de {len(df_catalogo_ts)} insumos cargado desde 'Producción de Biogás' (propiedades por nombre de insumo).")
+else:
+    st.info("Sin catálogo de insumos: el registro debe incluir TS, SV, Potencial y %CH4 en cada fila, o calcule primero en 'Producción de Biogás'.")
+
+archivo_ts = None
+if origen_ts == "Archivo de registro":
+    st.caption(
+        "Una fila por insumo y fecha (u hora) con las columnas **Fecha**, **Nombre** y **Volumen (t)** alimentadas en ese registro. "
+        "Las propiedades del insumo se toman del catálogo o de columnas TS (%), SV (%sms), Potencial (m3CH4/tSV), %CH4 del propio registro."
+    )
+    archivo_ts = st.file_uploader("Registro de alimentación (CSV, XLSX o Parquet)", type=["csv", "txt", "xlsx", "xlsm", "parquet", "pq"], key="ts_archivo")
+else:
+    if df_catalogo_ts is None:
+        st.warning("El registro de ejemplo se genera a partir de la tabla de insumos de 'Producción de Biogás'."); st.stop()
+    ecol1, ecol2, ecol3 = st.columns(3)
+    fecha_inicio_ejemplo_ts = ecol1.date_input("Fecha inicial", value=pd.Timestamp("2020-01-01"), key="ts_ej_inicio")
+    n_dias_ejemplo_ts = ecol2.number_input("Días de registro", 30, 20_000, 3 * 365, 30, key="ts_ej_dias")
+    registros_dia_ejemplo_ts = ecol3.selectbox("Registros por día", [1, 24], format_func=lambda n: "Diario" if n == 1 else "Horario", key="ts_ej_registros")
+
+# --- SECCIÓN 2: PARÁMETROS ---
+st.header("⚙️ Parámetros del Digestor y del Balance")
+pcol1, pcol2, pcol3 = st.columns(3)
+with pcol1:
+    trh_dias_ts = st.number_input("Tiempo de retención hidráulica, TRH (días)", 1, 200, 30, 1, key="ts_trh")
+    metodo_suavizado_ts = st.radio("Respuesta del digestor", list(METODOS_SUAVIZADO), format_func=METODOS_SUAVIZADO.get, key="ts_metodo")
+    temp_biogas_C_ts = st.number_input("Temperatura del biogás en saturación (°C)", 0.0, 60.0, 35.0, 0.5, key="ts_temp_biogas")
+    presion_biogas_hPa_ts = st.number_input("Presión absoluta del biogás (hPa)", 500.0, 20000.0, PRESION_NORMAL_HPA, 5.0, key="ts_presion_biogas")
+    g_agua_por_Nm3_biogas_ts = float(agua_saturacion_g_por_Nm3(temp_biogas_C_ts, presion_biogas_hPa_ts))
+    st.caption(f"Agua en biogás saturado: {g_agua_por_Nm3_biogas_ts:.1f} g H₂O / Nm³ seco")
+with pcol2:
+    agua_limpieza_m3_dia_ts = st.number_input("Agua de limpieza (m³/día)", 0.0, value=5.0, step=0.5, key="ts_agua_limpieza")
+    agua_dilucion_directa_m3_dia_ts = st.number_input("Agua de dilución directa (m³/día)", 0.0, value=0.0, step=1.0, key="ts_agua_dil_dir")
+    target_TS_digestor_percent_ts = st.slider("TS objetivo en el digestor (%)", 1.0, 25.0, 10.0, 0.1, key="ts_target_ts")
+with pcol3:
+    recirculacion_fraccion_ts = st.slider("Fracción de recirculación", 0.0, 1.0, 0.3, 0.01, key="ts_recirc")
+    evaporacion_perdida_fraccion_ts = st.slider("Fracción de evaporación", 0.0, 0.1, 0.01, 0.001, format="%.3f", key="ts_evap")
+    humedad_torta_solida_percent_ts = st.slider("Humedad de la torta sólida (%)", 50.0, 95.0, 75.0, 0.5, key="ts_hum_torta")
+    eficiencia_captura_ts_en_torta_ts = st.slider("Captura de TS en torta (%)", 0.0, 100.0, 85.0, 1.0, key="ts_captura") / 100.0
+    recirculacion_estacionaria_ts = st.checkbox("Resolver la recirculación en estado estacionario", value=True, key="ts_recirc_estacionaria")
+
+parametros_balance_ts = {
+    "agua_limpieza_m3_dia": agua_limpieza_m3_dia_ts, "agua_dilucion_directa_m3_dia": agua_dilucion_directa_m3_dia_ts,
+    "target_TS_digestor_percent": target_TS_digestor_percent_ts, "recirculacion_fraccion": recirculacion_fraccion_ts,
+    "evaporacion_perdida_fraccion": evaporacion_perdida_fraccion_ts, "humedad_torta_solida_percent": humedad_torta_solida_percent_ts,
+    "eficiencia_captura_ts_en_torta": eficiencia_captura_ts_en_torta_ts,
+}
+# La serie guardada solo es válida para los parámetros y el catálogo con los que se construyó
+clave_config_ts = huella(parametros_balance_ts, trh_dias_ts, metodo_suavizado_ts, g_agua_por_Nm3_biogas_ts, recirculacion_estacionaria_ts, clave_pg1)
+
+
+def nueva_serie_ts():
+    return SerieTemporalPlanta(
+        parametros_balance_ts, g_agua_por_Nm3_biogas_ts, trh_dias_ts, metodo_suavizado_ts, df_propiedades=df_catalogo_ts,
+        funcion_balance=resolver_recirculacion if recirculacion_estacionaria_ts else calcular_balance
+    )
+
+
+if st.button("Procesar registro completo", key="ts_procesar", type="primary"):
+    try:
+        serie_ts = nueva_serie_ts()
+        with st.spinner("Procesando registro..."):
+            if origen_ts == "Archivo de registro":
+                if archivo_ts is None:
+                    st.error("Cargue un archivo de registro."); st.stop()
+                serie_ts.anadir_archivo(archivo_ts)
+            else:
+                serie_ts.anadir(registro_sintetico(df_catalogo_ts, fecha_inicio_ejemplo_ts, int(n_dias_ejemplo_ts), registros_dia_ejemplo_ts, semilla=0))
+        st.session_state["ts_serie"] = serie_ts
+        st.session_state["ts_clave_serie"] = clave_config_ts
+    except (ValueError, ImportError) as e:
+        st.error(f"Error al procesar el registro: {e}"); st.stop()
+
+serie_ts = st.session_state.get("ts_serie")
+if serie_ts is None or len(serie_ts) == 0:
+    st.info("Procese un registro para ver las series de producción y balance."); st.stop()
+if st.session_state.get("ts_clave_serie") != clave_config_ts:
+    st.warning("Los parámetros o el catálogo han cambiado desde que se procesó el registro. Vuelva a procesarlo para actualizar toda la serie.")
+
+# --- SECCIÓN 3: ACTUALIZACIÓN INCREMENTAL ---
+st.header("➕ Añadir Registros")
+st.caption(f"Serie actual: {len(serie_ts)} días, del {serie_ts.diario.index.min():%d/%m/%Y} al {serie_ts.diario.index.max():%d/%m/%Y}. "
+           "Al añadir registros solo se recalculan los días afectados.")
+acol1, acol2 = st.columns(2)
+with acol1:
+    archivo_nuevo_ts = st.file_uploader("Registros nuevos (mismo formato)", type=["csv", "txt", "xlsx", "xlsm", "parquet", "pq"], key="ts_archivo_nuevo")
+    if st.button("Añadir registros del archivo", key="ts_anadir_archivo", disabled=archivo_nuevo_ts is None):
+        try:
+            serie_ts.anadir_archivo(archivo_nuevo_ts)
+            st.success(f"Registros añadidos: se recalcularon {serie_ts.dias_recalculados} de {len(serie_ts)} días.")
+        except (ValueError, ImportError) as e:
+            st.error(f"Error al añadir registros: {e}")
+with acol2:
+    if df_catalogo_ts is not None and st.button("Añadir un día simulado", key="ts_anadir_dia"):
+        siguiente_dia_ts = serie_ts.diario.index.max() + UN_DIA
+        serie_ts.anadir(registro_sintetico(df_catalogo_ts, siguiente_dia_ts, 1, semilla=len(serie_ts)))
+        st.success(f"Día {siguiente_dia_ts:%d/%m/%Y} añadido: se recalcularon {serie_ts.dias_recalculados} de {len(serie_ts)} días.")
+
+# --- SECCIÓN 4: RESULTADOS ---
+st.header("📊 Resultados por Periodo")
+rcol1, rcol2 = st.columns(2)
+frecuencia_ts = rcol1.radio("Periodo", list(FRECUENCIAS), horizontal=True, key="ts_frecuencia")
+agregacion_ts = rcol2.radio("Flujos expresados como", ["media", "suma"], horizontal=True, key="ts_agregacion",
+                            format_func={"media": "Media diaria del periodo", "suma": "Total del periodo"}.get,
+                            disabled=frecuencia_ts == "Diaria")
+
+# Las vistas remuestreadas se guardan por huella del contenido de la serie (cambian al añadir registros)
+cache_ts = cache_de_sesion(st.session_state, "ts_cache_resultados", max_entradas=8)
+df_serie_ts = serie_ts.resultados()
+clave_vista_ts = huella(df_serie_ts, frecuencia_ts, agregacion_ts)
+df_vista_ts = cache_ts.obtener_o_calcular(("vista", clave_vista_ts), lambda: remuestrear(df_serie_ts, FRECUENCIAS[frecuencia_ts], agregacion_ts))
+unidad_ts = "/periodo" if agregacion_ts == "suma" and frecuencia_ts != "Diaria" else "/día"
+
+
+def columnas_vista(columnas):
+    return [c.replace("/día", unidad_ts) for c in columnas if c.replace("/día", unidad_ts) in df_vista_ts.columns]
+
+
+mcol1, mcol2, mcol3 = st.columns(3)
+ultimos_ts = serie_ts.totales_recientes()
+mcol1.metric(f"Alimentación media últimos {serie_ts.trh_dias} días (t/día)", f"{ultimos_ts['total_volumen_insumos_humedos_t_dia']:.2f}")
+mcol2.metric("Biogás según TRH, media (Nm³/día)", f"{ultimos_ts['total_biogas_bruto_m3_dia']:.2f}")
+mcol3.metric("Dilución calculada, media (m³/día)", f"{serie_ts.balance[COLUMNAS_BALANCE_SERIE['E4_agua_dilucion_calculada']].iloc[-serie_ts.trh_dias:].mean():.2f}")
+
+fig_produccion_ts = cache_ts.obtener_o_calcular(("fig_produccion", clave_vista_ts), lambda: figura_series(
+    df_vista_ts, columnas_vista(["Biogás Bruto (m3/día)"] + list(COLUMNAS_SUAVIZADAS.values())),
+    "Producción de biogás y biometano", f"m³{unidad_ts}"
+))
+st.plotly_chart(fig_produccion_ts, use_container_width=True)
+columnas_balance_ts = [COLUMNAS_BALANCE_SERIE[k] for k in ("total_agua_entrante_m3_dia", "E4_agua_dilucion_calculada", "agua_efluente_liquido_neto_m3_dia", "agua_en_torta_solida_m3_dia")]
+fig_balance_ts = cache_ts.obtener_o_calcular(("fig_balance", clave_vista_ts), lambda: figura_series(
+    df_vista_ts, columnas_vista(columnas_balance_ts), "Balance de aguas", f"m³{unidad_ts}"
+))
+st.plotly_chart(fig_balance_ts, use_container_width=True)
+
+with st.expander("Tabla de resultados", expanded=False):
+    st.dataframe(df_vista_ts, column_config={col: st.column_config.NumberColumn(col, format="%.2f") for col in df_vista_ts.columns}, use_container_width=True)
+csv_vista_ts = cache_ts.obtener_o_calcular(("csv", clave_vista_ts), lambda: df_vista_ts.to_csv().encode("utf-8"))
+st.download_button("⬇️ CSV de la serie", csv_vista_ts, f"serie_{frecuencia_ts.lower()}.csv", "text/csv", key="ts_csv_dl")
+# Libro diario completo (parámetros, alimentación, producción y balance), escrito en flujo y en disco si la serie es larga
+boton_exportacion_diferida(
+    st, "⚙️ Preparar Excel de la serie diaria", "⬇️ Excel de la serie diaria", ("excel_serie", huella(df_serie_ts), clave_config_ts),
+    lambda destino: exportar_excel_serie(serie_ts, destino), "serie_diaria.xlsx", MIME_EXCEL, key="ts_excel_dl",
+    en_archivo=len(serie_ts) > UMBRAL_FILAS_ARCHIVO_TEMPORAL
+)
+
+if st.button(f"Usar la media de los últimos {serie_ts.trh_dias} días en 'Balance de Aguas'", key="ts_enviar_balance"):
+    st.session_state.update(ultimos_ts)
+    st.session_state['datos_produccion_biogas_completados'] = True
+    st.success("Totales diarios guardados en sesión para la página 'Balance de Aguas'.")
@@ -0,0 +1,114 @@
+# pages/4_Escenarios.py
+import datetime
+
+import streamlit as st
+from almacen_escenarios import almacen_compartido, TIPOS_ESCENARIO, ERRORES_ALMACEN
+
+# Métricas que se muestran en el listado (se leen en la misma consulta, sin cargar tablas)
+METRICAS_LISTADO = {
+    "biometano_final_m3_ano": "Biometano final (m³/año)",
+    "total_biogas_bruto_m3_dia": "Biogás bruto (m³/día)",
+    "insumos": "Insumos",
+    "total_agua_entrante_m3_dia": "Agua entrante (m³/día)",
+    "total_agua_saliente_m3_dia": "Agua saliente (m³/día)",
+    "balance_hidrico_m3_dia": "Balance (m³/día)",
+}
+COLUMNAS_COMPARACION_PRODUCCION = ["Biogás Bruto (m3/año)", "Biometano final (m3/año)"]
+
+# --- TÍTULO DE LA PÁGINA ---
+st.title("🗂️ Escenarios Guardados")
+st.markdown(
+    "Con 'Guardar cada cálculo como escenario' activado en la barra lateral, cada cálculo de 'Producción de Biogás' y "
+    "'Balance de Aguas' se guarda como escenario (sitio, fecha y parámetros). "
+    "Los cálculos idénticos se almacenan una sola vez y no se vuelven a calcular."
+)
+st.markdown("---")
+
+try:
+    almacen_esc = almacen_compartido()
+except ERRORES_ALMACEN as e:
+    st.error(f"No se pudo abrir el almacén de escenarios: {e}")
+    st.stop()
+st.caption(
+    f"Almacén: `{almacen_esc.ruta}` · {almacen_esc.numero_escenarios():,} escenarios"
+    + (f" (se conservan los {almacen_esc.max_escenarios:,} más recientes)" if almacen_esc.max_escenarios else "")
+)
+
+# --- SECCIÓN 1: FILTROS Y LISTADO ---
+st.header("🔎 Buscar escenarios")
+fcol1, fcol2, fcol3 = st.columns(3)
+tipo_esc = fcol1.selectbox("Tipo", [None] + list(TIPOS_ESCENARIO), format_func=lambda t: "Todos" if t is None else TIPOS_ESCENARIO[t], key="esc_tipo")
+sitio_esc = fcol2.selectbox("Sitio", [None] + almacen_esc.sitios(), format_func=lambda s: "Todos" if s is None else (s or "(sin sitio)"), key="esc_sitio")
+hoy_esc = datetime.date.today()
+rango_esc = fcol3.date_input("Fechas", (hoy_esc - datetime.timedelta(days=365), hoy_esc), key="esc_rango")
+desde_esc, hasta_esc = (rango_esc + (rango_esc[0],))[:2] if isinstance(rango_esc, tuple) and rango_esc else (None, None)
+limite_esc = st.select_slider("Escenarios mostrados (más recientes)", [100, 1000, 10_000, 100_000], value=1000, key="esc_limite")
+
+df_esc = almacen_esc.listar(sitio=sitio_esc, desde=desde_esc, hasta=hasta_esc, tipo=tipo_esc, metricas=list(METRICAS_LISTADO), limite=limite_esc)
+if df_esc.empty:
+    st.info("No hay escenarios guardados con estos filtros. Calcule en 'Producción de Biogás' o 'Balance de Aguas' para crearlos.")
+    st.stop()
+
+df_listado_esc = df_esc.drop(columns=["huella"]).rename(columns=METRICAS_LISTADO)
+df_listado_esc["tipo"] = df_listado_esc["tipo"].map(TIPOS_ESCENARIO)
+df_listado_esc = df_listado_esc.dropna(axis=1, how="all")
+st.dataframe(
+    df_listado_esc, hide_index=True, key="esc_listado",
+    column_config={etiqueta: st.column_config.NumberColumn(etiqueta, format="%.2f") for etiqueta in METRICAS_LISTADO.values()},
+)
+st.caption(f"{len(df_esc)} escenarios.")
+
+# --- SECCIÓN 2: COMPARACIÓN DE DOS ESCENARIOS ---
+st.header("⚖️ Comparar dos escenarios")
+etiquetas_esc = {
+    fila.id: f"#{fila.id} · {TIPOS_ESCENARIO[fila.tipo]} · {fila.sitio or '(sin sitio)'} · {fila.fecha}"
+    for fila in df_esc.itertuples()
+}
+ids_esc = list(etiquetas_esc)
+ccol1, ccol2 = st.columns(2)
+id_a_esc = ccol1.selectbox("Escenario A", ids_esc, index=min(1, len(ids_esc) - 1), format_func=etiquetas_esc.get, key="esc_a")
+id_b_esc = ccol2.selectbox("Escenario B", ids_esc, index=0, format_func=etiquetas_esc.get, key="esc_b")
+
+if id_a_esc == id_b_esc:
+    st.info("Elija dos escenarios distintos para compararlos.")
+else:
+    df_dif_esc = almacen_esc.diferencias(id_a_esc, id_b_esc)
+    st.markdown("##### Resultados (B - A)")
+    st.dataframe(
+        df_dif_esc.rename(columns={"clave": "Métrica", "a": "A", "b": "B", "diferencia": "B - A", "diferencia_relativa": "Variación (%)"})
+        .assign(**{"Variación (%)": df_dif_esc["diferencia_relativa"] * 100}),
+        hide_index=True, key="esc_diferencias",
+        column_config={c: st.column_config.NumberColumn(c, format="%.3f") for c in ["A", "B", "B - A", "Variación (%)"]},
+    )
+    df_param_esc = almacen_esc.diferencias_parametros(id_a_esc, id_b_esc)
+    if not df_param_esc.empty:
+        st.markdown("##### Parámetros que cambian")
+        st.dataframe(df_param_esc.astype(str), hide_index=True, key="esc_dif_parametros")
+    tipos_comparados_esc = {df_esc.loc[df_esc["id"] == i, "tipo"].iloc[0] for i in (id_a_esc, id_b_esc)}
+    if tipos_comparados_esc == {"produccion"}:
+        st.markdown("##### Producción por insumo")
+        # Solo se leen de cada tabla guardada el nombre y las columnas comparadas
+        st.dataframe(
+            almacen_esc.diferencias_tabla(id_a_esc, id_b_esc, "produccion", "Nombre", COLUMNAS_COMPARACION_PRODUCCION),
+            hide_index=True, key="esc_dif_produccion",
+        )
+
+# --- SECCIÓN 3: LIMPIEZA DEL ALMACÉN ---
+st.header("🗑️ Borrar escenarios")
+if "esc_mensaje_borrado" in st.session_state:
+    st.success(st.session_state.pop("esc_mensaje_borrado"))
+bcol1, bcol2 = st.columns(2)
+with bcol1:
+    ids_borrar_esc = st.multiselect("Escenarios a borrar", ids_esc, format_func=etiquetas_esc.get, key="esc_borrar_ids")
+    if st.button("Borrar seleccionados", disabled=not ids_borrar_esc, key="esc_borrar"):
+        for identificador in ids_borrar_esc:
+            almacen_esc.borrar(identificador)
+        st.session_state["esc_mensaje_borrado"] = f"{len(ids_borrar_esc)} escenarios borrados."
+        st.session_state.pop("esc_borrar_ids", None)
+        st.rerun()
+with bcol2:
+    conservar_esc = st.number_input("Conservar solo los más recientes", min_value=0, value=min(len(df_esc), 100), step=10, key="esc_conservar")
+    if st.button("Borrar los más antiguos", key="esc_podar"):
+        st.session_state["esc_mensaje_borrado"] = f"{almacen_esc.podar(conservar_esc)} escenarios borrados."
+        st.rerun()
+st.caption("Los resultados que ya no usa ningún escenario se eliminan con él.")
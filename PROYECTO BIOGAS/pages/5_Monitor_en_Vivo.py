@@ -0,0 +1,208 @@
+# pages/5_Monitor_en_Vivo.py
+import math
+
+import streamlit as st
+import pandas as pd
+from motor_balance import calcular_balance, resolver_recirculacion
+from monitor_sensores import (
+    MonitorBalance, FuenteArchivo, FuenteSocket, SimuladorSensores, valores_medios_simulacion, fecha_desde_segundos,
+    SENSORES, SALIDAS_EN_VIVO, VENTANAS_DEFECTO, INACTIVIDAD_MAXIMA_S, ANTIGUEDAD_AVISO_S
+)
+from psicrometria import PRESION_NORMAL_HPA, BASES_CONTENIDO_AGUA
+from graficos import figura_series
+from cache_resultados import huella
+
+VENTANAS_DISPONIBLES_SV = {"15 min": 900.0, "1 h": 3600.0, "6 h": 21600.0, "24 h": 86400.0, "7 días": 604800.0}
+REFRESCOS_SIN_LEER_SV = 10  # Refrescos del panel sin leer el socket (pestaña cerrada) antes de detener su hilo
+
+# --- TÍTULO DE LA PÁGINA ---
+st.title("📡 Monitor en Vivo del Balance de Aguas")
+st.markdown(
+    "Siga las lecturas de los caudalímetros, del medidor de biogás y de la temperatura a medida que llegan "
+    "(archivo que otro proceso va ampliando, socket TCP o simulador local) y vea el balance de aguas sobre "
+    "ventanas móviles. Solo el panel en vivo se refresca; el resto de la página no se vuelve a ejecutar."
+)
+st.markdown("---")
+
+# Totales de 'Producción de Biogás' (o de 'Series Temporales'): TS de la alimentación y medias del simulador
+totales_sesion_sv = {clave: st.session_state.get(clave) for clave in ("total_volumen_insumos_humedos_t_dia", "total_ts_en_insumos_t_dia", "total_biogas_bruto_m3_dia")}
+ts_sesion_sv = (100.0 * totales_sesion_sv["total_ts_en_insumos_t_dia"] / totales_sesion_sv["total_volumen_insumos_humedos_t_dia"]
+                if totales_sesion_sv["total_volumen_insumos_humedos_t_dia"] and totales_sesion_sv["total_ts_en_insumos_t_dia"] is not None else None)
+
+# --- SECCIÓN 1: FUENTE DE LECTURAS ---
+st.header("🔌 Fuente de Lecturas")
+origen_sv = st.radio("Origen", ["Simulador local", "Archivo", "Socket TCP"], horizontal=True, key="sv_origen")
+st.caption(
+    "Una lectura por línea: `fecha,sensor,valor` (CSV) o `{\"t\": fecha, \"sensor\": valor, ...}` (JSON), con la fecha en ISO 8601 "
+    "(sin zona = UTC) o en segundos. Sensores: " + ", ".join(f"`{s}` ({e})" for s, e in SENSORES.items()) + "."
+)
+fcol1, fcol2 = st.columns(2)
+if origen_sv == "Simulador local":
+    aceleracion_sv = fcol1.select_slider("Aceleración del tiempo simulado", [1, 10, 60, 600, 3600], value=60, key="sv_aceleracion",
+                                         format_func=lambda x: "Tiempo real" if x == 1 else f"x{x}")
+    periodo_sv = fcol2.number_input("Periodo entre lecturas simuladas (s)", 1.0, 3600.0, 60.0, 10.0, key="sv_periodo")
+    if totales_sesion_sv["total_volumen_insumos_humedos_t_dia"]:
+        st.caption("El simulador gira en torno a los totales diarios calculados en 'Producción de Biogás'.")
+    st.caption("Para probar un archivo o un socket: `python linea_comandos.py simular-sensores --archivo lecturas.csv` o `--puerto 9100`.")
+elif origen_sv == "Archivo":
+    ruta_sv = fcol1.text_input("Ruta del archivo de lecturas", "lecturas.csv", key="sv_ruta")
+    desde_inicio_sv = fcol2.checkbox("Leer también las lecturas ya escritas", value=True, key="sv_desde_inicio")
+else:
+    host_sv = fcol1.text_input("Host", "127.0.0.1", key="sv_host")
+    puerto_sv = fcol2.number_input("Puerto", 1, 65535, 9100, 1, key="sv_puerto")
+
+# --- SECCIÓN 2: PARÁMETROS ---
+st.header("⚙️ Parámetros")
+pcol1, pcol2, pcol3 = st.columns(3)
+with pcol1:
+    ts_alimentacion_sv = st.number_input("TS de la alimentación (%)", 0.1, 100.0, round(ts_sesion_sv, 2) if ts_sesion_sv else 15.0, 0.1, key="sv_ts_alimentacion",
+                                         help="No se mide en línea: por defecto, el de la mezcla calculada en 'Producción de Biogás'.")
+    ventanas_sv = st.multiselect("Ventanas móviles", list(VENTANAS_DISPONIBLES_SV), default=list(VENTANAS_DEFECTO), key="sv_ventanas")
+    intervalo_sv = st.slider("Refresco del panel (s)", 1, 60, 2, 1, key="sv_intervalo")
+with pcol2:
+    temp_biogas_C_sv = st.number_input("Temperatura del biogás sin sensor (°C)", 0.0, 60.0, 35.0, 0.5, key="sv_temp_biogas")
+    presion_biogas_hPa_sv = st.number_input("Presión absoluta del biogás (hPa)", 500.0, 20000.0, PRESION_NORMAL_HPA, 5.0, key="sv_presion_biogas")
+    base_agua_biogas_sv = st.radio("Contenido de agua del biogás", list(BASES_CONTENIDO_AGUA), format_func=BASES_CONTENIDO_AGUA.get, key="sv_base_agua")
+with pcol3:
+    with st.expander("Parámetros del balance", expanded=False):
+        agua_limpieza_m3_dia_sv = st.number_input("Agua de limpieza sin caudalímetro (m³/día)", 0.0, value=5.0, step=0.5, key="sv_agua_limpieza")
+        agua_dilucion_directa_m3_dia_sv = st.number_input("Dilución directa sin caudalímetro (m³/día)", 0.0, value=0.0, step=1.0, key="sv_agua_dil_dir")
+        target_TS_digestor_percent_sv = st.slider("TS objetivo en el digestor (%)", 1.0, 25.0, 10.0, 0.1, key="sv_target_ts")
+        recirculacion_fraccion_sv = st.slider("Fracción de recirculación", 0.0, 1.0, 0.3, 0.01, key="sv_recirc")
+        evaporacion_perdida_fraccion_sv = st.slider("Fracción de evaporación", 0.0, 0.1, 0.01, 0.001, format="%.3f", key="sv_evap")
+        humedad_torta_solida_percent_sv = st.slider("Humedad de la torta sólida (%)", 50.0, 95.0, 75.0, 0.5, key="sv_hum_torta")
+        eficiencia_captura_ts_en_torta_sv = st.slider("Captura de TS en torta (%)", 0.0, 100.0, 85.0, 1.0, key="sv_captura") / 100.0
+        recirculacion_estacionaria_sv = st.checkbox("Resolver la recirculación en estado estacionario", value=True, key="sv_recirc_estacionaria")
+
+parametros_balance_sv = {
+    "agua_limpieza_m3_dia": agua_limpieza_m3_dia_sv, "agua_dilucion_directa_m3_dia": agua_dilucion_directa_m3_dia_sv,
+    "target_TS_digestor_percent": target_TS_digestor_percent_sv, "recirculacion_fraccion": recirculacion_fraccion_sv,
+    "evaporacion_perdida_fraccion": evaporacion_perdida_fraccion_sv, "humedad_torta_solida_percent": humedad_torta_solida_percent_sv,
+    "eficiencia_captura_ts_en_torta": eficiencia_captura_ts_en_torta_sv,
+}
+if not ventanas_sv:
+    st.warning("Seleccione al menos una ventana móvil."); st.stop()
+ventanas_seleccionadas_sv = {v: VENTANAS_DISPONIBLES_SV[v] for v in VENTANAS_DISPONIBLES_SV if v in ventanas_sv}
+# El monitor conectado solo es válido para la fuente y los parámetros con los que se creó
+configuracion_fuente_sv = (origen_sv, st.session_state.get("sv_aceleracion"), st.session_state.get("sv_periodo"),
+                           st.session_state.get("sv_ruta"), st.session_state.get("sv_host"), st.session_state.get("sv_puerto"))
+clave_config_sv = huella(configuracion_fuente_sv, parametros_balance_sv, ts_alimentacion_sv, ventanas_seleccionadas_sv, temp_biogas_C_sv,
+                         presion_biogas_hPa_sv, base_agua_biogas_sv, recirculacion_estacionaria_sv)
+
+
+def nueva_fuente_sv():
+    if origen_sv == "Simulador local":
+        valores_medios = valores_medios_simulacion(totales_sesion_sv, temp_biogas_C_sv, agua_limpieza_m3_dia_sv)
+        return SimuladorSensores(valores_medios, periodo_s=periodo_sv, aceleracion=aceleracion_sv)
+    if origen_sv == "Archivo":
+        return FuenteArchivo(ruta_sv, desde_inicio=desde_inicio_sv)
+    return FuenteSocket(host_sv, puerto_sv, max_inactividad_s=max(INACTIVIDAD_MAXIMA_S, REFRESCOS_SIN_LEER_SV * intervalo_sv))
+
+
+def desconectar_sv():
+    fuente = st.session_state.pop("sv_fuente", None)
+    if fuente is not None:
+        fuente.cerrar()
+    st.session_state.pop("sv_monitor", None)
+
+
+bcol1, bcol2 = st.columns(2)
+if bcol1.button("Conectar", key="sv_conectar", type="primary"):
+    desconectar_sv()
+    st.session_state["sv_fuente"] = nueva_fuente_sv()
+    st.session_state["sv_monitor"] = MonitorBalance(
+        parametros_balance_sv, ts_alimentacion_sv, ventanas_seleccionadas_sv, temperatura_biogas_C=temp_biogas_C_sv,
+        presion_biogas_hPa=presion_biogas_hPa_sv, base_agua_biogas=base_agua_biogas_sv,
+        funcion_balance=resolver_recirculacion if recirculacion_estacionaria_sv else calcular_balance,
+    )
+    st.session_state["sv_clave_monitor"] = clave_config_sv
+if bcol2.button("Desconectar", key="sv_desconectar", disabled="sv_monitor" not in st.session_state):
+    desconectar_sv()
+    st.rerun()
+
+if "sv_monitor" not in st.session_state:
+    st.info("Conecte una fuente para empezar a recibir lecturas."); st.stop()
+if st.session_state.get("sv_clave_monitor") != clave_config_sv:
+    st.warning("La fuente o los parámetros han cambiado desde que se conectó. Vuelva a conectar para aplicarlos.")
+
+
+# --- SECCIÓN 3: PANEL EN VIVO ---
+st.header("📊 Panel en Vivo")
+
+
+def formatear_duracion_sv(segundos):
+    if segundos < 120:
+        return f"{segundos:.0f} s"
+    if segundos < 7200:
+        return f"{segundos / 60:.0f} min"
+    if segundos < 172800:
+        return f"{segundos / 3600:.1f} h"
+    return f"{segundos / 86400:.1f} días"
+
+
+@st.fragment(run_every=intervalo_sv)
+def panel_en_vivo_sv():
+    # Solo esta función se vuelve a ejecutar en cada refresco: lee lo nuevo de la fuente y actualiza las ventanas
+    monitor, fuente = st.session_state.get("sv_monitor"), st.session_state.get("sv_fuente")
+    if monitor is None or fuente is None:
+        return
+    nuevas = monitor.consumir(fuente.leer())
+    monitor.registrar()
+    if fuente.error:
+        st.warning(fuente.error)
+    ultima = f"{fecha_desde_segundos(monitor.t_ultimo):%d/%m/%Y %H:%M:%S}" if monitor.t_ultimo is not None else "—"
+    antiguedad = monitor.antiguedad()
+    if antiguedad is not None and antiguedad >= 0:  # El simulador acelerado va por delante del reloj
+        ultima += f" (hace {formatear_duracion_sv(antiguedad)})"
+    st.caption(f"Fuente: {fuente.descripcion} · {monitor.lecturas:,} lecturas (+{nuevas:,}) · {monitor.descartadas:,} descartadas · última lectura: {ultima}")
+    # Las ventanas expiran con la fecha de las lecturas: sin lecturas recientes las medias se quedan congeladas
+    umbral = max(ANTIGUEDAD_AVISO_S, 5 * intervalo_sv)
+    sin_lecturas = monitor.segundos_sin_lecturas()
+    if sin_lecturas is not None and sin_lecturas > umbral:
+        st.warning(f"No llegan lecturas nuevas desde hace {formatear_duracion_sv(sin_lecturas)}: las ventanas muestran las medias hasta la última lectura recibida.")
+    elif antiguedad is not None and antiguedad > umbral:
+        st.warning(f"La última lectura es de hace {formatear_duracion_sv(antiguedad)}: las ventanas terminan en esa fecha, no en la hora actual.")
+
+    for ventana in monitor.ventanas:
+        entradas, resultado = monitor.balance(ventana)
+        st.subheader(f"Ventana de {ventana}")
+        if resultado is None:
+            st.info("Esperando lecturas de alimentación y de biogás en esta ventana."); continue
+        mcol1, mcol2, mcol3, mcol4 = st.columns(4)
+        mcol1.metric("Alimentación (t/día)", f"{entradas['total_volumen_insumos_humedos_t_dia']:.2f}")
+        mcol2.metric("Biogás (Nm³/día)", f"{entradas['total_biogas_bruto_m3_dia']:,.0f}")
+        mcol3.metric("Agua de dilución calculada (m³/día)", f"{resultado['E4_agua_dilucion_calculada']:.2f}")
+        mcol4.metric("Efluente líquido neto (m³/día)", f"{resultado['agua_efluente_liquido_neto_m3_dia']:.2f}")
+
+    df_historial = monitor.historial_df()
+    if len(df_historial) > 1:
+        for salida in ("E4_agua_dilucion_calculada", "agua_efluente_liquido_neto_m3_dia"):
+            etiqueta = SALIDAS_EN_VIVO[salida]
+            columnas = [f"{etiqueta} [{v}]" for v in monitor.ventanas]
+            st.plotly_chart(figura_series(df_historial, columnas, etiqueta, "m³/día"), use_container_width=True, key=f"sv_fig_{salida}")
+
+    with st.expander("Últimas lecturas y medias por sensor", expanded=False):
+        medias = {v: monitor.medias(v) for v in monitor.ventanas}
+        filas = []
+        for sensor, etiqueta in SENSORES.items():
+            t, valor = monitor.ultimas.get(sensor, (None, math.nan))
+            fila = {"Sensor": etiqueta, "Última lectura": fecha_desde_segundos(t) if t is not None else pd.NaT, "Valor": valor}
+            fila.update({f"Media {v}": medias[v][sensor] for v in monitor.ventanas})
+            filas.append(fila)
+        st.dataframe(pd.DataFrame(filas), hide_index=True, use_container_width=True)
+
+
+panel_en_vivo_sv()
+
+# --- SECCIÓN 4: ENVÍO AL BALANCE DE AGUAS ---
+monitor_sv = st.session_state["sv_monitor"]
+ecol1, ecol2 = st.columns([1, 2])
+ventana_envio_sv = ecol1.selectbox("Ventana", list(monitor_sv.ventanas), index=len(monitor_sv.ventanas) - 1, key="sv_ventana_envio")
+if ecol2.button(f"Usar las medias de la ventana de {ventana_envio_sv} en 'Balance de Aguas'", key="sv_enviar_balance"):
+    entradas_sv = monitor_sv.entradas_balance(ventana_envio_sv)
+    if entradas_sv is None:
+        st.error("Aún no hay lecturas de alimentación y de biogás en esa ventana.")
+    else:
+        st.session_state.update({clave: entradas_sv[clave] for clave in totales_sesion_sv})
+        st.session_state['datos_produccion_biogas_completados'] = True
+        st.success("Totales diarios guardados en sesión para la página 'Balance de Aguas'.")
@@ -0,0 +1,153 @@
+# pages/6_Cartera_de_Plantas.py
+import streamlit as st
+from cartera_plantas import (
+    trabajos_cartera, leer_parametros_sitios, cartera_sintetica, evaluar_cartera, COLUMNA_SITIO, COLUMNAS_RESUMEN_CARTERA
+)
+from servicio_calculo import PARAMETROS_DEFECTO, procesos_disponibles
+from psicrometria import PRESION_NORMAL_HPA
+from visualizacion import agregar_produccion
+from graficos import figura_produccion_agregada
+from exportacion import exportar_excel_cartera, exportar_pdf_cartera, boton_exportacion_diferida, MIME_EXCEL, MIME_PDF
+from cache_resultados import cache_de_sesion, huella
+
+# --- TÍTULO DE LA PÁGINA ---
+st.title("🏭 Cartera de Plantas")
+st.markdown(
+    "Evalúe a la vez toda una flota de plantas: cada sitio con su tabla de insumos y sus parámetros de proceso. "
+    "Los sitios se reparten entre varios procesos y se obtienen los resultados por sitio y los totales de la flota."
+)
+st.markdown("---")
+
+clave_pg1_cp = st.session_state.get('pg1_clave_resultados')
+df_catalogo_cp = cache_de_sesion(st.session_state, "pg1_cache_resultados").obtener(("produccion", clave_pg1_cp)) if clave_pg1_cp else None
+
+# --- SECCIÓN 1: DEFINICIÓN DE LA CARTERA ---
+st.header("🗂️ Sitios")
+origen_cp = st.radio("Origen de la cartera", ["Archivos de sitios", "Cartera de ejemplo"], horizontal=True, key="cp_origen")
+if origen_cp == "Archivos de sitios":
+    st.caption(
+        "Tablas de insumos (CSV, XLSX o Parquet) con una columna **Sitio** para varias plantas en un archivo, o un archivo por planta "
+        "(el sitio es el nombre del archivo). También se admite JSON `{\"sitios\": [{\"sitio\", \"insumos\", \"parametros\"}, ...]}`."
+    )
+    archivos_cp = st.file_uploader("Insumos por sitio", type=["csv", "txt", "xlsx", "xlsm", "parquet", "pq", "json"], accept_multiple_files=True, key="cp_archivos")
+    archivo_parametros_cp = st.file_uploader(
+        "Parámetros por sitio (opcional): columna Sitio y una columna por parámetro", type=["csv", "txt", "xlsx", "xlsm", "parquet", "pq"], key="cp_parametros_sitios",
+        help="Columnas admitidas: " + ", ".join(PARAMETROS_DEFECTO) + ". Las celdas vacías toman los parámetros comunes."
+    )
+    fuentes_cp = [(f.name, f.size, getattr(f, "file_id", None)) for f in archivos_cp or []]
+    if archivo_parametros_cp is not None:
+        fuentes_cp.append(("parametros", archivo_parametros_cp.name, archivo_parametros_cp.size, getattr(archivo_parametros_cp, "file_id", None)))
+else:
+    if df_catalogo_cp is None:
+        st.warning("La cartera de ejemplo se genera a partir de la tabla de insumos de 'Producción de Biogás'."); st.stop()
+    n_sitios_cp = st.number_input("Número de plantas de ejemplo", 2, 2000, 100, 10, key="cp_n_sitios")
+    fuentes_cp = [("ejemplo", clave_pg1_cp, int(n_sitios_cp))]
+
+# --- SECCIÓN 2: PARÁMETROS COMUNES ---
+st.header("⚙️ Parámetros Comunes")
+st.caption("Se aplican a los sitios que no indican su propio valor.")
+pcol1, pcol2, pcol3 = st.columns(3)
+with pcol1:
+    temp_biogas_C_cp = st.number_input("Temperatura del biogás en saturación (°C)", 0.0, 60.0, 35.0, 0.5, key="cp_temp_biogas")
+    presion_biogas_hPa_cp = st.number_input("Presión absoluta del biogás (hPa)", 500.0, 20000.0, PRESION_NORMAL_HPA, 5.0, key="cp_presion_biogas")
+    agua_limpieza_m3_dia_cp = st.number_input("Agua de limpieza (m³/día)", 0.0, value=5.0, step=0.5, key="cp_agua_limpieza")
+    agua_dilucion_directa_m3_dia_cp = st.number_input("Agua de dilución directa (m³/día)", 0.0, value=0.0, step=1.0, key="cp_agua_dil_dir")
+with pcol2:
+    target_TS_digestor_percent_cp = st.slider("TS objetivo en el digestor (%)", 1.0, 25.0, 10.0, 0.1, key="cp_target_ts")
+    recirculacion_fraccion_cp = st.slider("Fracción de recirculación", 0.0, 1.0, 0.3, 0.01, key="cp_recirc")
+    evaporacion_perdida_fraccion_cp = st.slider("Fracción de evaporación", 0.0, 0.1, 0.01, 0.001, format="%.3f", key="cp_evap")
+with pcol3:
+    humedad_torta_solida_percent_cp = st.slider("Humedad de la torta sólida (%)", 50.0, 95.0, 75.0, 0.5, key="cp_hum_torta")
+    eficiencia_captura_ts_en_torta_cp = st.slider("Captura de TS en torta (%)", 0.0, 100.0, 85.0, 1.0, key="cp_captura") / 100.0
+    recirculacion_estacionaria_cp = st.checkbox("Resolver la recirculación en estado estacionario", value=True, key="cp_recirc_estacionaria")
+    procesos_cp = st.number_input("Procesos de cálculo", 1, max(1, procesos_disponibles()), max(1, procesos_disponibles()), 1, key="cp_procesos")
+
+parametros_comunes_cp = {
+    "agua_limpieza_m3_dia": agua_limpieza_m3_dia_cp, "agua_dilucion_directa_m3_dia": agua_dilucion_directa_m3_dia_cp,
+    "target_TS_digestor_percent": target_TS_digestor_percent_cp, "recirculacion_fraccion": recirculacion_fraccion_cp,
+    "evaporacion_perdida_fraccion": evaporacion_perdida_fraccion_cp, "humedad_torta_solida_percent": humedad_torta_solida_percent_cp,
+    "eficiencia_captura_ts_en_torta": eficiencia_captura_ts_en_torta_cp, "temperatura_biogas_C": temp_biogas_C_cp,
+    "presion_biogas_hPa": presion_biogas_hPa_cp, "recirculacion_estacionaria": recirculacion_estacionaria_cp,
+}
+# Los resultados guardados solo son válidos para los archivos y parámetros con los que se calcularon
+clave_cartera_cp = huella(fuentes_cp, parametros_comunes_cp)
+
+if st.button("Evaluar cartera", key="cp_evaluar", type="primary"):
+    try:
+        if origen_cp == "Archivos de sitios":
+            if not archivos_cp:
+                st.error("Cargue al menos un archivo de insumos."); st.stop()
+            parametros_sitios_cp = leer_parametros_sitios(archivo_parametros_cp) if archivo_parametros_cp is not None else None
+            trabajos_cp = trabajos_cartera(archivos_cp, parametros_sitios_cp, parametros_comunes_cp)
+        else:
+            trabajos_cp = [(df, dict(parametros_comunes_cp, **parametros), sitio)
+                           for df, parametros, sitio in cartera_sintetica(df_catalogo_cp, int(n_sitios_cp), semilla=0)]
+        barra_cp = st.progress(0.0, text=f"Evaluando {len(trabajos_cp)} sitios...")
+        resultados_cp = evaluar_cartera(trabajos_cp, procesos=int(procesos_cp),
+                                        al_progresar=lambda hechos, total: barra_cp.progress(hechos / total, text=f"{hechos} de {total} sitios evaluados"))
+        barra_cp.empty()
+        st.session_state["cp_resultados"] = resultados_cp
+        st.session_state["cp_clave_resultados"] = clave_cartera_cp
+    except (ValueError, ImportError) as e:
+        st.error(f"Error al cargar la cartera: {e}"); st.stop()
+
+resultados_cp = st.session_state.get("cp_resultados")
+if resultados_cp is None or len(resultados_cp) == 0:
+    st.info("Defina la cartera y pulse 'Evaluar cartera'."); st.stop()
+if st.session_state.get("cp_clave_resultados") != clave_cartera_cp:
+    st.warning("Los sitios o los parámetros comunes han cambiado desde la última evaluación. Vuelva a evaluar la cartera.")
+
+# --- SECCIÓN 3: RESULTADOS DE LA FLOTA ---
+st.header("📊 Resultados de la Flota")
+totales_cp = resultados_cp.totales_flota()
+mcol1, mcol2, mcol3, mcol4, mcol5 = st.columns(5)
+mcol1.metric("Sitios evaluados", f"{totales_cp['Sitios evaluados']}")
+mcol2.metric("Alimentación total (t/día)", f"{totales_cp[COLUMNAS_RESUMEN_CARTERA['total_volumen_insumos_humedos_t_dia']]:,.1f}")
+mcol3.metric("Biometano final (m³/año)", f"{totales_cp[COLUMNAS_RESUMEN_CARTERA['biometano_final_m3_ano']]:,.0f}")
+mcol4.metric("Dilución calculada (m³/día)", f"{totales_cp[COLUMNAS_RESUMEN_CARTERA['E4_agua_dilucion_calculada']]:,.1f}")
+mcol5.metric("Efluente líquido neto (m³/día)", f"{totales_cp[COLUMNAS_RESUMEN_CARTERA['agua_efluente_liquido_neto_m3_dia']]:,.1f}")
+st.caption(f"Tablas de producción de los sitios guardadas en columnas: {resultados_cp.bytes_tablas / 1e6:.2f} MB.")
+if totales_cp["Sitios sin estado estacionario"]:
+    st.warning(f"{totales_cp['Sitios sin estado estacionario']} sitios no alcanzan estado estacionario con su recirculación (sin dilución calculada).")
+df_errores_cp = resultados_cp.errores()
+if len(df_errores_cp):
+    with st.expander(f"⚠️ {len(df_errores_cp)} sitios con error", expanded=True):
+        st.dataframe(df_errores_cp, hide_index=True, use_container_width=True)
+
+df_sitios_cp = resultados_cp.tabla_sitios()
+st.dataframe(df_sitios_cp, hide_index=True, use_container_width=True,
+             column_config={col: st.column_config.NumberColumn(col, format="%.2f") for col in COLUMNAS_RESUMEN_CARTERA.values()})
+
+cache_cp = cache_de_sesion(st.session_state, "cp_cache_resultados", max_entradas=8)
+top_n_cp = st.slider("Sitios en el gráfico", 5, 50, 20, 5, key="cp_top_n")
+clave_grafico_cp = huella(df_sitios_cp, top_n_cp)
+fig_sitios_cp = cache_cp.obtener_o_calcular(("fig_sitios", clave_grafico_cp), lambda: figura_produccion_agregada(
+    agregar_produccion(resultados_cp.resumen().rename(columns={COLUMNA_SITIO: "Nombre"}), "Nombre", top_n_cp), titulo_grupo="Sitio"
+))
+st.plotly_chart(fig_sitios_cp, use_container_width=True)
+
+with st.expander("Producción de la flota por categoría de insumo", expanded=False):
+    st.dataframe(resultados_cp.produccion_por_categoria(), hide_index=True, use_container_width=True)
+
+# --- SECCIÓN 4: DETALLE POR SITIO ---
+st.header("🔎 Detalle por Sitio")
+if resultados_cp.sitios:
+    sitio_cp = st.selectbox("Sitio", resultados_cp.sitios, key="cp_sitio")
+    st.dataframe(resultados_cp.produccion(sitio_cp), hide_index=True, use_container_width=True)
+
+# --- SECCIÓN 5: EXPORTACIÓN ---
+st.header("📥 Informes de la Cartera")
+clave_export_cp = st.session_state.get("cp_clave_resultados")
+ecol1, ecol2 = st.columns(2)
+with ecol1:
+    boton_exportacion_diferida(
+        st, "Preparar Excel de la cartera", "📥 Excel (hoja por sitio)", ("cartera_xlsx", clave_export_cp),
+        lambda destino: exportar_excel_cartera(resultados_cp, destino), "cartera_plantas.xlsx", MIME_EXCEL, key="cp_excel",
+        en_archivo=len(resultados_cp) > 50,
+    )
+with ecol2:
+    boton_exportacion_diferida(
+        st, "Preparar PDF de la cartera", "📄 PDF (secciones por sitio)", ("cartera_pdf", clave_export_cp),
+        lambda destino: exportar_pdf_cartera(resultados_cp, destino), "cartera_plantas.pdf", MIME_PDF, key="cp_pdf",
+        en_archivo=len(resultados_cp) > 50,
+    )
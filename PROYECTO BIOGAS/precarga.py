@@ -0,0 +1,71 @@
+# precarga.py
+# Calentamiento del proceso de Streamlit. Los módulos de Python se comparten entre sesiones y reruns,
+# así que basta con pagar una vez por proceso el coste de importar el motor de cálculo y de preparar
+# las librerías de gráficos y exportación (fuentes, validadores de plotly, métricas de fpdf).
+# La página de inicio lanza la precarga en un hilo en segundo plano mientras el usuario la lee.
+
+import importlib
+import logging
+import threading
+import time
+
+MODULOS_MOTOR = [
+    "motor_produccion", "motor_balance", "psicrometria", "importacion_insumos", "cache_resultados",
+    "sensibilidad_balance", "incertidumbre", "optimizador_mezcla", "series_temporales", "monitor_sensores", "cartera_plantas", "visualizacion", "almacen_escenarios", "exportacion", "graficos",
+]
+
+_bloqueo = threading.Lock()
+_hilo = None
+_tiempos = {}
+_registro = logging.getLogger(__name__)
+
+
+def _calentar_graficos():
+    import pandas as pd
+    from graficos import figura_balance_barras, figura_produccion_agregada, figura_series
+    from visualizacion import agregar_produccion
+    df = pd.DataFrame({"Nombre": ["a"], "Biogás Bruto (m3/año)": [1.0], "Biometano útil (m3/año)": [1.0], "Biometano final (m3/año)": [1.0]})
+    figura_produccion_agregada(agregar_produccion(df)).to_json()
+    figura_balance_barras({"total_agua_entrante_m3_dia": 1.0, "total_agua_saliente_m3_dia": 1.0}).to_json()
+    figura_series(pd.DataFrame({"a": [1.0, 2.0]}, index=pd.date_range("2020-01-01", periods=2)), ["a"], "", "").to_json()
+
+
+def _calentar_pdf():
+    import pandas as pd
+    from exportacion import exportar_pdf_produccion
+    exportar_pdf_produccion(pd.DataFrame({"Nombre": ["a"], "Volumen (t/año)": [1.0]}), ["Nombre", "Volumen (t/año)"])
+
+
+def _precargar():
+    for modulo in MODULOS_MOTOR:
+        inicio = time.perf_counter()
+        importlib.import_module(modulo)
+        _tiempos[modulo] = time.perf_counter() - inicio
+    for nombre, funcion in (("graficos (plotly)", _calentar_graficos), ("pdf (fpdf2)", _calentar_pdf)):
+        inicio = time.perf_counter()
+        try:
+            funcion()
+        except Exception:  # La precarga nunca debe romper la página de inicio; el error se verá al usarlo
+            _registro.warning("No se pudo precargar %s", nombre, exc_info=True)
+            continue
+        _tiempos[nombre] = time.perf_counter() - inicio
+
+
+def precargar(en_segundo_plano=True):
+    """Lanza la precarga una sola vez por proceso; devuelve el hilo (o None si se ejecutó en primer plano)."""
+    global _hilo
+    with _bloqueo:
+        if _hilo is not None:
+            return _hilo
+        if not en_segundo_plano:
+            _hilo = threading.current_thread()
+            _precargar()
+            return None
+        _hilo = threading.Thread(target=_precargar, name="precarga", daemon=True)
+        _hilo.start()
+        return _hilo
+
+
+def estado_precarga():
+    """{módulo o grupo: segundos} de lo ya precargado."""
+    return dict(_tiempos)
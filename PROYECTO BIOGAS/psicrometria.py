@@ -0,0 +1,60 @@
+# psicrometria.py
+# Contenido de agua del biogás saturado en función de la temperatura y la presión (vectorizado).
+# Presión de vapor de saturación por la fórmula de Magnus (Alduchov y Eskridge, 1996) con el factor de
+# mejora de Buck (1981) para gas real a presión distinta de la atmosférica.
+
+import numpy as np
+
+MAGNUS_A_HPA = 6.1094
+MAGNUS_B = 17.625
+MAGNUS_C_GRADOS = 243.04
+MASA_MOLAR_AGUA_G_MOL = 18.01528
+R_J_MOL_K = 8.314462618
+VOLUMEN_MOLAR_NORMAL_L_MOL = 22.414  # 0 °C y 1013.25 hPa
+PRESION_NORMAL_HPA = 1013.25
+RANGO_VALIDEZ_C = (-40.0, 60.0)  # Ajuste de Magnus; fuera de él se usa el extremo más cercano
+
+BASES_CONTENIDO_AGUA = {
+    "Nm3_seco": "g H₂O / Nm³ de biogás seco (con corrección por presión)",
+    "m3_saturado": "g H₂O / m³ de biogás saturado a la temperatura indicada",
+}
+
+
+def presion_vapor_saturacion_hPa(temperatura_C, presion_hPa=None):
+    """Presión de vapor de saturación sobre agua líquida (hPa); con `presion_hPa` incluye el factor de mejora.
+
+    La temperatura se limita a RANGO_VALIDEZ_C (una lectura errónea de sensor no dispara el resultado).
+    """
+    temperatura_C = np.clip(np.asarray(temperatura_C, dtype=float), *RANGO_VALIDEZ_C)
+    e_s = MAGNUS_A_HPA * np.exp(MAGNUS_B * temperatura_C / (temperatura_C + MAGNUS_C_GRADOS))
+    if presion_hPa is not None:
+        e_s = e_s * (1.0007 + 3.46e-6 * np.asarray(presion_hPa, dtype=float))
+    return e_s
+
+
+def agua_saturacion_g_por_Nm3(temperatura_C, presion_hPa=PRESION_NORMAL_HPA):
+    """Agua (g) que arrastra cada Nm³ de biogás seco saturado a `temperatura_C` y `presion_hPa` absolutas.
+
+    x = (M_agua / V_m) · e_s / (P - e_s): a mayor presión el gas admite menos vapor por Nm³.
+    """
+    presion_hPa = np.asarray(presion_hPa, dtype=float)
+    e_s = np.minimum(presion_vapor_saturacion_hPa(temperatura_C, presion_hPa), presion_hPa)
+    with np.errstate(divide="ignore"):
+        return MASA_MOLAR_AGUA_G_MOL / VOLUMEN_MOLAR_NORMAL_L_MOL * 1000.0 * e_s / (presion_hPa - e_s)
+
+
+def densidad_vapor_saturado_g_m3(temperatura_C):
+    """Densidad del vapor de agua en gas saturado (g/m³ a la temperatura del gas), base de la tabla anterior."""
+    temperatura_C = np.clip(np.asarray(temperatura_C, dtype=float), *RANGO_VALIDEZ_C)
+    e_s_Pa = presion_vapor_saturacion_hPa(temperatura_C) * 100.0
+    return e_s_Pa * MASA_MOLAR_AGUA_G_MOL / (R_J_MOL_K * (temperatura_C + 273.15))
+
+
+def contenido_agua_biogas(temperatura_C, presion_hPa=PRESION_NORMAL_HPA, base="Nm3_seco"):
+    """g de agua por unidad de biogás saturado según la base de BASES_CONTENIDO_AGUA."""
+    if base == "Nm3_seco":
+        return agua_saturacion_g_por_Nm3(temperatura_C, presion_hPa)
+    if base == "m3_saturado":
+        return densidad_vapor_saturado_g_m3(temperatura_C)
+    raise ValueError(f"Base de contenido de agua desconocida: {base}")
+
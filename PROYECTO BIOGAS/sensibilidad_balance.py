@@ -0,0 +1,149 @@
+# sensibilidad_balance.py
+# Barridos de parámetros (rejilla completa o hipercubo latino) y análisis de sensibilidad del balance de aguas.
+# Cada barrido se evalúa con una sola llamada vectorizada al motor del balance por bloque de puntos
+# (calcular_balance o resolver_recirculacion, según `funcion_balance`).
+
+import numpy as np
+import pandas as pd
+
+from motor_balance import calcular_balance
+
+# Parámetros de operación barribles y sus rangos (los mismos límites que los sliders de la página)
+RANGOS_PARAMETROS = {
+    "target_TS_digestor_percent": (1.0, 25.0),
+    "recirculacion_fraccion": (0.0, 1.0),
+    "evaporacion_perdida_fraccion": (0.0, 0.1),
+    "humedad_torta_solida_percent": (50.0, 95.0),
+    "eficiencia_captura_ts_en_torta": (0.0, 1.0),
+}
+ETIQUETAS_PARAMETROS = {
+    "target_TS_digestor_percent": "TS objetivo en digestor (%)",
+    "recirculacion_fraccion": "Fracción de recirculación",
+    "evaporacion_perdida_fraccion": "Fracción de evaporación",
+    "humedad_torta_solida_percent": "Humedad de la torta (%)",
+    "eficiencia_captura_ts_en_torta": "Captura de TS en torta (fracción)",
+}
+SALIDAS_BARRIDO = {
+    "E4_agua_dilucion_calculada": "Agua de dilución calculada (m³/día)",
+    "agua_efluente_liquido_neto_m3_dia": "Efluente líquido neto (m³/día)",
+    "balance_hidrico_m3_dia": "Residuo del balance (m³/día)",
+}
+TAMANO_BLOQUE_DEFECTO = 1_000_000
+TAMANO_BLOQUE_HIPERCUBO = 250_000  # Puntos por bloque al resumir un hipercubo sin conservarlo (~300 MB de pico)
+
+
+def _validar_parametros(parametros):
+    desconocidos = [p for p in parametros if p not in RANGOS_PARAMETROS]
+    if desconocidos:
+        raise ValueError(f"Parámetros no barribles: {', '.join(desconocidos)}. Use: {', '.join(RANGOS_PARAMETROS)}")
+
+
+def muestras_rejilla(valores_por_parametro):
+    """Producto cartesiano de {parámetro: valores}; devuelve {parámetro: array 1-D} con todos los puntos."""
+    _validar_parametros(valores_por_parametro)
+    ejes = [np.asarray(v, dtype=float) for v in valores_por_parametro.values()]
+    mallas = np.meshgrid(*ejes, indexing="ij")
+    return {p: m.ravel() for p, m in zip(valores_por_parametro, mallas)}
+
+
+def muestras_hipercubo_latino(rangos, n_puntos, semilla=None):
+    """Muestreo por hipercubo latino de {parámetro: (mínimo, máximo)} con n_puntos estratos por eje."""
+    _validar_parametros(rangos)
+    rng = np.random.default_rng(semilla)
+    muestras = {}
+    for parametro, (minimo, maximo) in rangos.items():
+        estratos = rng.permutation(n_puntos).astype(float)
+        estratos += rng.random(n_puntos)
+        estratos *= (maximo - minimo) / n_puntos
+        estratos += minimo
+        muestras[parametro] = estratos
+    return muestras
+
+
+def bloques_hipercubo_latino(rangos, n_puntos, tamano_bloque=TAMANO_BLOQUE_HIPERCUBO, semilla=None):
+    """Genera n_puntos muestras en bloques, cada uno un hipercubo latino de su tamaño, sin reservar todos los puntos a la vez."""
+    rng = np.random.default_rng(semilla)
+    for inicio in range(0, n_puntos, tamano_bloque):
+        yield muestras_hipercubo_latino(rangos, min(tamano_bloque, n_puntos - inicio), semilla=rng)
+
+
+def evaluar_barrido(parametros_base, muestras, salidas=tuple(SALIDAS_BARRIDO), tamano_bloque=TAMANO_BLOQUE_DEFECTO,
+                    funcion_balance=calcular_balance):
+    """Evalúa el balance en todos los puntos de `muestras` con el resto de parámetros fijos en `parametros_base`.
+
+    `parametros_base` tiene los mismos argumentos que calcular_balance. Devuelve un DataFrame con una
+    columna por parámetro barrido y una por salida solicitada.
+    """
+    _validar_parametros(muestras)
+    n_puntos = len(next(iter(muestras.values())))
+    columnas = {p: np.asarray(v, dtype=float) for p, v in muestras.items()}
+    for salida in salidas:
+        columnas[salida] = np.empty(n_puntos)
+    for inicio in range(0, n_puntos, tamano_bloque):
+        fin = min(inicio + tamano_bloque, n_puntos)
+        parametros = dict(parametros_base)
+        parametros.update({p: columnas[p][inicio:fin] for p in muestras})
+        resultado = funcion_balance(**parametros)
+        for salida in salidas:
+            columnas[salida][inicio:fin] = resultado[salida]
+    return pd.DataFrame(columnas)
+
+
+def tornado(parametros_base, salida="E4_agua_dilucion_calculada", rangos=None, variacion_relativa=None,
+            funcion_balance=calcular_balance):
+    """Sensibilidad de una salida a cada parámetro moviéndolo a sus extremos (uno cada vez).
+
+    Si se indica `variacion_relativa` (p. ej. 0.2) los extremos son base ±20% recortados al rango
+    válido; si no, se usan `rangos` (por defecto RANGOS_PARAMETROS). Todos los puntos se evalúan en
+    una única llamada vectorizada. Devuelve un DataFrame ordenado por amplitud descendente.
+    """
+    rangos = dict(rangos or RANGOS_PARAMETROS)
+    _validar_parametros(rangos)
+    nombres = list(rangos)
+    bajos, altos = [], []
+    for p in nombres:
+        minimo, maximo = RANGOS_PARAMETROS[p]
+        if variacion_relativa is not None:
+            base = float(parametros_base[p])
+            bajo, alto = base * (1 - variacion_relativa), base * (1 + variacion_relativa)
+        else:
+            bajo, alto = rangos[p]
+        bajos.append(min(max(bajo, minimo), maximo))
+        altos.append(min(max(alto, minimo), maximo))
+
+    # Puntos: [base, p1 bajo, p1 alto, p2 bajo, p2 alto, ...]
+    n = 1 + 2 * len(nombres)
+    parametros = dict(parametros_base)
+    for k, p in enumerate(nombres):
+        valores = np.full(n, float(parametros_base[p]))
+        valores[1 + 2 * k] = bajos[k]
+        valores[2 + 2 * k] = altos[k]
+        parametros[p] = valores
+    resultado = np.broadcast_to(funcion_balance(**parametros)[salida], (n,))
+    valor_base = float(resultado[0])
+    df = pd.DataFrame({
+        "Parámetro": [ETIQUETAS_PARAMETROS[p] for p in nombres],
+        "parametro": nombres,
+        "Valor bajo": bajos,
+        "Valor alto": altos,
+        "Salida con valor bajo": resultado[1::2],
+        "Salida con valor alto": resultado[2::2],
+    })
+    df["Amplitud"] = (df["Salida con valor alto"] - df["Salida con valor bajo"]).abs()
+    df.attrs["valor_base"] = valor_base
+    df.attrs["salida"] = salida
+    return df.sort_values("Amplitud", ascending=False, ignore_index=True)
+
+
+def mapa_calor(parametros_base, parametro_x, valores_x, parametro_y, valores_y, salida="E4_agua_dilucion_calculada",
+               funcion_balance=calcular_balance):
+    """Matriz (len(valores_y) x len(valores_x)) de la salida sobre una rejilla de dos parámetros."""
+    _validar_parametros([parametro_x, parametro_y])
+    if parametro_x == parametro_y:
+        raise ValueError("Los parámetros de los ejes X e Y deben ser distintos.")
+    parametros = dict(parametros_base)
+    # Broadcasting: columna (y) x fila (x), sin materializar la rejilla de entrada
+    parametros[parametro_x] = np.asarray(valores_x, dtype=float)[np.newaxis, :]
+    parametros[parametro_y] = np.asarray(valores_y, dtype=float)[:, np.newaxis]
+    forma = (len(valores_y), len(valores_x))
+    return np.broadcast_to(funcion_balance(**parametros)[salida], forma)
@@ -0,0 +1,304 @@
+# series_temporales.py
+# Modo serie temporal: registros diarios u horarios de alimentación -> producción y balance de aguas por día.
+# La producción diaria se suaviza con el tiempo de retención hidráulica (TRH) del digestor y la serie se
+# actualiza de forma incremental: añadir registros nuevos solo recalcula los días afectados.
+
+import numpy as np
+import pandas as pd
+
+from importacion_insumos import iterar_bloques_archivo, mapear_columnas, UPGRADING_DEFECTO, TAMANO_BLOQUE_DEFECTO
+from motor_balance import resolver_recirculacion, agua_condensado_biogas
+from motor_produccion import calcular_cadena, COLUMNAS_NUMERICAS_ENTRADA, DIAS_POR_ANO
+
+# --- DEFINICIÓN DE COLUMNAS ---
+ALIAS_REGISTRO = {
+    "Fecha": ["fecha", "fecha_hora", "fecha y hora", "date", "datetime", "timestamp", "dia", "día"],
+    "Volumen (t)": ["volumen (t)", "volumen_t", "toneladas", "masa (t)", "t"],
+}
+PROPIEDADES_INSUMO = COLUMNAS_NUMERICAS_ENTRADA[1:]  # Humedad, TS, SV, Potencial, %CH4, Upgrading
+PROPIEDADES_OBLIGATORIAS = ["TS (%)", "SV (%sms)", "Potencial (m3CH4/tSV)", "%CH4"]
+COLUMNAS_DIARIAS = [
+    "Volumen (t/día)", "TS (t/día)", "SV (t/día)", "Biogás Bruto (m3/día)",
+    "Biometano útil (m3/día)", "Biometano final (m3/día)", "Agua en Insumo (t/día)",
+]
+# Producción alimentada en el día -> producción esperada tras el tiempo de retención del digestor
+COLUMNAS_SUAVIZADAS = {
+    "Biogás Bruto (m3/día)": "Biogás Bruto según TRH (m3/día)",
+    "Biometano útil (m3/día)": "Biometano útil según TRH (m3/día)",
+    "Biometano final (m3/día)": "Biometano final según TRH (m3/día)",
+}
+COLUMNAS_BALANCE_SERIE = {
+    "E4_agua_dilucion_calculada": "Agua Dilución Calculada (m³/día)",
+    "total_agua_entrante_m3_dia": "Total Agua Entrante (m³/día)",
+    "S1_evaporacion_m3_dia": "Evaporación (m³/día)",
+    "S2_condensado_biogas_m3_dia": "Condensado Biogás (m³/día)",
+    "agua_en_torta_solida_m3_dia": "Agua en Torta Sólida (m³/día)",
+    "agua_efluente_liquido_neto_m3_dia": "Agua Efluente Líquido Neto (m³/día)",
+    "total_agua_saliente_m3_dia": "Total Agua Saliente (m³/día)",
+    "balance_hidrico_m3_dia": "Balance (m³/día)",
+    "ts_digestor_percent": "TS en digestor (%)",
+}
+METODOS_SUAVIZADO = {
+    "movil": "Media móvil de TRH días",
+    "cstr": "Mezcla completa (exponencial, constante de tiempo = TRH)",
+}
+FRECUENCIAS = {"Diaria": "D", "Semanal": "W-MON", "Mensual": "MS"}
+UN_DIA = pd.Timedelta(days=1)
+
+
+# --- LECTURA Y AGREGACIÓN DIARIA DEL REGISTRO ---
+def mapear_columnas_registro(columnas):
+    """Como mapear_columnas, añadiendo la fecha y el volumen por registro (t) en lugar de t/año."""
+    mapeo = {}
+    for col in columnas:
+        clave = str(col).strip().lower()
+        for canonica, alias in ALIAS_REGISTRO.items():
+            if clave in alias or clave == canonica.lower():
+                mapeo[col] = canonica
+    for col, canonica in mapear_columnas([c for c in columnas if c not in mapeo]).items():
+        canonica = "Volumen (t)" if canonica == "Volumen (t/año)" else canonica
+        if canonica not in mapeo.values():
+            mapeo[col] = canonica
+    return mapeo
+
+
+def _numerico(serie):
+    if not pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype(str).str.replace(",", ".", regex=False)
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _parsear_fechas(serie):
+    # ISO 8601 primero (exportaciones de sistemas SCADA); el resto como fechas españolas día/mes/año
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    fechas = pd.to_datetime(serie, format="ISO8601", errors="coerce")
+    pendientes = fechas.isna() & serie.notna()
+    if pendientes.any():
+        fechas[pendientes] = pd.to_datetime(serie[pendientes], format="mixed", dayfirst=True, errors="coerce")
+    return fechas
+
+
+def _error_filas(invalidas, fila_inicial, motivo):
+    filas = (np.flatnonzero(invalidas)[:10] + fila_inicial + 2).tolist()  # +2: cabecera y base 1
+    raise ValueError(f"{int(invalidas.sum())} registros con {motivo} (primeras filas del archivo: {', '.join(map(str, filas))}).")
+
+
+def _propiedades_registro(df, df_propiedades, fila_inicial):
+    """Devuelve {propiedad: array por registro}, del propio registro o del catálogo de insumos por nombre."""
+    if all(col in df.columns for col in PROPIEDADES_OBLIGATORIAS):
+        props = {col: _numerico(df[col]) for col in PROPIEDADES_INSUMO if col in df.columns}
+    else:
+        if df_propiedades is None:
+            raise ValueError(
+                "El registro no incluye las propiedades de los insumos (TS, SV, Potencial, %CH4) "
+                "y no se ha indicado un catálogo de insumos."
+            )
+        if "Nombre" not in df.columns:
+            raise ValueError("El registro necesita una columna 'Nombre' para asociar cada insumo con el catálogo.")
+        catalogo = df_propiedades.drop_duplicates("Nombre", keep="last")
+        posiciones = pd.Index(catalogo["Nombre"].astype(str)).get_indexer(df["Nombre"].astype(str))
+        if (posiciones < 0).any():
+            desconocidos = pd.unique(df["Nombre"].astype(str).to_numpy()[posiciones < 0])[:10]
+            raise ValueError(f"Insumos del registro que no están en el catálogo: {', '.join(desconocidos)}")
+        props = {col: _numerico(catalogo[col])[posiciones] for col in PROPIEDADES_INSUMO if col in catalogo.columns}
+    faltantes = [col for col in PROPIEDADES_OBLIGATORIAS if col not in props]
+    if faltantes:
+        raise ValueError(f"Faltan propiedades de insumo: {', '.join(faltantes)}")
+    invalidas = np.zeros(len(df), dtype=bool)
+    for col in PROPIEDADES_OBLIGATORIAS:
+        invalidas |= np.isnan(props[col])
+    if invalidas.any():
+        _error_filas(invalidas, fila_inicial, "propiedades de insumo no numéricas")
+    humedad = props.get("Humedad (%)")
+    props["Humedad (%)"] = 100.0 - props["TS (%)"] if humedad is None else np.where(np.isnan(humedad), 100.0 - props["TS (%)"], humedad)
+    upgrading = props.get("Upgrading (%)")
+    props["Upgrading (%)"] = np.full(len(df), UPGRADING_DEFECTO) if upgrading is None else np.where(np.isnan(upgrading), UPGRADING_DEFECTO, upgrading)
+    return props
+
+
+def produccion_diaria(df_registro, df_propiedades=None, fila_inicial=0):
+    """Agrega un registro de alimentación (una fila por insumo y fecha u hora) a totales por día.
+
+    El registro necesita 'Fecha' y 'Volumen (t)' (toneladas alimentadas en ese registro) y, o bien
+    las propiedades de cada insumo, o bien 'Nombre' para tomarlas de `df_propiedades` (tabla de
+    insumos de la página de producción). Devuelve un DataFrame indexado por día con COLUMNAS_DIARIAS.
+    """
+    mapeo = mapear_columnas_registro(df_registro.columns)
+    df = df_registro[list(mapeo)].rename(columns=mapeo)
+    faltantes = [col for col in ("Fecha", "Volumen (t)") if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"El registro no contiene las columnas obligatorias: {', '.join(faltantes)}")
+
+    fechas = _parsear_fechas(df["Fecha"])
+    volumen = _numerico(df["Volumen (t)"])
+    if fechas.isna().any():
+        _error_filas(fechas.isna().to_numpy(), fila_inicial, "fechas no válidas")
+    if (np.isnan(volumen) | (volumen < 0)).any():
+        _error_filas(np.isnan(volumen) | (volumen < 0), fila_inicial, "volumen no numérico o negativo")
+    props = _propiedades_registro(df, df_propiedades, fila_inicial)
+    cadena = calcular_cadena(volumen, *(props[col] for col in PROPIEDADES_INSUMO))
+
+    # Suma por día con bincount: los registros horarios se agregan en una sola pasada
+    dias, codigos = np.unique(fechas.to_numpy().astype("datetime64[D]"), return_inverse=True)
+    totales = {"Volumen (t/día)": np.bincount(codigos, weights=volumen, minlength=len(dias))}
+    for col_anual, col_diaria in zip(cadena, COLUMNAS_DIARIAS[1:]):
+        totales[col_diaria] = np.bincount(codigos, weights=np.nan_to_num(cadena[col_anual]), minlength=len(dias))
+    return pd.DataFrame(totales, index=pd.DatetimeIndex(dias, name="Fecha"))[COLUMNAS_DIARIAS]
+
+
+def _sumar_por_dia(partes):
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS_DIARIAS, index=pd.DatetimeIndex([], name="Fecha"), dtype=float)
+    if len(partes) == 1:
+        return partes[0]
+    return pd.concat(partes).groupby(level=0).sum()
+
+
+def leer_produccion_diaria(fuente, nombre_archivo=None, df_propiedades=None, tamano_bloque=TAMANO_BLOQUE_DEFECTO):
+    """Lee un registro (CSV, XLSX o Parquet) por bloques y devuelve la producción agregada por día."""
+    partes, fila_inicial = [], 0
+    for bloque in iterar_bloques_archivo(fuente, nombre_archivo, tamano_bloque, mapeador=mapear_columnas_registro):
+        partes.append(produccion_diaria(bloque, df_propiedades, fila_inicial))
+        fila_inicial += len(bloque)
+    return _sumar_por_dia(partes)
+
+
+def registro_sintetico(df_propiedades, fecha_inicio, n_dias, registros_por_dia=1, semilla=None):
+    """Registro de alimentación de ejemplo a partir de la tabla de insumos (t/año) con ruido y estacionalidad."""
+    rng = np.random.default_rng(semilla)
+    nombres = df_propiedades["Nombre"].astype(str).to_numpy()
+    toneladas_dia = _numerico(df_propiedades["Volumen (t/año)"]) / DIAS_POR_ANO
+    n_registros = n_dias * registros_por_dia
+    instantes = pd.date_range(pd.Timestamp(fecha_inicio).normalize(), periods=n_registros, freq=pd.Timedelta(days=1) / registros_por_dia)
+    dia_del_ano = instantes.dayofyear.to_numpy()
+    estacional = 1.0 + 0.15 * np.sin(2 * np.pi * dia_del_ano / DIAS_POR_ANO)
+    ruido = rng.lognormal(0.0, 0.2, size=(n_registros, len(nombres)))
+    volumen = estacional[:, np.newaxis] * ruido * toneladas_dia / registros_por_dia
+    return pd.DataFrame({
+        "Fecha": np.repeat(instantes, len(nombres)),
+        "Nombre": np.tile(nombres, n_registros),
+        "Volumen (t)": volumen.ravel(),
+    })
+
+
+# --- REMUESTREO ---
+def remuestrear(df_serie, frecuencia, agregacion="media"):
+    """Agrega la serie diaria a semanas ('W-MON') o meses ('MS').
+
+    Con agregacion="media" los flujos se expresan como media diaria del periodo (mismas unidades);
+    con "suma" como total del periodo. Los porcentajes siempre se promedian.
+    """
+    if frecuencia == "D" or df_serie.empty:
+        return df_serie
+    porcentajes = [col for col in df_serie.columns if "%" in col]
+    flujos = [col for col in df_serie.columns if col not in porcentajes]
+    grupos = df_serie.resample(frecuencia, label="left", closed="left")
+    if agregacion == "suma":
+        df_flujos = grupos[flujos].sum().rename(columns=lambda c: c.replace("/día", "/periodo"))
+    else:
+        df_flujos = grupos[flujos].mean()
+    return pd.concat([df_flujos, grupos[porcentajes].mean()], axis=1) if porcentajes else df_flujos
+
+
+# --- SERIE INCREMENTAL ---
+class SerieTemporalPlanta:
+    """Serie diaria de producción y balance de aguas de una planta, actualizable de forma incremental.
+
+    Se guardan los totales diarios (aditivos), la producción suavizada por TRH y el balance diario.
+    Al añadir registros solo se recalculan los días desde la primera fecha afectada: con media móvil
+    se releen los TRH-1 días anteriores y con mezcla completa basta el último valor suavizado.
+    """
+
+    def __init__(self, parametros_balance, g_agua_por_Nm3_biogas, trh_dias=30, metodo_suavizado="movil",
+                 df_propiedades=None, funcion_balance=resolver_recirculacion):
+        if metodo_suavizado not in METODOS_SUAVIZADO:
+            raise ValueError(f"Método de suavizado desconocido: {metodo_suavizado}")
+        if trh_dias < 1:
+            raise ValueError("El TRH debe ser de al menos 1 día.")
+        self.parametros_balance = dict(parametros_balance)
+        self.g_agua_por_Nm3_biogas = g_agua_por_Nm3_biogas
+        self.trh_dias = int(trh_dias)
+        self.metodo_suavizado = metodo_suavizado
+        self.df_propiedades = df_propiedades
+        self.funcion_balance = funcion_balance
+        vacio = pd.DatetimeIndex([], name="Fecha")
+        self.diario = pd.DataFrame(columns=COLUMNAS_DIARIAS, index=vacio, dtype=float)
+        self.suavizado = pd.DataFrame(columns=list(COLUMNAS_SUAVIZADAS.values()), index=vacio, dtype=float)
+        self.balance = pd.DataFrame(index=vacio, dtype=float)
+        self.dias_recalculados = 0  # De la última actualización
+
+    def __len__(self):
+        return len(self.diario)
+
+    def anadir(self, df_registro):
+        """Añade registros de alimentación (mismo formato que produccion_diaria)."""
+        return self.anadir_diario(produccion_diaria(df_registro, self.df_propiedades))
+
+    def anadir_archivo(self, fuente, nombre_archivo=None, tamano_bloque=TAMANO_BLOQUE_DEFECTO):
+        return self.anadir_diario(leer_produccion_diaria(fuente, nombre_archivo, self.df_propiedades, tamano_bloque))
+
+    def anadir_diario(self, df_diario):
+        """Suma totales diarios a la serie y recalcula desde el primer día afectado; devuelve ese día."""
+        if df_diario.empty:
+            self.dias_recalculados = 0
+            return None
+        desde = df_diario.index.min()
+        if self.diario.empty:
+            self.diario = df_diario.asfreq("D", fill_value=0.0)
+        elif desde > self.diario.index.max():
+            # Caso habitual: días nuevos al final (los huecos se rellenan como días sin alimentación)
+            dias = pd.date_range(self.diario.index.max() + UN_DIA, df_diario.index.max(), freq="D", name="Fecha")
+            self.diario = pd.concat([self.diario, df_diario.reindex(dias, fill_value=0.0)])
+        else:
+            # Registros tardíos o correcciones de días ya procesados
+            dias = pd.date_range(min(desde, self.diario.index.min()), max(df_diario.index.max(), self.diario.index.max()), freq="D", name="Fecha")
+            self.diario = self.diario.reindex(dias, fill_value=0.0) + df_diario.reindex(dias, fill_value=0.0)
+        self._recalcular_desde(desde)
+        return desde
+
+    def _recalcular_desde(self, desde):
+        columnas = list(COLUMNAS_SUAVIZADAS)
+        previos = self.suavizado.loc[:desde - UN_DIA]
+        if self.metodo_suavizado == "movil":
+            tramo = self.diario.loc[desde - (self.trh_dias - 1) * UN_DIA:, columnas]
+            suavizado = tramo.rolling(self.trh_dias, min_periods=1).mean().loc[desde:]
+        else:
+            tramo = self.diario.loc[desde:, columnas]
+            if not previos.empty:  # Se siembra la exponencial con el último valor ya suavizado
+                tramo = pd.concat([previos.iloc[[-1]].set_axis(columnas, axis=1), tramo])
+            suavizado = tramo.ewm(alpha=1.0 / self.trh_dias, adjust=False).mean().loc[desde:]
+        suavizado.columns = list(COLUMNAS_SUAVIZADAS.values())
+        balance = self._balance(self.diario.loc[desde:], suavizado)
+        self.suavizado = pd.concat([previos, suavizado]) if not previos.empty else suavizado
+        previos_balance = self.balance.loc[:desde - UN_DIA]
+        self.balance = pd.concat([previos_balance, balance]) if not previos_balance.empty else balance
+        self.dias_recalculados = len(suavizado)
+
+    def _balance(self, diario, suavizado):
+        """Balance de aguas de cada día: alimentación del día y condensado del biogás según TRH."""
+        condensado = agua_condensado_biogas(suavizado[COLUMNAS_SUAVIZADAS["Biogás Bruto (m3/día)"]].to_numpy(), self.g_agua_por_Nm3_biogas)
+        resultado = self.funcion_balance(
+            ts_total_t_dia=diario["TS (t/día)"].to_numpy(), agua_en_insumos_t_dia=diario["Agua en Insumo (t/día)"].to_numpy(),
+            agua_en_biogas_condensado_m3_dia=condensado, **self.parametros_balance
+        )
+        n = len(diario)
+        return pd.DataFrame(
+            {etiqueta: np.broadcast_to(resultado[clave], (n,)) for clave, etiqueta in COLUMNAS_BALANCE_SERIE.items() if clave in resultado},
+            index=diario.index,
+        )
+
+    def resultados(self):
+        """Serie diaria completa: totales alimentados, producción según TRH y balance de aguas."""
+        return pd.concat([self.diario, self.suavizado, self.balance], axis=1)
+
+    def totales_recientes(self, dias=None):
+        """Medias de los últimos `dias` (por defecto el TRH) con las claves de sesión del balance de aguas."""
+        dias = dias or self.trh_dias
+        diario = self.diario.iloc[-dias:]
+        return {
+            "total_volumen_insumos_humedos_t_dia": float(diario["Volumen (t/día)"].mean()),
+            "total_ts_en_insumos_t_dia": float(diario["TS (t/día)"].mean()),
+            "total_biogas_bruto_m3_dia": float(self.suavizado[COLUMNAS_SUAVIZADAS["Biogás Bruto (m3/día)"]].iloc[-dias:].mean()),
+        }
@@ -0,0 +1,274 @@
+# servicio_calculo.py
+# Cálculo por lotes sin interfaz: tabla de insumos + parámetros de proceso -> producción por insumo, totales
+# diarios y balance de aguas, con los mismos motores y valores por defecto que las páginas de Streamlit.
+# Lo comparten la línea de comandos (linea_comandos.py) y la API HTTP (servidor_api.py).
+
+import io
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from importacion_insumos import leer_insumos, normalizar_insumos, EXTENSIONES_SOPORTADAS
+from motor_balance import calcular_balance, resolver_recirculacion, agua_condensado_biogas
+from motor_produccion import calcular_produccion, totales_diarios, COLUMNAS_ENTRADA, COLUMNAS_CALCULADAS
+from psicrometria import contenido_agua_biogas, BASES_CONTENIDO_AGUA, PRESION_NORMAL_HPA
+
+# --- PARÁMETROS ---
+# Mismos valores por defecto que los controles de la página de balance de aguas
+PARAMETROS_DEFECTO = {
+    "agua_limpieza_m3_dia": 5.0,
+    "agua_dilucion_directa_m3_dia": 0.0,
+    "target_TS_digestor_percent": 10.0,
+    "recirculacion_fraccion": 0.3,
+    "evaporacion_perdida_fraccion": 0.01,
+    "humedad_torta_solida_percent": 75.0,
+    "eficiencia_captura_ts_en_torta": 0.85,  # Fracción 0-1 (la página la pide en %)
+    "temperatura_biogas_C": 35.0,
+    "presion_biogas_hPa": PRESION_NORMAL_HPA,
+    "base_agua_biogas": "Nm3_seco",
+    "g_agua_por_Nm3_biogas": None,  # None: saturación calculada con la temperatura y la presión
+    "recirculacion_estacionaria": True,
+}
+# Parámetros que pasan tal cual al balance de aguas (el resto determina el agua condensada del biogás)
+ARGUMENTOS_PROCESO_BALANCE = [
+    "agua_limpieza_m3_dia", "agua_dilucion_directa_m3_dia", "target_TS_digestor_percent", "recirculacion_fraccion",
+    "evaporacion_perdida_fraccion", "humedad_torta_solida_percent", "eficiencia_captura_ts_en_torta",
+]
+FORMATOS_SALIDA = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+VALORES_VERDADEROS = ("1", "true", "si", "sí", "s", "yes", "y")
+
+
+def valor_booleano(valor):
+    """Interpreta textos como "sí", "true" o "1" (consulta HTTP, línea de comandos)."""
+    if isinstance(valor, str):
+        return valor.strip().lower() in VALORES_VERDADEROS
+    return bool(valor)
+
+
+def parametros_proceso(parametros=None):
+    """Completa `parametros` con PARAMETROS_DEFECTO y convierte cada valor a su tipo (admite texto)."""
+    if parametros is not None and not isinstance(parametros, dict):
+        raise ValueError(f"Los parámetros deben ser un objeto {{nombre: valor}} (recibido: {type(parametros).__name__}).")
+    parametros = dict(parametros or {})
+    desconocidos = sorted(set(parametros) - set(PARAMETROS_DEFECTO))
+    if desconocidos:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(desconocidos)}. Use: {', '.join(PARAMETROS_DEFECTO)}")
+    p = dict(PARAMETROS_DEFECTO)
+    for clave, valor in parametros.items():
+        if clave == "recirculacion_estacionaria":
+            p[clave] = valor_booleano(valor)
+        elif clave == "base_agua_biogas":
+            if valor not in BASES_CONTENIDO_AGUA:
+                raise ValueError(f"base_agua_biogas debe ser una de: {', '.join(BASES_CONTENIDO_AGUA)}")
+            p[clave] = valor
+        elif valor is None or (clave == "g_agua_por_Nm3_biogas" and valor == ""):
+            p[clave] = PARAMETROS_DEFECTO[clave]
+        else:
+            try:
+                p[clave] = float(str(valor).replace(",", ".")) if isinstance(valor, str) else float(valor)
+            except (TypeError, ValueError):
+                raise ValueError(f"El parámetro {clave} debe ser numérico (recibido: {valor!r}).") from None
+    return p
+
+
+def parametros_desde_pares(pares):
+    """Convierte ['clave=valor', ...] (línea de comandos) en un dict de parámetros."""
+    parametros = {}
+    for par in pares or []:
+        clave, separador, valor = par.partition("=")
+        if not separador:
+            raise ValueError(f"Parámetro mal formado '{par}': use clave=valor.")
+        parametros[clave.strip()] = valor.strip()
+    return parametros
+
+
+# --- EVALUACIÓN ---
+def _valor_json(valor):
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None  # Operaciones sin estado estacionario (NaN) -> null
+    return valor
+
+
+def configuracion_balance(p):
+    """(funcion_balance, g de agua por Nm³ de biogás, argumentos de proceso del balance) de parámetros ya completados."""
+    g_agua = p["g_agua_por_Nm3_biogas"]
+    if g_agua is None:
+        g_agua = round(float(contenido_agua_biogas(p["temperatura_biogas_C"], p["presion_biogas_hPa"], p["base_agua_biogas"])), 1)
+    funcion_balance = resolver_recirculacion if p["recirculacion_estacionaria"] else calcular_balance
+    argumentos = {clave: p[clave] for clave in ARGUMENTOS_PROCESO_BALANCE}
+    return funcion_balance, g_agua, argumentos
+
+
+def evaluar_trabajo(df_insumos, parametros=None, identificador=None):
+    """Producción, totales diarios y balance de aguas de una planta.
+
+    Devuelve un dict con 'id', 'produccion' (DataFrame por insumo), 'totales', 'parametros' y 'balance'
+    (escalares de Python). Los errores de validación se propagan como ValueError.
+    """
+    p = parametros_proceso(parametros)
+    df_produccion = calcular_produccion(normalizar_insumos(df_insumos))
+    totales = totales_diarios(df_produccion)
+    funcion_balance, g_agua, argumentos = configuracion_balance(p)
+    ts_total = totales["total_ts_en_insumos_t_dia"]
+    balance = funcion_balance(
+        ts_total_t_dia=ts_total,
+        agua_en_insumos_t_dia=totales["total_volumen_insumos_humedos_t_dia"] - ts_total,
+        agua_en_biogas_condensado_m3_dia=float(agua_condensado_biogas(totales["total_biogas_bruto_m3_dia"], g_agua)),
+        **argumentos,
+    )
+    return {
+        "id": identificador,
+        "produccion": df_produccion,
+        "totales": totales,
+        "parametros": dict(p, g_agua_por_Nm3_biogas=g_agua),
+        "balance": {clave: _valor_json(valor) for clave, valor in balance.items()},
+    }
+
+
+def trabajo_desde_dict(datos, posicion=0):
+    """(df_insumos, parametros, id) a partir de {'insumos': [...filas...] o {columna: [...]}, 'parametros': {...}, 'id': ...}."""
+    if not isinstance(datos, dict) or "insumos" not in datos:
+        raise ValueError("Cada trabajo debe ser un objeto con la clave 'insumos' (lista de filas o columnas).")
+    try:
+        df_insumos = pd.DataFrame(datos["insumos"])
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"'insumos' no es una tabla válida: {e}") from None
+    parametros = datos.get("parametros")
+    if parametros is not None and not isinstance(parametros, dict):
+        raise ValueError("'parametros' debe ser un objeto {nombre: valor}.")
+    return df_insumos, parametros, datos.get("id", posicion)
+
+
+def _evaluar_seguro(trabajo):
+    # Cualquier fallo de un trabajo (datos con tipos inesperados incluidos) queda en su resultado; las
+    # dependencias opcionales que faltan sí se propagan
+    df_insumos, parametros, identificador = trabajo
+    try:
+        return evaluar_trabajo(df_insumos, parametros, identificador)
+    except ImportError:
+        raise
+    except ValueError as e:
+        return {"id": identificador, "error": str(e)}
+    except Exception as e:
+        return {"id": identificador, "error": f"{type(e).__name__}: {e}"}
+
+
+def evaluar_lote(trabajos, procesos=None, tamano_tanda=None):
+    """Evalúa una lista de trabajos (df_insumos, parametros, id).
+
+    Un trabajo inválido no detiene el lote: su resultado lleva la clave 'error'. Con `procesos` > 1 los
+    trabajos se reparten en tandas entre procesos (un núcleo por proceso); el orden se conserva.
+    """
+    trabajos = list(trabajos)
+    if not procesos or procesos <= 1 or len(trabajos) < 2:
+        return [_evaluar_seguro(t) for t in trabajos]
+    procesos = min(procesos, len(trabajos))
+    tamano_tanda = tamano_tanda or max(1, len(trabajos) // (procesos * 4))
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return list(pool.map(_evaluar_seguro, trabajos, chunksize=tamano_tanda))
+
+
+def procesos_disponibles():
+    """Núcleos utilizables por este proceso (respeta la afinidad de CPU en Linux)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# --- LECTURA DE TRABAJOS ---
+def trabajos_desde_json(datos):
+    """Lista de trabajos a partir de un objeto {'trabajos': [...]} o de un único trabajo."""
+    if isinstance(datos, dict) and "trabajos" in datos:
+        lista = datos["trabajos"]
+        if not isinstance(lista, list):
+            raise ValueError("'trabajos' debe ser una lista.")
+    else:
+        lista = [datos]
+    return [trabajo_desde_dict(t, i) for i, t in enumerate(lista)]
+
+
+def trabajos_desde_archivos(rutas, parametros=None):
+    """Un trabajo por archivo de insumos (CSV, XLSX, Parquet; id = nombre del archivo) o los de un .json."""
+    trabajos = []
+    for ruta in rutas:
+        if os.path.splitext(ruta)[1].lower() == ".json":
+            with open(ruta, encoding="utf-8") as f:
+                for df_insumos, parametros_trabajo, identificador in trabajos_desde_json(json.load(f)):
+                    trabajos.append((df_insumos, dict(parametros or {}, **(parametros_trabajo or {})), identificador))
+        elif os.path.splitext(ruta)[1].lower() in EXTENSIONES_SOPORTADAS:
+            trabajos.append((leer_insumos(ruta), parametros, os.path.basename(ruta)))
+        else:
+            raise ValueError(f"Formato de '{ruta}' no soportado. Use CSV, XLSX, Parquet o JSON (lista de trabajos).")
+    return trabajos
+
+
+# --- SERIALIZACIÓN DE RESULTADOS ---
+def tabla_resumen(resultados):
+    """Una fila por trabajo: id, error, totales diarios, contenido de agua del biogás y balance de aguas."""
+    filas = []
+    for r in resultados:
+        fila = {"id": str(r["id"]), "error": r.get("error")}
+        if "error" not in r:
+            fila.update(r["totales"])
+            fila["g_agua_por_Nm3_biogas"] = r["parametros"]["g_agua_por_Nm3_biogas"]
+            fila.update(r["balance"])
+        filas.append(fila)
+    return pd.DataFrame(filas)
+
+
+def tabla_produccion(resultados):
+    """Filas de producción por insumo de todos los trabajos, con la columna 'id' del trabajo."""
+    partes = []
+    for r in resultados:
+        if "error" in r:
+            continue
+        df = r["produccion"]
+        columnas = [c for c in COLUMNAS_ENTRADA + ["Categoría"] + COLUMNAS_CALCULADAS if c in df.columns]
+        partes.append(df[columnas].astype({"Residuo ganadero": str}).assign(id=str(r["id"])))
+    if not partes:
+        return pd.DataFrame(columns=["id"] + COLUMNAS_ENTRADA + COLUMNAS_CALCULADAS)
+    df = pd.concat(partes, ignore_index=True)
+    return df[["id"] + [c for c in df.columns if c != "id"]]
+
+
+def _resultado_json(r, detalle):
+    if "error" in r:
+        return {"id": r["id"], "error": r["error"]}
+    salida = {"id": r["id"], "totales": r["totales"], "parametros": r["parametros"], "balance": r["balance"]}
+    if detalle:
+        df = r["produccion"]
+        salida["produccion"] = df.astype({c: str for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)}).to_dict("records")
+    return salida
+
+
+def serializar_resultados(resultados, formato="json", detalle=False):
+    """Bytes en `formato` (json, csv o parquet).
+
+    En JSON cada trabajo lleva sus totales y su balance (y sus filas de producción si `detalle`);
+    en CSV y Parquet se devuelve la tabla resumen o, con `detalle`, la tabla de producción por insumo.
+    """
+    if formato not in FORMATOS_SALIDA:
+        raise ValueError(f"Formato de salida desconocido: {formato}. Use: {', '.join(FORMATOS_SALIDA)}")
+    if formato == "json":
+        cuerpo = {"resultados": [_resultado_json(r, detalle) for r in resultados]}
+        return json.dumps(cuerpo, ensure_ascii=False, allow_nan=False, default=_valor_json).encode("utf-8")
+    df = tabla_produccion(resultados) if detalle else tabla_resumen(resultados)
+    if formato == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    buffer = io.BytesIO()
+    try:
+        df.to_parquet(buffer, index=False)
+    except ImportError as e:
+        raise ImportError("Instale 'pyarrow' para exportar a Parquet: pip install pyarrow") from e
+    return buffer.getvalue()
@@ -0,0 +1,232 @@
+# servidor_api.py
+# API HTTP local (solo biblioteca estándar: asyncio) sobre servicio_calculo. El bucle de eventos solo lee y
+# escribe HTTP; el análisis del cuerpo, el cálculo y la serialización se hacen en un pool de procesos, así
+# que las peticiones concurrentes se reparten entre los núcleos y el bucle nunca se bloquea.
+#
+#   GET  /salud            -> estado del servidor
+#   GET  /v1/parametros    -> parámetros de proceso y sus valores por defecto
+#   POST /v1/calcular      -> cuerpo JSON {"trabajos": [{"id", "insumos", "parametros"}, ...]} (o un único trabajo),
+#                             o CSV con la tabla de insumos y los parámetros en la consulta (?recirculacion_fraccion=0.4)
+#                             Consulta: formato=json|csv|parquet, detalle=1 (filas de producción por insumo)
+
+import asyncio
+import io
+import json
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from importacion_insumos import leer_insumos
+from servicio_calculo import (
+    PARAMETROS_DEFECTO, FORMATOS_SALIDA, evaluar_lote, procesos_disponibles, serializar_resultados,
+    trabajos_desde_json, valor_booleano,
+)
+
+MAX_CUERPO_DEFECTO = 64 * 1024 * 1024  # bytes
+MAX_PENDIENTES_POR_PROCESO = 64  # Peticiones en cola por proceso antes de responder 503
+TIEMPO_ESPERA_CABECERAS = 30.0  # Segundos de inactividad antes de cerrar una conexión keep-alive
+CONSULTA_RESERVADA = ("formato", "detalle")
+
+
+# --- TRABAJO EN EL POOL (se ejecuta en otro proceso) ---
+def _error(estado, mensaje):
+    return estado, FORMATOS_SALIDA["json"], json.dumps({"error": mensaje}, ensure_ascii=False).encode("utf-8")
+
+
+def procesar_peticion(cuerpo, tipo_contenido, consulta):
+    """Cuerpo de /v1/calcular -> (estado HTTP, tipo de contenido, bytes). No depende de asyncio."""
+    formato = consulta.get("formato", "json")
+    detalle = valor_booleano(consulta.get("detalle", "0"))
+    parametros_consulta = {k: v for k, v in consulta.items() if k not in CONSULTA_RESERVADA}
+    if formato not in FORMATOS_SALIDA:
+        return _error(HTTPStatus.BAD_REQUEST, f"Formato desconocido: {formato}. Use: {', '.join(FORMATOS_SALIDA)}")
+    try:
+        if tipo_contenido.startswith(("text/csv", "application/csv")):
+            trabajos = [(leer_insumos(io.BytesIO(cuerpo), "insumos.csv"), parametros_consulta, 0)]
+        else:
+            try:
+                datos = json.loads(cuerpo)
+            except ValueError as e:
+                return _error(HTTPStatus.BAD_REQUEST, f"JSON no válido: {e}")
+            trabajos = [
+                (df, dict(parametros_consulta, **(parametros or {})), identificador)
+                for df, parametros, identificador in trabajos_desde_json(datos)
+            ]
+        resultados = evaluar_lote(trabajos)
+        return HTTPStatus.OK, FORMATOS_SALIDA[formato], serializar_resultados(resultados, formato, detalle)
+    except ValueError as e:
+        return _error(HTTPStatus.BAD_REQUEST, str(e))
+    except ImportError as e:
+        return _error(HTTPStatus.NOT_IMPLEMENTED, str(e))
+
+
+def _calentar_proceso():
+    # Importa el motor y recorre una vez el camino completo para que la primera petición no lo pague
+    procesar_peticion(json.dumps({"insumos": [{"Volumen": 1, "TS": 10, "SV": 80, "Potencial": 300, "%CH4": 55}]}).encode(), "application/json", {})
+    return True
+
+
+# --- SERVIDOR ---
+class ServidorAPI:
+    """Servidor HTTP/1.1 con conexiones persistentes y un pool de `procesos` procesos de cálculo.
+
+    Con `procesos=0` se calcula en el hilo por defecto del bucle (útil para depurar, sin paralelismo).
+    """
+
+    def __init__(self, host="127.0.0.1", puerto=8765, procesos=None, max_cuerpo=MAX_CUERPO_DEFECTO, max_pendientes=None):
+        self.host = host
+        self.puerto = puerto
+        self.procesos = procesos_disponibles() if procesos is None else procesos
+        self.max_cuerpo = max_cuerpo
+        self.max_pendientes = max_pendientes or MAX_PENDIENTES_POR_PROCESO * max(1, self.procesos)
+        self.pendientes = 0
+        self.atendidas = 0
+        self._pool = None
+        self._servidor = None
+        self._inicio = None
+
+    async def iniciar(self):
+        """Arranca el pool (con los procesos ya calentados) y abre el puerto; devuelve el puerto real."""
+        loop = asyncio.get_running_loop()
+        if self.procesos > 0:
+            # 'spawn': los procesos no heredan el estado del bucle de eventos ni de sus hilos
+            self._pool = ProcessPoolExecutor(max_workers=self.procesos, mp_context=multiprocessing.get_context("spawn"))
+            await asyncio.gather(*(loop.run_in_executor(self._pool, _calentar_proceso) for _ in range(self.procesos)))
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto, limit=64 * 1024)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        self._inicio = time.monotonic()
+        return self.puerto
+
+    async def servir(self):
+        if self._servidor is None:
+            await self.iniciar()
+        try:
+            async with self._servidor:
+                await self._servidor.serve_forever()
+        finally:
+            self.cerrar()
+
+    def cerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _atender(self, lector, escritor):
+        try:
+            while True:
+                try:
+                    linea = await asyncio.wait_for(lector.readline(), TIEMPO_ESPERA_CABECERAS)
+                except asyncio.TimeoutError:
+                    break
+                if not linea.strip():
+                    break
+                mantener = await self._atender_peticion(linea, lector, escritor)
+                await escritor.drain()
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _atender_peticion(self, linea, lector, escritor):
+        partes = linea.decode("latin-1").split()
+        if len(partes) != 3:
+            self._responder(escritor, *_error(HTTPStatus.BAD_REQUEST, "Línea de petición mal formada."), mantener=False)
+            return False
+        metodo, destino, version = partes
+        cabeceras = {}
+        while True:
+            linea = await lector.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        conexion = cabeceras.get("connection", "").lower()
+        mantener = conexion != "close" if version == "HTTP/1.1" else conexion == "keep-alive"
+
+        if "chunked" in cabeceras.get("transfer-encoding", "").lower():
+            self._responder(escritor, *_error(HTTPStatus.LENGTH_REQUIRED, "Envíe el cuerpo con Content-Length."), mantener=False)
+            return False
+        longitud = cabeceras.get("content-length", "0") or "0"
+        if not longitud.isdecimal():  # No numérica o negativa
+            self._responder(escritor, *_error(HTTPStatus.BAD_REQUEST, f"Content-Length no válido: {longitud!r}."), mantener=False)
+            return False
+        longitud = int(longitud)
+        if longitud > self.max_cuerpo:
+            self._responder(escritor, *_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Cuerpo mayor de {self.max_cuerpo} bytes."), mantener=False)
+            return False
+        cuerpo = await lector.readexactly(longitud) if longitud else b""
+
+        url = urlsplit(destino)
+        consulta = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        estado, tipo, datos = await self._despachar(metodo, url.path.rstrip("/") or "/", cabeceras, cuerpo, consulta)
+        self.atendidas += 1
+        self._responder(escritor, estado, tipo, datos, mantener)
+        return mantener
+
+    async def _despachar(self, metodo, ruta, cabeceras, cuerpo, consulta):
+        if ruta == "/salud":
+            if metodo != "GET":
+                return _error(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET.")
+            return HTTPStatus.OK, FORMATOS_SALIDA["json"], json.dumps({
+                "estado": "ok", "procesos": self.procesos, "pendientes": self.pendientes,
+                "atendidas": self.atendidas, "segundos_activo": round(time.monotonic() - self._inicio, 1),
+            }).encode("utf-8")
+        if ruta == "/v1/parametros":
+            if metodo != "GET":
+                return _error(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET.")
+            return HTTPStatus.OK, FORMATOS_SALIDA["json"], json.dumps(
+                {"parametros": PARAMETROS_DEFECTO, "formatos": list(FORMATOS_SALIDA)}, ensure_ascii=False).encode("utf-8")
+        if ruta == "/v1/calcular":
+            if metodo != "POST":
+                return _error(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST.")
+            if self.pendientes >= self.max_pendientes:
+                return _error(HTTPStatus.SERVICE_UNAVAILABLE, "Servidor saturado; reintente en unos segundos.")
+            self.pendientes += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pool, procesar_peticion, cuerpo, cabeceras.get("content-type", "application/json"), consulta)
+            except Exception as e:  # Fallo inesperado del cálculo o del pool: se informa sin cerrar el servidor
+                return _error(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+            finally:
+                self.pendientes -= 1
+        return _error(HTTPStatus.NOT_FOUND, f"Ruta desconocida: {ruta}")
+
+    @staticmethod
+    def _responder(escritor, estado, tipo, datos, mantener):
+        estado = HTTPStatus(estado)
+        cabecera = (
+            f"HTTP/1.1 {estado.value} {estado.phrase}\r\n"
+            f"Content-Type: {tipo}\r\n"
+            f"Content-Length: {len(datos)}\r\n"
+            f"Connection: {'keep-alive' if mantener else 'close'}\r\n"
+        )
+        if estado == HTTPStatus.SERVICE_UNAVAILABLE:
+            cabecera += "Retry-After: 1\r\n"
+        escritor.write(cabecera.encode("latin-1") + b"\r\n" + datos)
+
+
+def servir(host="127.0.0.1", puerto=8765, procesos=None, max_cuerpo=MAX_CUERPO_DEFECTO, al_iniciar=None):
+    """Arranca el servidor y bloquea hasta Ctrl+C o SIGTERM. `al_iniciar(servidor)` se llama con el puerto ya abierto."""
+    async def principal():
+        servidor = ServidorAPI(host, puerto, procesos, max_cuerpo)
+        # SIGTERM cierra el pool de forma ordenada; si no, sus procesos quedarían huérfanos
+        tarea = asyncio.current_task()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, tarea.cancel)
+        except (NotImplementedError, AttributeError):  # Windows
+            pass
+        await servidor.iniciar()
+        if al_iniciar is not None:
+            al_iniciar(servidor)
+        await servidor.servir()
+    try:
+        asyncio.run(principal())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
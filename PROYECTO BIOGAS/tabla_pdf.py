@@ -0,0 +1,135 @@
+# tabla_pdf.py
+# Renderizado de tablas en PDF (fpdf2) con formato vectorizado, altura de fila calculada una sola vez
+# y paginación con cabecera repetida.
+
+import numpy as np
+import pandas as pd
+from fpdf.enums import XPos, YPos
+
+
+def formatear_columnas(df, columnas, decimales=2):
+    """Devuelve {columna: ndarray de str}: flotantes con `decimales`, el resto con str()."""
+    formateadas = {}
+    for col in columnas:
+        serie = df[col]
+        if pd.api.types.is_float_dtype(serie):
+            formateadas[col] = np.char.mod(f"%.{decimales}f", serie.to_numpy(dtype=float))
+        else:
+            formateadas[col] = serie.astype(str).to_numpy(dtype=object)
+    return formateadas
+
+
+def anchos_columnas(pdf, columnas, anchos_config, ancho_defecto=20, ocupacion_minima=0.95):
+    """Anchos (mm) por columna ajustados al ancho útil de la página."""
+    page_width = pdf.w - pdf.l_margin - pdf.r_margin
+    defined_widths_sum = sum(anchos_config.get(col, 0) for col in columnas if col in anchos_config)
+    num_undefined_cols = len([col for col in columnas if col not in anchos_config])
+    remaining_width = page_width - defined_widths_sum
+    default_width_for_undefined = (remaining_width / num_undefined_cols) if num_undefined_cols > 0 else ancho_defecto
+    anchos = {col: anchos_config.get(col, default_width_for_undefined) for col in columnas}
+    total = sum(anchos.values())
+    if total > page_width:
+        anchos = {col: w * page_width / total for col, w in anchos.items()}
+    elif 0 < total < page_width * ocupacion_minima:
+        anchos = {col: w * page_width * ocupacion_minima / total for col, w in anchos.items()}
+    return anchos
+
+
+class TablaPDF:
+    """Dibuja un DataFrame como tabla con bordes sobre un documento FPDF ya abierto.
+
+    El texto de cada celda se escribe con `text` (sin el coste de `cell`/`multi_cell` por celda) y
+    la rejilla se traza con una línea por fila y las verticales una vez por página. Solo las celdas
+    que no caben en su ancho se parten en líneas, una vez y con memoria por texto repetido.
+    """
+
+    def __init__(self, pdf, columnas, anchos, fuente="Arial", tamano_fuente=7, alto_cabecera=8,
+                 interlineado=1.2, decimales=2):
+        self.pdf = pdf
+        self.columnas = list(columnas)
+        self.anchos = [anchos[col] for col in self.columnas]
+        self.fuente = fuente
+        self.tamano_fuente = tamano_fuente
+        self.alto_cabecera = alto_cabecera
+        self.interlineado = interlineado
+        self.decimales = decimales
+
+    def _dibujar_cabecera(self):
+        pdf = self.pdf
+        pdf.set_font(self.fuente, 'B', self.tamano_fuente)
+        header_y = pdf.get_y()
+        for col, ancho in zip(self.columnas, self.anchos):
+            pdf.multi_cell(ancho, self.alto_cabecera, col, border=1, align='C', new_x=XPos.RIGHT, new_y=YPos.TOP,
+                           max_line_height=pdf.font_size * self.interlineado)
+        pdf.set_xy(pdf.l_margin, header_y + self.alto_cabecera)
+        pdf.set_font(self.fuente, '', self.tamano_fuente)
+        return header_y + self.alto_cabecera
+
+    def _partir_celdas(self, textos, n_filas):
+        """Devuelve ({(fila, columna): [líneas]} de las celdas que no caben, nº de líneas por fila)."""
+        pdf = self.pdf
+        partidas = {}
+        lineas_fila = np.ones(n_filas, dtype=np.int32)
+        # Cota superior del ancho de un carácter: los textos más cortos que util / ancho_max caben seguro
+        ancho_max_caracter = max(pdf.get_string_width(c) for c in "@WM")
+        for j, (col, ancho) in enumerate(zip(self.columnas, self.anchos)):
+            util = ancho - 2 * pdf.c_margin
+            valores = textos[col]
+            longitudes = np.fromiter((len(v) for v in valores), dtype=np.int64, count=n_filas)
+            memoria = {}
+            for i in np.flatnonzero(longitudes * ancho_max_caracter > util).tolist():
+                texto = valores[i]
+                if texto not in memoria:
+                    memoria[texto] = (pdf.multi_cell(ancho, 1, texto, dry_run=True, output="LINES")
+                                      if pdf.get_string_width(texto) > util else None)
+                if memoria[texto] is not None:
+                    partidas[i, j] = memoria[texto]
+                    lineas_fila[i] = max(lineas_fila[i], len(memoria[texto]))
+        return partidas, lineas_fila
+
+    def dibujar(self, df):
+        pdf = self.pdf
+        pdf.set_font(self.fuente, '', self.tamano_fuente)
+        alto_linea = pdf.font_size * self.interlineado
+        textos = formatear_columnas(df, self.columnas, self.decimales)
+        partidas, lineas_fila = self._partir_celdas(textos, len(df))
+        alturas = (lineas_fila * alto_linea).tolist()
+
+        x_bordes = (pdf.l_margin + np.concatenate([[0.0], np.cumsum(self.anchos)])).tolist()
+        x_textos = [x + pdf.c_margin for x in x_bordes[:-1]]
+        # Línea base del texto dentro de una franja de altura alto_linea (mismo criterio que fpdf.cell)
+        base = 0.5 * alto_linea + 0.3 * pdf.font_size
+        columnas_texto = [textos[col] for col in self.columnas]
+        limite = pdf.h - pdf.b_margin
+
+        def cerrar_pagina(y_inicio, y_fin):
+            for x in x_bordes:
+                pdf.line(x, y_inicio, x, y_fin)
+
+        auto_salto, margen_salto = pdf.auto_page_break, pdf.b_margin
+        pdf.set_auto_page_break(False)  # La paginación la controla la tabla para repetir la cabecera
+        try:
+            y_inicio = y = self._dibujar_cabecera()
+            for i, alto_fila in enumerate(alturas):
+                if y + alto_fila > limite:
+                    cerrar_pagina(y_inicio, y)
+                    pdf.add_page()
+                    y_inicio = y = self._dibujar_cabecera()
+                if lineas_fila[i] == 1:
+                    for x, valores in zip(x_textos, columnas_texto):
+                        pdf.text(x, y + base, valores[i])
+                else:
+                    centrado = 0.5 * (alto_fila - alto_linea)
+                    for j, (x, valores) in enumerate(zip(x_textos, columnas_texto)):
+                        lineas = partidas.get((i, j))
+                        if lineas is None:
+                            pdf.text(x, y + centrado + base, valores[i])
+                        else:
+                            for k, linea in enumerate(lineas):
+                                pdf.text(x, y + k * alto_linea + base, linea)
+                y += alto_fila
+                pdf.line(x_bordes[0], y, x_bordes[-1], y)
+            cerrar_pagina(y_inicio, y)
+            pdf.set_xy(pdf.l_margin, y)
+        finally:
+            pdf.set_auto_page_break(auto_salto, margen_salto)
@@ -0,0 +1,107 @@
+# visualizacion.py
+# Reducción de datos antes de graficar: agregación de la tabla de producción (top-N + "Otros") y
+# submuestreo de series temporales (LTTB o mínimo/máximo por cubeta). Así el tamaño de la figura que
+# se envía al navegador está acotado aunque la tabla o la serie tengan millones de filas.
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_GRAFICO_PRODUCCION = ["Biogás Bruto (m3/año)", "Biometano útil (m3/año)", "Biometano final (m3/año)"]
+AGRUPACIONES = {
+    "Nombre": "Insumo",
+    "Categoría": "Categoría de insumo",
+    "Residuo ganadero": "Residuo ganadero (Sí/No)",
+}
+ETIQUETA_OTROS = "Otros"
+PUNTOS_MAXIMOS_SERIE = 2000
+
+
+# --- AGREGACIÓN DE LA TABLA DE PRODUCCIÓN ---
+def categorias_insumos(df_resultados):
+    """Columna 'Categoría' si existe; si no, el nombre del insumo sin la descripción entre paréntesis
+    ni la numeración final ('Purín porcino 12' -> 'Purín porcino')."""
+    if "Categoría" in df_resultados.columns:
+        return df_resultados["Categoría"].astype(str)
+    nombres = df_resultados["Nombre"].astype(str).str.split("(", n=1).str[0]
+    return nombres.str.replace(r"\s*\d+\s*$", "", regex=True).str.strip()
+
+
+def agregar_produccion(df_resultados, agrupar_por="Nombre", top_n=20, columnas=COLUMNAS_GRAFICO_PRODUCCION,
+                       ordenar_por="Biometano final (m3/año)"):
+    """Suma la producción por grupo y deja los `top_n` mayores; el resto se acumula en 'Otros'.
+
+    Devuelve un DataFrame con la columna 'Grupo', las `columnas` sumadas y 'Insumos' (nº de filas
+    agregadas en cada grupo), ordenado de mayor a menor.
+    """
+    if agrupar_por not in AGRUPACIONES:
+        raise ValueError(f"Agrupación desconocida: {agrupar_por}. Use: {', '.join(AGRUPACIONES)}")
+    claves = categorias_insumos(df_resultados) if agrupar_por == "Categoría" else df_resultados[agrupar_por].astype(str)
+    valores = df_resultados[columnas].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    agregado = valores.groupby(claves.to_numpy(), sort=False, observed=True).sum()
+    agregado["Insumos"] = claves.value_counts(sort=False).reindex(agregado.index).to_numpy()
+    agregado = agregado.sort_values(ordenar_por, ascending=False)
+    if len(agregado) > top_n:
+        resto = agregado.iloc[top_n:]
+        otros = resto.sum().to_frame().T
+        otros.index = [f"{ETIQUETA_OTROS} ({len(resto)} grupos)"]
+        agregado = pd.concat([agregado.iloc[:top_n], otros])
+    agregado["Insumos"] = agregado["Insumos"].astype(int)
+    return agregado.rename_axis("Grupo").reset_index()
+
+
+# --- SUBMUESTREO DE SERIES ---
+def _como_numeros(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def indices_lttb(x, y, n_max):
+    """Índices elegidos por Largest-Triangle-Three-Buckets (conserva la forma visual de la serie)."""
+    n = len(y)
+    if n <= n_max or n_max < 3:
+        return np.arange(n)
+    x = _como_numeros(x)
+    y = np.asarray(y, dtype=float)
+    bordes = np.linspace(1, n - 1, n_max - 1).astype(np.int64)  # n_max - 2 cubetas entre el primero y el último
+    seleccion = np.empty(n_max, dtype=np.int64)
+    seleccion[0], seleccion[-1] = 0, n - 1
+    anterior = 0
+    for i in range(n_max - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        fin_siguiente = bordes[i + 2] if i + 2 < len(bordes) else n
+        x_medio = x[fin:fin_siguiente].mean()
+        with np.errstate(invalid="ignore"):
+            y_medio = np.nanmean(y[fin:fin_siguiente]) if np.isfinite(y[fin:fin_siguiente]).any() else 0.0
+        areas = np.abs((x[anterior] - x_medio) * (y[inicio:fin] - y[anterior]) - (x[anterior] - x[inicio:fin]) * (y_medio - y[anterior]))
+        anterior = inicio + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        seleccion[i + 1] = anterior
+    return seleccion
+
+
+def indices_minmax(y, n_max):
+    """Índices del mínimo y el máximo de cada cubeta (conserva los picos), totalmente vectorizado."""
+    n = len(y)
+    if n <= n_max or n_max < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    n_cubetas = n_max // 2
+    tamano = -(-n // n_cubetas)
+    relleno = tamano * n_cubetas - n
+    y_min = np.concatenate([np.where(np.isnan(y), np.inf, y), np.full(relleno, np.inf)]).reshape(n_cubetas, tamano)
+    y_max = np.concatenate([np.where(np.isnan(y), -np.inf, y), np.full(relleno, -np.inf)]).reshape(n_cubetas, tamano)
+    base = np.arange(n_cubetas) * tamano
+    indices = np.concatenate([base + y_min.argmin(axis=1), base + y_max.argmax(axis=1)])
+    return np.unique(indices[indices < n])
+
+
+def reducir_serie(x, y, n_max=PUNTOS_MAXIMOS_SERIE, metodo="lttb"):
+    """Devuelve (x, y) con como mucho `n_max` puntos."""
+    if metodo == "lttb":
+        indices = indices_lttb(x, y, n_max)
+    elif metodo == "minmax":
+        indices = indices_minmax(y, n_max)
+    else:
+        raise ValueError(f"Método de submuestreo desconocido: {metodo}")
+    return np.asarray(x)[indices], np.asarray(y)[indices]
@@ -0,0 +1,120 @@
+# benchmarks/bench_api.py
+# Rendimiento de la API HTTP local (servidor_api.py): peticiones por segundo y latencias con N clientes
+# concurrentes sobre conexiones persistentes. El servidor se arranca en un proceso aparte, como en producción.
+#
+# Uso:  python benchmarks/bench_api.py [--procesos 4] [--clientes 32] [--peticiones 2000]
+#                                      [--filas 10] [--trabajos 1] [--formato json] [--json salida.json]
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+CARPETA_APP = os.path.join(DIRECTORIO, "..", "PROYECTO BIOGAS")
+sys.path.insert(0, CARPETA_APP)
+
+from bench_suite import insumos_sinteticos  # noqa: E402
+
+
+def cuerpo_peticion(n_filas, n_trabajos):
+    trabajos = [
+        {"id": i, "insumos": insumos_sinteticos(n_filas, semilla=i).to_dict("records"), "parametros": {"recirculacion_fraccion": 0.3}}
+        for i in range(n_trabajos)
+    ]
+    return json.dumps({"trabajos": trabajos}, ensure_ascii=False).encode("utf-8")
+
+
+def arrancar_servidor(procesos):
+    """Lanza `linea_comandos.py servir` en un puerto libre y espera a que anuncie el puerto."""
+    proceso = subprocess.Popen(
+        [sys.executable, "linea_comandos.py", "servir", "--puerto", "0", "--procesos", str(procesos)],
+        cwd=CARPETA_APP, stderr=subprocess.PIPE, text=True,
+    )
+    linea = proceso.stderr.readline()
+    if "http://" not in linea:
+        proceso.kill()
+        raise RuntimeError(f"El servidor no arrancó: {linea}{proceso.stderr.read()}")
+    puerto = int(linea.split("http://", 1)[1].split()[0].rsplit(":", 1)[1])
+    return proceso, puerto
+
+
+async def cliente(puerto, peticion, cantidad, latencias, errores):
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    try:
+        for _ in range(cantidad):
+            inicio = time.perf_counter()
+            escritor.write(peticion)
+            await escritor.drain()
+            estado = int((await lector.readline()).split()[1])
+            longitud = 0
+            while True:
+                linea = await lector.readline()
+                if linea == b"\r\n":
+                    break
+                if linea.lower().startswith(b"content-length:"):
+                    longitud = int(linea.split(b":", 1)[1])
+            await lector.readexactly(longitud)
+            latencias.append(time.perf_counter() - inicio)
+            if estado != 200:
+                errores.append(estado)
+    finally:
+        escritor.close()
+
+
+async def carga(puerto, cuerpo, formato, clientes, peticiones):
+    peticion = (
+        f"POST /v1/calcular?formato={formato} HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(cuerpo)}\r\n\r\n"
+    ).encode("latin-1") + cuerpo
+    latencias, errores = [], []
+    por_cliente = [peticiones // clientes + (1 if i < peticiones % clientes else 0) for i in range(clientes)]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(puerto, peticion, n, latencias, errores) for n in por_cliente if n))
+    duracion = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "peticiones": len(latencias),
+        "errores": len(errores),
+        "segundos": duracion,
+        "peticiones_por_segundo": len(latencias) / duracion,
+        "latencia_p50_ms": 1000 * statistics.median(latencias),
+        "latencia_p99_ms": 1000 * latencias[min(len(latencias) - 1, int(0.99 * len(latencias)))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peticiones por segundo de la API HTTP de cálculo por lotes.")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Procesos de cálculo del servidor")
+    parser.add_argument("--clientes", type=int, default=32, help="Conexiones concurrentes")
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--filas", type=int, default=10, help="Insumos por trabajo")
+    parser.add_argument("--trabajos", type=int, default=1, help="Trabajos por petición")
+    parser.add_argument("--formato", default="json", choices=["json", "csv", "parquet"])
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    args = parser.parse_args()
+
+    cuerpo = cuerpo_peticion(args.filas, args.trabajos)
+    proceso, puerto = arrancar_servidor(args.procesos)
+    try:
+        asyncio.run(carga(puerto, cuerpo, args.formato, args.clientes, min(args.peticiones, 50)))  # Calentamiento
+        resultado = asyncio.run(carga(puerto, cuerpo, args.formato, args.clientes, args.peticiones))
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+    resultado.update(vars(args), bytes_peticion=len(cuerpo))
+    print(f"{resultado['peticiones']} peticiones ({resultado['errores']} con error) en {resultado['segundos']:.2f} s: "
+          f"{resultado['peticiones_por_segundo']:.0f} pet/s, p50 {resultado['latencia_p50_ms']:.1f} ms, "
+          f"p99 {resultado['latencia_p99_ms']:.1f} ms  [{args.procesos} procesos, {args.clientes} clientes, "
+          f"{args.trabajos} trabajo(s) x {args.filas} insumos, {args.formato}]")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/bench_arranque.py
+# Coste de arranque y de rerun de las páginas de Streamlit (sin navegador, con streamlit.testing.AppTest).
+#
+# Para cada página, en un proceso Python nuevo:
+#   - primer_render:    primera ejecución del script (incluye importar sus dependencias)
+#   - rerun_mediana:    mediana de las siguientes ejecuciones sin interacción (coste por rerun)
+#   - primer_resultado: primera pulsación del botón de cálculo (importa gráficos/exportación si hace falta)
+# Con --precarga se ejecuta antes la página de inicio y se espera a que termine su precarga.
+#
+# Uso:  python benchmarks/bench_arranque.py [--reruns 10] [--ref <commit>] [--json salida.json]
+# Con --ref se mide también la aplicación tal como estaba en ese commit (git archive), para comparar
+# antes/después en la misma máquina.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import io
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+RAIZ_REPO = os.path.abspath(os.path.join(DIRECTORIO, ".."))
+CARPETA_APP = "PROYECTO BIOGAS"
+
+# (script relativo a la carpeta de la aplicación, selector del botón de cálculo)
+PAGINAS = [
+    ("app_principal.py", None),
+    ("pages/1_Produccion_Biogas.py", "boton:0"),
+    ("pages/2_Balance_de_Aguas.py", "clave:wb_calc_balance_button"),
+    ("pages/3_Series_Temporales.py", None),
+    ("pages/4_Escenarios.py", None),
+]
+
+# Se ejecuta en un proceso nuevo para que ningún módulo esté ya importado
+CODIGO_MEDICION = r"""
+import json, os, statistics, sys, time
+directorio_app, script, boton, reruns, precarga = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5] == "1"
+sys.path.insert(0, directorio_app)
+from streamlit.testing.v1 import AppTest
+resultado = {}
+if precarga:
+    AppTest.from_file(os.path.join(directorio_app, "app_principal.py"), default_timeout=120).run()
+    import precarga as modulo_precarga
+    inicio = time.perf_counter()
+    modulo_precarga.precargar().join()
+    resultado["espera_precarga"] = time.perf_counter() - inicio
+at = AppTest.from_file(os.path.join(directorio_app, script), default_timeout=300)
+inicio = time.perf_counter(); at.run(); resultado["primer_render"] = time.perf_counter() - inicio
+tiempos = []
+for _ in range(reruns):
+    inicio = time.perf_counter(); at.run(); tiempos.append(time.perf_counter() - inicio)
+resultado["rerun_mediana"] = statistics.median(tiempos) if tiempos else None
+if boton != "-":
+    tipo, valor = boton.split(":", 1)
+    widget = at.button[int(valor)] if tipo == "boton" else at.button(key=valor)
+    inicio = time.perf_counter(); widget.click().run(); resultado["primer_resultado"] = time.perf_counter() - inicio
+    inicio = time.perf_counter(); at.run(); resultado["rerun_con_resultados"] = time.perf_counter() - inicio
+resultado["excepciones"] = [str(e.value) for e in at.exception]
+print("RESULTADO" + json.dumps(resultado))
+"""
+
+
+def extraer_version(ref, destino):
+    """Extrae la carpeta de la aplicación tal como estaba en `ref` (sin tocar el árbol de trabajo)."""
+    archivo = subprocess.run(["git", "archive", "--format=tar", ref, CARPETA_APP], cwd=RAIZ_REPO, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archivo)) as tar:
+        tar.extractall(destino)
+    return os.path.join(destino, CARPETA_APP)
+
+
+def medir_pagina(directorio_app, script, boton, reruns, precarga):
+    if not os.path.exists(os.path.join(directorio_app, script)):
+        return None
+    if precarga and not os.path.exists(os.path.join(directorio_app, "precarga.py")):
+        return None
+    salida = subprocess.run(
+        [sys.executable, "-c", CODIGO_MEDICION, directorio_app, script, boton or "-", str(reruns), "1" if precarga else "0"],
+        capture_output=True, text=True, env=dict(os.environ, MPLBACKEND="Agg"),
+    )
+    for linea in salida.stdout.splitlines():
+        if linea.startswith("RESULTADO"):
+            return json.loads(linea[len("RESULTADO"):])
+    raise RuntimeError(f"Fallo al medir {script}:\n{salida.stderr[-2000:]}")
+
+
+def medir_version(directorio_app, reruns, repeticiones, precarga):
+    """Mediana de `repeticiones` procesos nuevos por página."""
+    resultados = {}
+    for script, boton in PAGINAS:
+        if precarga and script == "app_principal.py":
+            continue
+        medidas = [m for m in (medir_pagina(directorio_app, script, boton, reruns, precarga) for _ in range(repeticiones)) if m]
+        if not medidas:
+            continue
+        resultados[script] = {
+            clave: statistics.median(m[clave] for m in medidas)
+            for clave in medidas[0] if clave != "excepciones" and medidas[0][clave] is not None
+        }
+        resultados[script]["excepciones"] = medidas[0]["excepciones"]
+    return resultados
+
+
+def imprimir(titulo, resultados):
+    print(f"\n{titulo}")
+    print(f"{'página':<32} {'1er render s':>13} {'rerun s':>9} {'1er resultado s':>16} {'rerun c/res s':>14}")
+    for script, r in resultados.items():
+        celdas = [f"{r[c]:.3f}" if c in r else "-" for c in ("primer_render", "rerun_mediana", "primer_resultado", "rerun_con_resultados")]
+        print(f"{script:<32} {celdas[0]:>13} {celdas[1]:>9} {celdas[2]:>16} {celdas[3]:>14}")
+        if r["excepciones"]:
+            print(f"    excepciones: {r['excepciones']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de primer render y de rerun de las páginas de Streamlit.")
+    parser.add_argument("--reruns", type=int, default=10, help="Reruns sin interacción por página")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Procesos nuevos por página (se toma la mediana)")
+    parser.add_argument("--ref", help="Commit de referencia a medir también (p. ej. el anterior a la optimización)")
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    args = parser.parse_args()
+
+    datos = {}
+    directorio_actual = os.path.join(RAIZ_REPO, CARPETA_APP)
+    datos["actual"] = medir_version(directorio_actual, args.reruns, args.repeticiones, precarga=False)
+    imprimir("Versión actual (proceso nuevo por página)", datos["actual"])
+    datos["actual_con_precarga"] = medir_version(directorio_actual, args.reruns, args.repeticiones, precarga=True)
+    if datos["actual_con_precarga"]:
+        imprimir("Versión actual tras la precarga de la página de inicio", datos["actual_con_precarga"])
+    if args.ref:
+        with tempfile.TemporaryDirectory(prefix="bench_arranque_") as temporal:
+            datos["referencia"] = medir_version(extraer_version(args.ref, temporal), args.reruns, args.repeticiones, precarga=False)
+        imprimir(f"Referencia {args.ref} (proceso nuevo por página)", datos["referencia"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# benchmarks/bench_cartera.py
+# Modo cartera (cartera_plantas.py): sitios por segundo en serie y con varios procesos, memoria máxima del
+# proceso principal (tracemalloc) y tamaño de las tablas de producción guardadas en el almacén en columnas
+# frente al de los DataFrames completos que devolvería servicio_calculo.evaluar_lote.
+#
+# Uso:  python benchmarks/bench_cartera.py [--sitios 100 500] [--insumos 30] [--procesos 1 4]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, "..", "PROYECTO BIOGAS"))
+
+from bench_suite import insumos_sinteticos  # noqa: E402
+from cartera_plantas import cartera_sintetica, evaluar_cartera  # noqa: E402
+from importacion_insumos import normalizar_insumos  # noqa: E402
+from servicio_calculo import evaluar_lote  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sitios por segundo y memoria del modo cartera.")
+    parser.add_argument("--sitios", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--insumos", type=int, default=30, help="Insumos de la tabla base de cada sitio")
+    parser.add_argument("--procesos", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    df_base = normalizar_insumos(insumos_sinteticos(args.insumos, semilla=0))
+    print(f"{'sitios':>7} {'procesos':>9} {'segundos':>9} {'sitios/s':>9} {'pico (MB)':>10} {'tablas (MB)':>12} {'DataFrames (MB)':>16}")
+    for n_sitios in args.sitios:
+        trabajos = cartera_sintetica(df_base, n_sitios, semilla=0)
+        completos = evaluar_lote(trabajos)
+        mb_completos = sum(r["produccion"].memory_usage(deep=True).sum() for r in completos) / 1e6
+        del completos
+        for procesos in args.procesos:
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            resultados = evaluar_cartera(trabajos, procesos=procesos)
+            segundos = time.perf_counter() - inicio
+            pico = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            print(f"{n_sitios:>7} {procesos:>9} {segundos:>9.2f} {n_sitios / segundos:>9.1f} {pico:>10.1f} "
+                  f"{resultados.bytes_tablas / 1e6:>12.2f} {mb_completos:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
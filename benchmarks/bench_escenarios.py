@@ -0,0 +1,77 @@
+# benchmarks/bench_escenarios.py
+# Rendimiento del almacén de escenarios (almacen_escenarios.py) con miles de escenarios históricos:
+# escritura, detección de escenarios repetidos, listado con métricas, comparación de métricas y de tablas.
+#
+# Uso:  python benchmarks/bench_escenarios.py [--escenarios 5000] [--insumos 200] [--sitios 20] [--ruta /tmp/escenarios.sqlite]
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, "..", "PROYECTO BIOGAS"))
+
+from almacen_escenarios import AlmacenEscenarios, guardar_balance, guardar_produccion  # noqa: E402
+from bench_suite import insumos_sinteticos, parametros_balance  # noqa: E402
+from cache_resultados import huella  # noqa: E402
+from motor_balance import resolver_recirculacion  # noqa: E402
+from motor_produccion import calcular_produccion, totales_diarios  # noqa: E402
+
+
+def cronometrar(etiqueta, funcion, repeticiones=1):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    segundos = (time.perf_counter() - inicio) / repeticiones
+    print(f"{etiqueta:<52} {segundos * 1000:>10.2f} ms")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escritura, búsqueda y comparación de escenarios guardados.")
+    parser.add_argument("--escenarios", type=int, default=5000, help="Escenarios de producción (y otros tantos de balance)")
+    parser.add_argument("--insumos", type=int, default=200, help="Filas de la tabla de producción de cada escenario")
+    parser.add_argument("--sitios", type=int, default=20)
+    parser.add_argument("--ruta", help="Archivo SQLite (por defecto, uno temporal que se borra al terminar)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_escenarios_") as temporal:
+        almacen = AlmacenEscenarios(args.ruta or os.path.join(temporal, "escenarios.sqlite"))
+        base = calcular_produccion(insumos_sinteticos(args.insumos, semilla=0))
+        hoy = datetime.date.today()
+
+        inicio = time.perf_counter()
+        for i in range(args.escenarios):
+            # Cada escenario escala los volúmenes: tablas distintas con la misma estructura
+            df = base.assign(**{"Volumen (t/año)": base["Volumen (t/año)"] * (1 + i / args.escenarios)})
+            df = calcular_produccion(df)
+            sitio, fecha = f"Planta {i % args.sitios}", (hoy - datetime.timedelta(days=i % 730)).isoformat()
+            guardar_produccion(almacen, huella(df), df, sitio, fecha)
+            parametros = parametros_balance(totales_diarios(df))
+            guardar_balance(almacen, huella(parametros), parametros, resolver_recirculacion(**parametros), sitio, fecha)
+        escritura = time.perf_counter() - inicio
+        print(f"{'escritura (producción + balance, por escenario)':<52} {escritura / args.escenarios * 1000:>10.2f} ms")
+        tamano = os.path.getsize(almacen.ruta) / 1e6
+        print(f"{'tamaño del archivo':<52} {tamano:>10.1f} MB")
+
+        clave = huella(base)
+        cronometrar("detección de escenario repetido (existe)", lambda: almacen.existe(clave), repeticiones=1000)
+        metricas = ["biometano_final_m3_ano", "total_biogas_bruto_m3_dia", "total_agua_entrante_m3_dia", "balance_hidrico_m3_dia"]
+        todos = cronometrar(f"listar {2 * args.escenarios} escenarios con {len(metricas)} métricas", lambda: almacen.listar(metricas=metricas))
+        cronometrar("listar un sitio en un rango de 30 días", lambda: almacen.listar(
+            sitio="Planta 3", desde=(hoy - datetime.timedelta(days=30)).isoformat(), metricas=metricas), repeticiones=20)
+        producciones = todos.loc[todos["tipo"] == "produccion", "id"].to_numpy()
+        balances = todos.loc[todos["tipo"] == "balance", "id"].to_numpy()
+        cronometrar("diferencias de métricas (balance)", lambda: almacen.diferencias(balances[0], balances[-1]), repeticiones=100)
+        cronometrar("diferencias de parámetros (balance)", lambda: almacen.diferencias_parametros(balances[0], balances[-1]), repeticiones=100)
+        cronometrar("diferencias de tabla (2 columnas de producción)", lambda: almacen.diferencias_tabla(
+            producciones[0], producciones[-1], "produccion", "Nombre", ["Biogás Bruto (m3/año)", "Biometano final (m3/año)"]), repeticiones=20)
+        cronometrar("cargar tabla de producción completa", lambda: almacen.cargar_tabla(almacen.huella_escenario(producciones[0]), "produccion"), repeticiones=20)
+        almacen.cerrar()
+
+
+if __name__ == "__main__":
+    main()
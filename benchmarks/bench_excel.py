@@ -0,0 +1,95 @@
+# benchmarks/bench_excel.py
+# Exportación a Excel de tablas de producción grandes: filas por segundo y pico de memoria (RSS) de la
+# escritura en flujo (libro_excel.LibroExcel, hojas write-only de openpyxl) frente a lo que hacían las
+# páginas antes (DataFrame.to_excel con pd.ExcelWriter y los motores xlsxwriter u openpyxl).
+# Cada medida se hace en un proceso nuevo para que el pico de RSS de una no contamine la siguiente.
+#
+# Uso:  python benchmarks/bench_excel.py [--filas 20000 100000] [--metodos libro pandas_openpyxl ...]
+
+import argparse
+import gc
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, "..", "PROYECTO BIOGAS"))
+
+import pandas as pd  # noqa: E402
+
+from bench_suite import COLUMNAS_TABLA, insumos_sinteticos  # noqa: E402
+from exportacion import exportar_excel_produccion  # noqa: E402
+from libro_excel import LibroExcel  # noqa: E402
+from motor_produccion import calcular_produccion  # noqa: E402
+
+
+def _pandas(motor):
+    def escribir(df, ruta):
+        with pd.ExcelWriter(ruta, engine=motor) as writer:
+            df.to_excel(writer, index=False, sheet_name="ResultadosProduccion")
+    return escribir
+
+
+def _libro(df, ruta):
+    with LibroExcel(ruta) as libro:
+        libro.hoja("ResultadosProduccion", df)
+
+
+METODOS = {
+    "pandas_xlsxwriter": ("pd.ExcelWriter + xlsxwriter (antes, página 1)", _pandas("xlsxwriter")),
+    "pandas_openpyxl": ("pd.ExcelWriter + openpyxl (antes, página 2)", _pandas("openpyxl")),
+    "libro": ("LibroExcel write-only, una hoja", _libro),
+    "exportar_produccion": ("exportar_excel_produccion (4 hojas)", lambda df, ruta: exportar_excel_produccion(df, ruta)),
+}
+
+
+def _rss_pico_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB en Linux
+
+
+def _medir(metodo, n_filas):
+    """Se ejecuta en un proceso nuevo: construye la tabla y mide solo la escritura."""
+    df = calcular_produccion(insumos_sinteticos(n_filas))[COLUMNAS_TABLA]
+    gc.collect()
+    descriptor, ruta = tempfile.mkstemp(suffix=".xlsx")
+    os.close(descriptor)
+    try:
+        rss_antes = _rss_pico_mib()
+        inicio = time.perf_counter()
+        METODOS[metodo][1](df, ruta)
+        segundos = time.perf_counter() - inicio
+        return segundos, rss_antes, _rss_pico_mib(), os.path.getsize(ruta) / 1024 ** 2
+    finally:
+        os.remove(ruta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filas/s y pico de RSS de la exportación a Excel.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[20_000, 100_000], help="Filas de la tabla de producción")
+    parser.add_argument("--metodos", nargs="+", choices=list(METODOS), default=list(METODOS))
+    args = parser.parse_args()
+
+    try:
+        import lxml  # noqa: F401
+        print("openpyxl serializa con lxml")
+    except ImportError:
+        print("openpyxl serializa con et_xmlfile (instalar lxml acelera los métodos basados en openpyxl)")
+    contexto = multiprocessing.get_context("spawn")
+    print(f"{'filas':>9} {'método':<46} {'filas/s':>9} {'RSS pico (MiB)':>15} {'+ escritura (MiB)':>18} {'xlsx (MiB)':>11}")
+    for n_filas in args.filas:
+        for metodo in args.metodos:
+            with contexto.Pool(1) as pool:
+                try:
+                    segundos, rss_antes, rss_despues, tamano = pool.apply(_medir, (metodo, n_filas))
+                except ImportError as e:
+                    print(f"{n_filas:>9,} {METODOS[metodo][0]:<46} omitido: {e}")
+                    continue
+            print(f"{n_filas:>9,} {METODOS[metodo][0]:<46} {n_filas / segundos:>9,.0f} {rss_despues:>15.0f} "
+                  f"{rss_despues - rss_antes:>18.0f} {tamano:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
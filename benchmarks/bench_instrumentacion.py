@@ -0,0 +1,59 @@
+# benchmarks/bench_instrumentacion.py
+# Coste de los tramos de instrumentacion.py por llamada: desactivados (contexto nulo compartido),
+# activados, y la versión de módulo (`tramo`, que busca el registro activo del hilo), frente a un bloque vacío.
+#
+# Uso:  python benchmarks/bench_instrumentacion.py [--n 1000000]
+
+import argparse
+import os
+import sys
+import time
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, "..", "PROYECTO BIOGAS"))
+
+from instrumentacion import RegistroTramos, tramo  # noqa: E402
+
+
+def _ns_por_llamada(funcion, n):
+    inicio = time.perf_counter_ns()
+    funcion(n)
+    return (time.perf_counter_ns() - inicio) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste por tramo de la instrumentación, activada y desactivada.")
+    parser.add_argument("--n", type=int, default=1_000_000, help="Tramos por medida")
+    args = parser.parse_args()
+
+    registro = RegistroTramos(max_tramos=1000)
+
+    def vacio(n):
+        for _ in range(n):
+            pass
+
+    def con_registro(n):
+        for _ in range(n):
+            with registro.tramo("x"):
+                pass
+
+    def con_modulo(n):
+        for _ in range(n):
+            with tramo("x"):
+                pass
+
+    base = _ns_por_llamada(vacio, args.n)
+    print(f"{'caso':<36} {'ns/tramo':>10}")
+    registro.activo = False
+    print(f"{'registro.tramo desactivado':<36} {_ns_por_llamada(con_registro, args.n) - base:>10.0f}")
+    print(f"{'tramo() sin registro en el hilo':<36} {_ns_por_llamada(con_modulo, args.n) - base:>10.0f}")
+    registro.iniciar_ejecucion()
+    print(f"{'tramo() con registro desactivado':<36} {_ns_por_llamada(con_modulo, args.n) - base:>10.0f}")
+    registro.activo = True
+    print(f"{'registro.tramo activado':<36} {_ns_por_llamada(con_registro, args.n // 10) - base:>10.0f}")
+    print(f"{'tramo() activado':<36} {_ns_por_llamada(con_modulo, args.n // 10) - base:>10.0f}")
+    registro.finalizar_ejecucion()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# benchmarks/bench_monte_carlo.py
+# Rendimiento de la propagación de incertidumbre (incertidumbre.py): muestras por segundo y memoria máxima
+# (tracemalloc) al crecer el número de muestras. Cada bloque se reduce a histogramas al llegar, así que el pico
+# de memoria debe quedar acotado por el tamaño de bloque y no crecer con las muestras.
+#
+# Uso:  python benchmarks/bench_monte_carlo.py [--insumos 20] [--muestras 100000 1000000 5000000] [--procesos 1]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, "..", "PROYECTO BIOGAS"))
+
+from bench_suite import insumos_sinteticos  # noqa: E402
+from incertidumbre import resumir  # noqa: E402
+from servicio_calculo import PARAMETROS_DEFECTO, configuracion_balance  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muestras por segundo y memoria de la simulación de Monte Carlo.")
+    parser.add_argument("--insumos", type=int, default=20)
+    parser.add_argument("--muestras", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--procesos", type=int, nargs="+", default=[1], help="Procesos a comparar")
+    parser.add_argument("--distribucion", default="normal")
+    args = parser.parse_args()
+
+    df_insumos = insumos_sinteticos(args.insumos, semilla=0)
+    funcion_balance, g_agua, argumentos = configuracion_balance(PARAMETROS_DEFECTO)
+    print(f"{'muestras':>10} {'procesos':>9} {'segundos':>10} {'muestras/s':>12} {'pico (MB)':>10} {'P50 biometano':>15}")
+    for n_muestras in args.muestras:
+        for procesos in args.procesos:
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            resumen = resumir(df_insumos, argumentos, g_agua, n_muestras, distribucion=args.distribucion,
+                              semilla=0, procesos=procesos, funcion_balance=funcion_balance)
+            segundos = time.perf_counter() - inicio
+            pico = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            p50 = resumen.distribuciones["biometano_final_m3_ano"].percentiles([50])[0]
+            print(f"{n_muestras:>10,} {procesos:>9} {segundos:>10.2f} {n_muestras / segundos:>12,.0f} {pico:>10.1f} {p50:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
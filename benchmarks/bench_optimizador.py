@@ -0,0 +1,46 @@
+# benchmarks/bench_optimizador.py
+# Tiempo del optimizador de mezcla (optimizador_mezcla.py) al crecer el número de insumos candidatos, con
+# programación lineal y con la heurística voraz, y biometano de la heurística respecto al óptimo lineal.
+#
+# Uso:  python benchmarks/bench_optimizador.py [--insumos 100 500 2000] [--repeticiones 3]
+
+import argparse
+import os
+import sys
+import time
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, "..", "PROYECTO BIOGAS"))
+
+from bench_suite import insumos_sinteticos  # noqa: E402
+from optimizador_mezcla import COLUMNA_DISPONIBLE, optimizar_mezcla  # noqa: E402
+from servicio_calculo import PARAMETROS_DEFECTO, configuracion_balance  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo del optimizador de mezcla frente al número de insumos.")
+    parser.add_argument("--insumos", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    funcion_balance, g_agua, argumentos = configuracion_balance(PARAMETROS_DEFECTO)
+    print(f"{'insumos':>8} {'método':>8} {'ms':>10} {'biometano (m³/año)':>20} {'vs lineal':>10}")
+    for n_insumos in args.insumos:
+        df_oferta = insumos_sinteticos(n_insumos, semilla=0)
+        df_oferta[COLUMNA_DISPONIBLE] = df_oferta["Volumen (t/año)"] * 2
+        # Límites a la mitad de lo que consumiría toda la oferta actual: varias restricciones activas
+        volumen_dia = df_oferta["Volumen (t/año)"].sum() / 365.0
+        limites = dict(dilucion_max_m3_dia=volumen_dia, efluente_max_m3_dia=volumen_dia, fraccion_ganadera_min=0.4, volumen_max_t_dia=volumen_dia)
+        referencia = None
+        for metodo in ("lineal", "voraz"):
+            inicio = time.perf_counter()
+            for _ in range(args.repeticiones):
+                resultado = optimizar_mezcla(df_oferta, argumentos, g_agua, funcion_balance, metodo=metodo, **limites)
+            milisegundos = (time.perf_counter() - inicio) / args.repeticiones * 1000
+            biometano = resultado.get("biometano_final_m3_ano", float("nan"))
+            referencia = referencia or biometano
+            print(f"{n_insumos:>8} {metodo:>8} {milisegundos:>10.1f} {biometano:>20,.0f} {biometano / referencia:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
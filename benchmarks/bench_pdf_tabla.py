@@ -0,0 +1,98 @@
+# benchmarks/bench_pdf_tabla.py
+# Tiempo de generación del PDF de producción para 10, 1.000 y 10.000 filas.
+#
+# Uso:  python benchmarks/bench_pdf_tabla.py [--filas 10 1000 10000] [--referencia]
+# Con --referencia también se mide el renderizador anterior (iloc por celda y doble multi_cell).
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PROYECTO BIOGAS"))
+
+from fpdf import FPDF  # noqa: E402
+from fpdf.enums import XPos, YPos  # noqa: E402
+
+from exportacion import ANCHOS_PDF_PRODUCCION, exportar_pdf_produccion  # noqa: E402
+from motor_produccion import calcular_produccion  # noqa: E402
+from tabla_pdf import anchos_columnas  # noqa: E402
+
+COLUMNAS_PDF = list(ANCHOS_PDF_PRODUCCION)
+
+
+def tabla_sintetica(n_filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    nombres = np.array(["Estiércol Vacuno (Líquido)", "Residuos de Cosecha (Paja Maíz)",
+                        "FORSU (Fracción Orgánica Residuos Sólidos Urbanos)", "Purín porcino"])
+    df = pd.DataFrame({
+        "Nombre": nombres[rng.integers(0, len(nombres), n_filas)],
+        "Volumen (t/año)": rng.uniform(100, 10000, n_filas),
+        "Residuo ganadero": rng.choice(["Sí", "No"], n_filas),
+        "Humedad (%)": rng.uniform(10, 95, n_filas),
+        "TS (%)": rng.uniform(5, 90, n_filas),
+        "SV (%sms)": rng.uniform(60, 95, n_filas),
+        "Potencial (m3CH4/tSV)": rng.uniform(200, 450, n_filas),
+        "%CH4": rng.uniform(50, 65, n_filas),
+        "Upgrading (%)": rng.uniform(92, 98, n_filas),
+    })
+    return calcular_produccion(df)[COLUMNAS_PDF]
+
+
+def pdf_referencia(df_export, columnas_para_pdf):
+    """Renderizador anterior de la página de producción, conservado solo para comparar."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, text="Resultados de Producción de Biometano", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.ln(5)
+    dynamic_col_widths = anchos_columnas(pdf, columnas_para_pdf, ANCHOS_PDF_PRODUCCION)
+    pdf.set_font("Arial", 'B', 7)
+    header_y = pdf.get_y()
+    for col_name in columnas_para_pdf:
+        pdf.multi_cell(dynamic_col_widths[col_name], 8, col_name, border=1, align='C', new_x=XPos.RIGHT, new_y=YPos.TOP, max_line_height=pdf.font_size * 1.2)
+    pdf.set_y(header_y + 8)
+    pdf.set_font("Arial", '', 7)
+    for i in range(len(df_export)):
+        row_y_start = pdf.get_y()
+        max_h = pdf.font_size * 1.2
+        for col_name in columnas_para_pdf:
+            valor_txt = f"{df_export.iloc[i][col_name]:.2f}" if isinstance(df_export.iloc[i][col_name], float) else str(df_export.iloc[i][col_name])
+            cell_height = pdf.multi_cell(dynamic_col_widths[col_name], pdf.font_size * 1.2, valor_txt, border=0, align='L', new_x=XPos.RIGHT, new_y=YPos.TOP, max_line_height=pdf.font_size * 1.2, dry_run=True, output="HEIGHT")
+            max_h = max(max_h, cell_height)
+        pdf.set_y(row_y_start)
+        for col_name in columnas_para_pdf:
+            valor_txt = f"{df_export.iloc[i][col_name]:.2f}" if isinstance(df_export.iloc[i][col_name], float) else str(df_export.iloc[i][col_name])
+            pdf.multi_cell(dynamic_col_widths[col_name], max_h, valor_txt, border=1, align='L', new_x=XPos.RIGHT, new_y=YPos.TOP, max_line_height=pdf.font_size * 1.2)
+        pdf.set_y(row_y_start + max_h)
+    return bytes(pdf.output())
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    salida = funcion(*args)
+    return time.perf_counter() - inicio, len(salida)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--referencia", action="store_true", help="Medir también el renderizador anterior")
+    args = parser.parse_args()
+
+    print(f"{'filas':>8} {'renderizador':<14} {'segundos':>10} {'filas/s':>10} {'KiB':>9}")
+    for n_filas in args.filas:
+        df = tabla_sintetica(n_filas)
+        renderizadores = [("TablaPDF", exportar_pdf_produccion)]
+        if args.referencia:
+            renderizadores.append(("referencia", pdf_referencia))
+        for nombre, funcion in renderizadores:
+            segundos, tamano = medir(funcion, df, COLUMNAS_PDF)
+            print(f"{n_filas:>8} {nombre:<14} {segundos:>10.3f} {n_filas / segundos:>10.0f} {tamano / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_sensores.py
+# Coste del modo en vivo (monitor_sensores.py): lecturas por segundo incorporadas a las ventanas móviles y
+# tiempo de evaluar el balance de una ventana, frente a reconstruir un DataFrame con las lecturas de la
+# ventana y promediarlo en cada refresco (lo que crece con la historia acumulada).
+#
+# Uso:  python benchmarks/bench_sensores.py [--dias 1 7 30] [--periodo 10]
+
+import argparse
+import os
+import sys
+import time
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, "..", "PROYECTO BIOGAS"))
+
+import pandas as pd  # noqa: E402
+
+from monitor_sensores import MonitorBalance, SimuladorSensores, parsear_linea  # noqa: E402
+from servicio_calculo import PARAMETROS_DEFECTO, configuracion_balance  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lecturas por segundo y coste de refresco del monitor en vivo.")
+    parser.add_argument("--dias", type=float, nargs="+", default=[1, 7, 30], help="Días de lecturas acumuladas")
+    parser.add_argument("--periodo", type=float, default=10.0, help="Segundos entre lecturas de cada sensor")
+    args = parser.parse_args()
+
+    funcion_balance, g_agua, argumentos = configuracion_balance(PARAMETROS_DEFECTO)
+    print(f"{'días':>6} {'lecturas':>10} {'lecturas/s':>12} {'balance (ms)':>13} {'DataFrame (ms)':>15}")
+    for dias in args.dias:
+        lineas = SimuladorSensores(periodo_s=args.periodo, inicio="2026-01-01").lineas(int(dias * 86400 / args.periodo))
+        monitor = MonitorBalance(argumentos, 15.0, funcion_balance=funcion_balance)
+        inicio = time.perf_counter()
+        monitor.consumir(lineas)
+        lecturas_s = len(lineas) / (time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        for _ in range(20):
+            for ventana in monitor.ventanas:
+                monitor.balance(ventana)
+        ms_balance = (time.perf_counter() - inicio) / 20 * 1000
+
+        # Referencia: toda la historia en un DataFrame y media de cada ventana en cada refresco
+        df = pd.DataFrame([lectura for linea in lineas for lectura in parsear_linea(linea)], columns=["t", "sensor", "valor"])
+        inicio = time.perf_counter()
+        for _ in range(5):
+            t_max = df["t"].max()
+            for duracion in monitor.ventanas.values():
+                df[df["t"] > t_max - duracion].groupby("sensor")["valor"].mean()
+        ms_df = (time.perf_counter() - inicio) / 5 * 1000
+        print(f"{dias:>6g} {len(lineas):>10,} {lecturas_s:>12,.0f} {ms_balance:>13.3f} {ms_df:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# benchmarks/bench_suite.py
+# Suite de rendimiento sin interfaz: cadena de producción, balance de aguas, figuras y exportaciones
+# sobre tablas de insumos sintéticas de tamaño creciente. Mide tiempo de pared y pico de memoria
+# (tracemalloc) por etapa y guarda los resultados en JSON para comparar entre versiones.
+#
+# Uso:  python benchmarks/bench_suite.py [--tamanos 10 1000 10000 100000] [--repeticiones 3]
+#                                        [--omitir exportar_pdf_produccion ...] [--salida resultados.json]
+#                                        [--comparar base.json] [--umbral 0.2]
+# Con --comparar se marca como regresión toda etapa más lenta (o con más memoria) que la base por
+# encima del umbral relativo, y el proceso termina con código 1.
+
+import argparse
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from importlib import metadata
+
+os.environ.setdefault("MPLBACKEND", "Agg")  # Sin pantalla
+
+import numpy as np
+import pandas as pd
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, "..", "PROYECTO BIOGAS"))
+
+from exportacion import (  # noqa: E402
+    ANCHOS_PDF_PRODUCCION, exportar_excel_balance, exportar_excel_produccion, exportar_pdf_produccion,
+    preparar_df_pdf_produccion,
+)
+from graficos import figura_balance_barras, figura_produccion_agregada, figura_sankey  # noqa: E402
+from importacion_insumos import leer_insumos  # noqa: E402
+from motor_balance import calcular_balance, resolver_recirculacion, tablas_balance  # noqa: E402
+from motor_produccion import calcular_produccion, totales_diarios  # noqa: E402
+from sensibilidad_balance import RANGOS_PARAMETROS, evaluar_barrido, muestras_hipercubo_latino  # noqa: E402
+from visualizacion import agregar_produccion  # noqa: E402
+
+# Mismos límites y valores por defecto que las páginas
+MAX_FILAS_PDF = 50_000
+PAQUETES = ["numpy", "pandas", "plotly", "fpdf2", "xlsxwriter", "openpyxl", "pyarrow", "streamlit"]
+COLUMNAS_TABLA = [
+    "Nombre", "Volumen (t/año)", "Humedad (%)", "TS (%)", "SV (%sms)", "Potencial (m3CH4/tSV)", "%CH4",
+    "Upgrading (%)", "TS (t/año)", "SV (t/año)", "Agua en Insumo (t/año)", "Biogás Bruto (m3/año)",
+    "Biometano útil (m3/año)", "Biometano final (m3/año)",
+]
+COLUMNAS_PDF = list(ANCHOS_PDF_PRODUCCION)
+PARAMETROS_PROCESO = {
+    "agua_limpieza_m3_dia": 5.0, "agua_dilucion_directa_m3_dia": 0.0, "target_TS_digestor_percent": 10.0,
+    "recirculacion_fraccion": 0.3, "evaporacion_perdida_fraccion": 0.01, "humedad_torta_solida_percent": 75.0,
+    "eficiencia_captura_ts_en_torta": 0.85,
+}
+G_AGUA_POR_NM3 = 47.4  # Saturación a 35 °C y presión normal
+
+
+def insumos_sinteticos(n_filas, semilla=0):
+    """Tabla de insumos de entrada (columnas del formulario de producción) con valores plausibles."""
+    rng = np.random.default_rng(semilla)
+    nombres = np.array(["Estiércol Vacuno (Líquido)", "Residuos de Cosecha (Paja Maíz)",
+                        "FORSU (Fracción Orgánica Residuos Sólidos Urbanos)", "Purín porcino"])
+    ts = rng.uniform(5, 90, n_filas)
+    return pd.DataFrame({
+        "Nombre": np.char.add(nombres[rng.integers(0, len(nombres), n_filas)], np.char.mod(" %d", np.arange(n_filas))),
+        "Volumen (t/año)": rng.uniform(100, 10000, n_filas),
+        "Residuo ganadero": rng.choice(["Sí", "No"], n_filas),
+        "Humedad (%)": 100.0 - ts,
+        "TS (%)": ts,
+        "SV (%sms)": rng.uniform(60, 95, n_filas),
+        "Potencial (m3CH4/tSV)": rng.uniform(200, 450, n_filas),
+        "%CH4": rng.uniform(50, 65, n_filas),
+        "Upgrading (%)": rng.uniform(92, 98, n_filas),
+    })
+
+
+def parametros_balance(totales):
+    ts_total = totales["total_ts_en_insumos_t_dia"]
+    return dict(
+        PARAMETROS_PROCESO, ts_total_t_dia=ts_total,
+        agua_en_insumos_t_dia=totales["total_volumen_insumos_humedos_t_dia"] - ts_total,
+        agua_en_biogas_condensado_m3_dia=totales["total_biogas_bruto_m3_dia"] * G_AGUA_POR_NM3 / 1000000.0,
+    )
+
+
+# --- ETAPAS ---
+# Cada etapa recibe el contexto y devuelve su resultado, que queda en el contexto con su nombre.
+# Las dependencias que no se miden (p. ej. por --omitir) se calculan bajo demanda sin cronometrar.
+ETAPAS = {
+    "importacion_csv": lambda c: leer_insumos(io.BytesIO(c["csv_insumos"]), "insumos.csv"),
+    "produccion": lambda c: calcular_produccion(c["insumos"]),
+    "totales_diarios": lambda c: totales_diarios(c["produccion"]),
+    "balance": lambda c: calcular_balance(**parametros_balance(c["totales_diarios"])),
+    "balance_estacionario": lambda c: resolver_recirculacion(**parametros_balance(c["totales_diarios"])),
+    "barrido_lhs": lambda c: evaluar_barrido(
+        parametros_balance(c["totales_diarios"]), muestras_hipercubo_latino(RANGOS_PARAMETROS, c["n_filas"], semilla=0),
+        funcion_balance=resolver_recirculacion,
+    ),
+    "tablas_balance": lambda c: tablas_balance(c["balance_estacionario"]),
+    "figura_produccion_plotly": lambda c: figura_produccion_agregada(agregar_produccion(c["produccion"], "Nombre", 20)).to_json(),
+    "figuras_balance_plotly": lambda c: [figura_balance_barras(c["balance_estacionario"]).to_json(), figura_sankey(c["balance_estacionario"]).to_json()],
+    "exportar_csv": lambda c: c["produccion"][COLUMNAS_TABLA].to_csv(index=False).encode("utf-8"),
+    "exportar_excel_produccion": lambda c: exportar_excel_produccion(c["produccion"][COLUMNAS_TABLA]),
+    "exportar_pdf_produccion": lambda c: exportar_pdf_produccion(preparar_df_pdf_produccion(c["produccion"], COLUMNAS_PDF), COLUMNAS_PDF),
+    "exportar_excel_balance": lambda c: exportar_excel_balance(*c["tablas_balance"]),
+}
+# Etapas que la aplicación no ejecuta por encima de cierto tamaño
+LIMITES_FILAS = {"exportar_pdf_produccion": MAX_FILAS_PDF}
+
+
+class Contexto(dict):
+    def __missing__(self, clave):
+        if clave not in ETAPAS:
+            raise KeyError(clave)
+        self[clave] = ETAPAS[clave](self)
+        return self[clave]
+
+
+def medir_etapa(nombre, contexto, repeticiones):
+    """Devuelve (segundos por repetición, pico de memoria en bytes) y deja el resultado en el contexto."""
+    # Las dependencias se resuelven antes de medir para no contarlas en la etapa
+    ETAPAS[nombre](contexto)
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = ETAPAS[nombre](contexto)
+        tiempos.append(time.perf_counter() - inicio)
+        del resultado
+    gc.collect()
+    tracemalloc.start()
+    try:
+        contexto[nombre] = ETAPAS[nombre](contexto)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return tiempos, pico
+
+
+def metadatos():
+    versiones = {}
+    for paquete in PAQUETES:
+        try:
+            versiones[paquete] = metadata.version(paquete)
+        except metadata.PackageNotFoundError:
+            versiones[paquete] = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIRECTORIO, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "paquetes": versiones,
+    }
+
+
+def ejecutar(tamanos, repeticiones, omitir=()):
+    resultados = []
+    print(f"{'etapa':<28} {'filas':>9} {'mediana s':>11} {'mínimo s':>10} {'filas/s':>12} {'pico MiB':>10}")
+    for n_filas in tamanos:
+        insumos = insumos_sinteticos(n_filas)
+        contexto = Contexto(n_filas=n_filas, insumos=insumos, csv_insumos=insumos.to_csv(index=False).encode("utf-8"))
+        for nombre in ETAPAS:
+            if nombre in omitir:
+                continue
+            if n_filas > LIMITES_FILAS.get(nombre, n_filas):
+                print(f"{nombre:<28} {n_filas:>9} {'(omitida: límite de la aplicación)':>45}")
+                continue
+            tiempos, pico = medir_etapa(nombre, contexto, repeticiones)
+            mediana = statistics.median(tiempos)
+            resultados.append({
+                "etapa": nombre, "filas": n_filas, "segundos_mediana": mediana, "segundos_min": min(tiempos),
+                "repeticiones": repeticiones, "pico_memoria_bytes": pico,
+            })
+            print(f"{nombre:<28} {n_filas:>9} {mediana:>11.4f} {min(tiempos):>10.4f} {n_filas / mediana if mediana > 0 else float('inf'):>12.0f} {pico / 2**20:>10.2f}")
+    return resultados
+
+
+def comparar(resultados, ruta_base, umbral, minimo_segundos=0.005):
+    """Imprime la comparación con una ejecución guardada; devuelve el número de regresiones."""
+    with open(ruta_base, encoding="utf-8") as f:
+        base = json.load(f)
+    indice_base = {(r["etapa"], r["filas"]): r for r in base["resultados"]}
+    print(f"\nComparación con {ruta_base} (commit {base['metadatos'].get('commit')}, {base['metadatos'].get('fecha')})")
+    print(f"{'etapa':<28} {'filas':>9} {'tiempo':>9} {'memoria':>9}")
+    regresiones = 0
+    for r in resultados:
+        anterior = indice_base.get((r["etapa"], r["filas"]))
+        if anterior is None:
+            continue
+        ratio_tiempo = r["segundos_min"] / anterior["segundos_min"] if anterior["segundos_min"] > 0 else float("inf")
+        ratio_memoria = r["pico_memoria_bytes"] / anterior["pico_memoria_bytes"] if anterior["pico_memoria_bytes"] > 0 else 1.0
+        # Diferencias de pocos milisegundos son ruido de medida
+        lenta = ratio_tiempo > 1 + umbral and r["segundos_min"] - anterior["segundos_min"] > minimo_segundos
+        pesada = ratio_memoria > 1 + umbral and r["pico_memoria_bytes"] - anterior["pico_memoria_bytes"] > 2**20
+        marca = "  <-- REGRESIÓN" if lenta or pesada else ""
+        regresiones += bool(marca)
+        print(f"{r['etapa']:<28} {r['filas']:>9} {ratio_tiempo:>8.2f}x {ratio_memoria:>8.2f}x{marca}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de rendimiento de producción, balance, figuras y exportaciones.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10, 1000, 10000, 100000], help="Número de insumos por tabla")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--omitir", nargs="*", default=[], choices=list(ETAPAS), metavar="ETAPA", help=f"Etapas a omitir: {', '.join(ETAPAS)}")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto benchmarks/resultados/suite_<commit>_<fecha>.json)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con la que comparar")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Aumento relativo a partir del cual se marca una regresión")
+    args = parser.parse_args()
+
+    datos = {"metadatos": metadatos(), "resultados": ejecutar(args.tamanos, args.repeticiones, set(args.omitir))}
+    salida = args.salida
+    if salida is None:
+        marca_tiempo = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        salida = os.path.join(DIRECTORIO, "resultados", f"suite_{datos['metadatos']['commit'] or 'sin_git'}_{marca_tiempo}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {salida}")
+
+    if args.comparar and comparar(datos["resultados"], args.comparar, args.umbral):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
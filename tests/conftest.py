@@ -0,0 +1,30 @@
+# tests/conftest.py
+# Los módulos de la aplicación están en "PROYECTO BIOGAS" (sin paquete instalable), como en benchmarks/.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PROYECTO BIOGAS"))
+
+
+@pytest.fixture
+def insumos():
+    """Tabla de insumos con las columnas del formulario de producción y valores plausibles."""
+    rng = np.random.default_rng(0)
+    n = 12
+    ts = rng.uniform(5, 90, n)
+    return pd.DataFrame({
+        "Nombre": [f"Insumo {i}" for i in range(n)],
+        "Volumen (t/año)": rng.uniform(100, 10000, n),
+        "Residuo ganadero": rng.choice(["Sí", "No"], n),
+        "Humedad (%)": 100.0 - ts,
+        "TS (%)": ts,
+        "SV (%sms)": rng.uniform(60, 95, n),
+        "Potencial (m3CH4/tSV)": rng.uniform(200, 450, n),
+        "%CH4": rng.uniform(50, 65, n),
+        "Upgrading (%)": rng.uniform(92, 98, n),
+    })
@@ -0,0 +1,23 @@
+# tests/test_cartera_plantas.py
+import json
+
+from cartera_plantas import trabajos_cartera
+
+INSUMOS = [{"Volumen": 1000, "TS": 10, "SV": 80, "Potencial": 300, "%CH4": 55}]
+
+
+def test_parametros_comunes_json_y_tabla_en_orden(tmp_path):
+    ruta = tmp_path / "flota.json"
+    ruta.write_text(json.dumps({"sitios": [
+        {"sitio": "Norte", "insumos": INSUMOS, "parametros": {"recirculacion_fraccion": 0.2, "agua_limpieza_m3_dia": 3.0}},
+        {"sitio": "Sur", "insumos": INSUMOS},
+    ]}), encoding="utf-8")
+    trabajos = trabajos_cartera(
+        [str(ruta)],
+        parametros_sitios={"Norte": {"recirculacion_fraccion": 0.4}},
+        parametros_comunes={"recirculacion_fraccion": 0.1, "agua_limpieza_m3_dia": 8.0, "target_TS_digestor_percent": 9.0},
+    )
+    parametros = {sitio: p for _, p, sitio in trabajos}
+    # La tabla de sitios prevalece sobre el JSON y el JSON sobre los comunes
+    assert parametros["Norte"] == {"recirculacion_fraccion": 0.4, "agua_limpieza_m3_dia": 3.0, "target_TS_digestor_percent": 9.0}
+    assert parametros["Sur"] == {"recirculacion_fraccion": 0.1, "agua_limpieza_m3_dia": 8.0, "target_TS_digestor_percent": 9.0}
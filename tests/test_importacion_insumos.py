@@ -0,0 +1,25 @@
+# tests/test_importacion_insumos.py
+import io
+
+import pytest
+
+from importacion_insumos import iterar_bloques_archivo
+
+
+@pytest.mark.parametrize("texto, separador", [
+    ("﻿Insumo;Volumen;TS\nA;1,5;10\nB;2;11,25\nC;3;12\n", ";"),
+    ("Insumo,Volumen,TS\nA,1.5,10\nB,2,11.25\nC,3,12\n", ","),
+])
+def test_csv_subido_en_bloques(texto, separador):
+    subido = io.BytesIO(texto.encode("utf-8"))
+    subido.read()  # El UploadedFile puede llegar ya leído de un rerun anterior
+    bloques = list(iterar_bloques_archivo(subido, "insumos.csv", tamano_bloque=2))
+    assert [len(b) for b in bloques] == [2, 1]
+    assert list(bloques[0].columns) == ["Insumo", "Volumen", "TS"]
+    assert bloques[0]["Volumen"].tolist() == [1.5, 2.0] and bloques[0]["TS"].tolist() == [10.0, 11.25]
+    assert not subido.closed  # El archivo subido sigue disponible para el siguiente rerun
+
+
+def test_csv_en_texto():
+    (bloque,) = iterar_bloques_archivo(io.StringIO("Insumo,Volumen\nA,1\n"), "insumos.csv")
+    assert bloque["Volumen"].tolist() == [1]
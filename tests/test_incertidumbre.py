@@ -0,0 +1,58 @@
+# tests/test_incertidumbre.py
+import numpy as np
+import pytest
+
+from incertidumbre import MUESTRAS_CRUDAS_MAXIMAS, SALIDAS_MONTE_CARLO, ResumenMonteCarlo, resumen_percentiles, resumir, simular
+from servicio_calculo import PARAMETROS_DEFECTO, configuracion_balance
+
+
+@pytest.fixture
+def simulacion(insumos):
+    funcion_balance, g_agua, argumentos = configuracion_balance(PARAMETROS_DEFECTO)
+    # Bloques pequeños: el resumen se combina a lo largo de muchos bloques
+    return (insumos, argumentos, g_agua), dict(funcion_balance=funcion_balance, semilla=3, elementos_por_bloque=12 * 1500)
+
+
+def test_resumen_en_flujo_coincide_con_las_muestras(simulacion):
+    argumentos, opciones = simulacion
+    exacto = resumen_percentiles(simular(*argumentos, 40_000, **opciones), percentiles=(5, 10, 50, 90, 95))
+    resumen = resumir(*argumentos, 40_000, **opciones)
+    en_flujo = resumen.tabla(percentiles=(5, 10, 50, 90, 95))
+    assert list(en_flujo.index) == list(exacto.index) == list(SALIDAS_MONTE_CARLO.values())
+    for salida, nombre in SALIDAS_MONTE_CARLO.items():
+        distribucion = resumen.distribuciones[salida]
+        tolerancia = 2 * distribucion.ancho + 1e-9  # Un percentil se sitúa dentro de su clase fina
+        assert en_flujo.loc[nombre, ["P5", "P10", "P50", "P90", "P95"]].to_numpy() == pytest.approx(
+            exacto.loc[nombre, ["P5", "P10", "P50", "P90", "P95"]].to_numpy(dtype=float), abs=tolerancia)
+        assert en_flujo.loc[nombre, ["Media", "Desv. típica"]].to_numpy() == pytest.approx(
+            exacto.loc[nombre, ["Media", "Desv. típica"]].to_numpy(dtype=float), rel=1e-6, abs=1e-9)
+        histograma = resumen.histograma(salida)
+        assert histograma["frecuencia"].sum() == pytest.approx(1.0)
+        assert len(histograma) <= 60
+
+
+def test_rango_ampliado_y_valores_no_finitos():
+    resumen = ResumenMonteCarlo(["x"])
+    rng = np.random.default_rng(0)
+    bloques = [rng.uniform(0.0, 1.0, 10_000), rng.uniform(-10.0, 0.0, 10_000), np.r_[rng.uniform(1.0, 30.0, 10_000), [np.nan] * 10]]
+    for bloque in bloques:
+        resumen.anadir({"x": bloque})
+    todos = np.concatenate(bloques)
+    todos = todos[np.isfinite(todos)]
+    distribucion = resumen.distribuciones["x"]
+    assert distribucion.minimo == todos.min() and distribucion.maximo == todos.max()
+    assert distribucion.percentiles([1, 25, 50, 75, 99]) == pytest.approx(np.percentile(todos, [1, 25, 50, 75, 99]), abs=2 * distribucion.ancho)
+    assert resumen.fraccion_no_finita("x") == pytest.approx(10 / 30_010)
+
+
+def test_salida_constante():
+    resumen = ResumenMonteCarlo(["x"])
+    resumen.anadir({"x": np.full(100, 7.5)})
+    assert resumen.distribuciones["x"].percentiles([10, 90]) == pytest.approx([7.5, 7.5])
+    assert resumen.tabla().loc["x", "Desv. típica"] == pytest.approx(0.0)
+
+
+def test_muestras_crudas_solo_para_simulaciones_pequenas(simulacion):
+    argumentos, opciones = simulacion
+    with pytest.raises(ValueError, match="resumir"):
+        simular(*argumentos, MUESTRAS_CRUDAS_MAXIMAS + 1, **opciones)
@@ -0,0 +1,86 @@
+# tests/test_libro_excel.py
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+import libro_excel  # noqa: E402
+from libro_excel import LibroExcel, FORMATOS_NUMERO  # noqa: E402
+
+
+@pytest.fixture
+def tabla():
+    return pd.DataFrame({
+        "Nombre": ["a", "b", None, "d"],
+        "Insumos": np.array([1, 2, 3, 4], dtype=np.int64),
+        "Biogás (m3/año)": [1.5, np.nan, 3.25, 1e9],
+        "TS (%)": [10.0, 20.5, 0.0, 100.0],
+        "Fecha": pd.to_datetime(["2026-01-01", "2026-01-02", None, "2026-01-04"]),
+        "Ganadero": [True, False, True, False],
+    })
+
+
+def _leer(buffer):
+    buffer.seek(0)
+    return openpyxl.load_workbook(buffer)
+
+
+def test_ida_y_vuelta(tabla):
+    buffer = io.BytesIO()
+    with LibroExcel(buffer) as libro:
+        assert libro.hoja("Resultados", tabla) == len(tabla)
+    leida = pd.read_excel(io.BytesIO(buffer.getvalue()), sheet_name="Resultados", engine="openpyxl")
+    assert list(leida.columns) == list(tabla.columns)
+    assert [None if pd.isna(v) else v for v in leida["Nombre"]] == ["a", "b", None, "d"]  # Celda vacía en lugar de NaN
+    np.testing.assert_array_equal(leida["Insumos"].to_numpy(), tabla["Insumos"].to_numpy())
+    np.testing.assert_allclose(leida["Biogás (m3/año)"].to_numpy(), tabla["Biogás (m3/año)"].to_numpy())
+    np.testing.assert_allclose(leida["TS (%)"].to_numpy(), tabla["TS (%)"].to_numpy())
+    pd.testing.assert_series_equal(leida["Fecha"], tabla["Fecha"], check_names=False)
+    assert leida["Ganadero"].tolist() == tabla["Ganadero"].tolist()
+
+
+def test_formatos_cabecera_y_panel(tabla):
+    buffer = io.BytesIO()
+    with LibroExcel(buffer) as libro:
+        libro.hoja("Resultados", tabla)
+    hoja = _leer(buffer)["Resultados"]
+    assert hoja.freeze_panes == "A2"
+    assert all(celda.font.bold for celda in hoja[1])
+    formatos = {celda.value: hoja.cell(row=2, column=celda.column).number_format for celda in hoja[1]}
+    assert formatos["Insumos"] == FORMATOS_NUMERO["entero"]
+    assert formatos["Biogás (m3/año)"] == FORMATOS_NUMERO["decimal"]
+    assert formatos["TS (%)"] == FORMATOS_NUMERO["porcentaje"]
+    assert formatos["Fecha"] == FORMATOS_NUMERO["fecha"]
+
+
+def test_bloques_pares_y_nombres_de_hoja(tabla):
+    buffer = io.BytesIO()
+    with LibroExcel(buffer) as libro:
+        assert libro.hoja_bloques("Detalle: sitio/1", (tabla.iloc[i:i + 2] for i in range(0, len(tabla), 2))) == len(tabla)
+        libro.hoja_pares("Detalle: sitio/1", {"TS objetivo (%)": 10.0, "Sitios": 3, "Recirculación": None, "Método": "cerrado"})
+        libro.hoja("Vacía", tabla.iloc[:0])
+    libro_leido = _leer(buffer)
+    assert libro_leido.sheetnames == ["Detalle_ sitio_1", "Detalle_ sitio_1 (2)", "Vacía"]
+    assert libro_leido["Detalle_ sitio_1"].max_row == len(tabla) + 1
+    pares = [tuple(fila) for fila in libro_leido["Detalle_ sitio_1 (2)"].iter_rows(min_row=2, values_only=True)]
+    assert pares == [("TS objetivo (%)", 10.0), ("Sitios", 3), ("Recirculación", None), ("Método", "cerrado")]
+
+
+def test_tabla_mas_larga_que_una_hoja(tabla, monkeypatch):
+    monkeypatch.setattr(libro_excel, "MAX_FILAS_HOJA", 3)  # Cabecera + 2 filas por hoja
+    buffer = io.BytesIO()
+    with LibroExcel(buffer) as libro:
+        libro.hoja("Serie", tabla)
+    libro_leido = _leer(buffer)
+    assert libro_leido.sheetnames == ["Serie", "Serie (2)"]
+    assert [libro_leido[h].max_row for h in libro_leido.sheetnames] == [3, 3]
+
+
+def test_libro_sin_hojas_es_valido():
+    buffer = io.BytesIO()
+    with LibroExcel(buffer):
+        pass
+    assert _leer(buffer).sheetnames == ["Vacío"]
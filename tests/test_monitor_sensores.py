@@ -0,0 +1,63 @@
+# tests/test_monitor_sensores.py
+import math
+
+import pytest
+
+from monitor_sensores import VentanaMovil, MonitorBalance, parsear_linea, formatear_lectura
+
+
+def test_ventana_movil_media_y_expiracion():
+    ventana = VentanaMovil(100.0, cubetas=10)  # Cubetas de 10 s
+    assert len(ventana) == 0 and math.isnan(ventana.media())
+    for t in range(0, 100, 10):
+        ventana.anadir(float(t), float(t))
+    assert len(ventana) == 10
+    assert ventana.media() == pytest.approx(45.0)
+    # En t = 125 han salido las cubetas que empiezan en t <= 15 (ventana de 100 s más una cubeta de margen)
+    ventana.anadir(125.0, 1000.0)
+    assert len(ventana) == 9
+    assert ventana.media() == pytest.approx((sum(range(20, 100, 10)) + 1000.0) / 9)
+    # Una lectura mucho más tarde vacía la ventana salvo ella misma
+    ventana.anadir(10_000.0, 7.0)
+    assert len(ventana) == 1 and ventana.media() == 7.0
+
+
+def test_ventana_movil_expirar_sin_lecturas_nuevas():
+    ventana = VentanaMovil(60.0, cubetas=6)
+    for t in range(0, 60, 5):
+        ventana.anadir(float(t), 2.0)
+    ventana.expirar(200.0)
+    assert len(ventana) == 0 and math.isnan(ventana.media())
+
+
+def test_ventana_movil_agrupa_en_cubetas_y_mantiene_la_suma():
+    ventana = VentanaMovil(3600.0)
+    valores = [float(i % 7) for i in range(20_000)]
+    for i, valor in enumerate(valores):
+        ventana.anadir(i * 0.5, valor)  # 2 lecturas por segundo: 10 000 s
+    assert len(ventana._cubetas) <= 241
+    dentro = [v for i, v in enumerate(valores) if i * 0.5 > 9999.5 - 3600.0 - 15.0]
+    assert ventana.media() == pytest.approx(sum(dentro) / len(dentro), rel=1e-3)
+
+
+def test_ventana_movil_duracion_invalida():
+    with pytest.raises(ValueError):
+        VentanaMovil(0.0)
+
+
+def test_lecturas_csv_y_json():
+    linea = formatear_lectura(1_700_000_000.0, "biogas_Nm3_h", 2105.3)
+    assert parsear_linea(linea) == [(1_700_000_000.0, "biogas_Nm3_h", pytest.approx(2105.3))]
+    lecturas = parsear_linea('{"t": 1700000000, "biogas_Nm3_h": 10, "alimentacion_t_h": 4}')
+    assert sorted(s for _, s, _ in lecturas) == ["alimentacion_t_h", "biogas_Nm3_h"]
+
+
+def test_monitor_antiguedad_de_la_ultima_lectura():
+    monitor = MonitorBalance({}, 10.0, ventanas={"1 h": 3600.0})
+    assert monitor.antiguedad() is None and monitor.segundos_sin_lecturas() is None
+    monitor.anadir(1_000.0, "biogas_Nm3_h", 100.0)
+    monitor.anadir(400.0, "biogas_Nm3_h", 100.0)  # Las lecturas atrasadas no retroceden la última fecha
+    assert monitor.t_ultimo == 1_000.0
+    assert monitor.antiguedad(ahora=1_600.0) == 600.0
+    assert not monitor.anadir(1_100.0, "sensor_desconocido", 1.0)
+    assert monitor.descartadas == 1
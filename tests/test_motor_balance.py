@@ -0,0 +1,72 @@
+# tests/test_motor_balance.py
+import numpy as np
+import pytest
+
+from motor_balance import calcular_balance, resolver_recirculacion
+
+# Rejilla de parámetros de proceso (vectorizada): recirculación, evaporación, captura y TS de los insumos
+R, EVAP, CAPTURA, TS = (a.ravel() for a in np.meshgrid([0.0, 0.3, 0.7, 0.95], [0.0, 0.01, 0.05], [0.0, 0.5, 0.85], [5.0, 20.0, 40.0]))
+PARAMETROS_REJILLA = dict(
+    ts_total_t_dia=TS, agua_en_insumos_t_dia=60.0 - TS, agua_limpieza_m3_dia=5.0, agua_dilucion_directa_m3_dia=1.0,
+    target_TS_digestor_percent=10.0, recirculacion_fraccion=R, evaporacion_perdida_fraccion=EVAP,
+    humedad_torta_solida_percent=75.0, eficiencia_captura_ts_en_torta=CAPTURA, agua_en_biogas_condensado_m3_dia=0.4,
+)
+SALIDAS = ["E4_agua_dilucion_calculada", "agua_efluente_liquido_neto_m3_dia", "agua_recirculada_m3_dia",
+           "ts_recirculado_t_dia", "total_agua_saliente_m3_dia"]
+
+
+def test_forma_cerrada_y_punto_fijo_coinciden():
+    cerrado = resolver_recirculacion(metodo="cerrado", **PARAMETROS_REJILLA)
+    punto_fijo = resolver_recirculacion(metodo="punto_fijo", tolerancia=1e-12, max_iteraciones=5000, **PARAMETROS_REJILLA)
+    assert cerrado["convergido"].all() and punto_fijo["convergido"].all()
+    for salida in SALIDAS:
+        np.testing.assert_allclose(punto_fijo[salida], cerrado[salida], rtol=1e-7, atol=1e-7, err_msg=salida)
+
+
+@pytest.mark.parametrize("metodo", ["cerrado", "punto_fijo"])
+def test_cierre_del_balance_hidrico(metodo):
+    # En estado estacionario el agua que entra es la que sale (la recirculada es un flujo interno)
+    resultado = resolver_recirculacion(metodo=metodo, tolerancia=1e-12, max_iteraciones=5000, **PARAMETROS_REJILLA)
+    np.testing.assert_allclose(resultado["balance_hidrico_m3_dia"], 0.0, atol=1e-6)
+    np.testing.assert_allclose(resultado["total_agua_entrante_m3_dia"], resultado["total_agua_saliente_m3_dia"], rtol=1e-9)
+
+
+def test_sin_recirculacion_coincide_con_un_solo_paso():
+    parametros = dict(PARAMETROS_REJILLA, recirculacion_fraccion=0.0)
+    un_paso = calcular_balance(**parametros)
+    estacionario = resolver_recirculacion(**parametros)
+    for salida in ("E4_agua_dilucion_calculada", "agua_efluente_liquido_neto_m3_dia", "total_agua_saliente_m3_dia"):
+        np.testing.assert_allclose(estacionario[salida], un_paso[salida], rtol=1e-12, atol=1e-12, err_msg=salida)
+
+
+def _recirculacion_total(**cambios):
+    parametros = dict(
+        ts_total_t_dia=20.0, agua_en_insumos_t_dia=30.0, agua_limpieza_m3_dia=0.0, agua_dilucion_directa_m3_dia=0.0,
+        target_TS_digestor_percent=10.0, evaporacion_perdida_fraccion=0.0, humedad_torta_solida_percent=75.0,
+        eficiencia_captura_ts_en_torta=0.85, agua_en_biogas_condensado_m3_dia=0.0,
+    )
+    parametros.update(cambios)
+    return parametros
+
+
+@pytest.mark.parametrize("metodo", ["cerrado", "punto_fijo"])
+def test_recirculacion_total_sin_evaporacion_con_dilucion_converge(metodo):
+    # Con dilución la masa de alimentación la fija el TS objetivo: el lazo se cierra aunque r = 1 y no haya evaporación
+    total = resolver_recirculacion(recirculacion_fraccion=1.0, metodo=metodo, **_recirculacion_total())
+    casi_total = resolver_recirculacion(recirculacion_fraccion=0.9999, metodo=metodo, **_recirculacion_total())
+    assert total["convergido"] and not total["acumula_agua"] and not total["acumula_solidos"]
+    assert total["E4_agua_dilucion_calculada"] > 0
+    np.testing.assert_allclose(total["E4_agua_dilucion_calculada"], casi_total["E4_agua_dilucion_calculada"], rtol=1e-3)
+    np.testing.assert_allclose(total["total_agua_entrante_m3_dia"], total["total_agua_saliente_m3_dia"], rtol=1e-6)
+
+
+def test_recirculacion_total_sin_estado_estacionario():
+    solidos = resolver_recirculacion(recirculacion_fraccion=1.0, **_recirculacion_total(eficiencia_captura_ts_en_torta=0.0))
+    assert solidos["acumula_solidos"] and not solidos["convergido"]
+    assert np.isnan(solidos["E4_agua_dilucion_calculada"])
+    # Mezcla ya más diluida que el objetivo: sin dilución que ajustar, el agua se acumula
+    agua = resolver_recirculacion(recirculacion_fraccion=1.0, **_recirculacion_total(agua_en_insumos_t_dia=500.0))
+    assert agua["acumula_agua"] and not agua["acumula_solidos"] and not agua["convergido"]
+    # Con evaporación el agua sí sale del lazo
+    con_evaporacion = resolver_recirculacion(recirculacion_fraccion=1.0, **_recirculacion_total(agua_en_insumos_t_dia=500.0, evaporacion_perdida_fraccion=0.02))
+    assert con_evaporacion["convergido"]
@@ -0,0 +1,43 @@
+# tests/test_motor_produccion.py
+import numpy as np
+import pandas as pd
+
+from motor_produccion import calcular_produccion, totales_diarios, COLUMNAS_CALCULADAS
+
+
+def produccion_pagina_original(df):
+    """Fórmulas de la página de producción antes de extraer el motor (columna a columna con pandas)."""
+    df = df.copy()
+    df["TS (t/año)"] = df["Volumen (t/año)"].astype(float) * df["TS (%)"].astype(float) / 100
+    df["SV (t/año)"] = df["TS (t/año)"].astype(float) * df["SV (%sms)"].astype(float) / 100
+    df["Biogás Bruto (m3/año)"] = df["SV (t/año)"].astype(float) * df["Potencial (m3CH4/tSV)"].astype(float)
+    df["Biometano útil (m3/año)"] = df["Biogás Bruto (m3/año)"].astype(float) * (df["%CH4"].astype(float) / 100)
+    df["Biometano final (m3/año)"] = df["Biometano útil (m3/año)"].astype(float) * (df["Upgrading (%)"].astype(float) / 100)
+    df["Agua en Insumo (t/año)"] = df["Volumen (t/año)"].astype(float) * (df["Humedad (%)"].astype(float) / 100)
+    return df
+
+
+def test_paridad_con_la_pagina_original(insumos):
+    esperado = produccion_pagina_original(insumos)
+    obtenido = calcular_produccion(insumos)
+    for col in COLUMNAS_CALCULADAS:
+        np.testing.assert_allclose(obtenido[col].to_numpy(), esperado[col].to_numpy(), rtol=1e-12, err_msg=col)
+    pd.testing.assert_frame_equal(obtenido[list(insumos.columns)], insumos)
+
+
+def test_totales_diarios_como_la_pagina_original(insumos):
+    esperado = produccion_pagina_original(insumos)
+    totales = totales_diarios(calcular_produccion(insumos))
+    np.testing.assert_allclose(totales["total_volumen_insumos_humedos_t_dia"], esperado["Volumen (t/año)"].sum() / 365.0)
+    np.testing.assert_allclose(totales["total_ts_en_insumos_t_dia"], esperado["TS (t/año)"].sum() / 365.0)
+    np.testing.assert_allclose(totales["total_biogas_bruto_m3_dia"], esperado["Biogás Bruto (m3/año)"].sum() / 365.0)
+
+
+def test_entradas_como_texto_y_no_numericas(insumos):
+    # Las columnas pueden llegar como texto (formularios, CSV); lo que no es numérico da 0 en lugar de NaN
+    texto = insumos.astype({"Volumen (t/año)": str, "TS (%)": str})
+    texto.loc[0, "TS (%)"] = "n/d"
+    obtenido = calcular_produccion(texto)
+    np.testing.assert_allclose(obtenido["TS (t/año)"].iloc[1:], produccion_pagina_original(insumos)["TS (t/año)"].iloc[1:])
+    assert obtenido.loc[0, "TS (t/año)"] == 0.0
+    assert obtenido.loc[0, "Biometano final (m3/año)"] == 0.0
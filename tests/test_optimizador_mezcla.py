@@ -0,0 +1,81 @@
+# tests/test_optimizador_mezcla.py
+# Las soluciones de la programación lineal y de la heurística voraz se comprueban con los motores de
+# producción y balance (no con las formas lineales que usa el optimizador).
+import importlib.util
+
+import numpy as np
+import pytest
+
+from motor_balance import resolver_recirculacion
+from motor_produccion import calcular_produccion, totales_diarios
+from optimizador_mezcla import optimizar_mezcla
+
+PARAMETROS_PROCESO = dict(
+    agua_limpieza_m3_dia=5.0, agua_dilucion_directa_m3_dia=0.0, target_TS_digestor_percent=10.0, recirculacion_fraccion=0.3,
+    evaporacion_perdida_fraccion=0.01, humedad_torta_solida_percent=75.0, eficiencia_captura_ts_en_torta=0.85,
+)
+G_AGUA = 50.0
+LIMITES = dict(dilucion_max_m3_dia=300.0, efluente_max_m3_dia=350.0, volumen_max_t_dia=120.0, fraccion_ganadera_min=0.3)
+# La programación lineal necesita scipy (dependencia opcional); la heurística voraz no
+SIN_SCIPY = importlib.util.find_spec("scipy") is None
+METODOS = [pytest.param("lineal", marks=pytest.mark.skipif(SIN_SCIPY, reason="scipy no instalado")), "voraz"]
+
+
+@pytest.fixture
+def oferta(insumos):
+    return insumos.assign(**{"Disponible (t/año)": insumos["Volumen (t/año)"], "Mínimo (t/año)": 0.0})
+
+
+def balance_con_motores(df_insumos, volumenes, parametros_proceso=PARAMETROS_PROCESO):
+    totales = totales_diarios(calcular_produccion(df_insumos.assign(**{"Volumen (t/año)": volumenes})))
+    ts = totales["total_ts_en_insumos_t_dia"]
+    balance = resolver_recirculacion(
+        ts_total_t_dia=ts, agua_en_insumos_t_dia=totales["total_volumen_insumos_humedos_t_dia"] - ts,
+        agua_en_biogas_condensado_m3_dia=totales["total_biogas_bruto_m3_dia"] * G_AGUA / 1e6, **parametros_proceso
+    )
+    return totales, balance
+
+
+@pytest.mark.parametrize("metodo", METODOS)
+def test_mezcla_factible_segun_los_motores(oferta, metodo):
+    resultado = optimizar_mezcla(oferta, PARAMETROS_PROCESO, G_AGUA, metodo=metodo, **LIMITES)
+    assert resultado["estado"] is None
+    volumenes = resultado["produccion"]["Volumen (t/año)"].to_numpy()
+    assert np.all(volumenes >= -1e-9) and np.all(volumenes <= oferta["Disponible (t/año)"].to_numpy() * (1 + 1e-9))
+
+    totales, balance = balance_con_motores(oferta, volumenes)
+    tolerancia = 1e-6
+    assert balance["convergido"]
+    assert balance["E4_agua_dilucion_calculada"] <= LIMITES["dilucion_max_m3_dia"] * (1 + tolerancia)
+    assert balance["E4_agua_dilucion_calculada"] >= -tolerancia  # TS objetivo alcanzable diluyendo
+    assert balance["agua_efluente_liquido_neto_m3_dia"] <= LIMITES["efluente_max_m3_dia"] * (1 + tolerancia)
+    assert totales["total_volumen_insumos_humedos_t_dia"] <= LIMITES["volumen_max_t_dia"] * (1 + tolerancia)
+    ganadera = oferta["Residuo ganadero"].eq("Sí").to_numpy(dtype=float)
+    assert ganadera @ volumenes / volumenes.sum() >= LIMITES["fraccion_ganadera_min"] - tolerancia
+    # El balance que devuelve el optimizador es el de los motores
+    np.testing.assert_allclose(resultado["balance"]["E4_agua_dilucion_calculada"], balance["E4_agua_dilucion_calculada"], rtol=1e-9)
+
+
+@pytest.mark.skipif(SIN_SCIPY, reason="scipy no instalado")
+def test_heuristica_voraz_no_supera_al_optimo_lineal(oferta):
+    lineal = optimizar_mezcla(oferta, PARAMETROS_PROCESO, G_AGUA, metodo="lineal", **LIMITES)
+    voraz = optimizar_mezcla(oferta, PARAMETROS_PROCESO, G_AGUA, metodo="voraz", **LIMITES)
+    assert voraz["biometano_final_m3_ano"] <= lineal["biometano_final_m3_ano"] * (1 + 1e-9)
+    assert voraz["biometano_final_m3_ano"] >= 0.9 * lineal["biometano_final_m3_ano"]
+
+
+@pytest.mark.parametrize("metodo", METODOS)
+def test_recirculacion_total_sin_evaporacion(oferta, metodo):
+    # Sin estado estacionario en el tramo sin dilución, la mezcla óptima debe quedar en el tramo con dilución
+    parametros = dict(PARAMETROS_PROCESO, recirculacion_fraccion=1.0, evaporacion_perdida_fraccion=0.0)
+    resultado = optimizar_mezcla(oferta, parametros, G_AGUA, metodo=metodo, exigir_ts_objetivo=False)
+    assert resultado["estado"] is None
+    _, balance = balance_con_motores(oferta, resultado["produccion"]["Volumen (t/año)"].to_numpy(), parametros)
+    assert balance["convergido"] and balance["E4_agua_dilucion_calculada"] >= -1e-6
+
+
+@pytest.mark.parametrize("metodo", METODOS)
+def test_sin_mezcla_posible(oferta, metodo):
+    resultado = optimizar_mezcla(oferta.assign(**{"Mínimo (t/año)": oferta["Disponible (t/año)"]}), PARAMETROS_PROCESO, G_AGUA,
+                                 metodo=metodo, volumen_max_t_dia=1.0)
+    assert resultado["estado"] is not None and "produccion" not in resultado
@@ -0,0 +1,23 @@
+# tests/test_psicrometria.py
+import numpy as np
+import pytest
+
+from psicrometria import RANGO_VALIDEZ_C, contenido_agua_biogas, presion_vapor_saturacion_hPa
+
+
+def test_valores_de_referencia():
+    # Presión de vapor de saturación tabulada: 31,7 hPa a 25 °C y 56,3 hPa a 35 °C
+    assert presion_vapor_saturacion_hPa([25.0, 35.0]) == pytest.approx([31.7, 56.3], rel=5e-3)
+    assert contenido_agua_biogas(35.0, base="m3_saturado") == pytest.approx(39.6, rel=1e-2)
+
+
+def test_mayor_presion_admite_menos_agua_por_Nm3():
+    atmosferica, comprimido = contenido_agua_biogas(35.0, [1013.25, 2000.0])
+    assert comprimido < atmosferica
+
+
+def test_temperatura_fuera_de_rango_se_limita():
+    minimo, maximo = RANGO_VALIDEZ_C
+    fuera = contenido_agua_biogas([minimo - 100.0, maximo + 100.0, -300.0])
+    assert fuera == pytest.approx(contenido_agua_biogas([minimo, maximo, minimo]))
+    assert np.isnan(contenido_agua_biogas(np.nan))
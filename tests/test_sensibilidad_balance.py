@@ -0,0 +1,40 @@
+# tests/test_sensibilidad_balance.py
+import numpy as np
+import pytest
+
+from incertidumbre import ResumenMonteCarlo
+from sensibilidad_balance import (
+    RANGOS_PARAMETROS, SALIDAS_BARRIDO, bloques_hipercubo_latino, evaluar_barrido, muestras_hipercubo_latino,
+)
+
+PARAMETROS_BASE = dict(
+    ts_total_t_dia=12.0, agua_en_insumos_t_dia=48.0, agua_limpieza_m3_dia=5.0, agua_dilucion_directa_m3_dia=1.0,
+    target_TS_digestor_percent=10.0, recirculacion_fraccion=0.3, evaporacion_perdida_fraccion=0.01,
+    humedad_torta_solida_percent=75.0, eficiencia_captura_ts_en_torta=0.85, agua_en_biogas_condensado_m3_dia=0.4,
+)
+
+
+def test_hipercubo_latino_un_punto_por_estrato():
+    muestras = muestras_hipercubo_latino(RANGOS_PARAMETROS, 500, semilla=1)
+    for parametro, (minimo, maximo) in RANGOS_PARAMETROS.items():
+        estratos = np.floor((muestras[parametro] - minimo) / (maximo - minimo) * 500).astype(int)
+        assert sorted(estratos) == list(range(500))
+
+
+def test_bloques_reproducibles_y_del_tamano_pedido():
+    bloques = list(bloques_hipercubo_latino(RANGOS_PARAMETROS, 2_500, tamano_bloque=1_000, semilla=0))
+    assert [len(b["recirculacion_fraccion"]) for b in bloques] == [1_000, 1_000, 500]
+    repetidos = list(bloques_hipercubo_latino(RANGOS_PARAMETROS, 2_500, tamano_bloque=1_000, semilla=0))
+    assert all(np.array_equal(a[p], b[p]) for a, b in zip(bloques, repetidos) for p in RANGOS_PARAMETROS)
+
+
+def test_resumen_por_bloques_coincide_con_el_barrido_completo():
+    bloques = list(bloques_hipercubo_latino(RANGOS_PARAMETROS, 30_000, tamano_bloque=4_000, semilla=0))
+    completo = evaluar_barrido(PARAMETROS_BASE, {p: np.concatenate([b[p] for b in bloques]) for p in RANGOS_PARAMETROS})
+    resumen = ResumenMonteCarlo(list(SALIDAS_BARRIDO))
+    for bloque in bloques:
+        resumen.anadir(evaluar_barrido(PARAMETROS_BASE, bloque))
+    for salida in SALIDAS_BARRIDO:
+        distribucion = resumen.distribuciones[salida]
+        exacto = np.nanpercentile(completo[salida], [5, 25, 50, 75, 95])
+        assert distribucion.percentiles([5, 25, 50, 75, 95]) == pytest.approx(exacto, abs=2 * distribucion.ancho + 1e-9)
@@ -0,0 +1,107 @@
+# tests/test_servidor_api.py
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+import servidor_api
+from servidor_api import ServidorAPI, procesar_peticion
+
+INSUMOS = [{"Volumen": 1000, "TS": 10, "SV": 80, "Potencial": 300, "%CH4": 55}]
+
+
+def _json(cuerpo, consulta=None):
+    estado, _, datos = procesar_peticion(json.dumps(cuerpo).encode("utf-8"), "application/json", consulta or {})
+    return estado, json.loads(datos)
+
+
+def test_trabajo_valido():
+    estado, datos = _json({"insumos": INSUMOS, "parametros": {"recirculacion_fraccion": 0.2}})
+    assert estado == HTTPStatus.OK
+    (resultado,) = datos["resultados"]
+    assert "error" not in resultado and resultado["parametros"]["recirculacion_fraccion"] == 0.2
+
+
+@pytest.mark.parametrize("cuerpo", [
+    {"insumos": INSUMOS, "parametros": [1]},
+    {"insumos": INSUMOS, "parametros": "recirculacion_fraccion=0.2"},
+    {"trabajos": {"insumos": INSUMOS}},
+    {"sin_insumos": True},
+    [1, 2, 3],
+])
+def test_peticiones_mal_formadas_dan_400(cuerpo):
+    estado, datos = _json(cuerpo)
+    assert estado == HTTPStatus.BAD_REQUEST and datos["error"]
+
+
+def test_json_no_valido_y_formato_desconocido_dan_400():
+    estado, _, _ = procesar_peticion(b"{no es json", "application/json", {})
+    assert estado == HTTPStatus.BAD_REQUEST
+    estado, _ = _json({"insumos": INSUMOS}, {"formato": "xml"})
+    assert estado == HTTPStatus.BAD_REQUEST
+
+
+def test_un_trabajo_invalido_no_detiene_el_lote():
+    estado, datos = _json({"trabajos": [
+        {"id": "bueno", "insumos": INSUMOS},
+        {"id": "tipo", "insumos": INSUMOS, "parametros": {"recirculacion_fraccion": [1, 2]}},
+        {"id": "desconocido", "insumos": INSUMOS, "parametros": {"no_existe": 1}},
+    ]})
+    assert estado == HTTPStatus.OK
+    errores = {r["id"]: r.get("error") for r in datos["resultados"]}
+    assert errores["bueno"] is None and errores["tipo"] and errores["desconocido"]
+
+
+async def _peticion(puerto, metodo, ruta, cuerpo=b"", longitud=None):
+    """`longitud`: valor de Content-Length (por defecto, el del cuerpo; "" para no enviar la cabecera)."""
+    longitud = len(cuerpo) if longitud is None else longitud
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    escritor.write((
+        f"{metodo} {ruta} HTTP/1.1\r\nHost: prueba\r\nContent-Type: application/json\r\n"
+        + (f"Content-Length: {longitud}\r\n" if longitud != "" else "")
+        + "Connection: close\r\n\r\n"
+    ).encode("latin-1") + cuerpo)
+    await escritor.drain()
+    respuesta = await lector.read()
+    escritor.close()
+    cabecera, _, datos = respuesta.partition(b"\r\n\r\n")
+    return int(cabecera.split()[1]), json.loads(datos)
+
+
+def _con_servidor(*peticiones):
+    async def principal():
+        servidor = ServidorAPI(puerto=0, procesos=0)  # Cálculo en el hilo por defecto del bucle
+        puerto = await servidor.iniciar()
+        try:
+            return [await _peticion(puerto, *p) for p in peticiones]
+        finally:
+            servidor.cerrar()
+    return asyncio.run(principal())
+
+
+def test_servidor_http_400_y_404():
+    (estado_ok, _), (estado_400, datos_400), (estado_404, _), (estado_405, _) = _con_servidor(
+        ("POST", "/v1/calcular", json.dumps({"insumos": INSUMOS}).encode()),
+        ("POST", "/v1/calcular", json.dumps({"insumos": INSUMOS, "parametros": [1]}).encode()),
+        ("GET", "/no/existe"),
+        ("GET", "/v1/calcular"),
+    )
+    assert (estado_ok, estado_400, estado_404, estado_405) == (200, 400, 404, 405)
+    assert "parametros" in datos_400["error"]
+
+
+@pytest.mark.parametrize("longitud", ["abc", "-5", "1.5", "²", ""])
+def test_content_length_no_valido_o_ausente_da_400(longitud):
+    cuerpo = json.dumps({"insumos": INSUMOS}).encode()
+    ((estado, datos),) = _con_servidor(("POST", "/v1/calcular", cuerpo if longitud == "" else b"", longitud))
+    assert estado == 400 and datos["error"]
+
+
+def test_fallo_inesperado_da_500_sin_detener_el_servidor(monkeypatch):
+    def fallo(*args):
+        raise RuntimeError("fallo del cálculo")
+    monkeypatch.setattr(servidor_api, "procesar_peticion", fallo)
+    (estado, datos), (estado_salud, _) = _con_servidor(("POST", "/v1/calcular", b"{}"), ("GET", "/salud"))
+    assert estado == 500 and "RuntimeError" in datos["error"]
+    assert estado_salud == 200